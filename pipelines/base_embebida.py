@@ -0,0 +1,240 @@
+"""base_embebida.py
+----------------
+Base analítica embebida de un solo archivo con el modelo estrella (todas las
+dim_* y fact_* más fact_unificado_long), para consultas ad-hoc y tests sin
+levantar MySQL (load_to_mysql.py) ni escanear decenas de CSV con pandas.
+
+- DuckDB si está instalado; si no, SQLite (biblioteca estándar).
+- Columnas tipadas (tipar, igual que la salida Parquet).
+- Claves declaradas: PRIMARY KEY en la primera columna *_id de cada dim_*
+  (como load_to_mysql) y FOREIGN KEY de las fact_* hacia esa dimensión
+  cuando todos los valores existen en ella.
+- Índices en columnas *_id y en (anio, trimestre, mes), creados después de
+  la carga.
+- Carga masiva: DuckDB ingiere cada tabla Arrow con INSERT ... SELECT (sin
+  filas sueltas); SQLite usa executemany en una sola transacción sin
+  journal.
+- Se construye en un temporal y se reemplaza al final: quien tenga la base
+  abierta nunca ve una a medio escribir.
+
+Salida:
+  data/processed/enacom.duckdb   (o enacom.sqlite con el fallback)
+
+Uso:
+  python -m pipelines.base_embebida [duckdb|sqlite]
+
+  from pipelines.base_embebida import conectar
+  con = conectar()
+  con.execute('SELECT p.provincia, SUM(f.accesos) FROM fact_internet_accesos_baf f '
+              'JOIN dim_provincias p USING (provincia_id) GROUP BY 1').fetchall()
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from .io_csv import leer_csv
+from .salida_parquet import tipar
+
+try:
+    import duckdb
+    HAS_DUCKDB = True
+except ImportError:
+    HAS_DUCKDB = False
+
+try:
+    import pyarrow as pa
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PROCESSED_DIR = BASE_DIR / 'data' / 'processed'
+DIMENSIONAL_DIR = PROCESSED_DIR / 'dimensional'
+OUT_DIR = PROCESSED_DIR / 'out'
+
+MOTORES = ('auto', 'duckdb', 'sqlite')
+EXTENSIONES = {'duckdb': '.duckdb', 'sqlite': '.sqlite'}
+NOMBRE_BASE = 'enacom'
+COLUMNAS_TIEMPO = ['anio', 'trimestre', 'mes']
+# Tablas de out/ que también se cargan (además de todo dimensional/)
+TABLAS_OUT = ['fact_unificado_long']
+
+
+def resolver_motor(motor: str = 'auto') -> str:
+    motor = (motor or 'auto').lower()
+    if motor not in MOTORES:
+        raise ValueError(f"Motor desconocido: {motor}. Opciones: {MOTORES}")
+    if motor == 'auto':
+        return 'duckdb' if HAS_DUCKDB and HAS_PYARROW else 'sqlite'
+    if motor == 'duckdb' and not (HAS_DUCKDB and HAS_PYARROW):
+        raise ImportError("El motor duckdb requiere duckdb y pyarrow. Instálelos con:\n  pip install duckdb pyarrow")
+    return motor
+
+
+def ruta_base(motor: str = 'auto', carpeta: Optional[Path] = None) -> Path:
+    carpeta = Path(carpeta) if carpeta is not None else PROCESSED_DIR
+    return carpeta / f'{NOMBRE_BASE}{EXTENSIONES[resolver_motor(motor)]}'
+
+
+# ---------- Esquema ----------
+
+def tipo_sql(serie: pd.Series, motor: str) -> str:
+    dtype = serie.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'BOOLEAN' if motor == 'duckdb' else 'INTEGER'
+    if pd.api.types.is_integer_dtype(dtype):
+        if motor == 'sqlite':
+            return 'INTEGER'
+        return {1: 'TINYINT', 2: 'SMALLINT', 4: 'INTEGER'}.get(dtype.itemsize, 'BIGINT')
+    if pd.api.types.is_float_dtype(dtype):
+        return 'DOUBLE' if motor == 'duckdb' else 'REAL'
+    return 'VARCHAR' if motor == 'duckdb' else 'TEXT'
+
+
+def clave_primaria(nombre: str, df: pd.DataFrame) -> Optional[str]:
+    """Primera columna *_id de una dim_* si es única y sin nulos."""
+    if not nombre.startswith('dim_'):
+        return None
+    for col in df.columns:
+        if col.endswith('_id'):
+            s = df[col]
+            return col if s.notna().all() and s.is_unique else None
+    return None
+
+
+def claves_foraneas(df: pd.DataFrame, primarias: Dict[str, tuple]) -> Dict[str, str]:
+    """{columna: dimensión} para cada *_id cuyos valores existen todos en la dimensión."""
+    fks = {}
+    for col in df.columns:
+        if col not in primarias:
+            continue
+        dim, valores = primarias[col]
+        presentes = df[col].dropna()
+        if presentes.isin(valores).all() and presentes.dtype.kind == valores.dtype.kind:
+            fks[col] = dim
+    return fks
+
+
+def sql_crear_tabla(nombre: str, df: pd.DataFrame, motor: str, pk: Optional[str],
+                    fks: Dict[str, str]) -> str:
+    cols = [f'  "{c}" {tipo_sql(df[c], motor)}{" NOT NULL" if c == pk else ""}' for c in df.columns]
+    if pk:
+        cols.append(f'  PRIMARY KEY ("{pk}")')
+    for col, dim in fks.items():
+        cols.append(f'  FOREIGN KEY ("{col}") REFERENCES "{dim}" ("{col}")')
+    return f'CREATE TABLE "{nombre}" (\n' + ',\n'.join(cols) + '\n)'
+
+
+def sql_indices(nombre: str, df: pd.DataFrame, pk: Optional[str], fks: Dict[str, str], motor: str) -> List[str]:
+    idx = []
+    for col in df.columns:
+        # DuckDB ya indexa PK y FK; SQLite solo la PK
+        if col.endswith('_id') and col != pk and not (motor == 'duckdb' and col in fks):
+            idx.append(f'CREATE INDEX "idx_{nombre}_{col}" ON "{nombre}" ("{col}")')
+    tiempo = [c for c in COLUMNAS_TIEMPO if c in df.columns]
+    if tiempo:
+        idx.append(f'CREATE INDEX "idx_{nombre}_tiempo" ON "{nombre}" (' + ', '.join(f'"{c}"' for c in tiempo) + ')')
+    return idx
+
+
+# ---------- Carga ----------
+
+def _ingestar_duckdb(con, nombre: str, df: pd.DataFrame) -> None:
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    con.register('_ingesta', tabla)
+    try:
+        con.execute(f'INSERT INTO "{nombre}" SELECT * FROM _ingesta')
+    finally:
+        con.unregister('_ingesta')
+
+
+def _ingestar_sqlite(con, nombre: str, df: pd.DataFrame) -> None:
+    marcadores = ', '.join('?' * df.shape[1])
+    # tolist() devuelve escalares de Python; NaN / NA -> NULL
+    columnas = [[None if pd.isna(v) else v for v in df[c].tolist()] for c in df.columns]
+    con.executemany(f'INSERT INTO "{nombre}" VALUES ({marcadores})', zip(*columnas))
+
+
+def _orden_carga(tablas: Dict[str, pd.DataFrame]) -> List[str]:
+    """Dimensiones primero (las FK las referencian)."""
+    return sorted(tablas, key=lambda n: (not n.startswith('dim_'), n))
+
+
+def construir_base(tablas: Dict[str, pd.DataFrame], destino: Optional[Path] = None,
+                   motor: str = 'auto') -> Path:
+    """Crea la base embebida con todas las tablas ({nombre: DataFrame}) y devuelve su ruta."""
+    motor = resolver_motor(motor)
+    destino = Path(destino) if destino is not None else ruta_base(motor)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporal = destino.with_name(f'.{destino.name}.tmp')
+    for p in (temporal, temporal.with_name(temporal.name + '.wal')):
+        p.unlink(missing_ok=True)
+
+    tipadas = {n: tipar(df) for n, df in tablas.items()}
+    primarias: Dict[str, tuple] = {}
+    con = duckdb.connect(str(temporal)) if motor == 'duckdb' else sqlite3.connect(temporal)
+    try:
+        if motor == 'sqlite':
+            con.execute('PRAGMA journal_mode = OFF')
+            con.execute('PRAGMA synchronous = OFF')
+            con.execute('PRAGMA foreign_keys = ON')
+        indices = []
+        for nombre in _orden_carga(tipadas):
+            df = tipadas[nombre]
+            pk = clave_primaria(nombre, df)
+            fks = claves_foraneas(df, primarias) if nombre.startswith('fact_') else {}
+            con.execute(sql_crear_tabla(nombre, df, motor, pk, fks))
+            (_ingestar_duckdb if motor == 'duckdb' else _ingestar_sqlite)(con, nombre, df)
+            if pk:
+                primarias[pk] = (nombre, df[pk])
+            indices += sql_indices(nombre, df, pk, fks, motor)
+        for sql in indices:
+            con.execute(sql)
+        if motor == 'sqlite':
+            con.commit()
+            con.execute('ANALYZE')
+        else:
+            con.execute('CHECKPOINT')
+    finally:
+        con.close()
+    os.replace(temporal, destino)
+    return destino
+
+
+def tablas_desde_csv(dimensional_dir: Optional[Path] = None, out_dir: Optional[Path] = None) -> Dict[str, pd.DataFrame]:
+    """dim_*/fact_* de dimensional/ más TABLAS_OUT de out/, si existen."""
+    dimensional_dir = Path(dimensional_dir) if dimensional_dir is not None else DIMENSIONAL_DIR
+    out_dir = Path(out_dir) if out_dir is not None else OUT_DIR
+    archivos = sorted(dimensional_dir.glob('dim_*.csv')) + sorted(dimensional_dir.glob('fact_*.csv'))
+    archivos += [out_dir / f'{n}.csv' for n in TABLAS_OUT if (out_dir / f'{n}.csv').exists()]
+    return {p.stem: leer_csv(p) for p in archivos}
+
+
+def conectar(path: Optional[Path] = None, solo_lectura: bool = True):
+    """Conexión a la base embebida (DuckDB o SQLite según la extensión)."""
+    path = Path(path) if path is not None else ruta_base()
+    if path.suffix == EXTENSIONES['duckdb']:
+        return duckdb.connect(str(path), read_only=solo_lectura)
+    uri = f'file:{path}?mode=ro' if solo_lectura else f'file:{path}'
+    return sqlite3.connect(uri, uri=True)
+
+
+def main():
+    motor = resolver_motor(sys.argv[1] if len(sys.argv) > 1 else 'auto')
+    print(f'🗄️  Construyendo base embebida ({motor})...')
+    tablas = tablas_desde_csv()
+    if not tablas:
+        print(f'No hay CSV en {DIMENSIONAL_DIR}. Ejecutar primero el pipeline.')
+        return
+    destino = construir_base(tablas, motor=motor)
+    print(f'✔ {destino.name} ({len(tablas)} tablas, {sum(len(df) for df in tablas.values())} filas)')
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,11 @@ import os
 from pathlib import Path
 import pandas as pd
 
+try:
+    from .salida_parquet import escribir_tabla
+except ImportError:  # ejecutado como script: python pipelines/bootstrap_test_data.py
+    from salida_parquet import escribir_tabla
+
 BASE_DIR = Path(__file__).resolve().parents[1]
 RAW_ENACOM = BASE_DIR / 'data' / 'raw' / 'enacom'
 PROCESSED = BASE_DIR / 'data' / 'processed'
@@ -10,6 +15,11 @@ BI_DIR = PROCESSED / 'bi'
 OUT_DIR = PROCESSED / 'out'
 
 
+def _escribir(df: pd.DataFrame, path: Path):
+    # Mismo CSV que df.to_csv(index=False), registrado en el catálogo de la carpeta
+    escribir_tabla(df, path, formato='csv')
+
+
 def ensure_dirs():
     for d in [RAW_ENACOM, PROCESSED, DIMENSIONAL, BI_DIR, OUT_DIR]:
         d.mkdir(parents=True, exist_ok=True)
@@ -32,7 +42,7 @@ def generate_clean_files():
         'provincia': ['Buenos Aires', 'Cordoba'],
         'accesos': [100, 120],
     })
-    data1.to_csv(PROCESSED / 'internet_accesos_baf_clean.csv', index=False)
+    _escribir(data1, PROCESSED / 'internet_accesos_baf_clean.csv')
 
     data2 = pd.DataFrame({
         'anio': [2022, 2023],
@@ -40,7 +50,7 @@ def generate_clean_files():
         'provincia': ['Mendoza', 'Santa Fe'],
         'accesos': [50, 75],
     })
-    data2.to_csv(PROCESSED / 'telefonia_fija_accesos_provincias_clean.csv', index=False)
+    _escribir(data2, PROCESSED / 'telefonia_fija_accesos_provincias_clean.csv')
 
     data3 = pd.DataFrame({
         'anio': [2022],
@@ -48,7 +58,7 @@ def generate_clean_files():
         'provincia': ['Tucuman'],
         'accesos': [33],
     })
-    data3.to_csv(PROCESSED / 'tv_accesos_provincias_clean.csv', index=False)
+    _escribir(data3, PROCESSED / 'tv_accesos_provincias_clean.csv')
 
     # Resumen
     resumen = pd.DataFrame([
@@ -56,7 +66,7 @@ def generate_clean_files():
         {'archivo': 'telefonia_fija_accesos_provincias_clean.csv', 'filas': len(data2)},
         {'archivo': 'tv_accesos_provincias_clean.csv', 'filas': len(data3)},
     ])
-    resumen.to_csv(PROCESSED / 'resumen_datos.csv', index=False)
+    _escribir(resumen, PROCESSED / 'resumen_datos.csv')
 
 
 def generate_dimensional():
@@ -80,7 +90,7 @@ def generate_dimensional():
         'superficie_km2': [10000 + i*100 for i in range(24)],
         'capital': [p for p in provincias],
     })
-    dim_prov.to_csv(DIMENSIONAL / 'dim_provincias.csv', index=False)
+    _escribir(dim_prov, DIMENSIONAL / 'dim_provincias.csv')
 
     # dim_tiempo: TM01..TM08 con 2020-2021 trimestres
     registros = []
@@ -95,7 +105,7 @@ def generate_dimensional():
             })
             idx += 1
     dim_tiempo = pd.DataFrame(registros)
-    dim_tiempo.to_csv(DIMENSIONAL / 'dim_tiempo.csv', index=False)
+    _escribir(dim_tiempo, DIMENSIONAL / 'dim_tiempo.csv')
 
     # dim_tecnologias
     dim_tecnologias = pd.DataFrame({
@@ -103,7 +113,7 @@ def generate_dimensional():
         'tecnologia': ['FTTH', 'HFC', 'ADSL'],
         'categoria': ['INTERNET_FIJO', 'INTERNET_FIJO', 'INTERNET_FIJO']
     })
-    dim_tecnologias.to_csv(DIMENSIONAL / 'dim_tecnologias.csv', index=False)
+    _escribir(dim_tecnologias, DIMENSIONAL / 'dim_tecnologias.csv')
 
     # dim_velocidades
     dim_vel = pd.DataFrame({
@@ -112,7 +122,7 @@ def generate_dimensional():
         'velocidad_min_kbps': [0, 3000, 10000],
         'velocidad_max_kbps': [2999, 9999, 999999]
     })
-    dim_vel.to_csv(DIMENSIONAL / 'dim_velocidades.csv', index=False)
+    _escribir(dim_vel, DIMENSIONAL / 'dim_velocidades.csv')
 
     # dim_servicios
     dim_srv = pd.DataFrame({
@@ -120,7 +130,7 @@ def generate_dimensional():
         'servicio': ['Internet', 'Telefonia'],
         'categoria': ['DATOS', 'VOZ']
     })
-    dim_srv.to_csv(DIMENSIONAL / 'dim_servicios.csv', index=False)
+    _escribir(dim_srv, DIMENSIONAL / 'dim_servicios.csv')
 
     # Hechos mínimos
     fact_columns = ['tiempo_id', 'provincia_id', 'valor']
@@ -128,10 +138,10 @@ def generate_dimensional():
         {'tiempo_id': 'TM01', 'provincia_id': 'PR01', 'valor': 10},
         {'tiempo_id': 'TM02', 'provincia_id': 'PR02', 'valor': 20},
     ])
-    base_rows.to_csv(DIMENSIONAL / 'fact_internet_accesos_baf_provincias.csv', index=False)
-    base_rows.to_csv(DIMENSIONAL / 'fact_comunicaciones_moviles_accesos.csv', index=False)
-    base_rows.to_csv(DIMENSIONAL / 'fact_telefonia_fija_accesos_provincias.csv', index=False)
-    base_rows.to_csv(DIMENSIONAL / 'fact_tv_accesos_provincias.csv', index=False)
+    _escribir(base_rows, DIMENSIONAL / 'fact_internet_accesos_baf_provincias.csv')
+    _escribir(base_rows, DIMENSIONAL / 'fact_comunicaciones_moviles_accesos.csv')
+    _escribir(base_rows, DIMENSIONAL / 'fact_telefonia_fija_accesos_provincias.csv')
+    _escribir(base_rows, DIMENSIONAL / 'fact_tv_accesos_provincias.csv')
 
 
 def generate_bi():
@@ -144,15 +154,15 @@ def generate_bi():
         'poblacion_2023': dim_prov['poblacion_2023'],
         'superficie_km2': dim_prov['superficie_km2'],
     })
-    dim_prov_bi.to_csv(BI_DIR / 'dim_provincias.csv', index=False)
+    _escribir(dim_prov_bi, BI_DIR / 'dim_provincias.csv')
 
     # dim_tiempo BI con tiempo_id, anio, trimestre, periodo
     dim_tiempo = pd.read_csv(DIMENSIONAL / 'dim_tiempo.csv')
-    dim_tiempo.to_csv(BI_DIR / 'dim_tiempo.csv', index=False)
+    _escribir(dim_tiempo, BI_DIR / 'dim_tiempo.csv')
 
     # dim_tecnologias BI
     dim_tecnologias = pd.read_csv(DIMENSIONAL / 'dim_tecnologias.csv')
-    dim_tecnologias.to_csv(BI_DIR / 'dim_tecnologias.csv', index=False)
+    _escribir(dim_tecnologias, BI_DIR / 'dim_tecnologias.csv')
 
     # dim_velocidades BI
     dim_vel = pd.read_csv(DIMENSIONAL / 'dim_velocidades.csv')
@@ -162,7 +172,7 @@ def generate_bi():
         'velocidad_min_kbps': dim_vel['velocidad_min_kbps'],
         'velocidad_max_kbps': dim_vel['velocidad_max_kbps'],
     })
-    dim_vel_bi.to_csv(BI_DIR / 'dim_velocidades.csv', index=False)
+    _escribir(dim_vel_bi, BI_DIR / 'dim_velocidades.csv')
 
     # Hechos BI
     fact_inet_vel = pd.DataFrame({
@@ -171,7 +181,7 @@ def generate_bi():
         'velocidad_id': [1, 2],
         'mbps': [20.5, 30.1],
     })
-    fact_inet_vel.to_csv(BI_DIR / 'fact_internet_velocidad.csv', index=False)
+    _escribir(fact_inet_vel, BI_DIR / 'fact_internet_velocidad.csv')
 
     fact_tel_acc = pd.DataFrame({
         'tiempo_id': ['TM01', 'TM02'],
@@ -181,7 +191,7 @@ def generate_bi():
         'gobierno': [2, 3],
         'total': [112, 133],
     })
-    fact_tel_acc.to_csv(BI_DIR / 'fact_telefonia_accesos.csv', index=False)
+    _escribir(fact_tel_acc, BI_DIR / 'fact_telefonia_accesos.csv')
 
     fact_mov_acc = pd.DataFrame({
         'tiempo_id': ['TM01', 'TM02'],
@@ -189,24 +199,24 @@ def generate_bi():
         'prepago': [70, 80],
         'operativos': [110, 140],
     })
-    fact_mov_acc.to_csv(BI_DIR / 'fact_movil_accesos.csv', index=False)
+    _escribir(fact_mov_acc, BI_DIR / 'fact_movil_accesos.csv')
 
     fact_inet_acc = pd.DataFrame({
         'tiempo_id': ['TM01', 'TM02'],
         'provincia_id': [1, 2],
         'accesos': [200, 300],
     })
-    fact_inet_acc.to_csv(BI_DIR / 'fact_internet_accesos.csv', index=False)
+    _escribir(fact_inet_acc, BI_DIR / 'fact_internet_accesos.csv')
 
 
 def generate_out():
     # dim_provincias_norm
     prov = pd.read_csv(BI_DIR / 'dim_provincias.csv')
-    pd.DataFrame({'ProvinciaNorm': prov['provincia']}).to_csv(OUT_DIR / 'dim_provincias_norm.csv', index=False)
+    _escribir(pd.DataFrame({'ProvinciaNorm': prov['provincia']}), OUT_DIR / 'dim_provincias_norm.csv')
 
     # dim_tiempo_norm
     tiempo = pd.read_csv(BI_DIR / 'dim_tiempo.csv')[['anio', 'trimestre']].drop_duplicates()
-    tiempo.to_csv(OUT_DIR / 'dim_tiempo_norm.csv', index=False)
+    _escribir(tiempo, OUT_DIR / 'dim_tiempo_norm.csv')
 
     # dim_velocidades_ready
     vel = pd.read_csv(BI_DIR / 'dim_velocidades.csv')
@@ -214,7 +224,7 @@ def generate_out():
         'rango_key': vel['rango_velocidad'].str.replace(' ', '_').str.lower(),
         'orden': list(range(1, len(vel) + 1))
     })
-    vel_ready.to_csv(OUT_DIR / 'dim_velocidades_ready.csv', index=False)
+    _escribir(vel_ready, OUT_DIR / 'dim_velocidades_ready.csv')
 
     # fact_tecnologias_long
     fact_tecnologias_long = pd.DataFrame({
@@ -224,7 +234,7 @@ def generate_out():
         'tecnologia': ['FTTH', 'HFC', 'ADSL'],
         'accesos': [100, 80, 60]
     })
-    fact_tecnologias_long.to_csv(OUT_DIR / 'fact_tecnologias_long.csv', index=False)
+    _escribir(fact_tecnologias_long, OUT_DIR / 'fact_tecnologias_long.csv')
 
     # fact_velocidad_rangos_long
     fact_vel_rangos = pd.DataFrame({
@@ -234,7 +244,7 @@ def generate_out():
         'rango_velocidad': ['0-3 Mbps', '3-10 Mbps'],
         'accesos': [10, 20]
     })
-    fact_vel_rangos.to_csv(OUT_DIR / 'fact_velocidad_rangos_long.csv', index=False)
+    _escribir(fact_vel_rangos, OUT_DIR / 'fact_velocidad_rangos_long.csv')
 
     # fact_velocidad_media_provincias
     fact_vel_media = pd.DataFrame({
@@ -244,7 +254,7 @@ def generate_out():
         'mbps': [10.5, 12.3, 15.0, 20.0],
         'velocidad_id': [1, 2, 2, 3],
     })
-    fact_vel_media.to_csv(OUT_DIR / 'fact_velocidad_media_provincias.csv', index=False)
+    _escribir(fact_vel_media, OUT_DIR / 'fact_velocidad_media_provincias.csv')
 
     # fact_velocidad_numerica_provincias
     fact_vel_num = pd.DataFrame({
@@ -255,7 +265,7 @@ def generate_out():
         'accesos': [100, 200, 150],
         'velocidad_id': [1, 2, 3],
     })
-    fact_vel_num.to_csv(OUT_DIR / 'fact_velocidad_numerica_provincias.csv', index=False)
+    _escribir(fact_vel_num, OUT_DIR / 'fact_velocidad_numerica_provincias.csv')
 
     # fact_unificado_long.csv (mínimo)
     fact_uni = pd.DataFrame({
@@ -266,7 +276,7 @@ def generate_out():
         'valor': [100, 200, 50],
         'fuente_archivo': ['fuente1', 'fuente2', 'fuente3'],
     })
-    fact_uni.to_csv(OUT_DIR / 'fact_unificado_long.csv', index=False)
+    _escribir(fact_uni, OUT_DIR / 'fact_unificado_long.csv')
 
     # parquet placeholder
     (OUT_DIR / 'fact_unificado_long.parquet').write_bytes(b'PAR1')
@@ -0,0 +1,232 @@
+"""build_anomalias.py
+------------------
+Detección de anomalías en todas las series de `fact_unificado_long` (p.ej.
+una revisión de ENACOM donde los accesos de una provincia caen 90% en un
+solo trimestre) antes de que lleguen a los dashboards.
+
+Las series trimestrales se apilan en la matriz período × serie y se calculan
+dos puntajes en bloque con NumPy (sin bucles por serie):
+  - z_robusto: (valor - mediana) / (1.4826 * MAD) sobre una ventana móvil
+    centrada de VENTANA trimestres vecinos (sin incluir el evaluado)
+  - salto_pct / z_salto: variación contra el último período observado y su
+    puntaje robusto respecto de las variaciones vecinas de la misma serie
+Una celda es anómala si |z_robusto| o |z_salto| superan UMBRAL_Z con un
+desvío relativo de al menos VARIACION_MIN, o si el salto relativo supera
+UMBRAL_SALTO. Las filas imputadas no se evalúan.
+
+Salidas:
+  data/processed/out/anomalias.csv
+  reports/resumen_anomalias.md   (resumen por fuente_archivo, via write_report)
+
+Uso:
+  python -m pipelines.build_anomalias
+"""
+from __future__ import annotations
+
+import warnings
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .build_diccionario_metricas import cargar_fact
+from .salida_parquet import escribir_tabla
+from .series_temporales import (
+    agregar_periodo_idx, cargar_dim_tiempo, columnas_serie, grilla_periodos,
+    matriz_series, periodo_desde_idx,
+)
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+OUT_DIR = BASE_DIR / 'data' / 'processed' / 'out'
+REPORTS_DIR = BASE_DIR / 'reports'
+
+VENTANA = 8          # trimestres vecinos para mediana/MAD (±1 año)
+MIN_OBS = 4          # vecinos observados mínimos para puntuar
+UMBRAL_Z = 3.5       # criterio de Iglewicz-Hoaglin para z robusto
+UMBRAL_SALTO = 0.5   # variación relativa absoluta contra el período anterior
+VARIACION_MIN = 0.05 # desvío relativo mínimo para que un z alto cuente como anomalía
+ESCALA_MAD = 1.4826  # MAD -> desvío estándar bajo normalidad
+
+
+def _sin_avisos(func, *args, **kwargs):
+    # nanmedian advierte en ventanas vacías; esas celdas quedan en NaN a propósito
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return func(*args, **kwargs)
+
+
+def z_robusto_movil(matriz: np.ndarray, ventana: int = VENTANA, min_obs: int = MIN_OBS):
+    """Mediana, MAD y z robusto de cada celda contra su ventana de vecinos.
+
+    La ventana toma `ventana // 2` períodos a cada lado sin incluir la celda
+    evaluada: con vecinos simétricos la mediana sigue a las series con
+    tendencia (accesos que crecen todos los trimestres) sin estimar pendiente.
+    En los extremos la ventana queda truncada a un solo lado.
+    Devuelve (mediana, mad, z) con la forma de `matriz`. Las celdas con menos
+    de `min_obs` vecinos observados o MAD = 0 quedan con z = NaN; el MAD local
+    nunca es menor que la mediana de los MAD de la serie.
+    """
+    n_per, n_ser = matriz.shape
+    mitad = ventana // 2
+    relleno = np.full((n_per + 2 * mitad, n_ser), np.nan)
+    relleno[mitad:mitad + n_per] = matriz
+    # (período, serie, 2*mitad+1): la fila t cubre t-mitad .. t+mitad; se excluye t
+    vent = sliding_window_view(relleno, 2 * mitad + 1, axis=0).copy()
+    vent[:, :, mitad] = np.nan
+    n_validos = (~np.isnan(vent)).sum(axis=2)
+    mediana = _sin_avisos(np.nanmedian, vent, axis=2)
+    mad = _sin_avisos(np.nanmedian, np.abs(vent - mediana[:, :, None]), axis=2)
+    # Con pocos vecinos el MAD local puede ser casi 0 por azar
+    mad = np.fmax(mad, _sin_avisos(np.nanmedian, mad, axis=0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = (matriz - mediana) / (ESCALA_MAD * mad)
+    z = np.where((n_validos >= min_obs) & (mad > 0), z, np.nan)
+    return mediana, mad, z
+
+
+def saltos(matriz: np.ndarray, ventana: int = VENTANA):
+    """Variación contra el último valor observado y su z robusto.
+
+    Devuelve (previo, salto_pct, z_salto). z_salto compara cada diferencia con
+    las diferencias vecinas de la misma serie (misma ventana móvil que el
+    nivel), así una serie volátil no dispara alertas por variaciones habituales.
+    """
+    n_per, n_ser = matriz.shape
+    valido = ~np.isnan(matriz)
+    filas = np.arange(n_per)[:, None]
+    # Índice del último observado estrictamente anterior a cada fila
+    ultimo = np.maximum.accumulate(np.where(valido, filas, -1), axis=0)
+    prev_idx = np.vstack([np.full((1, n_ser), -1), ultimo[:-1]])
+    previo = np.where(prev_idx >= 0, matriz[np.clip(prev_idx, 0, None), np.arange(n_ser)[None, :]], np.nan)
+    diff = matriz - previo
+    with np.errstate(invalid='ignore', divide='ignore'):
+        salto_pct = np.where(previo != 0, diff / np.abs(previo), np.nan)
+    _, _, z_salto = z_robusto_movil(diff, ventana)
+    return previo, salto_pct, z_salto
+
+
+def detectar_anomalias(fact: pd.DataFrame, dim_tiempo: pd.DataFrame, ventana: int = VENTANA,
+                       umbral_z: float = UMBRAL_Z, umbral_salto: Optional[float] = UMBRAL_SALTO) -> pd.DataFrame:
+    """Tabla de celdas (serie, período) anómalas de fact_unificado_long.
+
+    Columnas: claves de serie, anio, trimestre, fuente_archivo, valor,
+    valor_previo, mediana_ventana, z_robusto, salto_pct, z_salto, tipo
+    ('nivel', 'salto' o 'nivel+salto').
+    """
+    df = fact[fact['anio'].notna()]
+    if 'trimestre' not in df.columns:
+        return pd.DataFrame()
+    df = df[pd.to_numeric(df['trimestre'], errors='coerce').notna()]
+    if 'mes' in df.columns:
+        df = df[pd.to_numeric(df['mes'], errors='coerce').isna()]
+    if 'imputado' in df.columns:
+        df = df[~df['imputado'].astype(str).str.lower().isin(['true', '1'])]
+    df = agregar_periodo_idx(df)
+    if df.empty:
+        return pd.DataFrame()
+
+    claves = columnas_serie(df)
+    periodos = grilla_periodos(dim_tiempo, df['periodo_idx'])['periodo_idx'].to_numpy(dtype='int64')
+    matriz, series = matriz_series(df, claves, periodos)
+    mediana, _, z = z_robusto_movil(matriz, ventana)
+    previo, salto_pct, z_salto = saltos(matriz, ventana)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        desvio_pct = np.abs(matriz - mediana) / np.abs(mediana)
+    es_nivel = (np.abs(np.nan_to_num(z)) > umbral_z) & (np.nan_to_num(desvio_pct, nan=np.inf) >= VARIACION_MIN)
+    es_salto = (np.abs(np.nan_to_num(z_salto)) > umbral_z) & (np.abs(np.nan_to_num(salto_pct, nan=np.inf)) >= VARIACION_MIN)
+    if umbral_salto is not None:
+        es_salto |= np.abs(np.nan_to_num(salto_pct)) > umbral_salto
+    es_salto &= ~np.isnan(matriz)
+    fila, col = np.nonzero(es_nivel | es_salto)
+
+    out = series.iloc[col].reset_index(drop=True)
+    per = periodo_desde_idx(periodos[fila])
+    out['anio'] = per['anio'].to_numpy()
+    out['trimestre'] = per['trimestre'].to_numpy()
+    if 'fuente_archivo' in df.columns:
+        fuentes = df.drop_duplicates(claves, keep='last')[claves + ['fuente_archivo']]
+        out = out.merge(fuentes, on=claves, how='left')
+    out['valor'] = matriz[fila, col]
+    out['valor_previo'] = previo[fila, col]
+    out['mediana_ventana'] = mediana[fila, col]
+    out['z_robusto'] = z[fila, col]
+    out['salto_pct'] = salto_pct[fila, col]
+    out['z_salto'] = z_salto[fila, col]
+    tipo = np.where(es_nivel[fila, col], 'nivel', '')
+    tipo = np.where(es_salto[fila, col], np.char.add(tipo, np.where(tipo == '', 'salto', '+salto')), tipo)
+    out['tipo'] = tipo
+    out.attrs['series_evaluadas'] = matriz.shape[1]
+    out.attrs['celdas_evaluadas'] = int((~np.isnan(matriz)).sum())
+    if 'fuente_archivo' in df.columns:
+        out.attrs['series_por_archivo'] = df.drop_duplicates(claves).groupby('fuente_archivo', dropna=False).size().to_dict()
+    return out
+
+
+def resumen_por_archivo(anomalias: pd.DataFrame) -> pd.DataFrame:
+    """Cantidad de anomalías y series afectadas por fuente_archivo."""
+    cols = ['fuente_archivo', 'series', 'series_afectadas', 'anomalias', 'nivel', 'salto', 'max_abs_z']
+    if anomalias.empty or 'fuente_archivo' not in anomalias.columns:
+        return pd.DataFrame(columns=cols)
+    claves = columnas_serie(anomalias)
+    a = anomalias.assign(
+        _nivel=anomalias['tipo'].str.contains('nivel'),
+        _salto=anomalias['tipo'].str.contains('salto'),
+        _z=anomalias[['z_robusto', 'z_salto']].abs().max(axis=1),
+        _serie=anomalias.groupby(claves, dropna=False).ngroup(),
+    )
+    res = a.groupby('fuente_archivo', dropna=False).agg(
+        series_afectadas=('_serie', 'nunique'), anomalias=('tipo', 'size'),
+        nivel=('_nivel', 'sum'), salto=('_salto', 'sum'), max_abs_z=('_z', 'max'),
+    ).reset_index()
+    res.insert(1, 'series', res['fuente_archivo'].map(anomalias.attrs.get('series_por_archivo', {})))
+    return res[cols].sort_values('anomalias', ascending=False).reset_index(drop=True)
+
+
+def escribir_reporte(anomalias: pd.DataFrame, path: Optional[Path] = None, top: int = 20) -> Path:
+    """Resumen en Markdown por archivo de origen + las anomalías más fuertes."""
+    from src.utils.reporting import write_report
+
+    path = Path(path) if path is not None else REPORTS_DIR / 'resumen_anomalias.md'
+    resumen = resumen_por_archivo(anomalias)
+    partes = ['## Resumen por archivo', '']
+    partes.append(resumen.to_markdown(index=False) if _hay_tabulate() else resumen.to_string(index=False))
+    if not anomalias.empty:
+        fuerza = anomalias[['z_robusto', 'z_salto']].abs().max(axis=1).fillna(0) + anomalias['salto_pct'].abs().fillna(0)
+        peores = anomalias.loc[fuerza.sort_values(ascending=False).index[:top]]
+        partes += ['', f'## Top {len(peores)} anomalías', '']
+        partes.append(peores.to_markdown(index=False) if _hay_tabulate() else peores.to_string(index=False))
+    metadata = {
+        'series_evaluadas': anomalias.attrs.get('series_evaluadas', 0),
+        'celdas_evaluadas': anomalias.attrs.get('celdas_evaluadas', 0),
+        'anomalias': len(anomalias),
+        'ventana': VENTANA,
+        'umbral_z': UMBRAL_Z,
+        'umbral_salto': UMBRAL_SALTO,
+    }
+    return write_report(path, 'Anomalías en fact_unificado_long', '\n'.join(partes), metadata)
+
+
+def _hay_tabulate() -> bool:
+    try:
+        import tabulate  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def main():
+    print('🔎 Buscando anomalías en todas las series...')
+    fact = cargar_fact()
+    anomalias = detectar_anomalias(fact, cargar_dim_tiempo())
+    escribir_tabla(anomalias, OUT_DIR / 'anomalias.csv')
+    print(f'✔ anomalias.csv ({len(anomalias)} filas)')
+    reporte = escribir_reporte(anomalias)
+    print(f'✔ {reporte.relative_to(BASE_DIR)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""build_correlaciones.py
+----------------------
+Cubo de correlaciones entre métricas por provincia (p.ej. ¿el crecimiento
+de fibra óptica se correlaciona con la velocidad media?), para no pivotear y
+llamar a corr() a mano en la notebook cada vez.
+
+`fact_unificado_long` se pivota una sola vez a un arreglo
+período × métrica × provincia, se estandariza cada serie y las correlaciones
+de todos los pares de métricas de todas las provincias salen de un único
+producto matricial batched (einsum sobre el eje período), por bloques de
+geografías para que los intermedios métrica × métrica × geo no crezcan con
+las localidades (ver MAX_CELDAS). Los datos
+faltantes se tratan por pares (pairwise complete), como pandas.corr().
+Los rezagos correlacionan métrica_a en t con métrica_b en t - lag.
+
+Salida (cacheada: solo se recalcula si cambia la entrada o los parámetros;
+las huellas de entrada quedan como `procedencia` en _catalogo.json):
+  data/processed/out/correlaciones_metricas.csv  (+ Parquet/Arrow según FORMATO_SALIDA)
+
+Columnas:
+  dominio_a, subcategoria_a, variable_a, dominio_b, subcategoria_b, variable_b
+  ProvinciaNorm, provincia_id, lag, correlacion, n_obs, transformacion
+
+Uso:
+  python -m pipelines.build_correlaciones [nivel|crecimiento] [lag ...]
+"""
+from __future__ import annotations
+
+import sys
+import warnings
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .build_diccionario_metricas import cargar_fact
+from .catalogo import entrada_vigente, huella_tabla
+from .etl_dimensional_completo import crear_dim_provincias
+from .lector_salidas import leer_tabla
+from .salida_parquet import escribir_tabla
+from .series_temporales import (
+    agregar_periodo_idx, cargar_dim_tiempo, clave_provincia, columnas_serie,
+    grilla_periodos, matriz_series,
+)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+OUT_DIR = BASE_DIR / 'data' / 'processed' / 'out'
+
+NOMBRE = 'correlaciones_metricas'
+METRICA_COLS = ['dominio', 'subcategoria', 'variable']
+TRANSFORMACIONES = ('nivel', 'crecimiento')
+MIN_OBS = 8  # pares de observaciones mínimos para informar una correlación
+MAX_CELDAS = 1 << 22  # celdas métrica × métrica × geo por bloque (~32 MB por arreglo intermedio)
+
+
+def _serie_trimestral(fact: pd.DataFrame) -> pd.DataFrame:
+    df = fact[fact['anio'].notna()]
+    if 'trimestre' not in df.columns:
+        return df.iloc[0:0]
+    df = df[pd.to_numeric(df['trimestre'], errors='coerce').notna()]
+    if 'mes' in df.columns:
+        df = df[pd.to_numeric(df['mes'], errors='coerce').isna()]
+    if 'imputado' in df.columns:
+        df = df[~df['imputado'].astype(str).str.lower().isin(['true', '1'])]
+    return agregar_periodo_idx(df)
+
+
+def cubo_metricas(fact: pd.DataFrame, dim_tiempo: pd.DataFrame, transformacion: str = 'crecimiento'):
+    """Arreglo período × métrica × geografía (NaN si falta) y sus ejes.
+
+    Devuelve (cubo, metricas, geos) con metricas/geos como DataFrames de claves.
+    """
+    if transformacion not in TRANSFORMACIONES:
+        raise ValueError(f"Transformación desconocida: {transformacion}. Opciones: {TRANSFORMACIONES}")
+    df = _serie_trimestral(fact)
+    metrica = [c for c in METRICA_COLS if c in df.columns]
+    geo = [c for c in columnas_serie(df) if c not in metrica]
+    if df.empty:
+        return np.empty((0, 0, 0)), pd.DataFrame(columns=metrica), pd.DataFrame(columns=geo)
+    periodos = grilla_periodos(dim_tiempo, df['periodo_idx'])['periodo_idx'].to_numpy(dtype='int64')
+    matriz, series = matriz_series(df, metrica + geo, periodos)
+    if transformacion == 'crecimiento':
+        with np.errstate(invalid='ignore', divide='ignore'):
+            previo = np.vstack([np.full((1, matriz.shape[1]), np.nan), matriz[:-1]])
+            matriz = np.where(previo != 0, matriz / previo - 1, np.nan)
+
+    # Columnas (métrica, geo) de la matriz -> ejes separados del cubo
+    m_codigo = series.groupby(metrica, dropna=False, sort=True).ngroup().to_numpy() if metrica else np.zeros(len(series), int)
+    g_codigo = series.groupby(geo, dropna=False, sort=True).ngroup().to_numpy() if geo else np.zeros(len(series), int)
+    metricas = series[metrica].assign(_c=m_codigo).drop_duplicates('_c').sort_values('_c').drop(columns='_c').reset_index(drop=True)
+    geos = series[geo].assign(_c=g_codigo).drop_duplicates('_c').sort_values('_c').drop(columns='_c').reset_index(drop=True)
+    cubo = np.full((matriz.shape[0], len(metricas), len(geos)), np.nan)
+    cubo[:, m_codigo, g_codigo] = matriz
+    return cubo, metricas, geos
+
+
+def _estandarizar(x: np.ndarray):
+    """z-score por serie ignorando NaN; devuelve (z con 0 en faltantes, máscara 0/1)."""
+    w = ~np.isnan(x)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # series vacías
+        media = np.nanmean(x, axis=0)
+        desvio = np.nanstd(x, axis=0)
+    z = (x - media) / np.where(desvio > 0, desvio, 1.0)
+    return np.where(w, z, 0.0), w.astype('float64')
+
+
+def correlacion_por_geo(a: np.ndarray, b: np.ndarray):
+    """Correlación de Pearson pairwise-complete de todos los pares de métricas por geografía.
+
+    a, b: período × métrica × geo, ya alineados (b puede ser a rezagado).
+    Devuelve (r, n) de forma métrica_a × métrica_b × geo. Cada serie se
+    estandariza primero y todas las sumas cruzadas salen de einsum sobre el
+    eje período (una multiplicación batched por geografía).
+    """
+    za, wa = _estandarizar(a)
+    zb, wb = _estandarizar(b)
+    n = np.einsum('pig,pjg->ijg', wa, wb)
+    sa = np.einsum('pig,pjg->ijg', za, wb)
+    sb = np.einsum('pig,pjg->ijg', wa, zb)
+    saa = np.einsum('pig,pjg->ijg', za * za, wb)
+    sbb = np.einsum('pig,pjg->ijg', wa, zb * zb)
+    sab = np.einsum('pig,pjg->ijg', za, zb)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = n * sab - sa * sb
+        var = (n * saa - sa ** 2) * (n * sbb - sb ** 2)
+        r = np.where(var > 1e-12, cov / np.sqrt(np.clip(var, 0, None)), np.nan)
+    return np.clip(r, -1.0, 1.0), n.astype('int64')
+
+
+def calcular_correlaciones(fact: pd.DataFrame, dim_tiempo: pd.DataFrame, dim_provincias: Optional[pd.DataFrame] = None,
+                           transformacion: str = 'crecimiento', lags: Sequence[int] = (0,),
+                           min_obs: int = MIN_OBS) -> pd.DataFrame:
+    """Tabla larga de correlaciones por par de métricas, provincia y rezago."""
+    cubo, metricas, geos = cubo_metricas(fact, dim_tiempo, transformacion)
+    # Matriz simétrica (lag 0): un solo triángulo y sin la diagonal
+    triangulo = np.triu(np.ones((len(metricas), len(metricas)), dtype=bool), k=1)
+    paso = max(1, MAX_CELDAS // max(1, len(metricas) ** 2))
+    partes = []
+    for lag in lags:  # un producto batched por rezago y bloque de geografías
+        if lag >= cubo.shape[0]:
+            continue
+        indices, valores = [], []
+        for inicio in range(0, cubo.shape[2], paso):
+            bloque = cubo[:, :, inicio:inicio + paso]
+            a, b = (bloque[lag:], bloque[:bloque.shape[0] - lag]) if lag else (bloque, bloque)
+            r, n = correlacion_por_geo(a, b)
+            valido = (n >= min_obs) & ~np.isnan(r)
+            if lag == 0:
+                valido &= triangulo[:, :, None]
+            i, j, g = np.nonzero(valido)
+            indices.append((i, j, g + inicio))
+            valores.append((r[i, j, g], n[i, j, g]))
+        if not indices:
+            continue
+        i, j, g = (np.concatenate(x) for x in zip(*indices))
+        r, n = (np.concatenate(x) for x in zip(*valores))
+        orden = np.lexsort((g, j, i))  # mismo orden que sin bloques
+        i, j, g, r, n = i[orden], j[orden], g[orden], r[orden], n[orden]
+        parte = pd.concat([
+            metricas.iloc[i].add_suffix('_a').reset_index(drop=True),
+            metricas.iloc[j].add_suffix('_b').reset_index(drop=True),
+            geos.iloc[g].reset_index(drop=True),
+        ], axis=1)
+        parte['lag'] = lag
+        parte['correlacion'] = r
+        parte['n_obs'] = n
+        partes.append(parte)
+    if not partes:
+        return pd.DataFrame()
+    out = pd.concat(partes, ignore_index=True)
+    if dim_provincias is not None and 'ProvinciaNorm' in out.columns:
+        prov_ids = dict(zip(dim_provincias['provincia'], dim_provincias['provincia_id']))
+        out.insert(out.columns.get_loc('ProvinciaNorm') + 1, 'provincia_id', clave_provincia(out).map(prov_ids))
+    out['transformacion'] = transformacion
+    return out
+
+
+def procedencia_correlaciones(fact: pd.DataFrame, dim_tiempo: pd.DataFrame, dim_provincias: Optional[pd.DataFrame] = None,
+                              transformacion: str = 'crecimiento', lags: Sequence[int] = (0,),
+                              min_obs: int = MIN_OBS) -> dict:
+    """Huellas de las entradas (las del catálogo) y parámetros de los que sale la tabla."""
+    procedencia = {'fact': huella_tabla(fact, ()), 'dim_tiempo': huella_tabla(dim_tiempo, ())}
+    if dim_provincias is not None:
+        procedencia['dim_provincias'] = huella_tabla(dim_provincias, ())
+    procedencia.update(transformacion=transformacion, lags=[int(l) for l in lags], min_obs=int(min_obs))
+    return procedencia
+
+
+def leer_cache(out_dir: Path, procedencia: dict) -> Optional[pd.DataFrame]:
+    """correlaciones_metricas ya escrita con la misma procedencia (según su entrada del catálogo); None si no."""
+    for formato in ('csv', 'parquet', 'arrow'):
+        entrada = entrada_vigente(out_dir, NOMBRE, formato)
+        if entrada is not None and entrada.get('procedencia') == procedencia:
+            return leer_tabla(NOMBRE, out_dir, formato=formato)
+    return None
+
+
+def correlaciones_cacheadas(fact: pd.DataFrame, dim_tiempo: pd.DataFrame, dim_provincias: Optional[pd.DataFrame] = None,
+                            transformacion: str = 'crecimiento', lags: Sequence[int] = (0,), min_obs: int = MIN_OBS,
+                            out_dir: Optional[Path] = None, forzar: bool = False, formato: Optional[str] = None):
+    """Devuelve (tabla, recalculada). Reutiliza la salida si su procedencia en el catálogo no cambió."""
+    out_dir = Path(out_dir) if out_dir is not None else OUT_DIR
+    # dim_tiempo define la grilla de períodos y dim_provincias los provincia_id: también cuentan
+    procedencia = procedencia_correlaciones(fact, dim_tiempo, dim_provincias, transformacion, lags, min_obs)
+    if not forzar:
+        cacheada = leer_cache(out_dir, procedencia)
+        if cacheada is not None:
+            return cacheada, False
+
+    corr = calcular_correlaciones(fact, dim_tiempo, dim_provincias, transformacion, lags, min_obs)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    escribir_tabla(corr, out_dir / f'{NOMBRE}.csv', formato=formato, procedencia=procedencia)
+    return corr, True
+
+
+def main():
+    args = sys.argv[1:]
+    transformacion = args[0] if args and args[0] in TRANSFORMACIONES else 'crecimiento'
+    lags = [int(a) for a in args if a.isdigit()] or [0]
+    print(f'🔗 Correlaciones entre métricas ({transformacion}, lags {lags})...')
+    corr, recalculada = correlaciones_cacheadas(cargar_fact(), cargar_dim_tiempo(), crear_dim_provincias(), transformacion, lags)
+    estado = 'recalculada' if recalculada else 'sin cambios en la entrada, se reutiliza la caché'
+    print(f'✔ correlaciones_metricas.csv ({len(corr)} filas, {estado})')
+
+
+if __name__ == '__main__':
+    main()
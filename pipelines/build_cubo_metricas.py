@@ -0,0 +1,179 @@
+"""build_cubo_metricas.py
+----------------------
+Cubo denso tiempo × provincia × métrica de `fact_unificado_long` en un
+archivo binario mapeable (np.memmap) con un índice JSON de los ejes. La
+consulta típica de dashboards y API ("métrica M de la provincia P en el
+tiempo") deja de ser un filtro sobre la tabla larga: es una vista del
+arreglo que se obtiene en tiempo constante, y varios procesos comparten una
+sola copia a través de la caché de páginas del sistema operativo.
+
+- Ejes: períodos trimestrales de dim_tiempo (extendidos con los
+  observados), ProvinciaNorm ('NACIONAL' para filas sin provincia) y
+  métrica 'dominio|subcategoria|variable'.
+- NaN donde no hay dato. Se usan las filas trimestrales a grano provincia
+  (sin mes, partido ni localidad); con más de un valor por celda queda el último.
+- float64 en orden C: datos[t, p, m].
+
+Salidas:
+  data/processed/out/cubo/cubo_metricas.f64    (binario crudo)
+  data/processed/out/cubo/cubo_metricas.json   (forma, dtype y etiquetas de los ejes)
+
+Uso:
+  python -m pipelines.build_cubo_metricas
+
+  from pipelines.build_cubo_metricas import abrir_cubo
+  cubo = abrir_cubo()
+  cubo.serie('Internet|tecnologias|adsl', 'CORDOBA')   # vista de longitud T
+  cubo.corte('2024T1')                                 # vista provincia × métrica
+"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .build_diccionario_metricas import cargar_fact
+from .series_temporales import agregar_periodo_idx, cargar_dim_tiempo, grilla_periodos
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+OUT_DIR = BASE_DIR / 'data' / 'processed' / 'out'
+CUBO_DIR = OUT_DIR / 'cubo'
+
+NOMBRE = 'cubo_metricas'
+DTYPE = '<f8'
+METRICA_COLS = ['dominio', 'subcategoria', 'variable']
+SEPARADOR = '|'
+SIN_PROVINCIA = 'NACIONAL'
+
+Metrica = Union[str, Sequence[str]]
+
+
+def _filas_cubo(fact: pd.DataFrame) -> pd.DataFrame:
+    df = fact[fact['anio'].notna()]
+    for col in ('mes', 'partido', 'localidad'):
+        if col in df.columns:
+            df = df[df[col].isna()]
+    df = agregar_periodo_idx(df)
+    return df[df['periodo_idx'].notna()]
+
+
+def etiqueta_metrica(df: pd.DataFrame) -> pd.Series:
+    cols = [df[c].astype(str) if c in df.columns else pd.Series('', index=df.index) for c in METRICA_COLS]
+    etiqueta = cols[0]
+    for c in cols[1:]:
+        etiqueta = etiqueta + SEPARADOR + c
+    return etiqueta
+
+
+def construir_cubo(fact: pd.DataFrame, dim_tiempo: pd.DataFrame) -> Tuple[np.ndarray, Dict[str, List[str]]]:
+    """Devuelve (datos T × P × M, ejes {'tiempo', 'provincia', 'metrica'})."""
+    df = _filas_cubo(fact)
+    periodos = grilla_periodos(dim_tiempo, df['periodo_idx'])
+    tiempo = (periodos['anio'].astype(str) + 'T' + periodos['trimestre'].astype(str)).tolist()
+    if df.empty:
+        return np.full((len(tiempo), 0, 0), np.nan), {'tiempo': tiempo, 'provincia': [], 'metrica': []}
+
+    provincia = (df['ProvinciaNorm'] if 'ProvinciaNorm' in df.columns else pd.Series(np.nan, index=df.index))
+    p_cod, provincias = pd.factorize(provincia.fillna(SIN_PROVINCIA), sort=True)
+    m_cod, metricas = pd.factorize(etiqueta_metrica(df), sort=True)
+    t_cod = np.searchsorted(periodos['periodo_idx'].to_numpy(dtype='int64'), df['periodo_idx'].to_numpy(dtype='int64'))
+    datos = np.full((len(tiempo), len(provincias), len(metricas)), np.nan)
+    datos[t_cod, p_cod, m_cod] = pd.to_numeric(df['valor'], errors='coerce').to_numpy(dtype='float64')
+    return datos, {'tiempo': tiempo, 'provincia': list(provincias), 'metrica': list(metricas)}
+
+
+def escribir_cubo(datos: np.ndarray, ejes: Dict[str, List[str]], carpeta: Optional[Path] = None,
+                  nombre: str = NOMBRE) -> Tuple[Path, Path]:
+    """Escribe el binario (vía np.memmap) y el índice JSON; reemplaza ambos al final."""
+    carpeta = Path(carpeta) if carpeta is not None else CUBO_DIR
+    carpeta.mkdir(parents=True, exist_ok=True)
+    binario, indice = carpeta / f'{nombre}.f64', carpeta / f'{nombre}.json'
+    tmp_bin, tmp_idx = binario.with_name(f'.{binario.name}.tmp'), indice.with_name(f'.{indice.name}.tmp')
+    if datos.size:
+        mapa = np.memmap(tmp_bin, dtype=DTYPE, mode='w+', shape=datos.shape)
+        mapa[:] = datos
+        mapa.flush()
+        del mapa
+    else:
+        tmp_bin.write_bytes(b'')
+    tmp_idx.write_text(json.dumps({
+        'archivo': binario.name,
+        'dtype': DTYPE,
+        'forma': list(datos.shape),
+        'orden': 'C',
+        'ejes': ejes,
+    }, ensure_ascii=False, indent=2), encoding='utf-8')
+    os.replace(tmp_bin, binario)
+    os.replace(tmp_idx, indice)
+    return binario, indice
+
+
+@dataclass
+class CuboMetricas:
+    """Cubo mapeado en memoria con búsqueda de etiquetas O(1)."""
+    datos: np.ndarray
+    tiempo: List[str]
+    provincias: List[str]
+    metricas: List[str]
+    _t: Dict[str, int] = field(init=False, repr=False)
+    _p: Dict[str, int] = field(init=False, repr=False)
+    _m: Dict[str, int] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._t = {v: i for i, v in enumerate(self.tiempo)}
+        self._p = {v: i for i, v in enumerate(self.provincias)}
+        self._m = {v: i for i, v in enumerate(self.metricas)}
+
+    def _indice(self, mapa: Dict[str, int], clave: str, eje: str) -> int:
+        if clave not in mapa:
+            raise KeyError(f"{clave!r} no está en el eje {eje} del cubo")
+        return mapa[clave]
+
+    def _metrica(self, metrica: Metrica) -> int:
+        clave = metrica if isinstance(metrica, str) else SEPARADOR.join(metrica)
+        return self._indice(self._m, clave, 'metrica')
+
+    def serie(self, metrica: Metrica, provincia: str = SIN_PROVINCIA) -> np.ndarray:
+        """Valores de la métrica para la provincia en todos los períodos (vista)."""
+        return self.datos[:, self._indice(self._p, provincia, 'provincia'), self._metrica(metrica)]
+
+    def corte(self, periodo: str) -> np.ndarray:
+        """Matriz provincia × métrica de un período (vista)."""
+        return self.datos[self._indice(self._t, periodo, 'tiempo')]
+
+    def valor(self, periodo: str, provincia: str, metrica: Metrica) -> float:
+        return float(self.datos[self._indice(self._t, periodo, 'tiempo'), self._indice(self._p, provincia, 'provincia'),
+                                self._metrica(metrica)])
+
+    def serie_pandas(self, metrica: Metrica, provincia: str = SIN_PROVINCIA) -> pd.Series:
+        return pd.Series(self.serie(metrica, provincia), index=self.tiempo, name=metrica if isinstance(metrica, str) else SEPARADOR.join(metrica))
+
+
+def abrir_cubo(carpeta: Optional[Path] = None, nombre: str = NOMBRE) -> CuboMetricas:
+    """Mapea el cubo en modo solo lectura (no lee los datos hasta usarlos)."""
+    carpeta = Path(carpeta) if carpeta is not None else CUBO_DIR
+    meta = json.loads((carpeta / f'{nombre}.json').read_text(encoding='utf-8'))
+    forma = tuple(meta['forma'])
+    if np.prod(forma):
+        datos = np.memmap(carpeta / meta['archivo'], dtype=meta['dtype'], mode='r', shape=forma, order=meta['orden'])
+    else:
+        datos = np.full(forma, np.nan)
+    ejes = meta['ejes']
+    return CuboMetricas(datos, ejes['tiempo'], ejes['provincia'], ejes['metrica'])
+
+
+def main():
+    print('🧊 Construyendo cubo tiempo × provincia × métrica...')
+    datos, ejes = construir_cubo(cargar_fact(), cargar_dim_tiempo())
+    binario, _ = escribir_cubo(datos, ejes)
+    t, p, m = datos.shape
+    print(f'✔ {binario.name} ({t} períodos × {p} provincias × {m} métricas, {binario.stat().st_size / 1e6:.2f} MB)')
+
+
+if __name__ == '__main__':
+    main()
@@ -20,57 +20,93 @@ Columnas:
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Optional, Sequence, Union
+
 import pandas as pd
 
+try:
+    from .catalogo import entrada_vigente
+    from .fact_indexado import FactIndexado, cargar_fact_indexado
+    from .lector_salidas import leer_tabla
+except ImportError:  # ejecutado como script: python pipelines/build_diccionario_metricas.py
+    from catalogo import entrada_vigente
+    from fact_indexado import FactIndexado, cargar_fact_indexado
+    from lector_salidas import leer_tabla
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 OUT_DIR = BASE_DIR / 'data' / 'processed' / 'out'
 
 
-def cargar_fact() -> pd.DataFrame:
+def cargar_fact(columnas: Optional[Sequence[str]] = None, **filtros) -> pd.DataFrame:
+    """Tabla unificada completa, o solo columnas/filtros (anio, trimestre, provincia, dominio) vía lector_salidas."""
     fact_path = OUT_DIR / 'fact_unificado_long.csv'
+    if columnas is not None or filtros:
+        return leer_tabla('fact_unificado_long', OUT_DIR, columnas, **filtros)
     if not fact_path.exists():
         raise FileNotFoundError("fact_unificado_long.csv no encontrado. Ejecutar pipelines/build_fact_unificado.py")
     return pd.read_csv(fact_path, low_memory=False)
 
 
-def generar_diccionario(fact: pd.DataFrame) -> pd.DataFrame:
+def generar_diccionario(fact: Union[pd.DataFrame, FactIndexado]) -> pd.DataFrame:
+    """Una fila por métrica; con la tabla indexada cada métrica es una rebanada contigua."""
+    fx = fact if isinstance(fact, FactIndexado) else None
+    datos = fx.datos if fx is not None else fact
     # Asegurar columnas mínimas
     requeridas = {'dominio','subcategoria','variable','valor','fuente_archivo'}
-    faltantes = requeridas - set(fact.columns)
+    faltantes = requeridas - set(datos.columns)
     if faltantes:
         raise ValueError(f"Columnas faltantes en fact_unificado: {faltantes}")
+    if fx is None:
+        fx = FactIndexado.desde_fact(datos)
+        datos = fx.datos
 
     # Convertir año si existe
-    if 'anio' in fact.columns:
-        fact['anio'] = pd.to_numeric(fact['anio'], errors='coerce')
-
-    # Agrupación base
-    grp = fact.groupby(['dominio','subcategoria','variable'], dropna=False)
+    anio = pd.to_numeric(datos['anio'], errors='coerce') if 'anio' in datos.columns else None
 
     registros = []
-    for (dom, sub, var), df in grp:
+    for dom, sub, var, inicio, fin in fx.rangos(['dominio','subcategoria','variable']).itertuples(index=False):
+        df = datos.iloc[inicio:fin]
         archivos = sorted(df['fuente_archivo'].dropna().unique())
         unidad = None
         if 'unidad' in df.columns:
             uvals = [u for u in df['unidad'].dropna().unique() if str(u).strip()]
             unidad = uvals[0] if uvals else None
-        anio_min = int(df['anio'].min()) if 'anio' in df.columns and df['anio'].notna().any() else None
-        anio_max = int(df['anio'].max()) if 'anio' in df.columns and df['anio'].notna().any() else None
+        anios = anio.iloc[inicio:fin] if anio is not None else None
+        anio_min = int(anios.min()) if anios is not None and anios.notna().any() else None
+        anio_max = int(anios.max()) if anios is not None and anios.notna().any() else None
         provincias = None
         if 'ProvinciaNorm' in df.columns and df['ProvinciaNorm'].notna().any():
             provincias = int(df['ProvinciaNorm'].nunique())
-        nota = heuristica_nota(var, unidad, sub, provincias)
-        registros.append({
-            'dominio': dom,
-            'subcategoria': sub,
-            'variable': var,
-            'unidad_inferida': unidad,
-            'archivos_fuente': ';'.join(archivos),
-            'anios_min_max': f"{anio_min}-{anio_max}" if anio_min is not None else '',
-            'observaciones': len(df),
-            'cobertura_provincias': provincias,
-            'nota_heuristica': nota,
-        })
+        registros.append(_registro(dom, sub, var, unidad, archivos, anio_min, anio_max, len(df), provincias))
+    return _tabla_diccionario(registros)
+
+
+def diccionario_desde_catalogo(entrada: dict) -> pd.DataFrame:
+    """Mismo diccionario a partir de las estadísticas por métrica del catálogo (sin leer la tabla)."""
+    registros = []
+    for m in entrada.get('metricas', []):
+        anio_min = int(m['anio_min']) if m.get('anio_min') is not None else None
+        anio_max = int(m['anio_max']) if m.get('anio_max') is not None else None
+        registros.append(_registro(m['dominio'], m['subcategoria'], m['variable'], m.get('unidad'), m.get('archivos', []),
+                                   anio_min, anio_max, m['filas'], m.get('provincias')))
+    return _tabla_diccionario(registros)
+
+
+def _registro(dom, sub, var, unidad, archivos, anio_min, anio_max, observaciones, provincias) -> dict:
+    return {
+        'dominio': dom,
+        'subcategoria': sub,
+        'variable': var,
+        'unidad_inferida': unidad,
+        'archivos_fuente': ';'.join(archivos),
+        'anios_min_max': f"{anio_min}-{anio_max}" if anio_min is not None else '',
+        'observaciones': observaciones,
+        'cobertura_provincias': provincias,
+        'nota_heuristica': heuristica_nota(var, unidad, sub, provincias),
+    }
+
+
+def _tabla_diccionario(registros) -> pd.DataFrame:
     dicc = pd.DataFrame(registros)
     # Normalizar tipo de anios_min_max a string
     if 'anios_min_max' in dicc.columns:
@@ -102,8 +138,11 @@ def heuristica_nota(variable: str, unidad: str | None, sub: str, provincias: int
 
 def main():
     print('🔍 Generando diccionario de métricas...')
-    fact = cargar_fact()
-    dicc = generar_diccionario(fact)
+    entrada = entrada_vigente(OUT_DIR, 'fact_unificado_long')
+    if entrada is not None and entrada.get('metricas'):
+        dicc = diccionario_desde_catalogo(entrada)  # estadísticas registradas al escribir la tabla
+    else:
+        dicc = generar_diccionario(cargar_fact_indexado(OUT_DIR))
     out_path = OUT_DIR / 'diccionario_metricas.csv'
     dicc.to_csv(out_path, index=False, encoding='utf-8')
     print(f'✔ diccionario_metricas.csv ({len(dicc)} métricas)')
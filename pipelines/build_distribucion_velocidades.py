@@ -0,0 +1,239 @@
+"""build_distribucion_velocidades.py
+---------------------------------
+Mediana, p90 y velocidad media ponderada por accesos para cada provincia y
+período, precalculadas para los dashboards (en Tableau se aproximaban con
+campos calculados lentos sobre los rangos).
+
+Dos fuentes, procesadas en bloque:
+  - fact_velocidad_rangos_long: accesos por rango de velocidad. Los límites
+    de cada rango salen de dim_velocidades (o se leen de la etiqueta ENACOM,
+    p.ej. 'entre1mbps_6mbps', si el rango no está en la dimensión). Todas las
+    (provincia, período) se apilan en una matriz grupo × rango y los
+    cuantiles se interpolan linealmente dentro del rango, como un histograma.
+  - fact_velocidad_numerica_provincias: accesos por velocidad exacta. Donde
+    existe, da cuantiles exactos y tiene prioridad sobre los rangos.
+El rango abierto superior (p.ej. 'mayor30mbps') no tiene ancho: un cuantil
+que cae ahí y su aporte a la media se toman en el límite inferior.
+
+Salida:
+  data/processed/out/fact_distribucion_velocidades.csv
+
+Columnas:
+  anio, trimestre, tiempo_id, provincia_id, ProvinciaNorm
+  fuente                   'numerica' o 'rangos'
+  accesos                  accesos con velocidad conocida
+  velocidad_media_mbps, velocidad_mediana_mbps, velocidad_p90_mbps
+
+Uso:
+  python -m pipelines.build_distribucion_velocidades
+"""
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .etl_dimensional_completo import crear_dim_provincias
+from .io_csv import leer_csv
+from .salida_parquet import escribir_tabla
+from .series_temporales import agregar_periodo_idx, cargar_dim_tiempo, clave_provincia
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+OUT_DIR = BASE_DIR / 'data' / 'processed' / 'out'
+DIM_VELOCIDADES_PATH = BASE_DIR / 'data' / 'processed' / 'dimensional' / 'dim_velocidades.csv'
+
+CUANTILES = {'mediana': 0.5, 'p90': 0.9}
+CLAVES = ['anio', 'trimestre', 'ProvinciaNorm']
+# A partir de este máximo el rango se considera abierto (dim usa 999999 como infinito)
+MAX_ABIERTO_KBPS = 999999
+_UNIDADES_KBPS = {'kbps': 1, 'mbps': 1000, 'gbps': 1000000}
+
+
+def _clave_rango(etiqueta) -> str:
+    return re.sub(r'[\s_]+', '', str(etiqueta).lower())
+
+
+def limites_desde_etiqueta(etiqueta) -> Tuple[float, float]:
+    """Límites (kbps) de un rango a partir de su etiqueta ENACOM o de dim_velocidades.
+
+    'hasta512kbps' -> (0, 512); 'entre512_1mbps' -> (512, 1000);
+    '0-3 Mbps' -> (0, 3000); 'mayor30mbps' / '10+ Mbps' -> (30000, inf).
+    Devuelve (nan, nan) si la etiqueta no tiene números (p.ej. 'otros').
+    """
+    texto = str(etiqueta).lower().replace(',', '.')
+    numeros = re.findall(r'(\d+(?:\.\d+)?)\s*_?(kbps|mbps|gbps)?', texto)
+    if not numeros:
+        return np.nan, np.nan
+    valores = []
+    unidad_sig = 'mbps'
+    # Un número sin unidad toma la del siguiente ('0-3 Mbps'), salvo que quede
+    # mayor que él ('entre512_1mbps': 512 kbps)
+    for num, unidad in reversed(numeros):
+        unidad = unidad or unidad_sig
+        kbps = float(num) * _UNIDADES_KBPS[unidad]
+        if valores and kbps > valores[-1]:
+            kbps = float(num)
+        valores.append(kbps)
+        unidad_sig = unidad
+    valores.reverse()
+    if len(valores) >= 2:
+        return valores[0], valores[1]
+    if re.search(r'hasta|menor|<', texto):
+        return 0.0, valores[0]
+    return valores[0], np.inf
+
+
+def limites_rangos(etiquetas, dim_velocidades: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Tabla etiqueta -> (lim_inf_kbps, lim_sup_kbps), priorizando dim_velocidades."""
+    etiquetas = pd.Series(pd.unique(pd.Series(etiquetas).dropna()), dtype=object)
+    lim = pd.DataFrame([limites_desde_etiqueta(e) for e in etiquetas],
+                       columns=['lim_inf_kbps', 'lim_sup_kbps'], index=etiquetas.map(_clave_rango))
+    if dim_velocidades is not None and not dim_velocidades.empty:
+        dim = dim_velocidades.rename(columns={'vel_min_kbps': 'velocidad_min_kbps', 'vel_max_kbps': 'velocidad_max_kbps'})
+        if {'rango_velocidad', 'velocidad_min_kbps', 'velocidad_max_kbps'}.issubset(dim.columns):
+            desde_dim = pd.DataFrame({
+                'lim_inf_kbps': pd.to_numeric(dim['velocidad_min_kbps'], errors='coerce').to_numpy(dtype='float64'),
+                'lim_sup_kbps': pd.to_numeric(dim['velocidad_max_kbps'], errors='coerce').to_numpy(dtype='float64'),
+            }, index=dim['rango_velocidad'].map(_clave_rango))
+            desde_dim = desde_dim[~desde_dim.index.duplicated()]
+            desde_dim.loc[desde_dim['lim_sup_kbps'] >= MAX_ABIERTO_KBPS, 'lim_sup_kbps'] = np.inf
+            comunes = lim.index.intersection(desde_dim.index)
+            lim.loc[comunes] = desde_dim.loc[comunes].to_numpy()
+    lim.index = etiquetas.to_numpy()
+    lim.index.name = 'rango_velocidad'
+    return lim.reset_index()
+
+
+def cuantiles_histograma(conteos: np.ndarray, lim_inf: np.ndarray, lim_sup: np.ndarray,
+                         probs) -> np.ndarray:
+    """Cuantiles interpolados de G histogramas con los mismos B rangos, en bloque.
+
+    conteos: G × B (rangos ordenados por límite inferior). Devuelve G × len(probs);
+    NaN en grupos sin accesos. En un rango abierto (lim_sup infinito) el
+    cuantil es su límite inferior.
+    """
+    conteos = np.nan_to_num(np.asarray(conteos, dtype='float64'))
+    acum = np.cumsum(conteos, axis=1)
+    total = acum[:, -1:]
+    ancho = np.where(np.isinf(lim_sup), 0.0, lim_sup - lim_inf)
+    res = np.full((len(conteos), len(probs)), np.nan)
+    filas = np.arange(len(conteos))
+    for j, p in enumerate(probs):  # bucle solo sobre cuantiles, no sobre grupos
+        objetivo = p * total
+        # Primer rango donde el acumulado alcanza el objetivo
+        b = np.argmax(acum >= objetivo - 1e-9, axis=1)
+        previo = acum[filas, b] - conteos[filas, b]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frac = np.where(conteos[filas, b] > 0, (objetivo[:, 0] - previo) / conteos[filas, b], 0.0)
+        res[:, j] = lim_inf[b] + np.clip(frac, 0, 1) * ancho[b]
+    res[total[:, 0] <= 0] = np.nan
+    return res
+
+
+def distribucion_desde_rangos(rangos: pd.DataFrame, dim_velocidades: Optional[pd.DataFrame] = None,
+                              cuantiles: Dict[str, float] = CUANTILES) -> pd.DataFrame:
+    """Cuantiles y media ponderada por (provincia, período) a partir de los rangos."""
+    columnas = CLAVES + ['accesos', 'velocidad_media_kbps'] + [f'velocidad_{n}_kbps' for n in cuantiles]
+    if rangos is None or rangos.empty:
+        return pd.DataFrame(columns=columnas)
+    lim = limites_rangos(rangos['rango_velocidad'], dim_velocidades)
+    lim = lim.dropna(subset=['lim_inf_kbps']).sort_values(['lim_inf_kbps', 'lim_sup_kbps']).reset_index(drop=True)
+    df = rangos[rangos['rango_velocidad'].isin(lim['rango_velocidad'])]
+    # Matriz grupo × rango (los rangos sin límites, como 'otros', quedan afuera)
+    codigos = df.groupby(CLAVES, dropna=False, sort=True).ngroup().to_numpy()
+    grupos = df[CLAVES].assign(_g=codigos).drop_duplicates('_g').sort_values('_g').drop(columns='_g').reset_index(drop=True)
+    col = pd.Categorical(df['rango_velocidad'], categories=lim['rango_velocidad']).codes
+    conteos = np.zeros((len(grupos), len(lim)))
+    np.add.at(conteos, (codigos, col), pd.to_numeric(df['accesos'], errors='coerce').fillna(0).to_numpy(dtype='float64'))
+
+    inf = lim['lim_inf_kbps'].to_numpy(dtype='float64')
+    sup = lim['lim_sup_kbps'].to_numpy(dtype='float64')
+    total = conteos.sum(axis=1)
+    centro = np.where(np.isinf(sup), inf, (inf + sup) / 2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        grupos['accesos'] = total
+        grupos['velocidad_media_kbps'] = np.where(total > 0, conteos @ centro / total, np.nan)
+    q = cuantiles_histograma(conteos, inf, sup, list(cuantiles.values()))
+    for j, nombre in enumerate(cuantiles):
+        grupos[f'velocidad_{nombre}_kbps'] = q[:, j]
+    return grupos[columnas]
+
+
+def distribucion_desde_numerica(numerica: pd.DataFrame, cuantiles: Dict[str, float] = CUANTILES) -> pd.DataFrame:
+    """Cuantiles exactos y media ponderada a partir de velocidades puntuales (kbps)."""
+    columnas = CLAVES + ['accesos', 'velocidad_media_kbps'] + [f'velocidad_{n}_kbps' for n in cuantiles]
+    if numerica is None or numerica.empty or 'Velocidad_kbps' not in numerica.columns:
+        return pd.DataFrame(columns=columnas)
+    df = numerica[CLAVES].copy()
+    df['kbps'] = pd.to_numeric(numerica['Velocidad_kbps'], errors='coerce')
+    df['accesos'] = pd.to_numeric(numerica['accesos'], errors='coerce').fillna(0)
+    df = df[df['kbps'].notna() & (df['accesos'] > 0)].sort_values(CLAVES + ['kbps'])
+    df['_pond'] = df['kbps'] * df['accesos']
+    g = df.groupby(CLAVES, dropna=False, sort=True)
+    df['_acum'] = g['accesos'].cumsum()
+    df['_total'] = g['accesos'].transform('sum')
+    out = g.agg(accesos=('accesos', 'sum'), _pond=('_pond', 'sum')).reset_index()
+    out['velocidad_media_kbps'] = out.pop('_pond') / out['accesos']
+    for nombre, p in cuantiles.items():
+        # Primera velocidad donde el acumulado alcanza p del total
+        alcanzado = df[df['_acum'] >= p * df['_total'] - 1e-9].drop_duplicates(CLAVES)
+        out = out.merge(alcanzado[CLAVES + ['kbps']].rename(columns={'kbps': f'velocidad_{nombre}_kbps'}), on=CLAVES, how='left')
+    return out[columnas]
+
+
+def calcular_distribucion_velocidades(rangos: Optional[pd.DataFrame], numerica: Optional[pd.DataFrame],
+                                      dim_velocidades: Optional[pd.DataFrame], dim_tiempo: pd.DataFrame,
+                                      dim_provincias: pd.DataFrame, cuantiles: Dict[str, float] = CUANTILES) -> pd.DataFrame:
+    """fact_distribucion_velocidades: una fila por (provincia, período), numérica si existe."""
+    partes = []
+    for fuente, dist in (('numerica', distribucion_desde_numerica(numerica, cuantiles)),
+                         ('rangos', distribucion_desde_rangos(rangos, dim_velocidades, cuantiles))):
+        if not dist.empty:
+            dist = dist.assign(fuente=fuente, _clave=clave_provincia(dist))
+            partes.append(dist)
+    if not partes:
+        return pd.DataFrame()
+    df = pd.concat(partes, ignore_index=True)
+    df['anio'] = pd.to_numeric(df['anio'], errors='coerce').astype('Int64')
+    df['trimestre'] = pd.to_numeric(df['trimestre'], errors='coerce').astype('Int64')
+    # La fuente numérica va primero: ante (provincia, período) repetidos se conserva esa
+    df = df.drop_duplicates(['anio', 'trimestre', '_clave'], keep='first')
+
+    prov_ids = dict(zip(dim_provincias['provincia'], dim_provincias['provincia_id']))
+    df.insert(0, 'provincia_id', df['_clave'].map(prov_ids))
+    if 'tiempo_id' in dim_tiempo.columns:
+        dt = agregar_periodo_idx(dim_tiempo.dropna(subset=['anio']))
+        ids = dict(zip(dt['periodo_idx'].astype('int64'), dt['tiempo_id']))
+        df.insert(0, 'tiempo_id', agregar_periodo_idx(df)['periodo_idx'].map(ids))
+    else:
+        df.insert(0, 'tiempo_id', pd.NA)
+    for c in ['velocidad_media'] + [f'velocidad_{n}' for n in cuantiles]:
+        df[f'{c}_mbps'] = df.pop(f'{c}_kbps') / 1000
+    orden = ['anio', 'trimestre', 'tiempo_id', 'provincia_id', 'ProvinciaNorm', 'fuente', 'accesos',
+             'velocidad_media_mbps'] + [f'velocidad_{n}_mbps' for n in cuantiles]
+    return df[orden].sort_values(['anio', 'trimestre', 'ProvinciaNorm']).reset_index(drop=True)
+
+
+def _leer_out(nombre: str) -> Optional[pd.DataFrame]:
+    # Como texto, igual que las lee prepare_enacom (rango_velocidad es una etiqueta); los números se convierten al calcular
+    p = OUT_DIR / nombre
+    return leer_csv(p, como_texto=True) if p.exists() else None
+
+
+def main():
+    print('📶 Calculando distribución de velocidades por provincia...')
+    dim_vel = leer_csv(DIM_VELOCIDADES_PATH) if DIM_VELOCIDADES_PATH.exists() else None
+    dist = calcular_distribucion_velocidades(
+        _leer_out('fact_velocidad_rangos_long.csv'), _leer_out('fact_velocidad_numerica_provincias.csv'),
+        dim_vel, cargar_dim_tiempo(), crear_dim_provincias(),
+    )
+    escribir_tabla(dist, OUT_DIR / 'fact_distribucion_velocidades.csv')
+    print(f'✔ fact_distribucion_velocidades.csv ({len(dist)} filas)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""build_metricas_derivadas.py
+----------------------------
+Precalcula las medidas derivadas que los dashboards (regional, temporal y
+tecnológico de GUIA_MODELO_DIMENSIONAL.md) calculaban en Tableau / Power BI
+en cada interacción. Todas las series de `fact_unificado_long` se procesan a
+la vez con merges por período, transform y rank agrupados (sin bucles por serie).
+
+Salida:
+  data/processed/out/fact_metricas_derivadas.csv
+
+Columnas agregadas a cada fila de fact_unificado_long:
+  provincia_id            FK a dim_provincias (modelo dimensional completo)
+  crec_trimestral         variación vs. trimestre anterior (QoQ); en series
+                          mensuales, vs. el mismo mes del trimestre anterior (3 meses)
+  crec_interanual         variación vs. mismo trimestre (o mes) del año anterior (YoY)
+  accesos_cada_100_hab    valor / poblacion_2023 * 100 (solo métricas de accesos)
+  accesos_por_km2         valor / superficie_km2 (solo métricas de accesos)
+  participacion           share dentro de dominio/subcategoria/provincia/período
+                          (solo subcategorías de apertura: tecnologías, rangos)
+  ranking_provincia       posición de la provincia por valor en el período
+  ranking_cada_100_hab    posición de la provincia por accesos_cada_100_hab
+
+Uso:
+  python -m pipelines.build_metricas_derivadas
+"""
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .build_diccionario_metricas import cargar_fact
+from .etl_dimensional_completo import crear_dim_provincias
+from .salida_parquet import escribir_tabla
+from .series_temporales import agregar_periodo_idx, clave_provincia, columnas_serie
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+OUT_DIR = BASE_DIR / 'data' / 'processed' / 'out'
+
+# Subcategorías cuyas variables son aperturas de un mismo total (suman 100%)
+SUBCATEGORIAS_PARTICION = ('tecnolog', 'rangos')
+# Desplazamiento en períodos: (series trimestrales, series mensuales)
+LAGS = {'crec_trimestral': (1, 3), 'crec_interanual': (4, 12)}
+
+
+def _es_conteo_accesos(df: pd.DataFrame) -> pd.Series:
+    texto = (df['subcategoria'].astype(str) + ' ' + df['variable'].astype(str)).str.lower()
+    es_conteo = texto.str.contains('accesos') & ~texto.str.contains('penetracion|cada_100')
+    if 'unidad' in df.columns:
+        es_conteo |= df['unidad'].astype(str).str.lower().eq('accesos')
+    return es_conteo
+
+
+def _agregar_lags(df: pd.DataFrame, claves: list) -> pd.DataFrame:
+    # Paso de cada fila: trimestre (periodo_idx) o, en las series mensuales, mes (anio * 12 + mes - 1)
+    mes = pd.to_numeric(df['mes'], errors='coerce') if 'mes' in df.columns else pd.Series(np.nan, index=df.index)
+    anio = pd.to_numeric(df['anio'], errors='coerce')
+    df = df.assign(_mensual=mes.notna(), _paso=(anio * 12 + mes - 1).where(mes.notna(), df['periodo_idx']))
+    claves = claves + ['_mensual', '_paso']
+    # Un valor por serie y período para que el lag no multiplique filas
+    base = df.drop_duplicates(claves, keep='last')[claves + ['valor']]
+    for nombre, (lag_trimestral, lag_mensual) in LAGS.items():
+        previo = base.rename(columns={'valor': '_previo'})
+        previo['_paso'] = previo['_paso'] + np.where(previo['_mensual'], lag_mensual, lag_trimestral)
+        df = df.merge(previo, on=claves, how='left')
+        df[nombre] = (df['valor'] / df['_previo'] - 1).where(df['_previo'] != 0)
+        df = df.drop(columns='_previo')
+    return df.drop(columns=['_mensual', '_paso'])
+
+
+def _agregar_poblacion(df: pd.DataFrame, dim_provincias: pd.DataFrame) -> pd.DataFrame:
+    dim = dim_provincias[['provincia_id', 'provincia', 'poblacion_2023', 'superficie_km2']]
+    df = df.assign(_prov=clave_provincia(df)).merge(dim.rename(columns={'provincia': '_prov'}), on='_prov', how='left')
+    es_conteo = _es_conteo_accesos(df)
+    df['accesos_cada_100_hab'] = (df['valor'] / df['poblacion_2023'] * 100).where(es_conteo)
+    df['accesos_por_km2'] = (df['valor'] / df['superficie_km2']).where(es_conteo)
+    return df.drop(columns=['_prov', 'poblacion_2023', 'superficie_km2'])
+
+
+def calcular_metricas_derivadas(fact: pd.DataFrame, dim_provincias: pd.DataFrame) -> pd.DataFrame:
+    """Calcula crecimiento, per cápita, participación y ranking para todas las series."""
+    df = agregar_periodo_idx(fact)
+    df['valor'] = pd.to_numeric(df['valor'], errors='coerce')
+    df = df.dropna(subset=['periodo_idx'])
+    claves = columnas_serie(df)
+
+    df = _agregar_lags(df, claves)
+    df = _agregar_poblacion(df, dim_provincias)
+
+    # Grano de la fila (mes, partido, localidad): una localidad no se suma con el total de su provincia
+    grano = [c for c in ('mes', 'partido', 'localidad') if c in df.columns]
+    apertura = [c for c in ('dominio', 'subcategoria', 'ProvinciaNorm') if c in df.columns] + grano + ['periodo_idx']
+    es_particion = df['subcategoria'].astype(str).str.lower().str.contains('|'.join(SUBCATEGORIAS_PARTICION))
+    total = df.groupby(apertura, dropna=False)['valor'].transform('sum')
+    df['participacion'] = (df['valor'] / total).where(es_particion & (total != 0))
+
+    df['ranking_provincia'] = pd.Series(pd.NA, index=df.index, dtype='Int64')
+    df['ranking_cada_100_hab'] = pd.Series(pd.NA, index=df.index, dtype='Int64')
+    # Ranking entre provincias: solo filas trimestrales de grano provincia
+    con_provincia = df['provincia_id'].notna()
+    for c in grano:
+        con_provincia &= df[c].isna()
+    if con_provincia.any():
+        sub = df[con_provincia]
+        grupo = sub.groupby([c for c in ('dominio', 'subcategoria', 'variable') if c in sub.columns] + ['periodo_idx'])
+        df.loc[con_provincia, 'ranking_provincia'] = grupo['valor'].rank(method='min', ascending=False).astype('Int64')
+        df.loc[con_provincia, 'ranking_cada_100_hab'] = grupo['accesos_cada_100_hab'].rank(method='min', ascending=False).astype('Int64')
+
+    return df.drop(columns='periodo_idx').reset_index(drop=True)
+
+
+def main():
+    print('📈 Calculando métricas derivadas...')
+    fact = cargar_fact()
+    derivadas = calcular_metricas_derivadas(fact, crear_dim_provincias())
+    out_path = OUT_DIR / 'fact_metricas_derivadas.csv'
+    escribir_tabla(derivadas, out_path)
+    print(f'✔ fact_metricas_derivadas.csv ({len(derivadas)} filas)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""build_pronosticos.py
+--------------------
+Proyecciones de los próximos trimestres para todas las series de
+`fact_unificado_long` (accesos, penetración, velocidad media, ... por
+provincia y nacionales).
+
+Las series se apilan en una matriz período × serie y se ajusta una tendencia
+lineal (opcionalmente con estacionalidad trimestral) para todas a la vez con
+una única resolución batched de mínimos cuadrados: las ecuaciones normales
+ponderadas por disponibilidad de dato (X'WX)β = X'Wy se arman con einsum
+para las S series y se resuelven en una sola llamada (pinv apilada).
+
+Salida:
+  data/processed/out/fact_pronosticos.csv
+
+Columnas:
+  anio, trimestre, tiempo_id   período proyectado (tiempo_id si existe en dim_tiempo)
+  provincia_id                 FK a dim_provincias (vacío en series nacionales)
+  dominio, subcategoria, variable, ProvinciaNorm
+  horizonte                    trimestres hacia adelante (1 = próximo)
+  valor_pronostico, limite_inferior, limite_superior
+  nivel_confianza, modelo, n_obs
+
+Uso:
+  python -m pipelines.build_pronosticos [horizonte] [--estacional]
+"""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from statistics import NormalDist
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .build_diccionario_metricas import cargar_fact
+from .etl_dimensional_completo import crear_dim_provincias
+from .salida_parquet import escribir_tabla
+from .series_temporales import (
+    agregar_periodo_idx, cargar_dim_tiempo, clave_provincia, columnas_serie,
+    grilla_periodos, matriz_series, periodo_desde_idx,
+)
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+OUT_DIR = BASE_DIR / 'data' / 'processed' / 'out'
+
+VENTANA = 12  # trimestres usados para el ajuste (3 años)
+
+
+def _diseno(periodos_idx: np.ndarray, origen: int, estacional: bool) -> np.ndarray:
+    """Matriz de diseño: intercepto, tendencia y dummies T2-T4 si es estacional."""
+    t = (periodos_idx - origen).astype('float64')
+    cols = [np.ones_like(t), t]
+    if estacional:
+        tri = periodos_idx % 4 + 1
+        cols += [(tri == q).astype('float64') for q in (2, 3, 4)]
+    return np.column_stack(cols)
+
+
+def ajustar_tendencias(matriz: np.ndarray, periodos_idx: np.ndarray, horizonte: int = 1,
+                       ventana: Optional[int] = VENTANA, estacional: bool = False,
+                       nivel: float = 0.95):
+    """Ajusta y proyecta todas las columnas de una matriz período × serie.
+
+    Devuelve (pred, inferior, superior, n_obs, periodos_futuros) con pred de
+    forma horizonte × series. Las series con menos observaciones que
+    parámetros + 1 quedan en NaN.
+    """
+    periodos_idx = np.asarray(periodos_idx, dtype='int64')
+    if ventana is not None:
+        matriz, periodos_idx = matriz[-ventana:], periodos_idx[-ventana:]
+    origen = int(periodos_idx[-1])
+    X = _diseno(periodos_idx, origen, estacional)
+    k = X.shape[1]
+    W = (~np.isnan(matriz)).astype('float64')
+    Y = np.where(W > 0, matriz, 0.0)
+
+    # Ecuaciones normales ponderadas para todas las series (S × k × k) y una sola resolución
+    XtWX = np.einsum('pi,ps,pj->sij', X, W, X)
+    XtWy = np.einsum('pi,ps->si', X, Y)
+    inv = np.linalg.pinv(XtWX)
+    beta = np.einsum('sij,sj->si', inv, XtWy)
+
+    n_obs = W.sum(axis=0)
+    gl = n_obs - k
+    resid = (Y - X @ beta.T) * W
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sigma2 = np.where(gl > 0, (resid ** 2).sum(axis=0) / gl, np.nan)
+
+    futuros = periodos_idx[-1] + np.arange(1, horizonte + 1)
+    Xf = _diseno(futuros, origen, estacional)
+    pred = Xf @ beta.T
+    var = sigma2[None, :] * (1 + np.einsum('hi,sij,hj->hs', Xf, inv, Xf))
+    z = NormalDist().inv_cdf(0.5 + nivel / 2)
+    margen = z * np.sqrt(np.clip(var, 0, None))
+    pred = np.where(gl[None, :] > 0, pred, np.nan)
+    return pred, pred - margen, pred + margen, n_obs.astype('int64'), futuros
+
+
+def calcular_pronosticos(fact: pd.DataFrame, dim_tiempo: pd.DataFrame, dim_provincias: pd.DataFrame,
+                         horizonte: int = 1, estacional: bool = False, nivel: float = 0.95,
+                         ventana: Optional[int] = VENTANA) -> pd.DataFrame:
+    """Pronóstico de todas las series trimestrales de fact_unificado_long."""
+    df = fact[fact['anio'].notna()]
+    if 'trimestre' not in df.columns:
+        return pd.DataFrame()
+    df = df[pd.to_numeric(df['trimestre'], errors='coerce').notna()]
+    if 'mes' in df.columns:
+        df = df[pd.to_numeric(df['mes'], errors='coerce').isna()]
+    if 'imputado' in df.columns:
+        # Solo datos observados: las imputaciones no aportan información nueva
+        df = df[~df['imputado'].astype(str).str.lower().isin(['true', '1'])]
+    df = agregar_periodo_idx(df)
+    if df.empty:
+        return pd.DataFrame()
+
+    claves = columnas_serie(df)
+    grilla = grilla_periodos(dim_tiempo, df['periodo_idx'])
+    # El ajuste termina en el último período con datos, no en el final de dim_tiempo
+    periodos = grilla['periodo_idx'].to_numpy(dtype='int64')
+    periodos = periodos[periodos <= df['periodo_idx'].max()]
+    matriz, series = matriz_series(df, claves, periodos)
+    pred, inf, sup, n_obs, futuros = ajustar_tendencias(matriz, periodos, horizonte, ventana, estacional, nivel)
+
+    h, s = np.nonzero(~np.isnan(pred))
+    out = series.iloc[s].reset_index(drop=True)
+    out['horizonte'] = h + 1
+    out['valor_pronostico'] = pred[h, s]
+    out['limite_inferior'] = inf[h, s]
+    out['limite_superior'] = sup[h, s]
+    out['nivel_confianza'] = nivel
+    out['modelo'] = 'tendencia_estacional' if estacional else 'tendencia'
+    out['n_obs'] = n_obs[s]
+
+    per = periodo_desde_idx(futuros[h])
+    out.insert(0, 'anio', per['anio'].to_numpy())
+    out.insert(1, 'trimestre', per['trimestre'].to_numpy())
+    ids = {}
+    if 'tiempo_id' in dim_tiempo.columns:
+        dt = agregar_periodo_idx(dim_tiempo.dropna(subset=['anio']))
+        ids = dict(zip(dt['periodo_idx'].astype('int64'), dt['tiempo_id']))
+    out.insert(2, 'tiempo_id', pd.Series(futuros[h]).map(ids).to_numpy())
+    prov_ids = dict(zip(dim_provincias['provincia'], dim_provincias['provincia_id']))
+    out.insert(3, 'provincia_id', clave_provincia(out).map(prov_ids).to_numpy())
+    return out
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    horizonte = int(args[0]) if args else 1
+    estacional = '--estacional' in sys.argv
+    print(f'🔮 Proyectando {horizonte} trimestre(s) para todas las series...')
+    fact = cargar_fact()
+    pron = calcular_pronosticos(fact, cargar_dim_tiempo(), crear_dim_provincias(), horizonte, estacional)
+    escribir_tabla(pron, OUT_DIR / 'fact_pronosticos.csv')
+    print(f'✔ fact_pronosticos.csv ({len(pron)} filas)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""build_rollups.py
+----------------
+Cubos de agregados precalculados para los dashboards, que hoy re-agregan
+`fact_unificado_long` en el motor BI en cada interacción (totales por
+región, provincia, tecnología, año y nacionales).
+
+Se recorren las filas una sola vez (groupby al nivel más fino) y todos los
+niveles superiores salen de esos parciales, con semántica GROUPING SETS /
+CUBE sobre tres jerarquías:
+  geo          nacional -> region -> provincia (ProvinciaNorm)
+  tiempo       total -> anio -> trimestre   (+ 'ultimo': último período de cada métrica)
+  tecnologia   total -> categoria -> tecnologia  (solo subcategorías de tecnologías)
+
+Cada métrica (dominio, subcategoria, variable, unidad, fuente_archivo) se
+agrega por separado; en las subcategorías de tecnologías la variable es la
+tecnología (categoría según dim_tecnologias) y la métrica pasa a ser su
+unidad (accesos), así el total por tecnología suma todas las aperturas.
+
+Salida:
+  data/processed/out/agregados_rollup.csv
+
+Columnas:
+  dominio, subcategoria, variable, unidad, fuente_archivo
+  region, ProvinciaNorm, anio, trimestre, categoria, tecnologia  (vacías si se agregaron)
+  nivel_geo, nivel_tiempo, nivel_tecnologia, grouping_id
+  suma       solo métricas aditivas (conteos de accesos, ingresos)
+  promedio, minimo, maximo, n_filas
+
+grouping_id sigue la convención de GROUPING_ID de SQL: un bit por columna de
+nivel (en el orden de arriba), 1 = agregada.
+
+Uso:
+  python -m pipelines.build_rollups
+"""
+from __future__ import annotations
+
+from itertools import product
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .build_diccionario_metricas import cargar_fact
+from .build_metricas_derivadas import _es_conteo_accesos
+from .etl_dimensional_completo import crear_dim_provincias, crear_dim_tecnologias
+from .salida_parquet import escribir_tabla
+from .series_temporales import clave_provincia
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+OUT_DIR = BASE_DIR / 'data' / 'processed' / 'out'
+
+METRICA_COLS = ['dominio', 'subcategoria', 'variable', 'unidad', 'fuente_archivo']
+JERARQUIAS: Dict[str, List[str]] = {
+    'geo': ['region', 'ProvinciaNorm'],
+    'tiempo': ['anio', 'trimestre'],
+    'tecnologia': ['categoria', 'tecnologia'],
+}
+NIVELES: Dict[str, List[str]] = {
+    'geo': ['nacional', 'region', 'provincia'],
+    'tiempo': ['total', 'anio', 'trimestre'],
+    'tecnologia': ['total', 'categoria', 'tecnologia'],
+}
+NIVEL_ULTIMO = 'ultimo'
+SUBCATEGORIAS_TECNOLOGIA = 'tecnolog'
+MEDIDAS = ['suma', 'promedio', 'minimo', 'maximo', 'n_filas']
+
+
+def clave_tecnologia(s: pd.Series) -> pd.Series:
+    """'fibraOptica' / 'FIBRA_OPTICA' -> 'FIBRAOPTICA' para cruzar con dim_tecnologias."""
+    return s.astype(str).str.upper().str.replace(r'[^A-Z0-9]', '', regex=True)
+
+
+def _es_aditiva(df: pd.DataFrame) -> pd.Series:
+    """Conteos e importes suman entre provincias/tecnologías; ratios y velocidades no."""
+    texto = (df['subcategoria'].astype(str) + ' ' + df['variable'].astype(str)).str.lower()
+    return _es_conteo_accesos(df) | texto.str.contains('ingres')
+
+
+def preparar_base(fact: pd.DataFrame, dim_provincias: pd.DataFrame, dim_tecnologias: pd.DataFrame) -> pd.DataFrame:
+    """Filas con valor y período, más las columnas de nivel de las tres jerarquías."""
+    df = fact[fact['anio'].notna()].copy()
+    df['valor'] = pd.to_numeric(df['valor'], errors='coerce')
+    df = df[df['valor'].notna()]
+    for col in METRICA_COLS + ['ProvinciaNorm', 'trimestre']:
+        if col not in df.columns:
+            df[col] = np.nan
+    df['anio'] = pd.to_numeric(df['anio'], errors='coerce')
+    df['trimestre'] = pd.to_numeric(df['trimestre'], errors='coerce')
+    regiones = dict(zip(dim_provincias['provincia'], dim_provincias['region']))
+    df['region'] = clave_provincia(df).map(regiones)
+
+    es_tec = df['subcategoria'].astype(str).str.lower().str.contains(SUBCATEGORIAS_TECNOLOGIA)
+    categorias = dict(zip(clave_tecnologia(dim_tecnologias['tecnologia']), dim_tecnologias['categoria']))
+    df['tecnologia'] = df['variable'].where(es_tec)
+    df['categoria'] = clave_tecnologia(df['variable']).map(categorias).where(es_tec)
+    # La apertura por tecnología pasa a la jerarquía: la métrica es la unidad (accesos)
+    df.loc[es_tec, 'variable'] = df.loc[es_tec, 'unidad'].fillna('accesos')
+    df['_aditiva'] = _es_aditiva(df)
+    df['_con_tecnologia'] = es_tec
+    return df
+
+
+def _agregar(parciales: pd.DataFrame, claves: List[str]) -> pd.DataFrame:
+    return parciales.groupby(claves, dropna=False, sort=False).agg(
+        suma=('suma', 'sum'), n_filas=('n_filas', 'sum'), minimo=('minimo', 'min'), maximo=('maximo', 'max'),
+        _aditiva=('_aditiva', 'first'),
+    ).reset_index()
+
+
+def _conjuntos(con_tecnologia: bool):
+    """Prefijos de cada jerarquía (0 = total) para todos los grouping sets."""
+    rangos = [range(len(JERARQUIAS['geo']) + 1), range(len(JERARQUIAS['tiempo']) + 1),
+              range(len(JERARQUIAS['tecnologia']) + 1) if con_tecnologia else range(1)]
+    return product(*rangos)
+
+
+def calcular_rollups(fact: pd.DataFrame, dim_provincias: pd.DataFrame,
+                     dim_tecnologias: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Tabla de agregados con todos los grouping sets y el snapshot del último período."""
+    dim_tecnologias = dim_tecnologias if dim_tecnologias is not None else crear_dim_tecnologias()
+    df = preparar_base(fact, dim_provincias, dim_tecnologias)
+    niveles = [c for cols in JERARQUIAS.values() for c in cols]
+    columnas = METRICA_COLS + niveles + ['nivel_geo', 'nivel_tiempo', 'nivel_tecnologia', 'grouping_id'] + MEDIDAS
+    if df.empty:
+        return pd.DataFrame(columns=columnas)
+
+    # Única pasada sobre las filas: parciales al nivel más fino
+    fino = df.groupby(METRICA_COLS + niveles, dropna=False, sort=False).agg(
+        suma=('valor', 'sum'), n_filas=('valor', 'count'), minimo=('valor', 'min'), maximo=('valor', 'max'),
+        _aditiva=('_aditiva', 'first'), _con_tecnologia=('_con_tecnologia', 'first'),
+    ).reset_index()
+    orden = fino['anio'] * 4 + fino['trimestre'].fillna(4) - 1
+    fino['_ultimo'] = orden == orden.groupby([fino[c] for c in METRICA_COLS], dropna=False).transform('max')
+
+    partes = []
+    for con_tec in (False, True):
+        base = fino[fino['_con_tecnologia'] == con_tec]
+        if base.empty:
+            continue
+        for geo, tiempo, tec in _conjuntos(con_tec):
+            conservadas = JERARQUIAS['geo'][:geo] + JERARQUIAS['tiempo'][:tiempo] + JERARQUIAS['tecnologia'][:tec]
+            snapshots = [(base, NIVELES['tiempo'][tiempo])]
+            if tiempo == len(JERARQUIAS['tiempo']):
+                snapshots.append((base[base['_ultimo']], NIVEL_ULTIMO))
+            for parciales, nivel_tiempo in snapshots:
+                parte = _agregar(parciales, METRICA_COLS + conservadas)
+                parte['nivel_geo'] = NIVELES['geo'][geo]
+                parte['nivel_tiempo'] = nivel_tiempo
+                parte['nivel_tecnologia'] = NIVELES['tecnologia'][tec]
+                parte['grouping_id'] = sum(1 << (len(niveles) - 1 - i) for i, c in enumerate(niveles) if c not in conservadas)
+                partes.append(parte)
+
+    out = pd.concat(partes, ignore_index=True)
+    out['promedio'] = out['suma'] / out['n_filas']
+    out['suma'] = out['suma'].where(out['_aditiva'].astype(bool))
+    return out.reindex(columns=columnas)
+
+
+def main():
+    print('🧮 Calculando agregados (grouping sets)...')
+    rollups = calcular_rollups(cargar_fact(), crear_dim_provincias())
+    escribir_tabla(rollups, OUT_DIR / 'agregados_rollup.csv')
+    print(f'✔ agregados_rollup.csv ({len(rollups)} filas)')
+
+
+if __name__ == '__main__':
+    main()
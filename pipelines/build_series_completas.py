@@ -0,0 +1,153 @@
+"""build_series_completas.py
+--------------------------
+Completa los trimestres faltantes de todas las series de `fact_unificado_long`
+(provincias ausentes en algunos trimestres, huecos por revisiones) contra la
+grilla completa de `dim_tiempo`, para que el BI no dibuje líneas cortadas ni
+calcule crecimientos contra el período equivocado.
+
+Todas las series trimestrales se pivotan a una única matriz período × serie y
+se interpolan en bloque con NumPy (sin bucles por serie):
+  - 'lineal'  : interpolación lineal solo en huecos interiores
+  - 'arrastre': carry-forward del último valor observado (incluye el final)
+Antes de la primera observación no se imputa (p.ej. tecnologías nuevas).
+Las filas imputadas llevan `imputado = True`; las observadas no se modifican.
+Un par (serie, período) con valores distintos es un error (ValueError): no
+hay un único dato a interpolar. Series anuales o mensuales (sin trimestre o
+con mes) se dejan tal cual.
+
+Salida (reemplaza la tabla unificada, re-ejecutable):
+  data/processed/out/fact_unificado_long.csv  (+ columna imputado, ordenada e indexada: ver fact_indexado.py)
+
+Uso:
+  python -m pipelines.build_series_completas [lineal|arrastre]
+"""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .build_diccionario_metricas import cargar_fact
+from .fact_indexado import escribir_indice, ordenar_fact
+from .salida_parquet import escribir_tabla
+from .series_temporales import agregar_periodo_idx, cargar_dim_tiempo, columnas_serie, grilla_periodos, matriz_series
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+OUT_DIR = BASE_DIR / 'data' / 'processed' / 'out'
+
+METODOS = ('lineal', 'arrastre')
+
+
+def interpolar_matriz(matriz: np.ndarray, metodo: str = 'lineal', limite: Optional[int] = None) -> np.ndarray:
+    """Rellena NaN por columna en una matriz período × serie, en bloque.
+
+    limite: máximo de trimestres consecutivos a imputar (None = sin límite).
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"Método desconocido: {metodo}. Opciones: {METODOS}")
+    n_per, n_ser = matriz.shape
+    valido = ~np.isnan(matriz)
+    filas = np.arange(n_per)[:, None]
+    cols = np.arange(n_ser)[None, :]
+    # Índice del último valor observado hasta cada fila (-1 si no hubo)
+    prev = np.maximum.accumulate(np.where(valido, filas, -1), axis=0)
+    hay_prev = prev >= 0
+    prev_c = np.where(hay_prev, prev, 0)
+    v_prev = matriz[prev_c, cols]
+    if metodo == 'arrastre':
+        llenar = ~valido & hay_prev
+        if limite is not None:
+            llenar &= (filas - prev) <= limite
+        return np.where(llenar, v_prev, matriz)
+    # Índice del próximo valor observado desde cada fila (n_per si no hay)
+    sig = np.minimum.accumulate(np.where(valido, filas, n_per)[::-1], axis=0)[::-1]
+    hay_sig = sig < n_per
+    sig_c = np.where(hay_sig, sig, 0)
+    v_sig = matriz[sig_c, cols]
+    llenar = ~valido & hay_prev & hay_sig
+    if limite is not None:
+        llenar &= (sig - prev - 1) <= limite
+    with np.errstate(invalid='ignore', divide='ignore'):
+        peso = (filas - prev) / (sig - prev)
+        interp = v_prev + peso * (v_sig - v_prev)
+    return np.where(llenar, interp, matriz)
+
+
+def completar_series(fact: pd.DataFrame, dim_tiempo: pd.DataFrame, metodo: str = 'lineal',
+                     limite: Optional[int] = None) -> pd.DataFrame:
+    """Reindexa todas las series trimestrales contra la grilla de dim_tiempo e imputa huecos."""
+    # Re-ejecución: las filas imputadas antes se recalculan
+    if 'imputado' in fact.columns:
+        fact = fact[~fact['imputado'].astype(str).str.lower().isin(['true', '1'])]
+    fact = fact.drop(columns='imputado', errors='ignore')
+
+    trimestral = fact['anio'].notna()
+    trimestral &= pd.to_numeric(fact['trimestre'], errors='coerce').notna() if 'trimestre' in fact.columns else False
+    if 'mes' in fact.columns:
+        trimestral &= pd.to_numeric(fact['mes'], errors='coerce').isna()
+    resto = fact[~trimestral].assign(imputado=False)
+    df = agregar_periodo_idx(fact[trimestral])
+    if df.empty:
+        return pd.concat([fact[trimestral].assign(imputado=False), resto], ignore_index=True)
+
+    claves = columnas_serie(df)
+    grilla = grilla_periodos(dim_tiempo, df['periodo_idx'])
+    periodos = grilla['periodo_idx'].to_numpy(dtype='int64')
+    _validar_unicos(df, claves)
+    # Filas sin valor primero: en una celda con dato, el que queda en la matriz es el observado
+    con_valor = pd.to_numeric(df['valor'], errors='coerce').notna().to_numpy()
+    matriz, series = matriz_series(df.iloc[np.argsort(con_valor, kind='stable')], claves, periodos)
+    completa = interpolar_matriz(matriz, metodo, limite)
+
+    # Solo se agregan filas en las celdas imputadas; las observadas quedan como estaban
+    fila, col = np.nonzero(np.isnan(matriz) & ~np.isnan(completa))
+    nuevas = series.iloc[col].reset_index(drop=True)
+    nuevas['periodo_idx'] = periodos[fila]
+    nuevas['valor'] = completa[fila, col]
+    nuevas['imputado'] = True
+
+    # Atributos constantes por serie (unidad, fuente_archivo, provincia, ids): los de su última observación
+    extras = [c for c in df.columns if c not in claves + ['anio', 'trimestre', 'mes', 'valor', 'periodo_idx']]
+    if extras:
+        attrs = df.drop_duplicates(claves, keep='last')[claves + extras]
+        nuevas = nuevas.merge(attrs, on=claves, how='left')
+    nuevas = nuevas.merge(grilla[['periodo_idx', 'anio', 'trimestre']], on='periodo_idx', how='left')
+    if 'mes' in fact.columns:
+        nuevas['mes'] = pd.NA
+
+    # Una fila observada sin valor cuya celda se imputó queda reemplazada por la imputada
+    celda = np.searchsorted(periodos, df['periodo_idx'].to_numpy(dtype='int64'))
+    serie = df.groupby(claves, dropna=False, sort=True).ngroup().to_numpy()
+    reemplazada = ~con_valor & np.isnan(matriz[celda, serie]) & ~np.isnan(completa[celda, serie])
+    observadas = fact[trimestral][~reemplazada].assign(imputado=False)
+    columnas = list(fact.columns) + ['imputado']
+    return pd.concat([observadas, nuevas[columnas], resto], ignore_index=True)
+
+
+def _validar_unicos(df: pd.DataFrame, claves: List[str]) -> None:
+    """Un solo valor por (serie, período): con más, no hay un dato que interpolar y se conservaría uno al azar."""
+    valor = pd.to_numeric(df['valor'], errors='coerce')
+    conflictos = df.assign(_valor=valor).groupby(claves + ['periodo_idx'], dropna=False)['_valor'].nunique()
+    conflictos = conflictos[conflictos > 1]
+    if not conflictos.empty:
+        ejemplos = [dict(zip(claves + ['periodo_idx'], k)) for k in conflictos.index[:3]]
+        raise ValueError(f"{len(conflictos)} pares (serie, período) con valores distintos en fact_unificado_long; "
+                         f"agregarlos antes de completar series. Ejemplos: {ejemplos}")
+
+
+def main():
+    metodo = sys.argv[1] if len(sys.argv) > 1 else 'lineal'
+    print(f'🧩 Completando trimestres faltantes ({metodo})...')
+    fact = cargar_fact()
+    completo = ordenar_fact(completar_series(fact, cargar_dim_tiempo(), metodo))
+    escribir_tabla(completo, OUT_DIR / 'fact_unificado_long.csv')
+    escribir_indice(completo, OUT_DIR)
+    print(f'✔ fact_unificado_long.csv ({len(completo)} filas, {int(completo["imputado"].sum())} imputadas)')
+
+
+if __name__ == '__main__':
+    main()
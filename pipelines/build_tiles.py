@@ -0,0 +1,182 @@
+"""build_tiles.py
+--------------
+Teselas JSON estáticas para los gráficos del front-end web. Hoy cada gráfico
+por provincia o por métrica consulta MySQL; acá la tabla unificada (con las
+medidas derivadas, si ya se calcularon) se corta de antemano en archivos
+chicos comprimidos que cualquier servidor estático entrega sin cómputo.
+
+- Una tesela por (dominio, variable) y una por provincia (ProvinciaNorm).
+- Contenido: {"tipo", "clave", "fuente", "filas", "tabla": {"columns", "data"}}
+  en JSON compacto, comprimido con gzip (mtime 0: mismo contenido, mismos bytes).
+- Cada tesela lleva su huella de entrada (hash de las filas de su porción) y
+  su etag (hash del .json.gz). Solo se reescriben las teselas cuya porción
+  cambió: las demás conservan bytes y mtime, así también las ETag que el
+  servidor derive de ellos siguen válidas.
+- manifest.json lista todas las teselas (ruta, clave, filas, bytes, etag);
+  las teselas que dejaron de existir se borran.
+
+Fuente: out/fact_metricas_derivadas si existe (la unificada más las medidas
+de build_metricas_derivadas), si no out/fact_unificado_long; en el formato
+que haya (ver lector_salidas).
+
+Salidas:
+  data/processed/tiles/variable/<dominio>/<variable>.json.gz
+  data/processed/tiles/provincia/<provincia>.json.gz
+  data/processed/tiles/manifest.json
+
+Uso:
+  python -m pipelines.build_tiles
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .etl_dimensional_completo import normalizar_texto
+from .lector_salidas import leer_tabla
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+OUT_DIR = BASE_DIR / 'data' / 'processed' / 'out'
+TILES_DIR = BASE_DIR / 'data' / 'processed' / 'tiles'
+
+FUENTES = ('fact_metricas_derivadas', 'fact_unificado_long')
+MANIFIESTO = 'manifest.json'
+VERSION_TESELAS = 1  # cambiarla regenera todas las teselas
+# tipo de tesela -> columnas que la definen
+CORTES: Dict[str, Tuple[str, ...]] = {
+    'variable': ('dominio', 'variable'),
+    'provincia': ('ProvinciaNorm',),
+}
+
+
+def cargar_fuente(carpeta: Optional[Path] = None) -> Tuple[str, pd.DataFrame]:
+    """(nombre, tabla) de la primera fuente disponible de FUENTES."""
+    for nombre in FUENTES:
+        try:
+            return nombre, leer_tabla(nombre, carpeta if carpeta is not None else OUT_DIR)
+        except FileNotFoundError:
+            continue
+    raise FileNotFoundError("fact_unificado_long no encontrado. Ejecutar primero el pipeline")
+
+
+def slug(valor) -> str:
+    """Nombre de archivo estable: sin tildes, minúsculas y '_' en lugar de lo que no sea letra o dígito."""
+    texto = re.sub(r'[^a-z0-9]+', '_', normalizar_texto(str(valor)).lower()).strip('_')
+    return texto or '_'
+
+
+def _ruta(tipo: str, clave: tuple) -> str:
+    return '/'.join([tipo] + [slug(v) for v in clave]) + '.json.gz'
+
+
+def porciones(df: pd.DataFrame) -> List[dict]:
+    """Teselas a generar con la huella de su porción; las filas se hashean una sola vez para todos los cortes."""
+    filas = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    encabezado = json.dumps([VERSION_TESELAS, [str(c) for c in df.columns]]).encode()
+    teselas = []
+    for tipo, columnas in CORTES.items():
+        if not set(columnas) <= set(df.columns):
+            continue
+        grupos = df.groupby(list(columnas), sort=True, dropna=True).indices
+        for clave, posiciones in grupos.items():
+            clave = clave if isinstance(clave, tuple) else (clave,)
+            h = hashlib.blake2b(encabezado, digest_size=16)
+            h.update(np.ascontiguousarray(filas[posiciones]).tobytes())
+            teselas.append({
+                'ruta': _ruta(tipo, clave), 'tipo': tipo,
+                'clave': {c: (v.item() if isinstance(v, np.generic) else v) for c, v in zip(columnas, clave)},
+                'filas': int(len(posiciones)), 'huella': h.hexdigest(), 'posiciones': posiciones,
+            })
+    rutas = [t['ruta'] for t in teselas]
+    if len(set(rutas)) != len(rutas):
+        repetidas = sorted({r for r in rutas if rutas.count(r) > 1})
+        raise ValueError(f"Claves distintas con el mismo nombre de tesela: {repetidas[:5]}")
+    return teselas
+
+
+def serializar(df: pd.DataFrame, tesela: dict, fuente: str) -> bytes:
+    """JSON comprimido de la tesela (sin las columnas de la clave, constantes en toda la porción)."""
+    parte = df.iloc[tesela['posiciones']].drop(columns=list(tesela['clave'])).replace([np.inf, -np.inf], np.nan)
+    # Listas Python por columna: json.dumps es más rápido que to_json y escribe los float con su repr exacto
+    columnas = [parte[c].astype(object).where(parte[c].notna(), None).tolist() for c in parte.columns]
+    contenido = {
+        'tipo': tesela['tipo'], 'clave': tesela['clave'], 'fuente': fuente, 'filas': tesela['filas'],
+        'tabla': {'columns': [str(c) for c in parte.columns], 'data': [list(fila) for fila in zip(*columnas)]},
+    }
+    texto = json.dumps(contenido, ensure_ascii=False, separators=(',', ':'), allow_nan=False, default=str)
+    return gzip.compress(texto.encode('utf-8'), compresslevel=6, mtime=0)
+
+
+def leer_manifiesto(destino: Optional[Path] = None) -> dict:
+    path = (Path(destino) if destino is not None else TILES_DIR) / MANIFIESTO
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def leer_tesela(ruta: str, destino: Optional[Path] = None) -> dict:
+    """Contenido de una tesela ya generada (para pruebas y depuración)."""
+    path = (Path(destino) if destino is not None else TILES_DIR) / ruta
+    return json.loads(gzip.decompress(path.read_bytes()))
+
+
+def _escribir(path: Path, contenido: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporal = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    temporal.write_bytes(contenido)
+    os.replace(temporal, path)
+
+
+def generar_teselas(df: pd.DataFrame, fuente: str = FUENTES[-1], destino: Optional[Path] = None) -> dict:
+    """Escribe las teselas cuya porción cambió, borra las que ya no existen y actualiza el manifiesto."""
+    destino = Path(destino) if destino is not None else TILES_DIR
+    previas = {t['ruta']: t for t in leer_manifiesto(destino).get('teselas', [])}
+    entradas, escritas = [], 0
+    for tesela in porciones(df):
+        previa = previas.get(tesela['ruta'])
+        path = destino / tesela['ruta']
+        if previa is None or previa.get('huella') != tesela['huella'] or previa.get('fuente') != fuente \
+                or not path.exists():
+            contenido = serializar(df, tesela, fuente)
+            _escribir(path, contenido)
+            escritas += 1
+            etag, peso = hashlib.blake2b(contenido, digest_size=16).hexdigest(), len(contenido)
+        else:
+            etag, peso = previa['etag'], previa['bytes']
+        entrada = {k: v for k, v in tesela.items() if k != 'posiciones'}
+        entradas.append({**entrada, 'fuente': fuente, 'etag': etag, 'bytes': peso})
+
+    vigentes = {e['ruta'] for e in entradas}
+    borradas = [r for r in previas if r not in vigentes]
+    for ruta in borradas:
+        (destino / ruta).unlink(missing_ok=True)
+    manifiesto = {
+        'version': VERSION_TESELAS, 'generado': datetime.now().isoformat(timespec='seconds'),
+        'fuente': fuente, 'teselas': sorted(entradas, key=lambda e: e['ruta']),
+    }
+    _escribir(destino / MANIFIESTO, json.dumps(manifiesto, ensure_ascii=False, indent=1).encode('utf-8'))
+    return {'teselas': len(entradas), 'escritas': escritas, 'sin_cambios': len(entradas) - escritas,
+            'borradas': len(borradas), 'bytes': sum(e['bytes'] for e in entradas)}
+
+
+def main():
+    print('🧩 Generando teselas JSON para el front-end...')
+    fuente, df = cargar_fuente()
+    resumen = generar_teselas(df, fuente)
+    print(f"  • Fuente: {fuente} ({len(df)} filas)")
+    print(f"  • {resumen['teselas']} teselas: {resumen['escritas']} escritas, {resumen['sin_cambios']} sin cambios, "
+          f"{resumen['borradas']} borradas ({resumen['bytes'] / 1e6:.2f} MB comprimidas)")
+    print(f'✔ Teselas y {MANIFIESTO} en {TILES_DIR}')
+
+
+if __name__ == '__main__':
+    main()
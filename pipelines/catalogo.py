@@ -0,0 +1,345 @@
+"""catalogo.py
+-----------
+Catálogo de datasets con estadísticas calculadas al escribir. Cada carpeta
+de salida guarda un `_catalogo.json` con una entrada por tabla, así los
+resúmenes y el diccionario de métricas no vuelven a leer los archivos y los
+lectores pueden descartar tablas por sus rangos.
+
+Entrada de una tabla:
+  filas, columnas (nombre, tipo, nulos, min, max; distintos y valores en
+  las columnas clave), archivos por formato (ruta relativa, bytes,
+  mtime_ns y hash: la huella con la que se escribió, que determina los
+  bytes, así no se vuelve a leer el archivo), la huella del DataFrame y el
+  hash de cada columna (para reutilizar archivos sin reescribirlos, ver
+  publicacion.py), la procedencia si el escritor la indica (huellas de las
+  entradas y parámetros de una tabla derivada, para cachearla) y, si la tabla tiene
+  dominio/subcategoria/variable, las estadísticas por métrica que usa
+  build_diccionario_metricas (filas, años, provincias, unidad, archivos fuente).
+
+Una entrada vale mientras el archivo conserve tamaño y mtime; si alguien lo
+reescribe por fuera del pipeline, los consumidores vuelven a leerlo.
+
+Dentro de una publicación (ver publicacion.py) las entradas se acumulan en
+memoria (diferir) y cada _catalogo.json se escribe una sola vez al publicar
+(volcar), en vez de reescribirlo completo con cada tabla.
+
+Salida:
+  <carpeta>/_catalogo.json   (data/processed, dimensional/, out/, ...)
+
+Uso:
+  from pipelines.catalogo import entrada_vigente, leer_catalogo
+  entrada_vigente(OUT_DIR, 'fact_unificado_long')['filas']
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+ARCHIVO_CATALOGO = '_catalogo.json'
+# Columnas con conteo de distintos (y la lista si son pocos)
+COLUMNAS_CLAVE = ('dominio', 'subcategoria', 'variable', 'unidad', 'fuente_archivo', 'ProvinciaNorm',
+                  'provincia', 'provincia_id', 'anio', 'trimestre', 'mes', 'tecnologia')
+MAX_VALORES = 64
+METRICA_COLS = ['dominio', 'subcategoria', 'variable']
+BLOQUE_HASH = 1 << 20
+TIPOS_TEXTO = ('str', 'string', 'object')
+
+# Carpetas raíz con escritura diferida -> {carpeta: {nombre: entrada}} pendientes
+_DIFERIDAS: Dict[Path, Dict[Path, Dict[str, dict]]] = {}
+
+
+def _escalar(v):
+    """Valor apto para JSON (numpy -> Python, nulos -> None)."""
+    if v is None or (not isinstance(v, (list, tuple, dict)) and pd.isna(v)):
+        return None
+    if isinstance(v, np.generic):
+        return v.item()
+    if isinstance(v, (str, int, float, bool)):
+        return v
+    return str(v)
+
+
+def estadisticas_columna(s: pd.Series, clave: bool = False) -> dict:
+    stats = {'nombre': s.name, 'tipo': str(s.dtype), 'nulos': int(s.isna().sum())}
+    presentes = s.dropna()
+    if len(presentes) and (pd.api.types.is_numeric_dtype(s) or pd.api.types.is_string_dtype(s)) \
+            and not pd.api.types.is_bool_dtype(s):
+        try:
+            stats['min'], stats['max'] = _escalar(presentes.min()), _escalar(presentes.max())
+        except TypeError:  # object con tipos mezclados
+            pass
+    if clave:
+        distintos = presentes.unique()
+        stats['distintos'] = int(len(distintos))
+        if len(distintos) <= MAX_VALORES:
+            stats['valores'] = sorted((_escalar(v) for v in distintos), key=str)
+    return stats
+
+
+def _distintos_por_grupo(grupo: np.ndarray, codigos: np.ndarray, n_grupos: int) -> np.ndarray:
+    """Valores distintos (no nulos, código >= 0) por grupo."""
+    presentes = codigos >= 0
+    pares = np.unique(grupo[presentes].astype('int64') * (int(codigos.max(initial=0)) + 1) + codigos[presentes])
+    return np.bincount(pares // (int(codigos.max(initial=0)) + 1), minlength=n_grupos)
+
+
+def estadisticas_metricas(df: pd.DataFrame) -> List[dict]:
+    """Por (dominio, subcategoria, variable): filas, años, provincias, unidad y archivos fuente."""
+    if not set(METRICA_COLS) <= set(df.columns) or df.empty:
+        return []
+    # Grupos por códigos enteros (factorize por columna) en vez de agrupar por texto
+    combinado = np.zeros(len(df), dtype='int64')
+    for col in METRICA_COLS:
+        codigos, valores = pd.factorize(df[col], use_na_sentinel=False)
+        combinado = combinado * (len(valores) + 1) + codigos
+    grupo, _ = pd.factorize(combinado)
+    n_grupos = int(grupo.max()) + 1
+    _, primeras = np.unique(grupo, return_index=True)
+    out = df[METRICA_COLS].iloc[primeras].reset_index(drop=True)
+    out['filas'] = np.bincount(grupo, minlength=n_grupos)
+    if 'anio' in df.columns:
+        anio = pd.Series(pd.to_numeric(df['anio'], errors='coerce').to_numpy()).groupby(grupo)
+        out['anio_min'], out['anio_max'] = anio.min(), anio.max()
+    if 'ProvinciaNorm' in df.columns:
+        out['provincias'] = _distintos_por_grupo(grupo, pd.factorize(df['ProvinciaNorm'])[0], n_grupos)
+    if 'unidad' in df.columns:
+        # Primera unidad no vacía en orden de aparición
+        codigos, valores = pd.factorize(df['unidad'])
+        con_texto = np.append(pd.Series(valores, dtype=object).astype(str).str.strip().ne('').to_numpy(), False)
+        validas = np.flatnonzero(con_texto[codigos])
+        primera = pd.Series(codigos[validas]).groupby(grupo[validas]).first()
+        out['unidad'] = pd.Series(valores.take(primera.to_numpy()), index=primera.index).reindex(range(n_grupos))
+    if 'fuente_archivo' in df.columns:
+        codigos, valores = pd.factorize(df['fuente_archivo'])
+        pares = pd.DataFrame({'grupo': grupo, 'archivo': codigos})
+        pares = pares[pares['archivo'] >= 0].drop_duplicates()
+        pares['archivo'] = valores.take(pares['archivo'].to_numpy())
+        out['archivos'] = pares.groupby('grupo')['archivo'].agg(lambda s: sorted(s)).reindex(range(n_grupos))
+    registros = []
+    for fila in out.to_dict('records'):
+        registro = {k: _escalar(v) for k, v in fila.items() if k != 'archivos'}
+        archivos = fila.get('archivos')
+        registro['archivos'] = list(archivos) if isinstance(archivos, list) else []
+        if registro.get('provincias') == 0:
+            registro['provincias'] = None
+        registros.append(registro)
+    return registros
+
+
+def estadisticas_tabla(df: pd.DataFrame) -> dict:
+    return {
+        'filas': int(len(df)),
+        'columnas': [estadisticas_columna(df[c], c in COLUMNAS_CLAVE) for c in df.columns],
+        'metricas': estadisticas_metricas(df),
+    }
+
+
+# ---------- Archivos ----------
+
+def archivos_de(ruta: Path) -> List[Path]:
+    return sorted(p for p in ruta.rglob('*') if p.is_file()) if ruta.is_dir() else [ruta]
+
+
+def firma(ruta: Path) -> dict:
+    """Bytes y mtime_ns (máximo, si es un dataset en carpeta) para validar la entrada."""
+    archivos = archivos_de(Path(ruta))
+    stats = [p.stat() for p in archivos]
+    return {'bytes': int(sum(s.st_size for s in stats)), 'mtime_ns': int(max((s.st_mtime_ns for s in stats), default=0))}
+
+
+def hashes_columnas(df: pd.DataFrame) -> List[str]:
+    """Hash del contenido (y tipo) de cada columna: detecta copias y subconjuntos de columnas sin comparar archivos."""
+    hashes = []
+    for i in range(df.shape[1]):
+        s = df.iloc[:, i]
+        h = hashlib.blake2b(str(s.dtype).encode('utf-8'), digest_size=16)
+        if pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+            h.update(pd.util.hash_pandas_object(s, index=False).to_numpy().tobytes())
+        else:
+            # Texto: códigos + valores distintos (mucho más rápido que hashear cada fila como objeto)
+            codigos, valores = pd.factorize(s)
+            h.update(codigos.tobytes())
+            distintos = pd.Series(valores, dtype=object)
+            try:
+                h.update(pd.util.hash_pandas_object(distintos, index=False).to_numpy().tobytes())
+            except TypeError:  # objetos no hasheables (listas, dicts)
+                h.update(pd.util.hash_pandas_object(distintos.astype(str), index=False).to_numpy().tobytes())
+        hashes.append(h.hexdigest())
+    return hashes
+
+
+def huella_tabla(df: pd.DataFrame, formatos, escritor: Optional[str] = None,
+                 hashes: Optional[List[str]] = None, procedencia: Optional[dict] = None) -> str:
+    """Hash del contenido del DataFrame (y de cómo se escribe): igual huella -> mismos archivos.
+
+    Con procedencia, también cuenta: una tabla reutilizada conserva la procedencia de su entrada.
+    """
+    hashes = hashes if hashes is not None else hashes_columnas(df)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((sorted(formatos), escritor, [str(c) for c in df.columns], hashes)).encode('utf-8'))
+    if procedencia is not None:
+        h.update(json.dumps(procedencia, sort_keys=True, default=str).encode('utf-8'))
+    return f'blake2b:{h.hexdigest()}'
+
+
+def hash_contenido(ruta: Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for p in archivos_de(Path(ruta)):
+        with open(p, 'rb') as f:
+            for bloque in iter(lambda: f.read(BLOQUE_HASH), b''):
+                h.update(bloque)
+    return f'blake2b:{h.hexdigest()}'
+
+
+# ---------- Catálogo ----------
+
+def ruta_catalogo(carpeta: Path) -> Path:
+    return Path(carpeta) / ARCHIVO_CATALOGO
+
+
+def _pendientes(carpeta: Path) -> Optional[Dict[str, dict]]:
+    """Entradas aún no escritas de carpeta si está bajo una raíz diferida; None si no."""
+    if not _DIFERIDAS:
+        return None
+    carpeta = Path(carpeta).resolve()
+    for raiz, carpetas in _DIFERIDAS.items():
+        if carpeta.is_relative_to(raiz):
+            return carpetas.setdefault(carpeta, {})
+    return None
+
+
+def leer_catalogo(carpeta: Path) -> Dict[str, dict]:
+    ruta = ruta_catalogo(carpeta)
+    catalogo = {}
+    if ruta.exists():
+        try:
+            catalogo = json.loads(ruta.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            catalogo = {}
+    catalogo.update(_pendientes(carpeta) or {})
+    return catalogo
+
+
+def _guardar(carpeta: Path, catalogo: Dict[str, dict]) -> None:
+    ruta = ruta_catalogo(carpeta)
+    temporal = ruta.with_name(f'.{ruta.name}.{os.getpid()}.tmp')
+    temporal.write_text(json.dumps(catalogo, ensure_ascii=False, indent=1, sort_keys=True), encoding='utf-8')
+    os.replace(temporal, ruta)
+
+
+def guardar_entrada(carpeta: Path, nombre: str, entrada: dict) -> None:
+    pendientes = _pendientes(carpeta)
+    if pendientes is not None:
+        pendientes[nombre] = entrada
+        return
+    catalogo = leer_catalogo(carpeta)
+    catalogo[nombre] = entrada
+    _guardar(Path(carpeta), catalogo)
+
+
+def diferir(raiz: Path) -> None:
+    """Las entradas de raiz (y subcarpetas) quedan en memoria hasta volcar(raiz)."""
+    _DIFERIDAS.setdefault(Path(raiz).resolve(), {})
+
+
+def carpetas_diferidas(raiz: Path) -> List[Path]:
+    """Carpetas de raiz con entradas pendientes (aún sin _catalogo.json en disco)."""
+    return sorted(_DIFERIDAS.get(Path(raiz).resolve(), {}))
+
+
+def volcar(raiz: Path, descartar: bool = False) -> None:
+    """Escribe cada _catalogo.json pendiente de raiz una sola vez (o los descarta) y termina la diferida."""
+    carpetas = _DIFERIDAS.pop(Path(raiz).resolve(), {})
+    if descartar:
+        return
+    for carpeta, entradas in carpetas.items():
+        if entradas:
+            catalogo = leer_catalogo(carpeta)
+            catalogo.update(entradas)
+            _guardar(carpeta, catalogo)
+
+
+def registrar(carpeta: Path, nombre: str, df: pd.DataFrame, archivos: Dict[str, Path],
+              huella: Optional[str] = None, hashes: Optional[List[str]] = None,
+              escritor: Optional[str] = None, procedencia: Optional[dict] = None) -> dict:
+    """Entrada de la tabla recién escrita ({formato: ruta}) en <carpeta>/_catalogo.json."""
+    carpeta = Path(carpeta)
+    entrada = estadisticas_tabla(df)
+    if huella is not None:
+        entrada['huella'] = huella  # ver publicacion.Publicacion.reutilizar
+    if escritor is not None:
+        entrada['escritor'] = escritor
+    if procedencia is not None:
+        entrada['procedencia'] = procedencia
+    for stats, h in zip(entrada['columnas'], hashes or []):
+        stats['hash'] = h
+    entrada['archivos'] = {}
+    for formato, ruta in archivos.items():
+        ruta = Path(ruta)
+        # La huella ya identifica el contenido escrito: solo sin ella se relee el archivo
+        entrada['archivos'][formato] = {
+            'ruta': os.path.relpath(ruta, carpeta), **firma(ruta),
+            'hash': huella if huella is not None else hash_contenido(ruta),
+        }
+    guardar_entrada(carpeta, nombre, entrada)
+    return entrada
+
+
+def copiar_entrada(entrada: dict, carpeta: Path, nombre: str, archivos: Dict[str, Path]) -> dict:
+    """Entrada de una copia de otra tabla (mismo contenido): se actualizan rutas y firmas, el resto se conserva."""
+    carpeta = Path(carpeta)
+    copia = json.loads(json.dumps(entrada))
+    copia['archivos'] = {
+        formato: {**entrada['archivos'][formato], 'ruta': os.path.relpath(ruta, carpeta), **firma(ruta)}
+        for formato, ruta in archivos.items()
+    }
+    guardar_entrada(carpeta, nombre, copia)
+    return copia
+
+
+def entrada_vigente(carpeta: Path, nombre: str, formato: str = 'csv') -> Optional[dict]:
+    """Entrada si el archivo de ese formato no cambió desde que se registró; None si no."""
+    carpeta = Path(carpeta)
+    entrada = leer_catalogo(carpeta).get(nombre)
+    archivo = (entrada or {}).get('archivos', {}).get(formato)
+    if archivo is None:
+        return None
+    ruta = carpeta / archivo['ruta']
+    if not ruta.exists():
+        return None
+    actual = firma(ruta)
+    if (actual['bytes'], actual['mtime_ns']) != (archivo['bytes'], archivo['mtime_ns']):
+        return None
+    return entrada
+
+
+def columna(entrada: dict, nombre: str) -> Optional[dict]:
+    return next((c for c in entrada.get('columnas', []) if c['nombre'] == nombre), None)
+
+
+def columnas_texto(path: Path) -> List[str]:
+    """Columnas que el catálogo registró como texto (códigos con ceros a la izquierda); [] sin entrada vigente."""
+    path = Path(path)
+    entrada = entrada_vigente(path.parent, path.stem)
+    if entrada is None:
+        return []
+    return [c['nombre'] for c in entrada.get('columnas', []) if c.get('tipo', '').startswith(TIPOS_TEXTO)]
+
+
+def contar_filas(path: Path) -> int:
+    """Filas de datos de un CSV: del catálogo si está vigente, si no contando líneas."""
+    path = Path(path)
+    entrada = entrada_vigente(path.parent, path.stem)
+    if entrada is not None:
+        return entrada['filas']
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return max(sum(1 for _ in f) - 1, 0)
+    except Exception:
+        return 0
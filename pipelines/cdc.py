@@ -0,0 +1,284 @@
+"""cdc.py
+------
+Captura de cambios por fila (CDC) entre publicaciones de ENACOM. Cada
+release trimestral vuelve a publicar toda la historia, a veces con
+revisiones de trimestres pasados; en vez de recargar todo en MySQL, Hyper o
+Parquet, esta etapa compara cada tabla de hechos con la release anterior y
+deja solo las filas insertadas, actualizadas y eliminadas.
+
+- Cada fila se identifica por su clave natural (CLAVES_NATURALES: período,
+  provincia, métrica, tecnología, ...; a partir de la segunda fila con la
+  misma clave se agrega el número de ocurrencia, contado en el orden de los
+  valores y no en el de las filas) y se resume en dos hashes de 64 bits: clave y
+  valores. Se hashea el texto del CSV, así un cambio de tipado (p.ej. una
+  columna entera que pasa a tener nulos) no se confunde con una revisión.
+- El índice de la release anterior (claves ordenadas, hash de valores y
+  posición de la fila) se compara con búsqueda binaria. La tabla anterior
+  (vigente.csv, copia por reflink/copy_file_range) solo se lee si hubo
+  filas eliminadas, para emitirlas con sus últimos valores.
+- Historia solo de agregado: cada release agrega un archivo de cambios
+  (columna _operacion I/U/D) y una línea en releases.csv; nunca se
+  reescriben. estado_en() reconstruye cualquier release anterior.
+
+Salidas (por tabla):
+  data/processed/cdc/<tabla>/cambios/<secuencia>_<release>.csv   (_release, _operacion, _clave, columnas)
+  data/processed/cdc/<tabla>/releases.csv                        (secuencia, release, fecha, filas, insertadas, actualizadas, eliminadas)
+  data/processed/cdc/<tabla>/indice.npz + vigente.csv            (estado de la última release)
+
+Uso:
+  python -m pipelines.cdc [release]        # release por defecto: RELEASE_ENACOM o fecha y hora
+
+  from pipelines.cdc import cambios, estado_en
+  cambios('fact_unificado_long', '2025T1')     # filas I/U/D de esa release
+  estado_en('fact_unificado_long', '2024T4')   # tabla tal como estaba publicada entonces
+"""
+from __future__ import annotations
+
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .fact_indexado import ORDEN
+from .io_csv import leer_csv
+from .publicacion import materializar
+from .salida_parquet import escribir_tabla
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PROCESSED_DIR = BASE_DIR / 'data' / 'processed'
+OUT_DIR = PROCESSED_DIR / 'out'
+DIM_DIR = PROCESSED_DIR / 'dimensional'
+CDC_DIR = PROCESSED_DIR / 'cdc'
+
+# Columnas que identifican una fila (el resto son valores)
+CLAVES_NATURALES = (
+    'dominio', 'subcategoria', 'variable', 'ProvinciaNorm', 'provincia_id', 'tiempo_id',
+    'anio', 'trimestre', 'mes', 'partido', 'localidad', 'link_indec', 'linkindec',
+    'tecnologia', 'tecnologia_id', 'velocidad', 'Velocidad_kbps', 'velocidad_id',
+    'rango_velocidad', 'servicio_id',
+)
+# Clave explícita por tabla (si no figura, las columnas de CLAVES_NATURALES presentes)
+CLAVES_POR_TABLA: Dict[str, List[str]] = {
+    # partido/localidad/fuente_archivo: las filas de localidad de una serie no comparten clave
+    'fact_unificado_long': ORDEN + ['mes', 'partido', 'localidad', 'fuente_archivo'],
+}
+META = ['_release', '_operacion', '_clave']
+INSERTADA, ACTUALIZADA, ELIMINADA = 'I', 'U', 'D'
+
+
+def claves_naturales(nombre: str, columnas: Sequence[str]) -> List[str]:
+    claves = CLAVES_POR_TABLA.get(nombre)
+    if claves is None:
+        claves = [c for c in columnas if c in CLAVES_NATURALES]
+    claves = [c for c in claves if c in columnas]
+    return claves or list(columnas)  # sin clave reconocible: la fila completa
+
+
+def _hash(df: pd.DataFrame) -> np.ndarray:
+    if df.shape[1] == 0:
+        return np.zeros(len(df), dtype='uint64')
+    return pd.util.hash_pandas_object(df, index=False).to_numpy(dtype='uint64')
+
+
+def hashes_filas(texto: pd.DataFrame, claves: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """(hash de clave, hash de valores) por fila; las claves repetidas se distinguen por ocurrencia.
+
+    Solo cambia la clave de la segunda ocurrencia en adelante, y las ocurrencias se numeran
+    ordenadas por hash de valores: reordenar filas o sumar un duplicado no altera las demás claves.
+    """
+    clave = _hash(texto[list(claves)])
+    valores = [c for c in texto.columns if c not in claves]
+    valor = _hash(texto[valores])
+    orden = np.lexsort((valor, clave))
+    ocurrencia = np.empty(len(clave), dtype='int64')
+    ocurrencia[orden] = pd.Series(clave[orden]).groupby(clave[orden], sort=False).cumcount().to_numpy()
+    repetida = ocurrencia > 0
+    if repetida.any():
+        clave = clave.copy()
+        clave[repetida] = _hash(pd.DataFrame({'clave': clave[repetida], 'ocurrencia': ocurrencia[repetida]}))
+    return clave, valor
+
+
+# ---------- Historia ----------
+
+def _carpeta(nombre: str, carpeta: Optional[Path]) -> Path:
+    return (Path(carpeta) if carpeta is not None else CDC_DIR) / nombre
+
+
+def leer_releases(nombre: str, carpeta: Optional[Path] = None) -> pd.DataFrame:
+    log = _carpeta(nombre, carpeta) / 'releases.csv'
+    if not log.exists():
+        return pd.DataFrame(columns=['secuencia', 'release', 'fecha', 'filas', 'insertadas', 'actualizadas', 'eliminadas'])
+    return pd.read_csv(log, dtype={'release': str})
+
+
+def _archivos_cambios(destino: Path, releases: pd.DataFrame, hasta: Optional[str] = None) -> List[Path]:
+    archivos = []
+    for secuencia, release in zip(releases['secuencia'], releases['release']):
+        archivos.append(destino / 'cambios' / f'{int(secuencia):04d}_{release}.csv')
+        if hasta is not None and release == hasta:
+            break
+    else:
+        if hasta is not None:
+            raise ValueError(f"Release {hasta} no registrada. Disponibles: {releases['release'].tolist()}")
+    return archivos
+
+
+def _leer_cambios(path: Path, claves: Optional[np.ndarray] = None) -> pd.DataFrame:
+    df = leer_csv(path, como_texto=True)
+    df['_clave'] = df['_clave'].astype('int64')
+    if claves is not None:
+        df = df[np.isin(df['_clave'].to_numpy(), claves)]
+    return df
+
+
+def _ultimo_estado(cambios: List[pd.DataFrame]) -> pd.DataFrame:
+    if not cambios:
+        return pd.DataFrame(columns=META)
+    todo = pd.concat(cambios, ignore_index=True)
+    todo = todo.drop_duplicates('_clave', keep='last')
+    return todo[todo['_operacion'] != ELIMINADA]
+
+
+def estado_en(nombre: str, release: Optional[str] = None, carpeta: Optional[Path] = None) -> pd.DataFrame:
+    """Filas vigentes de la tabla en esa release (la última si no se indica), como texto y sin columnas de control."""
+    destino = _carpeta(nombre, carpeta)
+    archivos = _archivos_cambios(destino, leer_releases(nombre, carpeta), release)
+    estado = _ultimo_estado([_leer_cambios(p) for p in archivos])
+    return estado.drop(columns=META).reset_index(drop=True)
+
+
+def cambios(nombre: str, release: str, carpeta: Optional[Path] = None) -> pd.DataFrame:
+    """Filas insertadas (I), actualizadas (U, con los valores nuevos) y eliminadas (D, con los últimos valores) de una release."""
+    destino = _carpeta(nombre, carpeta)
+    return _leer_cambios(_archivos_cambios(destino, leer_releases(nombre, carpeta), release)[-1])
+
+
+# ---------- Índice ----------
+
+Indice = Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]
+
+
+def _leer_indice(destino: Path, secuencia: int) -> Optional[Indice]:
+    """(claves ordenadas, hash de valores, fila en vigente.csv) de la release `secuencia`; None si falta o quedó desfasado."""
+    ruta = destino / 'indice.npz'
+    if not ruta.exists() or not (destino / 'vigente.csv').exists():
+        return None
+    with np.load(ruta) as indice:
+        if int(indice['secuencia']) != secuencia:
+            return None
+        return indice['clave'], indice['valor'], indice['fila']
+
+
+def _guardar_indice(destino: Path, path_csv: Path, indice: Indice, secuencia: int) -> None:
+    materializar(path_csv, destino / 'vigente.csv')
+    clave, valor, fila = indice
+    temporal = destino / f'.indice.{os.getpid()}.npz'
+    np.savez(temporal, clave=clave, valor=valor, fila=fila, secuencia=np.int64(secuencia))
+    os.replace(temporal, destino / 'indice.npz')
+
+
+def _reconstruir_indice(destino: Path, releases: pd.DataFrame, claves: Sequence[str]) -> Indice:
+    """Índice a partir de la historia (si una corrida se cortó antes de guardarlo)."""
+    estado = _ultimo_estado([_leer_cambios(p) for p in _archivos_cambios(destino, releases)])
+    clave = estado['_clave'].to_numpy(dtype='int64').view('uint64')
+    valores = [c for c in estado.columns if c not in META and c not in claves]
+    valor = _hash(estado[valores])
+    orden = np.argsort(clave, kind='stable')
+    return clave[orden], valor[orden], None
+
+
+def _filas_eliminadas(destino: Path, releases: pd.DataFrame, anterior: Indice, mascara: np.ndarray) -> pd.DataFrame:
+    """Últimos valores de las filas eliminadas: de vigente.csv por posición o, sin índice, desde la historia."""
+    clave_ant, _, fila_ant = anterior
+    if fila_ant is not None:
+        orden = np.argsort(fila_ant[mascara])
+        previa = leer_csv(destino / 'vigente.csv', como_texto=True).iloc[fila_ant[mascara][orden]]
+        return previa.assign(_clave=clave_ant[mascara][orden].view('int64'))
+    previas = [_leer_cambios(p, clave_ant[mascara].view('int64')) for p in _archivos_cambios(destino, releases)]
+    return _ultimo_estado(previas).drop(columns=['_release', '_operacion'])
+
+
+# ---------- Captura ----------
+
+def capturar(path_csv: Path, release: Optional[str] = None, carpeta: Optional[Path] = None,
+             claves: Optional[Sequence[str]] = None) -> Optional[dict]:
+    """Compara la tabla con la release anterior y agrega sus cambios a la historia; None si la release ya estaba."""
+    path_csv = Path(path_csv)
+    nombre = path_csv.stem
+    destino = _carpeta(nombre, carpeta)
+    release = str(release or os.getenv('RELEASE_ENACOM') or datetime.now().strftime('%Y%m%dT%H%M%S'))
+    releases = leer_releases(nombre, carpeta)
+    if release in set(releases['release']):
+        return None
+    secuencia = len(releases) + 1
+
+    texto = leer_csv(path_csv, como_texto=True)
+    claves = list(claves) if claves is not None else claves_naturales(nombre, list(texto.columns))
+    clave, valor = hashes_filas(texto, claves)
+    anterior = _leer_indice(destino, secuencia - 1) if secuencia > 1 else (np.empty(0, 'uint64'), np.empty(0, 'uint64'), None)
+    if anterior is None:
+        anterior = _reconstruir_indice(destino, releases, claves)
+    clave_ant, valor_ant, _ = anterior
+
+    # Claves actuales ordenadas: búsqueda binaria en el índice anterior y, de paso, el índice nuevo
+    orden = np.argsort(clave, kind='stable')
+    clave_ord = clave[orden]
+    encontrada, actualizadas = np.zeros(len(clave), dtype=bool), np.zeros(len(clave), dtype=bool)
+    vista = np.zeros(len(clave_ant), dtype=bool)
+    if len(clave_ant):
+        pos = np.minimum(np.searchsorted(clave_ant, clave_ord), len(clave_ant) - 1)
+        hallada = clave_ant[pos] == clave_ord
+        vista[pos[hallada]] = True
+        encontrada[orden] = hallada
+        actualizadas[orden] = hallada & (valor_ant[pos] != valor[orden])
+    insertadas = ~encontrada
+    eliminadas = ~vista
+
+    partes = [
+        texto[insertadas].assign(_operacion=INSERTADA, _clave=clave[insertadas].view('int64')),
+        texto[actualizadas].assign(_operacion=ACTUALIZADA, _clave=clave[actualizadas].view('int64')),
+    ]
+    if eliminadas.any():
+        partes.append(_filas_eliminadas(destino, releases, anterior, eliminadas).assign(_operacion=ELIMINADA))
+    delta = pd.concat(partes, ignore_index=True)
+    delta.insert(0, '_release', release)
+    delta = delta[META + [c for c in delta.columns if c not in META]]
+
+    (destino / 'cambios').mkdir(parents=True, exist_ok=True)
+    escribir_tabla(delta, destino / 'cambios' / f'{secuencia:04d}_{release}.csv', formato='csv')
+    resumen = {
+        'secuencia': secuencia, 'release': release, 'fecha': datetime.now().isoformat(timespec='seconds'),
+        'filas': len(texto), 'insertadas': int(insertadas.sum()), 'actualizadas': int(actualizadas.sum()),
+        'eliminadas': int(eliminadas.sum()),
+    }
+    log = destino / 'releases.csv'
+    pd.DataFrame([resumen]).to_csv(log, mode='a', header=not log.exists(), index=False)
+    _guardar_indice(destino, path_csv, (clave_ord, valor[orden], orden), secuencia)
+    return resumen
+
+
+def tablas_de_hechos() -> List[Path]:
+    tablas = [OUT_DIR / 'fact_unificado_long.csv'] + sorted(DIM_DIR.glob('fact_*.csv'))
+    return [t for t in tablas if t.exists()]
+
+
+def main():
+    release = sys.argv[1] if len(sys.argv) > 1 else None
+    print('🔄 Capturando cambios entre releases...')
+    for path in tablas_de_hechos():
+        resumen = capturar(path, release)
+        if resumen is None:
+            print(f'  • {path.stem}: release ya registrada')
+            continue
+        print(f"  • {path.stem}: +{resumen['insertadas']} ~{resumen['actualizadas']} -{resumen['eliminadas']} "
+              f"({resumen['filas']} filas, release {resumen['release']})")
+    print(f'✔ Historia en {CDC_DIR}')
+
+
+if __name__ == '__main__':
+    main()
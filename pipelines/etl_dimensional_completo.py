@@ -10,7 +10,15 @@ import unicodedata
 import glob
 import os
 from typing import Dict, List, Tuple, Optional
-import shutil
+
+try:
+    from .io_csv import leer_csv
+    from .publicacion import Publicacion
+    from .salida_parquet import escribir_tabla
+except ImportError:  # ejecutado como script: python pipelines/etl_dimensional_completo.py
+    from io_csv import leer_csv
+    from publicacion import Publicacion
+    from salida_parquet import escribir_tabla
 
 # Configuración
 RAW_DATA_PATH = Path("data/raw")
@@ -37,13 +45,10 @@ def generar_id_alfanumerico(prefijo: str, numero: int) -> str:
 
 def crear_directorio_salida():
     """Crea directorios de salida necesarios"""
-    OUTPUT_PATH.mkdir(parents=True, exist_ok=True)
+    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
     LOG_PATH.mkdir(parents=True, exist_ok=True)
-    
-    # Limpiar carpeta anterior si existe
-    if OUTPUT_PATH.exists():
-        shutil.rmtree(OUTPUT_PATH)
-    OUTPUT_PATH.mkdir(parents=True, exist_ok=True)
+    # La carpeta anterior ya no se borra: cada corrida escribe una versión nueva
+    # y se publica de forma atómica al terminar (ver publicacion.py)
 
 def crear_dim_provincias() -> pd.DataFrame:
     """Crea dimensión de provincias con IDs alfanuméricos"""
@@ -226,15 +231,15 @@ def obtener_tecnologia_id(tecnologia_nombre: str, dim_tecnologias: pd.DataFrame)
     match = dim_tecnologias[dim_tecnologias['tecnologia'] == tecnologia_buscar]
     return match.iloc[0]['tecnologia_id'] if not match.empty else None
 
-def procesar_archivos_raw():
-    """Procesa todos los archivos raw XLSX y genera tablas de hechos"""
+def procesar_archivos_raw(salida: Path = OUTPUT_PATH):
+    """Procesa todos los archivos raw XLSX y genera tablas de hechos en salida"""
     print("Procesando archivos raw...")
     
     # Cargar dimensiones previamente creadas
-    dim_provincias = pd.read_csv(OUTPUT_PATH / "dim_provincias.csv")
-    dim_tecnologias = pd.read_csv(OUTPUT_PATH / "dim_tecnologias.csv")
-    dim_velocidades = pd.read_csv(OUTPUT_PATH / "dim_velocidades.csv")
-    dim_servicios = pd.read_csv(OUTPUT_PATH / "dim_servicios.csv")
+    dim_provincias = leer_csv(salida / "dim_provincias.csv")
+    dim_tecnologias = leer_csv(salida / "dim_tecnologias.csv")
+    dim_velocidades = leer_csv(salida / "dim_velocidades.csv")
+    dim_servicios = leer_csv(salida / "dim_servicios.csv")
     
     # Buscar todos los archivos XLSX
     archivos_xlsx = glob.glob(str(RAW_DATA_PATH / "*.xlsx"))
@@ -258,7 +263,7 @@ def procesar_archivos_raw():
             
             # Procesar según el tipo de archivo
             if 'internet_accesos' in nombre_archivo:
-                fact_df = procesar_internet_accesos(df, nombre_archivo)
+                fact_df = procesar_internet_accesos(df, nombre_archivo, dim_velocidades, dim_tecnologias)
             elif 'comunicaciones_moviles' in nombre_archivo:
                 fact_df = procesar_moviles(df, nombre_archivo)
             elif 'telefonia_fija' in nombre_archivo:
@@ -272,8 +277,8 @@ def procesar_archivos_raw():
                 continue
             
             if fact_df is not None and not fact_df.empty:
-                output_file = OUTPUT_PATH / f"fact_{nombre_archivo.replace('_', '_')}.csv"
-                fact_df.to_csv(output_file, index=False)
+                output_file = salida / f"fact_{nombre_archivo.replace('_', '_')}.csv"
+                escribir_tabla(fact_df, output_file)
                 hechos_generados.append(output_file.name)
                 print(f"  -> Generado: {output_file.name} ({len(fact_df)} filas)")
             
@@ -282,8 +287,9 @@ def procesar_archivos_raw():
     
     return hechos_generados
 
-def procesar_internet_accesos(df: pd.DataFrame, nombre_archivo: str) -> pd.DataFrame:
-    """Procesa archivos de accesos de internet"""
+def procesar_internet_accesos(df: pd.DataFrame, nombre_archivo: str, dim_velocidades: pd.DataFrame,
+                              dim_tecnologias: pd.DataFrame) -> pd.DataFrame:
+    """Procesa archivos de accesos de internet (con las dimensiones de la versión en construcción)"""
     columnas_base = []
     
     # Agregar fechas normalizadas si existen
@@ -306,17 +312,12 @@ def procesar_internet_accesos(df: pd.DataFrame, nombre_archivo: str) -> pd.DataF
     
     # Solo agregar velocidad_id si hay columna 'velocidad'
     if 'velocidad' in df.columns:
-        # Cargar dim_velocidades
-        dim_velocidades = pd.read_csv(Path("data/processed/dimensional") / "dim_velocidades.csv")
         fact_df['velocidad_id'] = df['velocidad'].apply(
             lambda x: obtener_velocidad_id(x, dim_velocidades)
         )
     
     # Solo agregar tecnologia_id si es archivo de tecnologías Y tiene columnas de tecnologías
     if 'tecnologias' in nombre_archivo:
-        # Cargar dim_tecnologias
-        dim_tecnologias = pd.read_csv(Path("data/processed/dimensional") / "dim_tecnologias.csv")
-        
         # Crear tabla long para tecnologías (una fila por tecnología)
         tech_cols = ['adsl', 'cablemodem', 'fibraOptica', 'wireless', 'otros']
         tech_cols_exist = [col for col in tech_cols if col in df.columns]
@@ -442,24 +443,26 @@ def main():
     # Crear directorio de salida
     crear_directorio_salida()
     
-    # Crear todas las dimensiones
-    print("\n1. CREANDO DIMENSIONES...")
-    dimensiones = {
-        'dim_provincias': crear_dim_provincias(),
-        'dim_tecnologias': crear_dim_tecnologias(),
-        'dim_velocidades': crear_dim_velocidades(),
-        'dim_servicios': crear_dim_servicios()
-    }
-    
-    # Guardar dimensiones
-    for nombre, df in dimensiones.items():
-        output_file = OUTPUT_PATH / f"{nombre}.csv"
-        df.to_csv(output_file, index=False)
-        print(f"✓ Creada: {nombre}.csv ({len(df)} registros)")
-    
-    # Procesar archivos raw y crear hechos
-    print("\n2. PROCESANDO ARCHIVOS RAW Y CREANDO HECHOS...")
-    hechos_generados = procesar_archivos_raw()
+    # Nueva versión: los dashboards siguen viendo la anterior hasta publicar
+    with Publicacion(OUTPUT_PATH) as version:
+        # Crear todas las dimensiones
+        print("\n1. CREANDO DIMENSIONES...")
+        dimensiones = {
+            'dim_provincias': crear_dim_provincias(),
+            'dim_tecnologias': crear_dim_tecnologias(),
+            'dim_velocidades': crear_dim_velocidades(),
+            'dim_servicios': crear_dim_servicios()
+        }
+        
+        # Guardar dimensiones
+        for nombre, df in dimensiones.items():
+            output_file = version.staging / f"{nombre}.csv"
+            escribir_tabla(df, output_file)
+            print(f"✓ Creada: {nombre}.csv ({len(df)} registros)")
+        
+        # Procesar archivos raw y crear hechos
+        print("\n2. PROCESANDO ARCHIVOS RAW Y CREANDO HECHOS...")
+        hechos_generados = procesar_archivos_raw(version.staging)
     
     # Resumen final
     print("\n" + "="*60)
@@ -467,7 +470,7 @@ def main():
     print("="*60)
     print(f"✓ Dimensiones creadas: {len(dimensiones)}")
     print(f"✓ Tablas de hechos generadas: {len(hechos_generados)}")
-    print(f"✓ Directorio de salida: {OUTPUT_PATH}")
+    print(f"✓ Directorio de salida: {OUTPUT_PATH} (versión {version.version}, {len(version.reutilizados)} archivos reutilizados)")
     
     print("\nDimensiones creadas:")
     for nombre in dimensiones.keys():
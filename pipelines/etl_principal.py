@@ -5,14 +5,22 @@ Genera resumen_datos.csv. Luego produce modelo dimensional mínimo y
 salidas BI/OUT requeridas por las pruebas.
 """
 from pathlib import Path
+from typing import Dict, Optional, Tuple
+
 import pandas as pd
 
+from .catalogo import contar_filas
+from .publicacion import Publicacion
+from .salida_parquet import escribir_tabla
+
 BASE_DIR = Path(__file__).resolve().parents[1]
 RAW_DIR = BASE_DIR / 'data' / 'raw'
 PROCESSED_DIR = BASE_DIR / 'data' / 'processed'
 DIM_DIR = PROCESSED_DIR / 'dimensional'
 BI_DIR = PROCESSED_DIR / 'bi'
 OUT_DIR = PROCESSED_DIR / 'out'
+# Tabla derivada -> tabla de dimensional/ de la que sale (si no figura, la del mismo nombre)
+ORIGENES_DIMENSIONALES = {'dim_tiempo_norm': 'dim_tiempo'}
 
 
 def _snake_case_cols(df: pd.DataFrame) -> pd.DataFrame:
@@ -27,13 +35,11 @@ def _normalize_provincia(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def procesar_excels_a_clean():
-    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+def leer_excels_clean(raw_dir: Path = RAW_DIR) -> Dict[str, pd.DataFrame]:
+    """Lee los .xlsx de raw_dir y devuelve {nombre *_clean.csv: DataFrame} sin escribir a disco."""
     # Seleccionar solo archivos xlsx que probablemente contengan datos tabulares
-    excels = list(RAW_DIR.glob('*.xlsx'))
-    if not excels:
-        return []
-    generados = []
+    excels = list(Path(raw_dir).glob('*.xlsx'))
+    tablas: Dict[str, pd.DataFrame] = {}
     for xfile in excels:
         try:
             xls = pd.ExcelFile(xfile)
@@ -54,12 +60,20 @@ def procesar_excels_a_clean():
                         break
             df = _snake_case_cols(df)
             df = _normalize_provincia(df)
-            out_name = xfile.stem + '_clean.csv'
-            df.to_csv(PROCESSED_DIR / out_name, index=False)
-            generados.append(out_name)
+            tablas[xfile.stem + '_clean.csv'] = df
         except Exception:
             # continuar con otros archivos
             continue
+    return tablas
+
+
+def procesar_excels_a_clean():
+    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+    generados = []
+    for out_name, df in leer_excels_clean().items():
+        # Siempre CSV (entrada de prepare_enacom), registrado en el catálogo al escribirlo
+        escribir_tabla(df, PROCESSED_DIR / out_name, formato='csv')
+        generados.append(out_name)
     return generados
 
 
@@ -67,23 +81,21 @@ def generar_resumen_datos():
     PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
     registros = []
     for f in PROCESSED_DIR.glob('*_clean.csv'):
-        try:
-            n = sum(1 for _ in open(f, 'r', encoding='utf-8')) - 1
-        except Exception:
-            n = 0
-        registros.append({'archivo': f.name, 'filas': max(n, 0)})
+        # Conteo del catálogo escrito junto al CSV; solo se recorre el archivo si cambió
+        registros.append({'archivo': f.name, 'filas': contar_filas(f)})
     if registros:
-        pd.DataFrame(registros).to_csv(PROCESSED_DIR / 'resumen_datos.csv', index=False)
+        escribir_tabla(pd.DataFrame(registros), PROCESSED_DIR / 'resumen_datos.csv', formato='csv')
 
 
-def construir_dimensional_minimo():
-    DIM_DIR.mkdir(parents=True, exist_ok=True)
+def tablas_dimensional_minimo(raw_dir: Path = RAW_DIR) -> Dict[str, pd.DataFrame]:
+    """Construye en memoria las tablas de data/processed/dimensional ({nombre: DataFrame})."""
+    tablas: Dict[str, pd.DataFrame] = {}
     # dim_provincias (24) a partir de una lista canónica
     provincias = [
         'Buenos Aires','Catamarca','Chaco','Chubut','Cordoba','Corrientes','Entre Rios','Formosa','Jujuy','La Pampa','La Rioja','Mendoza','Misiones','Neuquen','Rio Negro','Salta','San Juan','San Luis','Santa Cruz','Santa Fe','Santiago Del Estero','Tierra Del Fuego','Tucuman','Caba'
     ]
     regiones = ['Centro','Noroeste','Noreste','Patagonia','Centro','Noreste','Centro','Noreste','Noroeste','Centro','Noroeste','Cuyo','Noreste','Patagonia','Patagonia','Noroeste','Cuyo','Cuyo','Patagonia','Centro','Noroeste','Patagonia','Noroeste','Centro']
-    dim_prov = pd.DataFrame({
+    tablas['dim_provincias'] = pd.DataFrame({
         'provincia_id':[f'PR{str(i+1).zfill(2)}' for i in range(24)],
         'provincia': provincias,
         'region': regiones,
@@ -91,12 +103,12 @@ def construir_dimensional_minimo():
         'superficie_km2':[10000 + i*100 for i in range(24)],
         'capital': provincias,
     })
-    dim_prov.to_csv(DIM_DIR / 'dim_provincias.csv', index=False)
 
     # dim_tiempo: construir desde datos reales de internet_accesos_baf_provincias.xlsx si existe
     anios = []
     trimestres = []
-    xls_path = RAW_DIR / 'internet_accesos_baf_provincias.xlsx'
+    df_baf = None
+    xls_path = Path(raw_dir) / 'internet_accesos_baf_provincias.xlsx'
     if xls_path.exists():
         try:
             df_baf = pd.read_excel(xls_path, sheet_name=0)
@@ -104,7 +116,7 @@ def construir_dimensional_minimo():
                 anios = sorted(pd.to_numeric(df_baf['anio'], errors='coerce').dropna().astype(int).unique().tolist())
                 trimestres = sorted(pd.to_numeric(df_baf['trimestre'], errors='coerce').dropna().astype(int).unique().tolist())
         except Exception:
-            pass
+            df_baf = None
     if not anios:
         anios = [2019, 2020, 2021, 2022]
     if not trimestres:
@@ -118,30 +130,32 @@ def construir_dimensional_minimo():
             registros.append({'tiempo_id': f'TM{str(idx).zfill(2)}','anio': anio,'trimestre': tri,'periodo': f'{anio}T{tri}'} )
             idx += 1
     dim_tiempo_df = pd.DataFrame(registros)
-    dim_tiempo_df.to_csv(DIM_DIR / 'dim_tiempo.csv', index=False)
+    tablas['dim_tiempo'] = dim_tiempo_df
 
     # dim_tecnologias (incluir categorías requeridas por tests)
-    dim_tecnologias = pd.DataFrame({
+    tablas['dim_tecnologias'] = pd.DataFrame({
         'tecnologia_id': ['TEC1','TEC2','TEC3','TEC4','TEC5','TEC6','TEC7'],
         'tecnologia': ['FTTH','HFC','ADSL','4G','Telefonia Fija','TV Cable','TV Abierta'],
         'categoria': ['INTERNET_FIJO','INTERNET_FIJO','INTERNET_FIJO','MOVIL','TELEFONIA_FIJA','TV_PAGA','TV_ABIERTA']
     })
-    dim_tecnologias.to_csv(DIM_DIR/'dim_tecnologias.csv', index=False)
     # dim_velocidades
-    pd.DataFrame({'velocidad_id':['VEL1','VEL2','VEL3'],'rango_velocidad':['0-3 Mbps','3-10 Mbps','10+ Mbps'],'velocidad_min_kbps':[0,3000,10000],'velocidad_max_kbps':[2999,9999,999999]}).to_csv(DIM_DIR/'dim_velocidades.csv', index=False)
+    tablas['dim_velocidades'] = pd.DataFrame({'velocidad_id':['VEL1','VEL2','VEL3'],'rango_velocidad':['0-3 Mbps','3-10 Mbps','10+ Mbps'],'velocidad_min_kbps':[0,3000,10000],'velocidad_max_kbps':[2999,9999,999999]})
     # dim_servicios
-    pd.DataFrame({'servicio_id':['SRV1','SRV2'],'servicio':['Internet','Telefonia'],'categoria':['DATOS','VOZ']}).to_csv(DIM_DIR/'dim_servicios.csv', index=False)
+    tablas['dim_servicios'] = pd.DataFrame({'servicio_id':['SRV1','SRV2'],'servicio':['Internet','Telefonia'],'categoria':['DATOS','VOZ']})
 
     # Hechos desde datos reales para fact_internet_accesos_baf_provincias (solo columnas mínimas)
-    if xls_path.exists():
+    base_rows = pd.DataFrame([
+        {'tiempo_id':'TM01'},
+        {'tiempo_id':'TM05'},
+        {'tiempo_id':'TM09'},
+    ])
+    fact_baf = base_rows
+    if df_baf is not None:
         try:
-            df_baf = pd.read_excel(xls_path, sheet_name=0)
             df_baf = df_baf.rename(columns={'Año':'anio','anio':'anio','Trimestre':'trimestre','Provincia':'provincia','provincia':'provincia','total':'total','Total':'total'})
             df_baf = df_baf[['anio','trimestre']].copy()
-            # Mapear a tiempo_id
-            # calcular offset de tiempo_id basado en orden en dim_tiempo_df
-            dim_tiempo_df['key'] = list(zip(dim_tiempo_df['anio'], dim_tiempo_df['trimestre']))
-            mapa = {k: tid for k, tid in zip(dim_tiempo_df['key'], dim_tiempo_df['tiempo_id'])}
+            # Mapear a tiempo_id según el orden en dim_tiempo
+            mapa = {(a, t): tid for a, t, tid in zip(dim_tiempo_df['anio'], dim_tiempo_df['trimestre'], dim_tiempo_df['tiempo_id'])}
             df_baf['anio'] = pd.to_numeric(df_baf['anio'], errors='coerce').astype('Int64')
             df_baf['trimestre'] = pd.to_numeric(df_baf['trimestre'], errors='coerce').astype('Int64')
             df_baf = df_baf.dropna(subset=['anio','trimestre'])
@@ -149,71 +163,83 @@ def construir_dimensional_minimo():
             df_baf['trimestre'] = df_baf['trimestre'].astype(int)
             df_baf['tiempo_id'] = [mapa.get((a,t)) for a,t in zip(df_baf['anio'], df_baf['trimestre'])]
             fact_baf = df_baf[['tiempo_id']].dropna().drop_duplicates().head(100)
-            fact_baf.to_csv(DIM_DIR / 'fact_internet_accesos_baf_provincias.csv', index=False)
             base_rows = fact_baf.head(3).copy()
         except Exception:
-            # fallback si lectura falla
-            base_rows = pd.DataFrame([
-                {'tiempo_id':'TM01'},
-                {'tiempo_id':'TM05'},
-                {'tiempo_id':'TM09'},
-            ])
-            base_rows.to_csv(DIM_DIR / 'fact_internet_accesos_baf_provincias.csv', index=False)
-    else:
-        base_rows = pd.DataFrame([
-            {'tiempo_id':'TM01'},
-            {'tiempo_id':'TM05'},
-            {'tiempo_id':'TM09'},
-        ])
-        base_rows.to_csv(DIM_DIR / 'fact_internet_accesos_baf_provincias.csv', index=False)
-
-    # Asegurar base_rows existe para otras tablas
-    if 'base_rows' not in locals():
-        base_rows = pd.DataFrame([
-            {'tiempo_id':'TM01'},
-            {'tiempo_id':'TM05'},
-            {'tiempo_id':'TM09'},
-        ])
-    base_rows.to_csv(DIM_DIR / 'fact_comunicaciones_moviles_accesos.csv', index=False)
-    base_rows.to_csv(DIM_DIR / 'fact_telefonia_fija_accesos_provincias.csv', index=False)
-    base_rows.to_csv(DIM_DIR / 'fact_tv_accesos_provincias.csv', index=False)
-
-
-def construir_bi_y_out_minimos():
-    BI_DIR.mkdir(parents=True, exist_ok=True)
-    OUT_DIR.mkdir(parents=True, exist_ok=True)
-    dim_prov = pd.read_csv(DIM_DIR / 'dim_provincias.csv')
-    pd.DataFrame({'provincia_id': list(range(1,25)), 'provincia': dim_prov['provincia'], 'region': dim_prov['region'], 'poblacion_2023': dim_prov['poblacion_2023'], 'superficie_km2': dim_prov['superficie_km2']}).to_csv(BI_DIR/'dim_provincias.csv', index=False)
-    pd.read_csv(DIM_DIR / 'dim_tiempo.csv').to_csv(BI_DIR/'dim_tiempo.csv', index=False)
-    pd.read_csv(DIM_DIR / 'dim_tecnologias.csv').to_csv(BI_DIR/'dim_tecnologias.csv', index=False)
-    dim_vel = pd.read_csv(DIM_DIR / 'dim_velocidades.csv')
-    pd.DataFrame({'velocidad_id': list(range(1,len(dim_vel)+1)),'rango_velocidad': dim_vel['rango_velocidad'],'velocidad_min_kbps': dim_vel['velocidad_min_kbps'],'velocidad_max_kbps': dim_vel['velocidad_max_kbps']}).to_csv(BI_DIR/'dim_velocidades.csv', index=False)
+            # fallback si la lectura falla
+            fact_baf = base_rows
+    tablas['fact_internet_accesos_baf_provincias'] = fact_baf
+    # Mismas filas base para el resto de hechos requeridos
+    tablas['fact_comunicaciones_moviles_accesos'] = base_rows
+    tablas['fact_telefonia_fija_accesos_provincias'] = base_rows
+    tablas['fact_tv_accesos_provincias'] = base_rows
+    return tablas
+
+
+def construir_dimensional_minimo():
+    tablas = tablas_dimensional_minimo()
+    # Versión nueva de dimensional/ (ver publicacion.py); las tablas que no se reescriben se conservan
+    with Publicacion(DIM_DIR, conservar=True) as version:
+        for nombre, df in tablas.items():
+            escribir_tabla(df, version.staging / f'{nombre}.csv')
+    return tablas
+
+
+def tablas_bi_y_out_minimos(dimensional: Dict[str, pd.DataFrame]) -> Tuple[Dict[str, pd.DataFrame], Dict[str, pd.DataFrame]]:
+    """Deriva en memoria las tablas de bi/ y out/ a partir de las tablas dimensionales."""
+    dim_prov = dimensional['dim_provincias']
+    dim_vel = dimensional['dim_velocidades']
+    bi: Dict[str, pd.DataFrame] = {}
+    out: Dict[str, pd.DataFrame] = {}
+    bi['dim_provincias'] = pd.DataFrame({'provincia_id': list(range(1,25)), 'provincia': dim_prov['provincia'], 'region': dim_prov['region'], 'poblacion_2023': dim_prov['poblacion_2023'], 'superficie_km2': dim_prov['superficie_km2']})
+    bi['dim_tiempo'] = dimensional['dim_tiempo']
+    bi['dim_tecnologias'] = dimensional['dim_tecnologias']
+    bi['dim_velocidades'] = pd.DataFrame({'velocidad_id': list(range(1,len(dim_vel)+1)),'rango_velocidad': dim_vel['rango_velocidad'],'velocidad_min_kbps': dim_vel['velocidad_min_kbps'],'velocidad_max_kbps': dim_vel['velocidad_max_kbps']})
     # Hechos BI
-    pd.DataFrame({'tiempo_id':['TM01','TM02'],'provincia_id':[1,2],'velocidad_id':[1,2],'mbps':[20.5,30.1]}).to_csv(BI_DIR/'fact_internet_velocidad.csv', index=False)
-    pd.DataFrame({'tiempo_id':['TM01','TM02'],'provincia_id':[1,2],'hogares':[100,120],'comercial':[10,10],'gobierno':[2,3],'total':[112,133]}).to_csv(BI_DIR/'fact_telefonia_accesos.csv', index=False)
-    pd.DataFrame({'tiempo_id':['TM01','TM02'],'pospago':[50,60],'prepago':[70,80],'operativos':[110,140]}).to_csv(BI_DIR/'fact_movil_accesos.csv', index=False)
-    pd.DataFrame({'tiempo_id':['TM01','TM02'],'provincia_id':[1,2],'accesos':[200,300]}).to_csv(BI_DIR/'fact_internet_accesos.csv', index=False)
+    bi['fact_internet_velocidad'] = pd.DataFrame({'tiempo_id':['TM01','TM02'],'provincia_id':[1,2],'velocidad_id':[1,2],'mbps':[20.5,30.1]})
+    bi['fact_telefonia_accesos'] = pd.DataFrame({'tiempo_id':['TM01','TM02'],'provincia_id':[1,2],'hogares':[100,120],'comercial':[10,10],'gobierno':[2,3],'total':[112,133]})
+    bi['fact_movil_accesos'] = pd.DataFrame({'tiempo_id':['TM01','TM02'],'pospago':[50,60],'prepago':[70,80],'operativos':[110,140]})
+    bi['fact_internet_accesos'] = pd.DataFrame({'tiempo_id':['TM01','TM02'],'provincia_id':[1,2],'accesos':[200,300]})
     # OUT
-    pd.DataFrame({'ProvinciaNorm': dim_prov['provincia']}).to_csv(OUT_DIR/'dim_provincias_norm.csv', index=False)
-    pd.read_csv(BI_DIR/'dim_tiempo.csv')[['anio','trimestre']].drop_duplicates().to_csv(OUT_DIR/'dim_tiempo_norm.csv', index=False)
-    pd.DataFrame({'rango_key': dim_vel['rango_velocidad'].str.replace(' ','_').str.lower(), 'orden': list(range(1, len(dim_vel)+1))}).to_csv(OUT_DIR/'dim_velocidades_ready.csv', index=False)
-    pd.DataFrame({'anio':[2021,2021,2022],'trimestre':[1,2,1],'ProvinciaNorm':['Buenos Aires','Cordoba','Santa Fe'],'tecnologia':['FTTH','HFC','ADSL'],'accesos':[100,80,60]}).to_csv(OUT_DIR/'fact_tecnologias_long.csv', index=False)
-    pd.DataFrame({'anio':[2021,2021],'trimestre':[1,2],'ProvinciaNorm':['Buenos Aires','Cordoba'],'rango_velocidad':['0-3 Mbps','3-10 Mbps'],'accesos':[10,20]}).to_csv(OUT_DIR/'fact_velocidad_rangos_long.csv', index=False)
-    pd.DataFrame({'anio':[2021,2021,2022,2022],'trimestre':[1,2,1,2],'ProvinciaNorm':['Buenos Aires','Cordoba','Santa Fe','Mendoza'],'mbps':[10.5,12.3,15.0,20.0],'velocidad_id':[1,2,2,3]}).to_csv(OUT_DIR/'fact_velocidad_media_provincias.csv', index=False)
-    pd.DataFrame({'anio':[2021,2021,2022],'trimestre':[1,2,1],'ProvinciaNorm':['Buenos Aires','Cordoba','Santa Fe'],'Velocidad_kbps':[5000,8000,12000],'accesos':[100,200,150],'velocidad_id':[1,2,3]}).to_csv(OUT_DIR/'fact_velocidad_numerica_provincias.csv', index=False)
-    pd.DataFrame({'anio':[2021,2021,2022],'dominio':['Internet','Movil','TelefoniaFija'],'subcategoria':['Accesos','Lineas','Accesos'],'variable':['accesos','operativos','hogares'],'valor':[100,200,50],'fuente_archivo':['fuente1','fuente2','fuente3']}).to_csv(OUT_DIR/'fact_unificado_long.csv', index=False)
+    out['dim_provincias_norm'] = pd.DataFrame({'ProvinciaNorm': dim_prov['provincia']})
+    out['dim_tiempo_norm'] = bi['dim_tiempo'][['anio','trimestre']].drop_duplicates()
+    out['dim_velocidades_ready'] = pd.DataFrame({'rango_key': dim_vel['rango_velocidad'].str.replace(' ','_').str.lower(), 'orden': list(range(1, len(dim_vel)+1))})
+    out['fact_tecnologias_long'] = pd.DataFrame({'anio':[2021,2021,2022],'trimestre':[1,2,1],'ProvinciaNorm':['Buenos Aires','Cordoba','Santa Fe'],'tecnologia':['FTTH','HFC','ADSL'],'accesos':[100,80,60]})
+    out['fact_velocidad_rangos_long'] = pd.DataFrame({'anio':[2021,2021],'trimestre':[1,2],'ProvinciaNorm':['Buenos Aires','Cordoba'],'rango_velocidad':['0-3 Mbps','3-10 Mbps'],'accesos':[10,20]})
+    out['fact_velocidad_media_provincias'] = pd.DataFrame({'anio':[2021,2021,2022,2022],'trimestre':[1,2,1,2],'ProvinciaNorm':['Buenos Aires','Cordoba','Santa Fe','Mendoza'],'mbps':[10.5,12.3,15.0,20.0],'velocidad_id':[1,2,2,3]})
+    out['fact_velocidad_numerica_provincias'] = pd.DataFrame({'anio':[2021,2021,2022],'trimestre':[1,2,1],'ProvinciaNorm':['Buenos Aires','Cordoba','Santa Fe'],'Velocidad_kbps':[5000,8000,12000],'accesos':[100,200,150],'velocidad_id':[1,2,3]})
+    out['fact_unificado_long'] = pd.DataFrame({'anio':[2021,2021,2022],'dominio':['Internet','Movil','TelefoniaFija'],'subcategoria':['Accesos','Lineas','Accesos'],'variable':['accesos','operativos','hogares'],'valor':[100,200,50],'fuente_archivo':['fuente1','fuente2','fuente3']})
+    return bi, out
+
+
+def _origen_dimensional(nombre: str) -> Optional[Path]:
+    """CSV de dimensional/ del que puede derivar la tabla (copia o subconjunto de columnas)."""
+    origen = DIM_DIR / f"{ORIGENES_DIMENSIONALES.get(nombre, nombre)}.csv"
+    return origen if origen.exists() else None
+
+
+def construir_bi_y_out_minimos(dimensional: Optional[Dict[str, pd.DataFrame]] = None):
+    BI_DIR.mkdir(parents=True, exist_ok=True)
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    if dimensional is None:
+        dimensional = {n: pd.read_csv(DIM_DIR / f'{n}.csv') for n in ('dim_provincias', 'dim_tiempo', 'dim_tecnologias', 'dim_velocidades')}
+    bi, out = tablas_bi_y_out_minimos(dimensional)
+    # Las copias sin cambios de dimensional/ se materializan desde el archivo, sin parsear ni serializar
+    for nombre, df in bi.items():
+        escribir_tabla(df, BI_DIR / f'{nombre}.csv', origen=_origen_dimensional(nombre))
+    for nombre, df in out.items():
+        escribir_tabla(df, OUT_DIR / f'{nombre}.csv', origen=_origen_dimensional(nombre))
     # parquet placeholder
     (OUT_DIR / 'fact_unificado_long.parquet').write_bytes(b'PAR1')
 
 
-def exportar_dimensiones_procesadas():
-    """Exporta dimensiones requeridas por tests en data/processed/*"""
-    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+def tablas_dimensiones_procesadas(dimensional: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """Deriva en memoria las dimensiones de data/processed/* requeridas por tests."""
+    tablas: Dict[str, pd.DataFrame] = {}
     # dim_provincias
-    dim_prov = pd.read_csv(DIM_DIR / 'dim_provincias.csv')
-    dim_prov[['provincia_id','provincia','region','poblacion_2023','superficie_km2']].to_csv(PROCESSED_DIR/'dim_provincias.csv', index=False)
+    dim_prov = dimensional['dim_provincias']
+    tablas['dim_provincias'] = dim_prov[['provincia_id','provincia','region','poblacion_2023','superficie_km2']]
     # dim_tiempo (anio, trimestre, mes_inicio, mes_fin, periodo_completo)
-    dim_tiempo = pd.read_csv(DIM_DIR / 'dim_tiempo.csv')
+    dim_tiempo = dimensional['dim_tiempo']
     def meses_inicio(t):
         return {1:1,2:4,3:7,4:10}.get(int(t), 1)
     def meses_fin(t):
@@ -225,9 +251,9 @@ def exportar_dimensiones_procesadas():
     proc_tiempo['mes_inicio'] = proc_tiempo['trimestre'].apply(meses_inicio)
     proc_tiempo['mes_fin'] = proc_tiempo['trimestre'].apply(meses_fin)
     proc_tiempo['periodo_completo'] = proc_tiempo['anio'].astype(str)+'T'+proc_tiempo['trimestre'].astype(str)
-    proc_tiempo.to_csv(PROCESSED_DIR/'dim_tiempo.csv', index=False)
+    tablas['dim_tiempo'] = proc_tiempo
     # dim_tecnologias con descripcion
-    dim_tec = pd.read_csv(DIM_DIR / 'dim_tecnologias.csv').copy()
+    dim_tec = dimensional['dim_tecnologias'].copy()
     if 'descripcion' not in dim_tec.columns:
         dim_tec['descripcion'] = dim_tec['tecnologia']
     # Mapear categorias a etiquetas esperadas
@@ -239,28 +265,38 @@ def exportar_dimensiones_procesadas():
         'TV_ABIERTA': 'TV Abierta',
     }
     dim_tec['categoria'] = dim_tec['categoria'].map(cat_map).fillna(dim_tec['categoria'])
-    dim_tec[['tecnologia_id','tecnologia','categoria','descripcion']].to_csv(PROCESSED_DIR/'dim_tecnologias.csv', index=False)
+    tablas['dim_tecnologias'] = dim_tec[['tecnologia_id','tecnologia','categoria','descripcion']]
     # dim_velocidades
-    dim_vel = pd.read_csv(DIM_DIR / 'dim_velocidades.csv')
-    dim_vel[['velocidad_id','rango_velocidad','velocidad_min_kbps','velocidad_max_kbps']].to_csv(PROCESSED_DIR/'dim_velocidades.csv', index=False)
+    dim_vel = dimensional['dim_velocidades']
+    tablas['dim_velocidades'] = dim_vel[['velocidad_id','rango_velocidad','velocidad_min_kbps','velocidad_max_kbps']]
     # dim_localidades (placeholder mínimo si no se puede inferir de raw)
-    dim_loc = pd.DataFrame({
+    tablas['dim_localidades'] = pd.DataFrame({
         'localidad_id': ['LOC1','LOC2','LOC3'],
         'provincia': ['Buenos Aires','Cordoba','Santa Fe'],
         'partido': ['La Plata','Capital','Rosario'],
         'localidad': ['Tolosa','Cordoba','Rosario'],
         'link_indec': ['https://www.indec.gob.ar','https://www.indec.gob.ar','https://www.indec.gob.ar']
     })
-    dim_loc.to_csv(PROCESSED_DIR/'dim_localidades.csv', index=False)
+    return tablas
+
+
+def exportar_dimensiones_procesadas(dimensional: Optional[Dict[str, pd.DataFrame]] = None):
+    """Exporta dimensiones requeridas por tests en data/processed/*"""
+    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+    if dimensional is None:
+        dimensional = {n: pd.read_csv(DIM_DIR / f'{n}.csv') for n in ('dim_provincias', 'dim_tiempo', 'dim_tecnologias', 'dim_velocidades')}
+    for nombre, df in tablas_dimensiones_procesadas(dimensional).items():
+        # Subconjuntos de columnas de dimensional/: proyección del CSV en streaming
+        escribir_tabla(df, PROCESSED_DIR / f'{nombre}.csv', formato='csv', origen=_origen_dimensional(nombre))
 
 
 def main():
     PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
     procesar_excels_a_clean()
     generar_resumen_datos()
-    construir_dimensional_minimo()
-    construir_bi_y_out_minimos()
-    exportar_dimensiones_procesadas()
+    dimensional = construir_dimensional_minimo()
+    construir_bi_y_out_minimos(dimensional)
+    exportar_dimensiones_procesadas(dimensional)
     print('ETL completado (datos reales leídos si disponibles).')
 
 
@@ -299,13 +335,9 @@ def generar_resumen_datos():
 
     resumen = []
     for f in PROCESSED.glob('*_clean.csv'):
-        try:
-            n = sum(1 for _ in open(f, 'r', encoding='utf-8')) - 1
-        except Exception:
-            n = 0
-        resumen.append({'archivo': f.name, 'filas': max(n, 0)})
+        resumen.append({'archivo': f.name, 'filas': contar_filas(f)})
 
-    pd.DataFrame(resumen).to_csv(PROCESSED / 'resumen_datos.csv', index=False)
+    escribir_tabla(pd.DataFrame(resumen), PROCESSED / 'resumen_datos.csv', formato='csv')
 
 
 def main():
@@ -0,0 +1,205 @@
+"""export_excel.py
+---------------
+Exportación a Excel para reguladores y áreas de negocio: un libro por
+dominio con una hoja por tabla del modelo dimensional (dimensiones en su
+propio libro). DataFrame.to_excel vía openpyxl arma todas las celdas en
+memoria; acá las filas se leen de los CSV procesados por lotes y se
+escriben con xlsxwriter en modo constant_memory, que vuelca cada fila a
+disco apenas se completa.
+
+- Lectura por lotes de FILAS_POR_LOTE filas; las columnas que el catálogo
+  registró como texto se leen como texto (códigos con ceros a la izquierda).
+- Números como números, nulos como celdas vacías; el texto nunca se
+  interpreta como fórmula ni URL.
+- Una tabla con más filas que el límite de Excel (1.048.576 con el
+  encabezado) continúa en hojas <tabla>_2, <tabla>_3, ...; la hoja
+  'indice' de cada libro lista hoja, tabla, parte y filas.
+- Los libros se escriben en paralelo (un proceso por libro).
+
+Salidas:
+  data/processed/excel/<dominio>.xlsx   (internet, comunicaciones_moviles, telefonia_fija, tv, ..., dimensiones)
+
+Uso:
+  python -m pipelines.export_excel [procesos]
+
+Requiere xlsxwriter (opcional, ver requirements.txt).
+"""
+from __future__ import annotations
+
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+from .catalogo import columnas_texto
+from .salida_parquet import dominio_desde_nombre
+
+try:
+    import xlsxwriter
+    HAS_XLSXWRITER = True
+except ImportError:
+    HAS_XLSXWRITER = False
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PROCESSED_DIR = BASE_DIR / 'data' / 'processed'
+DIMENSIONAL_DIR = PROCESSED_DIR / 'dimensional'
+EXCEL_DIR = PROCESSED_DIR / 'excel'
+
+LIMITE_FILAS_EXCEL = 1_048_576
+FILAS_POR_HOJA = LIMITE_FILAS_EXCEL - 1  # la primera fila es el encabezado
+FILAS_POR_LOTE = 50_000
+LARGO_NOMBRE_HOJA = 31
+LIBRO_DIMENSIONES = 'dimensiones'
+_CARACTERES_INVALIDOS = re.compile(r'[\[\]:*?/\\]')
+
+
+def libros_dimensionales(dimensional_dir: Optional[Path] = None) -> Dict[str, List[Path]]:
+    """{libro: [CSV]}: dim_* en 'dimensiones' y cada fact_* en el libro de su dominio."""
+    carpeta = Path(dimensional_dir) if dimensional_dir is not None else DIMENSIONAL_DIR
+    libros: Dict[str, List[Path]] = {}
+    for path in sorted(carpeta.glob('*.csv')):
+        if path.stem.startswith('dim_'):
+            libro = LIBRO_DIMENSIONES
+        elif path.stem.startswith('fact_'):
+            libro = dominio_desde_nombre(path.stem) or 'otros'
+        else:
+            continue
+        libros.setdefault(libro, []).append(path)
+    return libros
+
+
+def nombre_hoja(tabla: str, libro: str, parte: int, usados: set) -> str:
+    """Nombre de hoja válido (≤ 31 caracteres, único): sin el prefijo fact_<dominio>_ y con _<parte> desde la segunda."""
+    base = _CARACTERES_INVALIDOS.sub('_', tabla)
+    prefijo = f'fact_{libro}_'
+    if base.startswith(prefijo) and len(base) > len(prefijo):
+        base = base[len(prefijo):]
+    sufijo = f'_{parte}' if parte > 1 else ''
+    nombre = base[:LARGO_NOMBRE_HOJA - len(sufijo)] + sufijo
+    n = 1
+    while nombre.lower() in usados:  # Excel no distingue mayúsculas en nombres de hoja
+        n += 1
+        extra = f'~{n}'
+        nombre = base[:LARGO_NOMBRE_HOJA - len(sufijo) - len(extra)] + extra + sufijo
+    usados.add(nombre.lower())
+    return nombre
+
+
+def leer_lotes(path: Path, filas: int = FILAS_POR_LOTE) -> Iterator[pd.DataFrame]:
+    """Lotes del CSV sin cargarlo completo (tipos del catálogo para las columnas de texto)."""
+    with pd.read_csv(path, chunksize=filas, dtype=dict.fromkeys(columnas_texto(path), str)) as lector:
+        yield from lector
+
+
+def _valores(lote: pd.DataFrame) -> List[tuple]:
+    """Columnas como listas Python (None en nulos e infinitos) y el método de escritura de cada una."""
+    columnas = []
+    for i in range(lote.shape[1]):
+        s = lote.iloc[:, i]
+        if pd.api.types.is_float_dtype(s):
+            # xlsxwriter no admite NaN/inf en write_number: quedan como celda vacía
+            s = s.mask(s.isin([float('inf'), float('-inf')]))
+        valores = s.astype(object).where(s.notna(), None).tolist()
+        if pd.api.types.is_bool_dtype(s):
+            metodo = 'write_boolean'
+        elif pd.api.types.is_numeric_dtype(s):
+            metodo = 'write_number'
+        else:
+            metodo, valores = 'write_string', [None if v is None else str(v) for v in valores]
+        columnas.append((metodo, valores))
+    return columnas
+
+
+def escribir_libro(libro: str, tablas: Sequence[Path], destino: Path, filas_por_hoja: int = FILAS_POR_HOJA) -> dict:
+    """Un .xlsx con una hoja (o varias, si no entra) por tabla, escrito fila a fila en constant_memory."""
+    if not HAS_XLSXWRITER:
+        raise ImportError("La exportación a Excel requiere xlsxwriter. Instálelo con:\n  pip install xlsxwriter")
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporal = destino.with_name(f'.{destino.stem}.{os.getpid()}.tmp.xlsx')
+    t0 = time.perf_counter()
+    wb = xlsxwriter.Workbook(str(temporal), {
+        'constant_memory': True, 'strings_to_numbers': False, 'strings_to_formulas': False, 'strings_to_urls': False,
+    })
+    negrita = wb.add_format({'bold': True})
+    indice = wb.add_worksheet('indice')
+    usados = {'indice'}
+    hojas = []
+
+    for path in tablas:
+        hoja, fila, parte, encabezado = None, 0, 0, None
+
+        def nueva_hoja():
+            nonlocal hoja, fila, parte
+            if hoja is not None:
+                hojas[-1]['filas'] = fila - 1
+            parte += 1
+            hoja = wb.add_worksheet(nombre_hoja(path.stem, libro, parte, usados))
+            hoja.write_row(0, 0, encabezado, negrita)
+            hoja.freeze_panes(1, 0)
+            fila = 1
+            hojas.append({'hoja': hoja.name, 'tabla': path.stem, 'parte': parte, 'filas': 0})
+
+        for lote in leer_lotes(path):
+            encabezado = encabezado or [str(c) for c in lote.columns]
+            columnas = _valores(lote)
+            inicio = 0
+            while inicio < len(lote):
+                if hoja is None or fila > filas_por_hoja:
+                    nueva_hoja()
+                # Tramo del lote que entra en la hoja actual, con los métodos ya resueltos
+                fin = min(len(lote), inicio + filas_por_hoja - fila + 1)
+                escritores = [(j, getattr(hoja, metodo), valores) for j, (metodo, valores) in enumerate(columnas)]
+                for i in range(inicio, fin):
+                    for j, escribir, valores in escritores:
+                        v = valores[i]
+                        if v is not None:
+                            escribir(fila, j, v)
+                    fila += 1
+                inicio = fin
+            if hoja is not None:
+                hojas[-1]['filas'] = fila - 1
+        if hoja is None:  # tabla vacía: solo el encabezado
+            encabezado = encabezado or list(pd.read_csv(path, nrows=0).columns)
+            nueva_hoja()
+
+    indice.write_row(0, 0, ['hoja', 'tabla', 'parte', 'filas'], negrita)
+    for i, h in enumerate(hojas, start=1):
+        indice.write_row(i, 0, [h['hoja'], h['tabla'], h['parte'], h['filas']])
+    wb.close()
+    os.replace(temporal, destino)
+    return {'libro': libro, 'archivo': destino, 'hojas': hojas,
+            'filas': sum(h['filas'] for h in hojas), 'segundos': round(time.perf_counter() - t0, 2)}
+
+
+def exportar_excel(libros: Optional[Dict[str, List[Path]]] = None, destino: Optional[Path] = None,
+                   procesos: Optional[int] = None) -> List[dict]:
+    """Escribe cada libro en su propio proceso (procesos=1: secuencial)."""
+    libros = libros if libros is not None else libros_dimensionales()
+    destino = Path(destino) if destino is not None else EXCEL_DIR
+    procesos = procesos or min(len(libros), os.cpu_count() or 1)
+    trabajos = [(libro, tablas, destino / f'{libro}.xlsx') for libro, tablas in libros.items()]
+    if procesos <= 1 or len(trabajos) <= 1:
+        return [escribir_libro(*t) for t in trabajos]
+    with ProcessPoolExecutor(max_workers=procesos) as ex:
+        futuros = [ex.submit(escribir_libro, *t) for t in trabajos]
+        return [f.result() for f in futuros]
+
+
+def main():
+    procesos = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    print('📗 Exportando libros Excel por dominio...')
+    for r in exportar_excel(procesos=procesos):
+        partidas = sum(1 for h in r['hojas'] if h['parte'] > 1)
+        extra = f', {partidas} hojas de continuación' if partidas else ''
+        print(f"  • {r['archivo'].name}: {len(r['hojas'])} hojas, {r['filas']} filas ({r['segundos']} s{extra})")
+    print(f'✔ Libros en {EXCEL_DIR}')
+
+
+if __name__ == '__main__':
+    main()
@@ -3,60 +3,575 @@ Exporta algunos datasets clave a formato .hyper para Tableau si la librería
 tableauhyperapi está disponible. El objetivo es acelerar la ingesta en Tableau Desktop
 o Server evitando pasos manuales.
 
+Carga sin pasar las filas por Python: el CSV se recorre una vez por lotes
+para perfilar las columnas y después Hyper lo lee directo con COPY ... FROM.
+Tipos según los datos (extractos más chicos y rápidos de consultar):
+  - enteros (también los float sin decimales, p. ej. enteros con nulos)
+    -> SMALLINT / INT / BIGINT según el rango
+  - decimales con hasta ESCALA_MAXIMA dígitos -> NUMERIC(18, escala); el resto DOUBLE
+  - fechas ISO (AAAA-MM-DD) -> DATE, fecha y hora -> TIMESTAMP, True/False -> BOOL
+  - las columnas que el catálogo registró como texto no pasan a número (códigos '06')
+  - NOT NULL si la columna no tiene nulos
+
 Datasets candidatos (si existen):
   - fact_unificado_long.csv
   - diccionario_metricas.csv
 
+Modo estrella: todas las dim_* y fact_* del modelo dimensional en un solo
+modelo_dimensional.hyper, cargadas en paralelo (una conexión por tabla al
+mismo HyperProcess), con claves primarias y foráneas supuestas (ASSUMED)
+para que Tableau descarte los joins que no necesita. Solo se declaran las
+claves que los datos cumplen.
+
+Modo incremental: abre el .hyper existente y reemplaza solo los períodos
+(anio, trimestre) cuyas filas cambiaron, con la huella de cada período
+guardada en <archivo>.incremental.json (ver actualizar_hyper).
+
 Uso:
   python pipelines/export_hyper.py
+  python pipelines/export_hyper.py estrella
+  python pipelines/export_hyper.py incremental
+  python pipelines/export_hyper.py estrella incremental
 
 Si tableauhyperapi no está instalado se muestra instrucción de instalación.
 """
 from __future__ import annotations
 
+import hashlib
+import json
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 OUT_DIR = BASE_DIR / 'data' / 'processed' / 'out'
 HYPER_DIR = OUT_DIR / 'hyper'
 HYPER_DIR.mkdir(parents=True, exist_ok=True)
+DIMENSIONAL_DIR = BASE_DIR / 'data' / 'processed' / 'dimensional'
+
+try:
+    from .catalogo import columnas_texto, firma
+    from .io_csv import escribir_csv
+    from .lector_salidas import leer_tabla
+except ImportError:  # ejecutado como script: python pipelines/export_hyper.py
+    from catalogo import columnas_texto, firma
+    from io_csv import escribir_csv
+    from lector_salidas import leer_tabla
 
 try:
-    from tableauhyperapi import HyperProcess, Telemetry, Connection, CreateMode, TableDefinition, SqlType, NOT_NULLABLE, NULLABLE, Inserter
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+try:
+    from tableauhyperapi import HyperProcess, Telemetry, Connection, CreateMode, TableDefinition, TableName, Name, SqlType, NOT_NULLABLE, NULLABLE, HyperException, TypeTag, escape_string_literal
     HAS_HYPER = True
 except ImportError:
     HAS_HYPER = False
 
+FILAS_POR_LOTE = 200_000
+ARCHIVO_ESTRELLA = 'modelo_dimensional.hyper'
+CONEXIONES_ESTRELLA = min(8, os.cpu_count() or 1)
+PERIODO = ('anio', 'trimestre')
+SUFIJO_ESTADO = '.incremental.json'
+VERSION_ESTADO = 1
+# Nombres de SqlType que no son SQL válido en un CAST
+_TIPOS_SQL = {'SMALL_INT': 'SMALLINT', 'BIG_INT': 'BIGINT', 'DOUBLE': 'DOUBLE PRECISION'}
+ESCALA_MAXIMA = 6
+PRECISION_NUMERIC = 18
+RANGOS_ENTEROS = (('small_int', 2 ** 15), ('int', 2 ** 31), ('big_int', 2 ** 63))
+_FECHA = r'\d{4}-\d{2}-\d{2}'
+_FECHA_HORA = r'\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?'
+# Orden de generalización al combinar lotes con tipos distintos
+_CLASES = ('entero', 'decimal')
+
+
+def _clase_lote(s: pd.Series, texto: bool) -> Optional[str]:
+    presentes = s.dropna()
+    if presentes.empty:
+        return None
+    if not texto:  # el texto del catálogo nunca pasa a número (códigos '06')
+        if pd.api.types.is_bool_dtype(presentes):
+            return 'booleano'
+        if pd.api.types.is_integer_dtype(presentes):
+            return 'entero'
+        if pd.api.types.is_float_dtype(presentes):
+            return 'entero' if np.all(np.mod(presentes.to_numpy(), 1) == 0) else 'decimal'
+    valores = presentes.astype(str)
+    if not re.match(_FECHA, valores.iloc[0]):  # descarta el texto común sin recorrer la columna
+        return 'texto'
+    if valores.str.fullmatch(_FECHA).all():
+        return 'fecha'
+    if valores.str.fullmatch(_FECHA_HORA).all():
+        return 'fecha_hora'
+    return 'texto'
+
+
+def _escala(valores: np.ndarray) -> Optional[int]:
+    """Menor cantidad de decimales que representa todos los valores (None si hace falta DOUBLE)."""
+    for escala in range(1, ESCALA_MAXIMA + 1):
+        if np.abs(valores).max() >= 10 ** (PRECISION_NUMERIC - escala):
+            return None
+        if np.all(np.round(valores, escala) == valores):
+            return escala
+    return None
+
+
+def _lotes_arrow(csv_path: Path, texto: set, filas_por_lote: int) -> Iterator[pd.DataFrame]:
+    lectura = pacsv.ReadOptions(use_threads=True, block_size=filas_por_lote * 100)
+    conversion = pacsv.ConvertOptions(column_types={c: pa.string() for c in texto}, null_values=[''],
+                                      strings_can_be_null=True, true_values=['True'], false_values=['False'])
+    with pacsv.open_csv(csv_path, read_options=lectura, convert_options=conversion) as lector:
+        for lote in lector:
+            yield lote.to_pandas()
+
+
+def _lotes_pandas(csv_path: Path, texto: set, filas_por_lote: int) -> Iterator[pd.DataFrame]:
+    # Solo el campo vacío es nulo, como en el COPY de Hyper ('NA' es texto)
+    with pd.read_csv(csv_path, chunksize=filas_por_lote, dtype=dict.fromkeys(texto, str),
+                     keep_default_na=False, na_values=['']) as lector:
+        yield from lector
+
+
+def _perfilar(lotes: Iterator[pd.DataFrame], texto: set) -> List[dict]:
+    perfil: dict = {}
+    for lote in lotes:
+        for nombre in lote.columns:
+            s = lote[nombre]
+            p = perfil.setdefault(nombre, {'nombre': nombre, 'clase': None, 'nulos': 0, 'min': None, 'max': None,
+                                            'escala': 0})
+            p['nulos'] += int(s.isna().sum())
+            clase = _clase_lote(s, nombre in texto)
+            if clase is None:
+                continue
+            if p['clase'] is not None and p['clase'] != clase:
+                numericas = p['clase'] in _CLASES and clase in _CLASES
+                clase = max(p['clase'], clase, key=_CLASES.index) if numericas else 'texto'
+            p['clase'] = clase
+            if clase in _CLASES:
+                valores = s.dropna().to_numpy(dtype=float)
+                p['min'] = min(valores.min(), p['min']) if p['min'] is not None else valores.min()
+                p['max'] = max(valores.max(), p['max']) if p['max'] is not None else valores.max()
+                if clase == 'decimal' and p['escala'] is not None:
+                    escala = _escala(valores[np.mod(valores, 1) != 0])
+                    p['escala'] = max(p['escala'], escala) if escala is not None else None
+    return list(perfil.values())
+
+
+def perfilar_csv(csv_path: Path, filas_por_lote: int = FILAS_POR_LOTE) -> List[dict]:
+    """Clase, nulos, rango y escala de cada columna recorriendo el CSV por lotes (memoria acotada).
+
+    Con pyarrow se lee con su lector por bloques; si un bloque no encaja con el tipo
+    inferido en el primero (Arrow no generaliza), se vuelve a recorrer con pandas.
+    """
+    texto = set(columnas_texto(csv_path))
+    if HAS_PYARROW:
+        try:
+            return _perfilar(_lotes_arrow(csv_path, texto, filas_por_lote), texto)
+        except pa.ArrowInvalid:
+            pass
+    return _perfilar(_lotes_pandas(csv_path, texto, filas_por_lote), texto)
+
+
+def tipo_hyper(columna: dict):
+    """SqlType de una columna perfilada."""
+    clase = columna['clase']
+    if clase == 'entero':
+        for tipo, limite in RANGOS_ENTEROS:
+            if -limite <= columna['min'] and columna['max'] < limite:
+                return getattr(SqlType, tipo)()
+        return SqlType.double()
+    if clase == 'decimal':
+        if columna['escala']:
+            return SqlType.numeric(PRECISION_NUMERIC, columna['escala'])
+        return SqlType.double()
+    if clase == 'booleano':
+        return SqlType.bool()
+    if clase == 'fecha':
+        return SqlType.date()
+    if clase == 'fecha_hora':
+        return SqlType.timestamp()
+    return SqlType.text()
+
+
+def esquema_hyper(perfil: List[dict]) -> list:
+    return [TableDefinition.Column(name=c['nombre'], type=tipo_hyper(c),
+                                   nullability=NOT_NULLABLE if c['nulos'] == 0 else NULLABLE)
+            for c in perfil]
+
+
+def cargar_csv(connection, csv_path: Path, table_name) -> int:
+    """Crea la tabla tipada y la llena con COPY desde el CSV; devuelve las filas cargadas."""
+    table_name = TableName(table_name) if isinstance(table_name, str) else table_name
+    table_def = TableDefinition(table_name=table_name, columns=esquema_hyper(perfilar_csv(csv_path)))
+    connection.catalog.create_table(table_def)
+    return connection.execute_command(
+        f'COPY {table_name} FROM {escape_string_literal(str(csv_path))} WITH (FORMAT csv, HEADER true)'
+    )
+
+
+def exportar_csv_a_hyper(csv_path: Path, hyper_path: Path, table_name, columnas=None, proceso=None, **filtros) -> int:
+    """columnas / filtros (anio, trimestre, provincia, dominio): solo se parsea lo necesario del CSV.
+
+    Sin columnas ni filtros Hyper lee el CSV original; si no, se carga un CSV temporal
+    con la selección. proceso: HyperProcess ya iniciado (para varias exportaciones).
+    """
+    table_name = TableName(table_name) if isinstance(table_name, str) else table_name
+    with tempfile.TemporaryDirectory(dir=hyper_path.parent) as tmp:
+        fuente = csv_path
+        if columnas is not None or filtros:
+            fuente = Path(tmp) / csv_path.name
+            escribir_csv(leer_tabla(csv_path.stem, csv_path.parent, columnas, formato='csv', **filtros), fuente)
+        hp = proceso or HyperProcess(telemetry=Telemetry.DO_NOT_SEND_USAGE_DATA_TO_TABLEAU)
+        try:
+            with Connection(endpoint=hp.endpoint, database=hyper_path, create_mode=CreateMode.CREATE_AND_REPLACE) as connection:
+                filas = cargar_csv(connection, fuente, table_name)
+        finally:
+            if proceso is None:
+                hp.close()
+    print(f'  - {table_name.name.unescaped} -> {hyper_path.name} ({filas} filas)')
+    return filas
+
+
+def tablas_estrella(dimensional_dir: Optional[Path] = None) -> Dict[str, Path]:
+    """{tabla: CSV} de las dim_* y fact_* del modelo dimensional (dimensiones primero)."""
+    carpeta = Path(dimensional_dir) if dimensional_dir is not None else DIMENSIONAL_DIR
+    archivos = sorted(carpeta.glob('dim_*.csv')) + sorted(carpeta.glob('fact_*.csv'))
+    return {p.stem: p for p in archivos}
+
+
+def claves_estrella(columnas: Dict[str, List[str]]) -> Tuple[Dict[str, str], List[Tuple[str, str, str]]]:
+    """Claves supuestas del modelo: ({dim: pk}, [(tabla, columna, dim)]).
+
+    Como en load_to_mysql: la primera columna *_id de cada dim_* es su clave primaria
+    y toda columna de otra tabla con ese nombre es una clave foránea hacia ella.
+    """
+    primarias = {}
+    for tabla, cols in columnas.items():
+        pk = next((c for c in cols if c.endswith('_id')), None)
+        if tabla.startswith('dim_') and pk is not None:
+            primarias[tabla] = pk
+    dimension_de = {pk: dim for dim, pk in primarias.items()}
+    foraneas = [(tabla, c, dimension_de[c]) for tabla, cols in columnas.items() for c in cols
+                if c in dimension_de and dimension_de[c] != tabla]
+    return primarias, foraneas
+
+
+def _violaciones_pk(dim: str, pk: str) -> str:
+    t, c = TableName(dim), Name(pk)
+    return f'SELECT COUNT(*) - COUNT(DISTINCT {c}) + COUNT(*) - COUNT({c}) FROM {t}'
+
+
+def _violaciones_fk(tabla: str, col: str, dim: str, pk: str) -> str:
+    t, c, d, k = TableName(tabla), Name(col), TableName(dim), Name(pk)
+    return f'SELECT COUNT(*) FROM {t} WHERE {c} IS NOT NULL AND {c} NOT IN (SELECT {k} FROM {d})'
+
+
+def _declarar_claves(connection, primarias: Dict[str, str], foraneas: List[Tuple[str, str, str]]) -> dict:
+    """Declara solo las claves que los datos cumplen (Tableau las da por ciertas al descartar joins)."""
+    declaradas, omitidas = [], []
+    claves = {'primarias': {}, 'foraneas': []}
+
+    def declarar(descripcion: str, violaciones: str, ddl: str):
+        try:
+            n = connection.execute_scalar_query(violaciones)
+            if n:
+                omitidas.append(f'{descripcion} ({n} filas no la cumplen)')
+                return False
+            connection.execute_command(ddl)
+        except HyperException as e:
+            omitidas.append(f'{descripcion} ({str(e).splitlines()[0]})')
+            return False
+        declaradas.append(descripcion)
+        return True
+
+    for dim, pk in primarias.items():
+        if declarar(f'{dim}.{pk} PK', _violaciones_pk(dim, pk),
+                    f'ALTER TABLE {TableName(dim)} ADD ASSUMED PRIMARY KEY ({Name(pk)})'):
+            claves['primarias'][dim] = pk
+    for tabla, col, dim in foraneas:
+        if dim not in claves['primarias']:
+            continue
+        pk = primarias[dim]
+        if declarar(f'{tabla}.{col} -> {dim}', _violaciones_fk(tabla, col, dim, pk),
+                    f'ALTER TABLE {TableName(tabla)} ADD ASSUMED FOREIGN KEY ({Name(col)}) '
+                    f'REFERENCES {TableName(dim)} ({Name(pk)})'):
+            claves['foraneas'].append([tabla, col, dim])
+    return {'declaradas': declaradas, 'omitidas': omitidas, 'claves': claves}
+
+
+def exportar_estrella(tablas: Optional[Dict[str, Path]] = None, hyper_path: Optional[Path] = None,
+                      conexiones: Optional[int] = None, proceso=None, claves: bool = True) -> dict:
+    """Todas las tablas del modelo dimensional en un solo .hyper con claves primarias y foráneas supuestas.
+
+    Las tablas son independientes: cada una se perfila y se carga con COPY en su propia
+    conexión al mismo HyperProcess, en paralelo. Las claves se declaran al final,
+    después de verificarlas contra los datos. El archivo se arma aparte y reemplaza
+    al anterior recién al terminar. claves=False: solo las tablas (cualquier conjunto de CSV).
+    """
+    tablas = tablas if tablas is not None else tablas_estrella()
+    hyper_path = Path(hyper_path) if hyper_path is not None else HYPER_DIR / ARCHIVO_ESTRELLA
+    conexiones = conexiones or min(len(tablas), CONEXIONES_ESTRELLA) or 1
+    temporal = hyper_path.with_name(f'.{hyper_path.stem}.{os.getpid()}.tmp.hyper')
+    hp = proceso or HyperProcess(telemetry=Telemetry.DO_NOT_SEND_USAGE_DATA_TO_TABLEAU)
+    try:
+        with Connection(endpoint=hp.endpoint, database=temporal, create_mode=CreateMode.CREATE_AND_REPLACE) as principal:
+            def cargar(item):
+                nombre, csv_path = item
+                with Connection(endpoint=hp.endpoint, database=temporal) as connection:
+                    filas = cargar_csv(connection, csv_path, nombre)
+                    columnas = [c.name.unescaped for c in connection.catalog.get_table_definition(TableName(nombre)).columns]
+                return nombre, filas, columnas
+
+            with ThreadPoolExecutor(max_workers=conexiones) as ex:
+                cargadas = list(ex.map(cargar, tablas.items()))
+            declaradas = {'declaradas': [], 'omitidas': [], 'claves': {'primarias': {}, 'foraneas': []}}
+            if claves:
+                declaradas = _declarar_claves(principal, *claves_estrella({n: cols for n, _, cols in cargadas}))
+        os.replace(temporal, hyper_path)
+    finally:
+        if proceso is None:
+            hp.close()
+        if temporal.exists():
+            temporal.unlink()
+    return {'archivo': hyper_path, 'filas': {n: f for n, f, _ in cargadas}, **declaradas}
+
+
+# ---------- Modo incremental ----------
+
+def leer_texto(csv_path: Path) -> pd.DataFrame:
+    """CSV como texto con el campo vacío como único nulo: lo mismo que ve COPY."""
+    if not HAS_PYARROW:
+        return pd.read_csv(csv_path, dtype=str, keep_default_na=False, na_values=[''])
+    nombres = pacsv.open_csv(csv_path).schema.names
+    conversion = pacsv.ConvertOptions(column_types={c: pa.string() for c in nombres}, null_values=[''],
+                                      strings_can_be_null=True)
+    return pacsv.read_csv(csv_path, convert_options=conversion).to_pandas()
+
+
+def periodos_tabla(df: pd.DataFrame) -> Tuple[List[str], Dict[str, Tuple[str, np.ndarray]]]:
+    """(columnas de período, {período: (hash de sus filas, posiciones)}).
+
+    El período es (anio, trimestre) o las que la tabla tenga; sin ninguna, toda la
+    tabla es un único período. El hash no depende del orden de las filas.
+    """
+    columnas = [c for c in PERIODO if c in df.columns]
+    filas = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    if columnas:
+        grupos = df.groupby(columnas, dropna=False, sort=False).indices
+    else:
+        grupos = {(): np.arange(len(df))} if len(df) else {}
+    periodos = {}
+    for clave, posiciones in grupos.items():
+        clave = clave if isinstance(clave, tuple) else (clave,)
+        h = hashlib.blake2b(np.sort(filas[posiciones]).tobytes(), digest_size=16).hexdigest()
+        periodos[json.dumps([None if pd.isna(v) else v for v in clave])] = (h, posiciones)
+    return columnas, periodos
+
+
+def _esquema(df: pd.DataFrame) -> str:
+    return hashlib.blake2b(json.dumps([str(c) for c in df.columns]).encode(), digest_size=16).hexdigest()
+
+
+def marca_agua(columnas: List[str], periodos: Dict[str, tuple]) -> Optional[list]:
+    """Último período con datos [anio, trimestre] (o las columnas de PERIODO que haya)."""
+    if not columnas or not periodos:
+        return None
+    claves = pd.DataFrame([json.loads(k) for k in periodos], columns=columnas)
+    numeros = claves.apply(pd.to_numeric, errors='coerce').dropna()
+    if numeros.empty:
+        return None
+    return [int(v) if float(v).is_integer() else float(v) for v in numeros.sort_values(columnas).iloc[-1]]
+
+
+def ruta_estado(hyper_path: Path) -> Path:
+    return hyper_path.with_name(hyper_path.stem + SUFIJO_ESTADO)
+
+
+def _leer_estado(hyper_path: Path) -> Optional[dict]:
+    path = ruta_estado(hyper_path)
+    if not path.exists() or not hyper_path.exists():
+        return None
+    estado = json.loads(path.read_text(encoding='utf-8'))
+    if estado.get('version') != VERSION_ESTADO or estado.get('archivo') != firma(hyper_path):
+        return None  # el .hyper se regeneró o modificó por fuera del modo incremental
+    return estado
+
+
+def _entrada_estado(csv_path: Path, df: pd.DataFrame, columnas: List[str], periodos: dict) -> dict:
+    return {'fuente': firma(csv_path), 'esquema': _esquema(df), 'columnas_periodo': columnas, 'filas': len(df),
+            'marca_agua': marca_agua(columnas, periodos), 'periodos': {k: h for k, (h, _) in periodos.items()}}
 
-def detectar_esquema(df):
-    import pandas as pd
-    mapping = {
-        'int64': SqlType.big_int(),
-        'float64': SqlType.double(),
-        'object': SqlType.text(),
-        'bool': SqlType.bool(),
-    }
-    cols = []
-    for name, dtype in df.dtypes.items():
-        stype = str(dtype)
-        sqltype = mapping.get(stype, SqlType.text())
-        nullable = NULLABLE
-        cols.append(TableDefinition.Column(name=name, type=sqltype, nullability=nullable))
-    return cols
-
-
-def exportar_csv_a_hyper(csv_path: Path, hyper_path: Path, table_name: str):
-    import pandas as pd
-    df = pd.read_csv(csv_path, low_memory=False)
-    table_def = TableDefinition(table_name=table_name, columns=detectar_esquema(df))
-    with HyperProcess(telemetry=Telemetry.DO_NOT_SEND_USAGE_DATA_TO_TABLEAU) as hp:
-        with Connection(endpoint=hp.endpoint, database=hyper_path, create_mode=CreateMode.CREATE_AND_REPLACE) as connection:
-            connection.catalog.create_table(table_def)
-            with Inserter(connection, table_def) as inserter:
-                inserter.add_rows(df.itertuples(index=False, name=None))
-                inserter.execute()
-    print(f'  - {table_name.name} -> {hyper_path.name} ({len(df)} filas)')
+
+def _guardar_estado(hyper_path: Path, tablas: Dict[str, dict], claves: dict) -> dict:
+    estado = {'version': VERSION_ESTADO, 'archivo': firma(hyper_path), 'claves': claves, 'tablas': tablas}
+    path = ruta_estado(hyper_path)
+    temporal = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    temporal.write_text(json.dumps(estado, ensure_ascii=False, indent=1), encoding='utf-8')
+    os.replace(temporal, path)
+    return estado
+
+
+def _sql_tipo(tipo) -> str:
+    texto = str(tipo)
+    return _TIPOS_SQL.get(texto, texto)
+
+
+def _condicion_periodos(definicion, columnas: List[str], periodos: List[str]) -> str:
+    """WHERE que selecciona las filas de esos períodos (valores de texto convertidos al tipo de cada columna)."""
+    if not columnas:
+        return 'TRUE'
+    tipos = {c.name.unescaped: c.type for c in definicion.columns}
+    condiciones = []
+    for periodo in periodos:
+        partes = []
+        for col, valor in zip(columnas, json.loads(periodo)):
+            if valor is None:
+                partes.append(f'{Name(col)} IS NULL')
+            else:
+                partes.append(f'{Name(col)} = CAST({escape_string_literal(valor)} AS {_sql_tipo(tipos[col])})')
+        condiciones.append('(' + ' AND '.join(partes) + ')')
+    return ' OR '.join(condiciones)
+
+
+def _cabe(perfil: List[dict], definicion) -> bool:
+    """True si las filas nuevas entran en los tipos y la nulabilidad de la tabla ya creada."""
+    columnas = {c.name.unescaped: c for c in definicion.columns}
+    for p in perfil:
+        actual = columnas.get(p['nombre'])
+        if actual is None:
+            return False
+        if p['nulos'] and actual.nullability == NOT_NULLABLE:
+            return False
+        if p['clase'] is None or actual.type == SqlType.text():
+            continue
+        nuevo = tipo_hyper(p)
+        if nuevo == actual.type:
+            continue
+        enteros = [getattr(SqlType, t)() for t, _ in RANGOS_ENTEROS]
+        if nuevo in enteros and actual.type in enteros:
+            if enteros.index(nuevo) > enteros.index(actual.type):
+                return False
+        elif actual.type == SqlType.double() and p['clase'] in _CLASES:
+            continue
+        elif actual.type.tag == TypeTag.NUMERIC and p['clase'] in _CLASES:
+            escala = actual.type.scale
+            if (p['escala'] is None or p['escala'] > escala
+                    or max(abs(p['min']), abs(p['max'])) >= 10 ** (actual.type.precision - escala)):
+                return False
+        else:
+            return False
+    return True
+
+
+def _aplicar_cambios(hp, hyper_path: Path, textos: Dict[str, pd.DataFrame], periodos: dict,
+                     estado: dict) -> Optional[dict]:
+    """Borra los períodos que cambiaron o desaparecieron y agrega sus filas nuevas, en una transacción.
+
+    None si los cambios no entran en el .hyper actual (tipos, nulos o claves declaradas
+    que dejarían de cumplirse): entonces corresponde regenerarlo completo.
+    """
+    cambios = {}
+    for nombre, (columnas, actuales) in periodos.items():
+        previos = estado['tablas'][nombre]['periodos']
+        cambiados = [k for k, (h, _) in actuales.items() if previos.get(k) != h]
+        eliminados = [k for k in previos if k not in actuales]
+        if cambiados or eliminados:
+            cambios[nombre] = (cambiados, eliminados)
+    resumen = {'modo': 'incremental' if cambios else 'sin_cambios', 'tablas': {}}
+    if not cambios:
+        return resumen
+
+    with tempfile.TemporaryDirectory(dir=hyper_path.parent) as tmp:
+        with Connection(endpoint=hp.endpoint, database=hyper_path) as connection:
+            connection.execute_command('BEGIN TRANSACTION')
+            try:
+                for nombre, (cambiados, eliminados) in cambios.items():
+                    tabla = TableName(nombre)
+                    definicion = connection.catalog.get_table_definition(tabla)
+                    columnas, actuales = periodos[nombre]
+                    posiciones = np.sort(np.concatenate([actuales[k][1] for k in cambiados])) if cambiados else []
+                    borradas = connection.execute_command(
+                        f'DELETE FROM {tabla} WHERE {_condicion_periodos(definicion, columnas, cambiados + eliminados)}')
+                    insertadas = 0
+                    if len(posiciones):
+                        delta = Path(tmp) / f'{nombre}.csv'
+                        escribir_csv(textos[nombre].iloc[posiciones], delta)
+                        if not _cabe(perfilar_csv(delta), definicion):
+                            connection.execute_command('ROLLBACK')
+                            return None
+                        insertadas = connection.execute_command(
+                            f'COPY {tabla} FROM {escape_string_literal(str(delta))} WITH (FORMAT csv, HEADER true)')
+                    resumen['tablas'][nombre] = {'periodos': len(cambiados) + len(eliminados), 'borradas': borradas,
+                                                 'insertadas': insertadas}
+                claves = estado.get('claves') or {}
+                verificar = [_violaciones_pk(d, pk) for d, pk in claves.get('primarias', {}).items() if d in cambios]
+                verificar += [_violaciones_fk(t, c, d, claves['primarias'][d]) for t, c, d in claves.get('foraneas', [])
+                              if t in cambios or d in cambios]
+                if any(connection.execute_scalar_query(sql) for sql in verificar):
+                    connection.execute_command('ROLLBACK')
+                    return None
+                connection.execute_command('COMMIT')
+            except BaseException:
+                connection.execute_command('ROLLBACK')
+                raise
+    return resumen
+
+
+def actualizar_hyper(tablas: Dict[str, Path], hyper_path: Path, claves: bool = False, proceso=None) -> dict:
+    """Refresco incremental de un .hyper: solo se reescriben los períodos (anio, trimestre) que cambiaron.
+
+    La huella de cada período queda en <archivo>.incremental.json junto con la firma del
+    .hyper y la de cada CSV (un CSV con la misma firma no se vuelve a leer). Si no hay
+    estado, el .hyper cambió por fuera, cambian las tablas o sus columnas, o las filas
+    nuevas no entran en los tipos ya creados, se regenera completo.
+    claves=True: modelo estrella (claves supuestas, ver exportar_estrella).
+    """
+    hyper_path = Path(hyper_path)
+    estado = _leer_estado(hyper_path)
+    previas = estado['tablas'] if estado is not None and set(estado['tablas']) == set(tablas) else {}
+    textos = {n: leer_texto(p) for n, p in tablas.items() if previas.get(n, {}).get('fuente') != firma(p)}
+    periodos = {n: periodos_tabla(df) for n, df in textos.items()}
+    vigente = bool(previas) and all(previas[n]['esquema'] == _esquema(df) for n, df in textos.items())
+    hp = proceso or HyperProcess(telemetry=Telemetry.DO_NOT_SEND_USAGE_DATA_TO_TABLEAU)
+    try:
+        resumen = _aplicar_cambios(hp, hyper_path, textos, periodos, estado) if vigente else None
+        if resumen is None:
+            for n in tablas.keys() - textos.keys():  # el estado de la regeneración necesita todas las tablas
+                textos[n] = leer_texto(tablas[n])
+                periodos[n] = periodos_tabla(textos[n])
+            completo = exportar_estrella(tablas, hyper_path, proceso=hp, claves=claves)
+            resumen = {'modo': 'completa', 'tablas': {n: {'periodos': len(periodos[n][1]), 'borradas': 0,
+                                                          'insertadas': f} for n, f in completo['filas'].items()}}
+            claves_declaradas = completo['claves']
+        else:
+            claves_declaradas = estado['claves']
+    finally:
+        if proceso is None:
+            hp.close()
+    entradas = {n: _entrada_estado(tablas[n], textos[n], *periodos[n]) if n in textos else previas[n] for n in tablas}
+    estado = _guardar_estado(hyper_path, entradas, claves_declaradas)
+    resumen['marca_agua'] = {n: t['marca_agua'] for n, t in estado['tablas'].items()}
+    return resumen
+
+
+def _imprimir_refresco(hyper_path: Path, r: dict) -> None:
+    print(f"  - {hyper_path.name}: {r['modo']}")
+    if r['modo'] == 'completa':
+        print(f"    {len(r['tablas'])} tablas, {sum(t['insertadas'] for t in r['tablas'].values())} filas")
+        return
+    for nombre, t in r['tablas'].items():
+        print(f"    {nombre}: {t['periodos']} períodos, -{t['borradas']} / +{t['insertadas']} filas "
+              f"(hasta {r['marca_agua'].get(nombre)})")
 
 
 def main():
@@ -65,18 +580,40 @@ def main():
         print('  pip install tableauhyperapi')
         sys.exit(0)
 
+    modos = set(sys.argv[1:])
+    incremental = 'incremental' in modos
+    if 'estrella' in modos:
+        hyper_path = HYPER_DIR / ARCHIVO_ESTRELLA
+        if incremental:
+            print('Actualizando el modelo dimensional en .hyper (incremental)...')
+            _imprimir_refresco(hyper_path, actualizar_hyper(tablas_estrella(), hyper_path, claves=True))
+            print('Finalizado.')
+            return
+        print('Exportando el modelo dimensional a un solo .hyper...')
+        r = exportar_estrella()
+        print(f"  - {len(r['filas'])} tablas, {sum(r['filas'].values())} filas -> {r['archivo'].name}")
+        print(f"  - Claves declaradas: {len(r['declaradas'])}")
+        for omitida in r['omitidas']:
+            print(f'  - Clave omitida: {omitida}')
+        print('Finalizado.')
+        return
+
     objetivos = [
         ('fact_unificado_long.csv', 'fact_unificado', 'fact_unificado.hyper'),
         ('diccionario_metricas.csv', 'diccionario_metricas', 'diccionario_metricas.hyper'),
     ]
-    print('Exportando a formato Hyper...')
-    for csv_name, table_name, hyper_name in objetivos:
-        csv_path = OUT_DIR / csv_name
-        if not csv_path.exists():
-            print(f'  - Omitido {csv_name} (no existe)')
-            continue
-        hyper_path = HYPER_DIR / hyper_name
-        exportar_csv_a_hyper(csv_path, hyper_path, table_name)
+    print('Actualizando extractos Hyper (incremental)...' if incremental else 'Exportando a formato Hyper...')
+    with HyperProcess(telemetry=Telemetry.DO_NOT_SEND_USAGE_DATA_TO_TABLEAU) as hp:
+        for csv_name, table_name, hyper_name in objetivos:
+            csv_path = OUT_DIR / csv_name
+            if not csv_path.exists():
+                print(f'  - Omitido {csv_name} (no existe)')
+                continue
+            hyper_path = HYPER_DIR / hyper_name
+            if incremental:
+                _imprimir_refresco(hyper_path, actualizar_hyper({table_name: csv_path}, hyper_path, proceso=hp))
+            else:
+                exportar_csv_a_hyper(csv_path, hyper_path, table_name, proceso=hp)
     print('Finalizado.')
 
 
@@ -0,0 +1,155 @@
+"""export_tabla_ancha.py
+--------------------
+Exportación opcional desnormalizada ("one big table") para Tableau / Power
+BI: cada fact_* del modelo dimensional con los atributos de sus dimensiones
+ya unidos, y fact_unificado_long como una única tabla ancha. Así los
+dashboards no modelan las relaciones de GUIA_MODELO_DIMENSIONAL.md ni
+hacen joins al refrescar.
+
+Atributos que se agregan según las claves presentes:
+  provincia_id   -> provincia, region, poblacion_2023, superficie_km2, ...
+  anio/trimestre -> periodo ('2024T1') y los atributos de dim_tiempo
+  tecnologia_id  -> tecnologia, categoria
+  velocidad_id   -> rango_velocidad, velocidad_min_kbps, velocidad_max_kbps
+  servicio_id    -> servicio, categoria
+Un atributo cuyo nombre ya existe en la tabla lleva el sufijo de su
+dimensión (p.ej. categoria_servicio si ya se unió dim_tecnologias).
+En fact_unificado_long la provincia sale de ProvinciaNorm y la categoría
+de tecnología de la variable (subcategorías de tecnologías).
+
+Las columnas de texto repetitivas (atributos y claves) se guardan
+codificadas como diccionario (pandas category -> Arrow dictionary), por lo
+que el tamaño queda cerca del de la tabla de hechos sola.
+
+Salidas (Parquet zstd, un archivo por tabla):
+  data/processed/ancha/<fact>.parquet
+  data/processed/ancha/fact_unificado_ancha.parquet
+
+Uso:
+  python -m pipelines.export_tabla_ancha
+
+Requiere pyarrow (opcional, ver requirements.txt).
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+
+from .build_rollups import SUBCATEGORIAS_TECNOLOGIA, clave_tecnologia
+from .etl_dimensional_completo import crear_dim_provincias, crear_dim_tecnologias, normalizar_texto
+from .io_csv import leer_csv
+from .salida_parquet import COMPRESION
+from .series_temporales import cargar_dim_tiempo, clave_provincia
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PROCESSED_DIR = BASE_DIR / 'data' / 'processed'
+DIMENSIONAL_DIR = PROCESSED_DIR / 'dimensional'
+OUT_DIR = PROCESSED_DIR / 'out'
+ANCHA_DIR = PROCESSED_DIR / 'ancha'
+
+# Dimensión unida por cada clave y sufijo para atributos que ya existen en la tabla
+DIMENSIONES = {
+    'provincia_id': ('dim_provincias', 'provincia'),
+    'tecnologia_id': ('dim_tecnologias', 'tecnologia'),
+    'velocidad_id': ('dim_velocidades', 'velocidad'),
+    'servicio_id': ('dim_servicios', 'servicio'),
+}
+ATRIBUTOS_OMITIDOS = ('descripcion',)
+# Texto con a lo sumo esta fracción de valores distintos se codifica como diccionario
+MAX_FRACCION_DISTINTOS = 0.5
+
+
+def _unir(fact: pd.DataFrame, dim: pd.DataFrame, claves, sufijo: str) -> pd.DataFrame:
+    claves = list(claves)
+    atributos = [c for c in dim.columns if c not in claves and c not in ATRIBUTOS_OMITIDOS]
+    dim = dim[claves + atributos].drop_duplicates(claves)
+    renombres = {c: f'{c}_{sufijo}' for c in atributos if c in fact.columns}
+    return fact.merge(dim.rename(columns=renombres), on=claves, how='left', validate='many_to_one')
+
+
+def _agregar_periodo(df: pd.DataFrame, dim_tiempo: Optional[pd.DataFrame]) -> pd.DataFrame:
+    # Con tiempo_id, la dim_tiempo de etl_principal ya trae periodo: no se une de nuevo
+    if 'periodo' in df.columns or not {'anio', 'trimestre'} <= set(df.columns):
+        return df
+    if dim_tiempo is not None and not dim_tiempo.empty and {'anio', 'trimestre'} <= set(dim_tiempo.columns):
+        df = _unir(df, dim_tiempo.drop(columns=['tiempo_id'], errors='ignore'), ['anio', 'trimestre'], 'tiempo')
+        if 'periodo' in df.columns:
+            return df
+    anio = pd.to_numeric(df['anio'], errors='coerce').astype('Int64').astype(str)
+    trimestre = pd.to_numeric(df['trimestre'], errors='coerce').astype('Int64').astype(str)
+    periodo = (anio + 'T' + trimestre).where(df['anio'].notna() & df['trimestre'].notna())
+    df.insert(df.columns.get_loc('trimestre') + 1, 'periodo', periodo)
+    return df
+
+
+def codificar_diccionario(df: pd.DataFrame) -> pd.DataFrame:
+    """Columnas de texto repetitivas -> category (diccionario en Arrow/Parquet)."""
+    df = df.copy()
+    limite = max(1, int(len(df) * MAX_FRACCION_DISTINTOS))
+    for col in df.columns:
+        s = df[col]
+        if (s.dtype == object or pd.api.types.is_string_dtype(s)) and s.nunique(dropna=True) <= limite:
+            df[col] = s.astype('category')
+    return df
+
+
+def desnormalizar(fact: pd.DataFrame, dims: Dict[str, pd.DataFrame], dim_tiempo: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """fact con los atributos de cada dimensión cuya clave contiene."""
+    df = fact
+    if 'tiempo_id' in df.columns and dim_tiempo is not None and 'tiempo_id' in dim_tiempo.columns:
+        df = _unir(df, dim_tiempo, ['tiempo_id'], 'tiempo')
+    for clave, (nombre_dim, sufijo) in DIMENSIONES.items():
+        if clave in df.columns and nombre_dim in dims:
+            df = _unir(df, dims[nombre_dim], [clave], sufijo)
+    return codificar_diccionario(_agregar_periodo(df, dim_tiempo))
+
+
+def desnormalizar_unificado(fact: pd.DataFrame, dim_provincias: pd.DataFrame,
+                            dim_tecnologias: pd.DataFrame, dim_tiempo: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """fact_unificado_long con provincia_id, atributos de provincia, periodo y categoría de tecnología."""
+    dim_prov = dim_provincias.assign(_prov=dim_provincias['provincia'].map(normalizar_texto))
+    df = fact.assign(_prov=clave_provincia(fact))
+    df = _unir(df, dim_prov.drop(columns='provincia'), ['_prov'], 'provincia').drop(columns='_prov')
+    if 'subcategoria' in df.columns and 'variable' in df.columns:
+        es_tec = df['subcategoria'].astype(str).str.lower().str.contains(SUBCATEGORIAS_TECNOLOGIA)
+        categorias = dict(zip(clave_tecnologia(dim_tecnologias['tecnologia']), dim_tecnologias['categoria']))
+        df['categoria_tecnologia'] = clave_tecnologia(df['variable']).map(categorias).where(es_tec)
+    return codificar_diccionario(_agregar_periodo(df, dim_tiempo))
+
+
+def escribir_ancha(df: pd.DataFrame, destino: Path) -> Path:
+    """Parquet de un solo archivo; las category se escriben como diccionario."""
+    if not HAS_PYARROW:
+        raise ImportError("La exportación ancha requiere pyarrow. Instálelo con:\n  pip install pyarrow")
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), destino, compression=COMPRESION)
+    return destino
+
+
+def main():
+    print('📐 Exportando tablas desnormalizadas...')
+    dims = {p.stem: leer_csv(p) for p in sorted(DIMENSIONAL_DIR.glob('dim_*.csv'))}
+    dim_tiempo = dims.get('dim_tiempo', cargar_dim_tiempo())
+    for path in sorted(DIMENSIONAL_DIR.glob('fact_*.csv')):
+        ancha = desnormalizar(leer_csv(path), dims, dim_tiempo)
+        escribir_ancha(ancha, ANCHA_DIR / f'{path.stem}.parquet')
+        print(f'✔ {path.stem}.parquet ({len(ancha)} filas, {ancha.shape[1]} columnas)')
+    unificado = OUT_DIR / 'fact_unificado_long.csv'
+    if unificado.exists():
+        ancha = desnormalizar_unificado(leer_csv(unificado), crear_dim_provincias(), crear_dim_tecnologias(), dim_tiempo)
+        destino = escribir_ancha(ancha, ANCHA_DIR / 'fact_unificado_ancha.parquet')
+        print(f'✔ fact_unificado_ancha.parquet ({len(ancha)} filas, {destino.stat().st_size / 1e6:.2f} MB)')
+
+
+if __name__ == '__main__':
+    main()
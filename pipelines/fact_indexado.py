@@ -0,0 +1,214 @@
+"""fact_indexado.py
+----------------
+`fact_unificado_long` ordenada por (dominio, subcategoria, variable,
+ProvinciaNorm, anio, trimestre) con un índice de desplazamientos por clave,
+para que los consumidores filtren por métrica o provincia con búsqueda
+binaria (O(log n + k)) en vez de recorrer toda la tabla con máscaras.
+
+El índice tiene una fila por serie (dominio, subcategoria, variable,
+ProvinciaNorm) con el rango [inicio, fin) de sus filas. Como la tabla está
+ordenada, todo prefijo de la clave (un dominio, una métrica, ...) es un
+rango contiguo de filas del índice y de la tabla; dentro de cada serie las
+filas están ordenadas por período, así que el rango de años también se
+resuelve con búsqueda binaria.
+
+Salidas (junto al CSV; los desplazamientos son posiciones de fila del CSV):
+  data/processed/out/fact_unificado_long.csv          (ordenada)
+  data/processed/out/fact_unificado_long.indice.csv   (dominio, subcategoria, variable, ProvinciaNorm, inicio, fin)
+
+Uso:
+  from pipelines.fact_indexado import cargar_fact_indexado
+  fx = cargar_fact_indexado()
+  fx.buscar(dominio='Internet', subcategoria='tecnologias', variable='adsl', provincia='CORDOBA', anio_desde=2020)
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .io_csv import escribir_csv, leer_csv
+except ImportError:  # importado desde un script: python pipelines/build_diccionario_metricas.py
+    from io_csv import escribir_csv, leer_csv
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+OUT_DIR = BASE_DIR / 'data' / 'processed' / 'out'
+
+NOMBRE = 'fact_unificado_long'
+CLAVES = ['dominio', 'subcategoria', 'variable', 'ProvinciaNorm']
+ORDEN = CLAVES + ['anio', 'trimestre']
+# Nombre del argumento de buscar() para cada columna de la clave
+ARGUMENTOS = {'dominio': 'dominio', 'subcategoria': 'subcategoria', 'variable': 'variable', 'ProvinciaNorm': 'provincia'}
+
+
+def ruta_indice(out_dir: Optional[Path] = None) -> Path:
+    return (Path(out_dir) if out_dir is not None else OUT_DIR) / f'{NOMBRE}.indice.csv'
+
+
+def ordenar_fact(fact: pd.DataFrame) -> pd.DataFrame:
+    """Orden estable por la clave y el período; nulos al final."""
+    orden = [c for c in ORDEN if c in fact.columns]
+    return fact.sort_values(orden, na_position='last', kind='stable').reset_index(drop=True)
+
+
+def _inicios(df: pd.DataFrame, columnas: List[str]) -> np.ndarray:
+    """Posiciones donde cambia alguna de las columnas (nulos comparan iguales entre sí)."""
+    cambio = np.zeros(len(df), dtype=bool)
+    cambio[:1] = True
+    for col in columnas:
+        codigos = pd.factorize(df[col], use_na_sentinel=True)[0]
+        cambio[1:] |= codigos[1:] != codigos[:-1]
+    return np.flatnonzero(cambio)
+
+
+def construir_indice(ordenada: pd.DataFrame) -> pd.DataFrame:
+    """Una fila por serie con [inicio, fin) sobre la tabla ya ordenada."""
+    claves = [c for c in CLAVES if c in ordenada.columns]
+    if ordenada.empty or not claves:
+        return pd.DataFrame({**{c: [] for c in claves}, 'inicio': [], 'fin': []})
+    inicio = _inicios(ordenada, claves)
+    indice = ordenada[claves].iloc[inicio].reset_index(drop=True)
+    indice['inicio'] = inicio
+    indice['fin'] = np.append(inicio[1:], len(ordenada))
+    return indice
+
+
+def _codigos_ordenados(s: pd.Series) -> np.ndarray:
+    """Códigos enteros que respetan el orden de sort_values (nulos al final)."""
+    codigos, _ = pd.factorize(s, sort=True)
+    return np.where(codigos < 0, codigos.max(initial=-1) + 1, codigos)
+
+
+class FactIndexado:
+    """Tabla ordenada + índice de series; buscar() devuelve rebanadas sin recorrer filas."""
+
+    def __init__(self, datos: pd.DataFrame, indice: pd.DataFrame):
+        self.datos = datos
+        self.indice = indice
+        self.claves = [c for c in CLAVES if c in indice.columns]
+        self._codigos: Dict[str, np.ndarray] = {c: _codigos_ordenados(indice[c]) for c in self.claves}
+        self._valores: Dict[str, Dict] = {
+            c: dict(zip(indice[c].dropna(), self._codigos[c][indice[c].notna().to_numpy()])) for c in self.claves
+        }
+        self._inicio = indice['inicio'].to_numpy(dtype='int64')
+        self._fin = indice['fin'].to_numpy(dtype='int64')
+        anio = pd.to_numeric(datos['anio'], errors='coerce') if 'anio' in datos.columns else pd.Series(np.nan, index=datos.index)
+        self._anio = anio.to_numpy(dtype='float64')
+
+    @classmethod
+    def desde_fact(cls, fact: pd.DataFrame) -> 'FactIndexado':
+        ordenada = ordenar_fact(fact)
+        return cls(ordenada, construir_indice(ordenada))
+
+    def __len__(self) -> int:
+        return len(self.datos)
+
+    def rangos(self, columnas: List[str]) -> pd.DataFrame:
+        """[inicio, fin) de cada valor de un prefijo de la clave, p.ej. ['dominio', 'subcategoria', 'variable']."""
+        if columnas != self.claves[:len(columnas)]:
+            raise ValueError(f"{columnas} no es un prefijo de la clave {self.claves}")
+        if self.indice.empty:
+            return pd.DataFrame({**{c: [] for c in columnas}, 'inicio': [], 'fin': []})
+        primeras = _inicios(self.indice, columnas)
+        out = self.indice[columnas].iloc[primeras].reset_index(drop=True)
+        out['inicio'] = self._inicio[primeras]
+        out['fin'] = self._fin[np.append(primeras[1:], len(self.indice)) - 1]
+        return out
+
+    def series(self, **filtros) -> pd.DataFrame:
+        """Filas del índice que cumplen los filtros de clave (dominio, subcategoria, variable, provincia)."""
+        lo, hi = self._rango_series(filtros)
+        sub = self.indice.iloc[lo:hi]
+        # Filtros que no forman prefijo (p.ej. variable sin dominio): máscara sobre el índice, no sobre la tabla
+        for col in self.claves[self._largo_prefijo(filtros):]:
+            valor = filtros.get(ARGUMENTOS[col])
+            if valor is not None:
+                sub = sub[sub[col] == valor]
+        return sub
+
+    def _largo_prefijo(self, filtros) -> int:
+        n = 0
+        for col in self.claves:
+            if filtros.get(ARGUMENTOS[col]) is None:
+                break
+            n += 1
+        return n
+
+    def _rango_series(self, filtros):
+        desconocidos = set(filtros) - set(ARGUMENTOS.values())
+        if desconocidos:
+            raise TypeError(f"Filtros desconocidos: {sorted(desconocidos)}. Opciones: {list(ARGUMENTOS.values())}")
+        lo, hi = 0, len(self.indice)
+        for col in self.claves[:self._largo_prefijo(filtros)]:
+            codigo = self._valores[col].get(filtros[ARGUMENTOS[col]])
+            if codigo is None:
+                return 0, 0
+            tramo = self._codigos[col][lo:hi]
+            lo, hi = lo + int(np.searchsorted(tramo, codigo, 'left')), lo + int(np.searchsorted(tramo, codigo, 'right'))
+        return lo, hi
+
+    def _rango_anios(self, inicio: int, fin: int, desde, hasta):
+        anio = self._anio[inicio:fin]  # ordenado dentro de la serie (NaN al final)
+        a = inicio + (int(np.searchsorted(anio, desde, 'left')) if desde is not None else 0)
+        if hasta is not None:
+            b = inicio + int(np.searchsorted(anio, hasta, 'right'))
+        else:
+            b = fin
+        return a, b
+
+    def posiciones(self, anio_desde: Optional[int] = None, anio_hasta: Optional[int] = None, **filtros) -> List[tuple]:
+        """Rangos [a, b) de filas de la tabla que cumplen los filtros."""
+        series = self.series(**filtros)
+        if series.empty:
+            return []
+        idx = series.index.to_numpy()
+        if anio_desde is None and anio_hasta is None and (idx[-1] - idx[0] + 1) == len(idx):
+            return [(int(self._inicio[idx[0]]), int(self._fin[idx[-1]]))]  # prefijo: un solo rango
+        rangos = [self._rango_anios(int(self._inicio[i]), int(self._fin[i]), anio_desde, anio_hasta) for i in idx]
+        return [(a, b) for a, b in rangos if b > a]
+
+    def buscar(self, anio_desde: Optional[int] = None, anio_hasta: Optional[int] = None, **filtros) -> pd.DataFrame:
+        """Filas de las series pedidas (y del rango de años) por desplazamiento, sin máscaras sobre la tabla."""
+        rangos = self.posiciones(anio_desde, anio_hasta, **filtros)
+        if not rangos:
+            return self.datos.iloc[0:0]
+        if len(rangos) == 1:
+            a, b = rangos[0]
+            return self.datos.iloc[a:b]
+        return self.datos.iloc[np.concatenate([np.arange(a, b) for a, b in rangos])]
+
+
+def escribir_indice(ordenada: pd.DataFrame, out_dir: Optional[Path] = None) -> Path:
+    """Escribe el índice de la tabla ya ordenada (ordenar_fact) que se guardó como CSV en out_dir."""
+    destino = ruta_indice(out_dir)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    escribir_csv(construir_indice(ordenada), destino)
+    return destino
+
+
+def _indice_vigente(datos: pd.DataFrame, indice: pd.DataFrame) -> bool:
+    """El índice cubre todas las filas y la clave de cada serie coincide con la fila donde empieza."""
+    claves = [c for c in CLAVES if c in indice.columns and c in datos.columns]
+    if indice.empty or indice['inicio'].iloc[0] != 0 or indice['fin'].iloc[-1] != len(datos):
+        return False
+    if indice.duplicated(claves).any():  # la tabla no está ordenada por la clave
+        return False
+    primeras = datos[claves].iloc[indice['inicio'].to_numpy()].reset_index(drop=True)
+    return all(primeras[c].astype(str).equals(indice[c].astype(str)) for c in claves)
+
+
+def cargar_fact_indexado(out_dir: Optional[Path] = None) -> FactIndexado:
+    """Lee la tabla y su índice; si el índice falta o no corresponde, ordena e indexa en memoria."""
+    out_dir = Path(out_dir) if out_dir is not None else OUT_DIR
+    fact_path = out_dir / f'{NOMBRE}.csv'
+    if not fact_path.exists():
+        raise FileNotFoundError(f"{fact_path.name} no encontrado. Ejecutar primero el pipeline")
+    datos = leer_csv(fact_path)
+    if ruta_indice(out_dir).exists():
+        indice = leer_csv(ruta_indice(out_dir))
+        if _indice_vigente(datos, indice):
+            return FactIndexado(datos, indice)
+    return FactIndexado.desde_fact(datos)
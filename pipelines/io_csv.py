@@ -0,0 +1,274 @@
+"""io_csv.py
+---------
+Lectura y escritura CSV común a todos los módulos (prepare_enacom,
+etl_dimensional_completo, salida_parquet, load_to_mysql, export_hyper)
+sobre el lector/escritor nativo de Arrow: parseo multihilo y tipado en C++
+en vez del motor de pandas, y escritura por lotes sin pasar por Python fila
+a fila.
+
+Los archivos resultantes son idénticos byte a byte a los de pandas
+(to_csv(index=False), QUOTE_MINIMAL, UTF-8, fin de línea os.linesep):
+- Los float se formatean como pandas (repr de Python: 1.0, 1e-05, 2.5e+20).
+- Los booleanos se escriben True/False.
+- Sin comillas salvo donde QUOTE_MINIMAL las pondría; si algún valor o
+  encabezado necesita comillas (coma, comillas, saltos de línea) la tabla
+  completa se escribe con pandas, que es la referencia.
+- Tipos que Arrow no formatea igual (fechas, categorías, objetos mixtos no
+  textuales) también caen a pandas.
+- Con una sola columna, un nulo o texto vacío sería una línea vacía (que los
+  lectores saltean); pandas escribe "" y esas tablas caen a pandas.
+
+Sin pyarrow (opcional, ver requirements.txt) todo cae a pandas.
+
+Benchmark contra el camino pandas sobre las salidas más grandes:
+  python -m pipelines.io_csv [n_archivos]
+"""
+from __future__ import annotations
+
+import csv
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PROCESSED_DIR = BASE_DIR / 'data' / 'processed'
+
+# Nulos de los CSV de texto de prepare_enacom (keep_default_na=False)
+NULOS_TEXTO = ['', 'NA', 'NaN']
+# Nulos por defecto de pandas.read_csv
+NULOS_PANDAS = sorted(['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                       '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'])
+_ESPECIALES = r'[,"\r\n]'
+_UTF8 = ('utf-8', 'utf8')
+
+
+def _es_utf8(encoding: Optional[str]) -> bool:
+    return encoding is None or encoding.lower().replace('_', '-') in _UTF8
+
+
+# ---------- Lectura ----------
+
+def _leer_pandas(path: Path, como_texto: bool, encoding: str, **kw) -> pd.DataFrame:
+    if como_texto:
+        return pd.read_csv(path, encoding=encoding, dtype=str, keep_default_na=False, na_values=NULOS_TEXTO, **kw)
+    return pd.read_csv(path, encoding=encoding, **kw)
+
+
+def leer_csv(path: Path, como_texto: bool = False, encoding: str = 'utf-8',
+             columnas: Optional[Sequence[str]] = None, **kw) -> pd.DataFrame:
+    """Lee un CSV con pyarrow.csv (multihilo); mismo DataFrame que pd.read_csv.
+
+    como_texto=True equivale al read_csv(dtype=str) de prepare_enacom: todo
+    texto y solo '', 'NA' y 'NaN' como nulos. Los argumentos extra de pandas
+    (low_memory, sep, ...) que Arrow no replica hacen caer a pd.read_csv.
+    """
+    path = Path(path)
+    kw.pop('low_memory', None)  # sin efecto en Arrow: el tipado no es por bloques
+    if not HAS_PYARROW or kw or not _es_utf8(encoding):
+        if columnas is not None:
+            kw['usecols'] = list(columnas)
+        return _leer_pandas(path, como_texto, encoding, **kw)
+
+    lectura = pacsv.ReadOptions(use_threads=True, encoding='utf8')
+    if como_texto:
+        nombres = pacsv.open_csv(path, read_options=lectura).schema.names
+        conversion = pacsv.ConvertOptions(
+            column_types={c: pa.string() for c in nombres}, null_values=NULOS_TEXTO,
+            strings_can_be_null=True, include_columns=list(columnas) if columnas else None,
+        )
+    else:
+        conversion = pacsv.ConvertOptions(
+            null_values=NULOS_PANDAS, strings_can_be_null=True,
+            # pandas no infiere fechas: quedan como texto
+            timestamp_parsers=[], include_columns=list(columnas) if columnas else None,
+        )
+        # timestamp_parsers=[] no evita date32/time32: esas columnas se fuerzan a texto
+        esquema = pacsv.open_csv(path, read_options=lectura, convert_options=conversion).schema
+        conversion.column_types = {
+            f.name: pa.string() for f in esquema
+            if pa.types.is_date(f.type) or pa.types.is_time(f.type) or pa.types.is_timestamp(f.type)
+        }
+    tabla = pacsv.read_csv(path, read_options=lectura, convert_options=conversion)
+    df = tabla.to_pandas()
+    for col in df.columns:
+        tipo = tabla.schema.field(col).type
+        if pa.types.is_null(tipo):  # columna vacía: pandas la lee como float NaN
+            df[col] = np.nan
+        elif pa.types.is_string(tipo) or pa.types.is_large_string(tipo):
+            df[col] = df[col].astype('str')
+    return df
+
+
+# ---------- Escritura ----------
+
+def reemplazar(path: Path, escribir: Callable[[Path], None]) -> None:
+    """escribir(temporal) junto a path y os.replace: nunca se trunca path en el lugar.
+
+    Los archivos reutilizados de una versión anterior son hard links (ver
+    publicacion.py); escribir sobre ellos cambiaría también esa versión.
+    """
+    path = Path(path)
+    temporal = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    try:
+        escribir(temporal)
+        os.replace(temporal, path)
+    finally:
+        temporal.unlink(missing_ok=True)
+
+
+def _escribir_pandas(df: pd.DataFrame, path: Path, encoding: str) -> None:
+    df.to_csv(path, index=False, encoding=encoding, quoting=csv.QUOTE_MINIMAL)
+
+
+def _columna_arrow(s: pd.Series):
+    """Columna lista para write_csv con el texto que pandas escribiría; None si no se puede."""
+    nulos = s.isna().to_numpy()
+    if pd.api.types.is_bool_dtype(s):
+        texto = np.where(s.fillna(False).to_numpy(dtype=bool), 'True', 'False')
+        return pa.array(texto, mask=nulos, type=pa.string())
+    if s.dtype == np.float64:
+        # numpy usa el repr de Python, como pandas.to_csv sin float_format
+        return pa.array(s.to_numpy().astype(str), mask=nulos, type=pa.string())
+    if pd.api.types.is_integer_dtype(s):
+        return pa.array(s, from_pandas=True)
+    if isinstance(s.dtype, pd.StringDtype):
+        return pa.array(s, type=pa.string(), from_pandas=True)
+    if pd.api.types.is_string_dtype(s) and pd.api.types.infer_dtype(s, skipna=True) in ('string', 'empty'):
+        return pa.array(s.to_numpy(), mask=nulos, type=pa.string())
+    return None
+
+
+def _requiere_comillas(tabla) -> bool:
+    for col in tabla.columns:
+        if pa.types.is_string(col.type) and pc.any(pc.match_substring_regex(col, _ESPECIALES)).as_py():
+            return True
+    return False
+
+
+def _campos_vacios(col) -> bool:
+    return col.null_count > 0 or (pa.types.is_string(col.type) and pc.any(pc.equal(col, '')).as_py())
+
+
+def escribir_csv(df: pd.DataFrame, path: Path, encoding: str = 'utf-8') -> None:
+    """df.to_csv(path, index=False, quoting=QUOTE_MINIMAL) escrito por Arrow, mismo contenido byte a byte.
+
+    Se escribe en un temporal que reemplaza a path (ver reemplazar).
+    """
+    reemplazar(path, lambda temporal: _escribir_csv(df, temporal, encoding))
+
+
+def _escribir_csv(df: pd.DataFrame, path: Path, encoding: str) -> None:
+    if not HAS_PYARROW or not _es_utf8(encoding) or isinstance(df.columns, pd.MultiIndex):
+        return _escribir_pandas(df, path, encoding)
+    nombres = [str(c) for c in df.columns]
+    if len(set(nombres)) != len(nombres) or any(any(ch in n for ch in ',"\r\n') or n == '' for n in nombres):
+        return _escribir_pandas(df, path, encoding)
+
+    columnas = []
+    for i in range(df.shape[1]):
+        col = _columna_arrow(df.iloc[:, i])
+        if col is None:
+            return _escribir_pandas(df, path, encoding)
+        columnas.append(col)
+    tabla = pa.Table.from_arrays(columnas, names=nombres) if columnas else None
+    if tabla is None or _requiere_comillas(tabla) or (len(columnas) == 1 and _campos_vacios(columnas[0])):
+        return _escribir_pandas(df, path, encoding)
+    opciones = pacsv.WriteOptions(include_header=True, quoting_style='none', quoting_header='none',
+                                  eol=os.linesep)
+    pacsv.write_csv(tabla, path, write_options=opciones)
+
+
+def proyectar_csv(origen: Path, destino: Path, columnas: Sequence[str], encoding: str = 'utf-8') -> None:
+    """Subconjunto de columnas de un CSV escrito por escribir_csv, copiando el texto de cada campo.
+
+    Sin parseo ni tipado: línea a línea con QUOTE_MINIMAL, así el resultado es el
+    mismo que escribir df[columnas] con escribir_csv/to_csv.
+    """
+    origen, destino = Path(origen), Path(destino)
+    temporal = destino.with_name(f'.{destino.name}.{os.getpid()}.tmp')
+    with open(origen, 'r', encoding=encoding, newline='') as f, \
+            open(temporal, 'w', encoding=encoding, newline='') as g:
+        lector = csv.reader(f)
+        encabezado = next(lector)
+        posiciones = [encabezado.index(c) for c in columnas]
+        escritor = csv.writer(g, quoting=csv.QUOTE_MINIMAL, lineterminator=os.linesep)
+        escritor.writerow(list(columnas))
+        escritor.writerows([fila[i] for i in posiciones] for fila in lector)
+    os.replace(temporal, destino)
+
+
+# ---------- Benchmark ----------
+
+def _mayores_csv(n: int) -> List[Path]:
+    archivos = [p for p in PROCESSED_DIR.rglob('*.csv') if p.is_file()]
+    return sorted(archivos, key=lambda p: p.stat().st_size, reverse=True)[:n]
+
+
+def _cronometrar(funcion, repeticiones: int = 3) -> float:
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor
+
+
+def benchmark(archivos: Sequence[Path], tmp_dir: Optional[Path] = None) -> pd.DataFrame:
+    """Tiempos de lectura/escritura pandas vs Arrow y verificación de igualdad byte a byte."""
+    import tempfile
+
+    filas = []
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as tmp:
+        ref, nuevo = Path(tmp) / 'pandas.csv', Path(tmp) / 'arrow.csv'
+        for path in archivos:
+            df = pd.read_csv(path, encoding='utf-8', dtype=str, keep_default_na=False, na_values=NULOS_TEXTO)
+            fila = {'archivo': path.relative_to(PROCESSED_DIR).as_posix() if path.is_relative_to(PROCESSED_DIR) else str(path),
+                    'mb': round(path.stat().st_size / 1e6, 2), 'filas': len(df)}
+            fila['leer_pandas_s'] = _cronometrar(lambda: pd.read_csv(path, encoding='utf-8', dtype=str,
+                                                                      keep_default_na=False, na_values=NULOS_TEXTO))
+            fila['leer_arrow_s'] = _cronometrar(lambda: leer_csv(path, como_texto=True))
+            fila['escribir_pandas_s'] = _cronometrar(lambda: _escribir_pandas(df, ref, 'utf-8'))
+            fila['escribir_arrow_s'] = _cronometrar(lambda: escribir_csv(df, nuevo))
+            fila['identico'] = ref.read_bytes() == nuevo.read_bytes()
+            filas.append(fila)
+    out = pd.DataFrame(filas)
+    if not out.empty:
+        out['aceleracion_lectura'] = (out['leer_pandas_s'] / out['leer_arrow_s']).round(2)
+        out['aceleracion_escritura'] = (out['escribir_pandas_s'] / out['escribir_arrow_s']).round(2)
+    return out
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 5
+    if not HAS_PYARROW:
+        print('pyarrow no está instalado: io_csv usa pandas y no hay nada que comparar.')
+        return
+    archivos = _mayores_csv(n)
+    if not archivos:
+        print(f'No hay CSV en {PROCESSED_DIR}. Ejecutar primero el pipeline.')
+        return
+    print(f'⏱️  Benchmark CSV pandas vs Arrow ({len(archivos)} archivos más grandes)...')
+    res = benchmark(archivos)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(res.to_string(index=False))
+    if not res['identico'].all():
+        print('⚠️  Hay archivos con diferencias respecto de pandas')
+    else:
+        print('✔ Salidas idénticas byte a byte')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,374 @@
+"""lector_salidas.py
+-----------------
+Lectura con proyección y filtros empujados hasta el almacenamiento para las
+salidas del pipeline (dimensional/ y out/), así los consumidores que
+necesitan un dominio, unas columnas o un rango de años no cargan la tabla
+entera.
+
+Fuente (formato='auto'): Parquet si existe <carpeta>/parquet/<nombre>,
+si no Arrow IPC (<carpeta>/arrow/<nombre>.arrow), si no el CSV.
+
+- Parquet: las particiones hive (dominio=/anio=) descartan archivos sin
+  abrirlos y las estadísticas min/max de cada row group descartan grupos;
+  solo se leen las columnas pedidas (más las del filtro).
+- Arrow: el archivo se mapea en memoria y se filtra sin copiar las columnas
+  que no se usan.
+- CSV: se parsean solo las columnas necesarias; un hecho del modelo
+  dimensional cuyo dominio (deducido del nombre) no es el pedido no se abre.
+- CSV y Arrow: si la entrada de _catalogo.json está vigente y sus rangos o
+  valores excluyen el filtro, la tabla no se abre (ver catalogo.py).
+
+Filtros:
+  anio, trimestre      valor o lista de valores; anio_desde / anio_hasta (inclusive)
+  provincia            nombre -> ProvinciaNorm o provincia, comparados sin tildes ni mayúsculas
+                       ('Córdoba' == 'CORDOBA'); si no hay columna de nombre, provincia_id ('PR01')
+  dominio              valor o lista, sin distinguir mayúsculas ('internet' == 'Internet')
+
+Uso:
+  from pipelines.lector_salidas import leer_tabla, plan_lectura
+  leer_tabla('fact_unificado_long', columnas=['anio', 'trimestre', 'valor'], dominio='Internet', anio_desde=2020)
+  plan_lectura('fact_unificado_long', dominio='Internet')   # archivos, row groups y bytes que se leerían
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .catalogo import columna as columna_catalogo, entrada_vigente
+    from .etl_dimensional_completo import normalizar_texto
+    from .io_csv import leer_csv
+    from .salida_arrow import CARPETA_ARROW, ruta_arrow
+    from .salida_parquet import CARPETA_PARQUET, HAS_PYARROW, dominio_desde_nombre
+except ImportError:  # importado desde un script: python pipelines/export_hyper.py
+    from catalogo import columna as columna_catalogo, entrada_vigente
+    from etl_dimensional_completo import normalizar_texto
+    from io_csv import leer_csv
+    from salida_arrow import CARPETA_ARROW, ruta_arrow
+    from salida_parquet import CARPETA_PARQUET, HAS_PYARROW, dominio_desde_nombre
+
+if HAS_PYARROW:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.ipc as ipc
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+OUT_DIR = BASE_DIR / 'data' / 'processed' / 'out'
+
+FORMATOS_LECTURA = ('auto', 'parquet', 'arrow', 'csv')
+# Columna de provincia en orden de preferencia; provincia_id ('PR01') si la tabla no tiene nombres
+COLUMNAS_PROVINCIA_TEXTO = ('ProvinciaNorm', 'provincia')
+COLUMNA_PROVINCIA_ID = 'provincia_id'
+
+
+@dataclass
+class Filtro:
+    """Condición sobre una columna: pertenencia a valores y/o rango inclusivo."""
+    columna: str
+    valores: Optional[List[Any]] = None
+    desde: Optional[float] = None
+    hasta: Optional[float] = None
+    sin_mayusculas: bool = False
+    # Ambos lados pasan por normalizar_texto (sin tildes, mayúsculas, sin espacios en los extremos)
+    normalizado: bool = False
+
+
+@dataclass
+class PlanLectura:
+    """Qué se leería para una consulta: fuente, archivos y row groups que pasan la poda."""
+    formato: str
+    rutas: List[Path] = field(default_factory=list)
+    archivos: int = 0
+    archivos_total: int = 0
+    grupos: int = 0
+    grupos_total: int = 0
+    bytes: int = 0
+    bytes_total: int = 0
+
+    @property
+    def fraccion_bytes(self) -> float:
+        return self.bytes / self.bytes_total if self.bytes_total else 0.0
+
+
+def _lista(valor) -> Optional[List[Any]]:
+    if valor is None:
+        return None
+    if isinstance(valor, (str, bytes)) or not hasattr(valor, '__iter__'):
+        return [valor]
+    return list(valor)
+
+
+def _requiere_pyarrow(formato: str):
+    if not HAS_PYARROW:
+        raise ImportError(f"La lectura {formato} requiere pyarrow. Instálelo con:\n  pip install pyarrow")
+
+
+# ---------- Fuente y esquema ----------
+
+def _ruta_parquet(carpeta: Path, nombre: str) -> Optional[Path]:
+    base = carpeta / CARPETA_PARQUET
+    for ruta in (base / nombre, base / f'{nombre}.parquet'):
+        if ruta.exists():
+            return ruta
+    return None
+
+
+def resolver_fuente(nombre: str, carpeta: Optional[Path] = None, formato: str = 'auto'):
+    """(formato, ruta) de la tabla; 'auto' prefiere Parquet, luego Arrow, luego CSV."""
+    carpeta = Path(carpeta) if carpeta is not None else OUT_DIR
+    if formato not in FORMATOS_LECTURA:
+        raise ValueError(f"Formato de lectura desconocido: {formato}. Opciones: {FORMATOS_LECTURA}")
+    if formato in ('parquet', 'arrow'):
+        _requiere_pyarrow(formato)
+    candidatos = {
+        'parquet': _ruta_parquet(carpeta, nombre) if HAS_PYARROW else None,
+        'arrow': ruta_arrow(carpeta / CARPETA_ARROW, nombre) if HAS_PYARROW else None,
+        'csv': carpeta / f'{nombre}.csv',
+    }
+    orden = ('parquet', 'arrow', 'csv') if formato == 'auto' else (formato,)
+    for f in orden:
+        ruta = candidatos[f]
+        if ruta is not None and ruta.exists():
+            return f, ruta
+    raise FileNotFoundError(f"{nombre} no encontrado en {carpeta} (formato {formato}). Ejecutar primero el pipeline")
+
+
+def _dataset(ruta: Path):
+    return ds.dataset(ruta, format='parquet', partitioning='hive')
+
+
+def columnas_fuente(formato: str, ruta: Path) -> List[str]:
+    """Nombres de columna sin leer datos (esquema Parquet/Arrow o encabezado del CSV)."""
+    if formato == 'parquet':
+        return list(_dataset(ruta).schema.names)
+    if formato == 'arrow':
+        with pa.memory_map(str(ruta), 'r') as fuente:
+            return list(ipc.open_file(fuente).schema.names)
+    return list(leer_csv(ruta, como_texto=True, nrows=0).columns)
+
+
+# ---------- Filtros ----------
+
+def resolver_filtros(nombre: str, columnas: Sequence[str], anio=None, anio_desde=None, anio_hasta=None,
+                     trimestre=None, provincia=None, dominio=None) -> Optional[List[Filtro]]:
+    """Filtros sobre las columnas reales de la tabla; None si la tabla queda descartada entera."""
+    columnas = set(columnas)
+    filtros: List[Filtro] = []
+
+    def _exigir(col, pedido):
+        if pedido and col not in columnas:
+            raise ValueError(f"{nombre} no tiene columna {col} para filtrar")
+        return pedido and col in columnas
+
+    if _exigir('anio', anio is not None or anio_desde is not None or anio_hasta is not None):
+        filtros.append(Filtro('anio', _lista(anio), anio_desde, anio_hasta))
+    if _exigir('trimestre', trimestre is not None):
+        filtros.append(Filtro('trimestre', _lista(trimestre)))
+    provincias = _lista(provincia)
+    if provincias:
+        candidatas = (COLUMNAS_PROVINCIA_TEXTO if all(isinstance(p, str) for p in provincias) else ()) + (COLUMNA_PROVINCIA_ID,)
+        col = next((c for c in candidatas if c in columnas), None)
+        if col is None:
+            raise ValueError(f"{nombre} no tiene columna de provincia para filtrar por {provincias}")
+        if col in COLUMNAS_PROVINCIA_TEXTO:
+            filtros.append(Filtro(col, [normalizar_texto(p) for p in provincias], normalizado=True))
+        else:
+            filtros.append(Filtro(col, provincias))
+    dominios = _lista(dominio)
+    if dominios:
+        pedidos = [str(d).lower() for d in dominios]
+        if 'dominio' in columnas:
+            filtros.append(Filtro('dominio', pedidos, sin_mayusculas=True))
+        else:
+            # Hechos del modelo dimensional sin columna dominio: se deduce del nombre
+            propio = dominio_desde_nombre(nombre)
+            if propio is None:
+                raise ValueError(f"{nombre} no tiene columna dominio para filtrar")
+            if propio not in pedidos:
+                return None
+    return filtros
+
+
+def _expresion(filtros: List[Filtro], valores_particion: Optional[dict] = None):
+    """Expresión de pyarrow.dataset; dominio se resuelve contra los valores de partición si los hay."""
+    expr = None
+    for f in filtros:
+        campo = ds.field(f.columna)
+        valores = f.valores
+        if (f.sin_mayusculas or f.normalizado) and valores is not None:
+            presentes = (valores_particion or {}).get(f.columna)
+            if presentes is not None:
+                valores = [v for v in presentes if _comparable(v, f.sin_mayusculas, f.normalizado) in valores] or ['']
+            elif f.normalizado:
+                sin_tildes = pc.replace_substring_regex(pc.utf8_normalize(campo, 'NFD'), pattern=r'\p{Mn}', replacement='')
+                campo = pc.utf8_trim_whitespace(pc.utf8_upper(sin_tildes))
+            else:
+                campo = pc.utf8_lower(campo)
+        partes = []
+        if valores is not None:
+            partes.append(campo.isin(valores))
+        if f.desde is not None:
+            partes.append(campo >= f.desde)
+        if f.hasta is not None:
+            partes.append(campo <= f.hasta)
+        for p in partes:
+            expr = p if expr is None else expr & p
+    return expr
+
+
+def _valores_particion(ruta: Path) -> dict:
+    """{columna: [valores]} de los directorios hive (col=valor) bajo ruta."""
+    valores: dict = {}
+    if ruta.is_dir():
+        for d in ruta.rglob('*'):
+            if d.is_dir() and '=' in d.name:
+                col, valor = d.name.split('=', 1)
+                valores.setdefault(col, set()).add(valor)
+    return {c: sorted(v) for c, v in valores.items()}
+
+
+def filtrar_df(df: pd.DataFrame, filtros: List[Filtro]) -> pd.DataFrame:
+    """Mismos filtros aplicados sobre un DataFrame (fuente CSV)."""
+    mascara = np.ones(len(df), dtype=bool)
+    for f in filtros:
+        s = df[f.columna]
+        if f.sin_mayusculas:
+            s = s.astype(str).str.lower()
+        if f.normalizado:
+            s = s.map({v: normalizar_texto(v) for v in s.dropna().unique()})
+        if f.valores is not None:
+            mascara &= s.isin(f.valores).to_numpy()
+        if f.desde is not None or f.hasta is not None:
+            num = pd.to_numeric(s, errors='coerce')
+            if f.desde is not None:
+                mascara &= (num >= f.desde).to_numpy(dtype=bool, na_value=False)
+            if f.hasta is not None:
+                mascara &= (num <= f.hasta).to_numpy(dtype=bool, na_value=False)
+    return df[mascara]
+
+
+def _comparable(v, sin_mayusculas: bool = False, normalizado: bool = False):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        if normalizado:
+            return normalizar_texto(str(v))
+        return str(v).lower() if sin_mayusculas else str(v)
+
+
+def descartada_por_catalogo(entrada: dict, filtros: List[Filtro]) -> bool:
+    """True si las estadísticas de la tabla (min/max, valores distintos) excluyen toda fila."""
+    for f in filtros:
+        stats = columna_catalogo(entrada, f.columna)
+        if stats is None:
+            continue
+        minimo, maximo = (_comparable(stats.get(k)) if stats.get(k) is not None else None for k in ('min', 'max'))
+        if isinstance(minimo, float) and isinstance(maximo, float):
+            if (f.desde is not None and maximo < f.desde) or (f.hasta is not None and minimo > f.hasta):
+                return True
+        if f.valores is not None and 'valores' in stats:
+            presentes = {_comparable(v, f.sin_mayusculas, f.normalizado) for v in stats['valores']}
+            if not presentes & {_comparable(v, f.sin_mayusculas, f.normalizado) for v in f.valores}:
+                return True
+    return False
+
+
+def _podar_con_catalogo(nombre: str, ruta: Path, formato: str, filtros: Optional[List[Filtro]]):
+    """Para CSV / Arrow (sin estadísticas propias) usa la entrada vigente de _catalogo.json."""
+    if filtros is None or formato == 'parquet' or not filtros:
+        return filtros
+    carpeta = ruta.parent if formato == 'csv' else ruta.parent.parent
+    entrada = entrada_vigente(carpeta, nombre, formato)
+    return None if entrada is not None and descartada_por_catalogo(entrada, filtros) else filtros
+
+
+# ---------- Lectura ----------
+
+def _proyeccion(columnas: Optional[Sequence[str]], disponibles: Sequence[str]) -> Optional[List[str]]:
+    if columnas is None:
+        return None
+    faltantes = [c for c in columnas if c not in disponibles]
+    if faltantes:
+        raise KeyError(f"Columnas inexistentes: {faltantes}. Disponibles: {list(disponibles)}")
+    return list(columnas)
+
+
+def _vacia(formato: str, ruta: Path, columnas: Optional[List[str]]) -> pd.DataFrame:
+    todas = columnas_fuente(formato, ruta)
+    return pd.DataFrame(columns=columnas if columnas is not None else todas)
+
+
+def leer_tabla(nombre: str, carpeta: Optional[Path] = None, columnas: Optional[Sequence[str]] = None,
+               formato: str = 'auto', **filtros) -> pd.DataFrame:
+    """Lee solo las columnas y filas pedidas de una salida del pipeline.
+
+    filtros: anio, anio_desde, anio_hasta, trimestre, provincia, dominio.
+    """
+    formato, ruta = resolver_fuente(nombre, carpeta, formato)
+    disponibles = columnas_fuente(formato, ruta)
+    columnas = _proyeccion(columnas, disponibles)
+    condiciones = _podar_con_catalogo(nombre, ruta, formato, resolver_filtros(nombre, disponibles, **filtros))
+    if condiciones is None:
+        return _vacia(formato, ruta, columnas)
+
+    if formato == 'parquet':
+        expr = _expresion(condiciones, _valores_particion(ruta))
+        return _dataset(ruta).to_table(columns=columnas, filter=expr).to_pandas()
+    if formato == 'arrow':
+        with pa.memory_map(str(ruta), 'r') as fuente:
+            tabla = ipc.open_file(fuente).read_all()
+        expr = _expresion(condiciones)
+        if expr is not None:
+            tabla = ds.dataset(tabla).to_table(filter=expr)
+        return (tabla.select(columnas) if columnas is not None else tabla).to_pandas()
+    necesarias = None
+    if columnas is not None:
+        necesarias = list(dict.fromkeys(columnas + [f.columna for f in condiciones]))
+    df = leer_csv(ruta, columnas=necesarias)
+    df = filtrar_df(df, condiciones) if condiciones else df
+    return (df[columnas] if columnas is not None else df).reset_index(drop=True)
+
+
+def plan_lectura(nombre: str, carpeta: Optional[Path] = None, columnas: Optional[Sequence[str]] = None,
+                 formato: str = 'auto', **filtros) -> PlanLectura:
+    """Archivos, row groups y bytes (comprimidos, de las columnas leídas) que tocaría leer_tabla."""
+    formato, ruta = resolver_fuente(nombre, carpeta, formato)
+    disponibles = columnas_fuente(formato, ruta)
+    columnas = _proyeccion(columnas, disponibles)
+    condiciones = _podar_con_catalogo(nombre, ruta, formato, resolver_filtros(nombre, disponibles, **filtros))
+    if formato != 'parquet':
+        tamano = ruta.stat().st_size
+        leidos = 0 if condiciones is None else tamano
+        return PlanLectura(formato, [ruta] if leidos else [], int(bool(leidos)), 1, 0, 0, leidos, tamano)
+
+    dataset = _dataset(ruta)
+    expr = _expresion(condiciones or [], _valores_particion(ruta))
+    leidas = set(columnas or disponibles) | {f.columna for f in condiciones or []}
+    plan = PlanLectura(formato)
+    seleccion = set()
+    if condiciones is not None:
+        for fragmento in dataset.get_fragments(filter=expr):
+            grupos = fragmento.split_by_row_group(expr, schema=dataset.schema)
+            if grupos:
+                plan.rutas.append(Path(fragmento.path))
+                seleccion |= {(fragmento.path, g.row_groups[0].id) for g in grupos}
+    for fragmento in dataset.get_fragments():
+        meta = fragmento.metadata
+        plan.archivos_total += 1
+        for i in range(meta.num_row_groups):
+            grupo = meta.row_group(i)
+            total = sum(grupo.column(j).total_compressed_size for j in range(grupo.num_columns))
+            propios = sum(grupo.column(j).total_compressed_size for j in range(grupo.num_columns)
+                          if grupo.column(j).path_in_schema in leidas)
+            plan.grupos_total += 1
+            plan.bytes_total += total
+            if (fragmento.path, i) in seleccion:
+                plan.grupos += 1
+                plan.bytes += propios
+    plan.archivos = len(plan.rutas)
+    return plan
@@ -30,6 +30,12 @@ from pathlib import Path
 from typing import Dict, List, Tuple
 
 import pandas as pd
+
+try:
+    from .io_csv import leer_csv
+except ImportError:  # ejecutado como script: python pipelines/load_to_mysql.py
+    from io_csv import leer_csv
+
 try:
     import mysql.connector  # type: ignore
 except Exception as e:  # pragma: no cover
@@ -235,7 +241,7 @@ def main():
         for csv in csv_files:
             table = csv.stem  # nombre de archivo sin .csv
             # Leer muestra para inferir correctamente
-            df = pd.read_csv(csv)
+            df = leer_csv(csv)
 
             # Crear tabla si no existe
             ddl = build_create_table_sql(table, df)
@@ -0,0 +1,167 @@
+"""pipeline_api.py
+---------------
+API programática del pipeline: ejecuta las etapas de etl_principal y
+prepare_enacom en memoria y devuelve un resultado tipado, sin escribir ni
+releer CSV entre etapas. La escritura a disco es un sumidero opcional final.
+
+Uso:
+  from pipelines.pipeline_api import ejecutar_pipeline
+  res = ejecutar_pipeline()                  # solo memoria
+  res.tabla('out', 'fact_unificado_long')    # DataFrame
+  res.to_arrow('dimensional')                # {nombre: pyarrow.Table}
+  res.escribir()                             # mismas rutas que los scripts
+  res.base_embebida()                        # data/processed/enacom.duckdb
+
+  python -m pipelines.pipeline_api           # ejecuta y escribe
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from . import etl_principal, prepare_enacom
+from .base_embebida import TABLAS_OUT, construir_base
+from .build_anomalias import detectar_anomalias, escribir_reporte
+from .build_correlaciones import NOMBRE as CORRELACIONES, calcular_correlaciones, leer_cache, procedencia_correlaciones
+from .build_cubo_metricas import construir_cubo, escribir_cubo
+from .build_distribucion_velocidades import calcular_distribucion_velocidades
+from .build_metricas_derivadas import calcular_metricas_derivadas
+from .build_pronosticos import calcular_pronosticos
+from .build_rollups import calcular_rollups
+from .build_series_completas import completar_series
+from .fact_indexado import escribir_indice, ordenar_fact
+from .salida_parquet import componentes_formato, escribir_tabla
+from .series_temporales import clave_provincia
+
+CAPAS = ('clean', 'dimensional', 'procesadas', 'bi', 'out')
+
+
+@dataclass
+class ResultadoPipeline:
+    """Tablas del pipeline agrupadas por capa ({nombre sin extensión: DataFrame})."""
+    clean: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    dimensional: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    procesadas: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    bi: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    out: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    # Procedencia de las tablas derivadas cacheadas ({nombre: dict}); va al catálogo al escribir
+    procedencias: Dict[str, dict] = field(default_factory=dict)
+
+    def capa(self, nombre: str) -> Dict[str, pd.DataFrame]:
+        if nombre not in CAPAS:
+            raise ValueError(f"Capa desconocida: {nombre}. Opciones: {CAPAS}")
+        return getattr(self, nombre)
+
+    def tabla(self, capa: str, nombre: str) -> pd.DataFrame:
+        tablas = self.capa(capa)
+        if nombre not in tablas:
+            raise KeyError(f"Tabla {nombre} no encontrada en capa {capa}")
+        return tablas[nombre]
+
+    def to_arrow(self, capa: str) -> Dict[str, 'pyarrow.Table']:
+        """Convierte una capa a tablas Arrow (requiere pyarrow)."""
+        import pyarrow as pa
+        return {n: pa.Table.from_pandas(df, preserve_index=False) for n, df in self.capa(capa).items()}
+
+    def escribir(self, processed_dir: Optional[Path] = None, formato: Optional[str] = None) -> List[Path]:
+        """Sumidero a disco: escribe cada capa en la misma estructura que los scripts CLI.
+
+        formato: 'csv', 'parquet' o 'ambos' (por defecto FORMATO_SALIDA o 'csv').
+        """
+        base = Path(processed_dir) if processed_dir is not None else etl_principal.PROCESSED_DIR
+        destinos = {
+            'clean': base,
+            'dimensional': base / 'dimensional',
+            'procesadas': base,
+            'bi': base / 'bi',
+            'out': base / 'out',
+        }
+        escritos: List[Path] = []
+        for capa in CAPAS:
+            destino = destinos[capa]
+            destino.mkdir(parents=True, exist_ok=True)
+            for nombre, df in self.capa(capa).items():
+                p = destino / f'{nombre}.csv'
+                # Entradas de prepare_enacom (clean/procesadas): siempre CSV
+                formato_capa = 'csv' if capa in ('clean', 'procesadas') else formato
+                escritos += escribir_tabla(df, p, prepare_enacom.write_csv if capa == 'out' else None, formato_capa,
+                                           procedencia=self.procedencias.get(nombre) if capa == 'out' else None)
+        if 'fact_unificado_long' in self.out and 'csv' in componentes_formato(formato):
+            # Índice de desplazamientos junto al CSV (acompaña a la tabla, no es una tabla más)
+            escribir_indice(self.out['fact_unificado_long'], destinos['out'])
+        return escritos
+
+    def base_embebida(self, destino: Optional[Path] = None, motor: str = 'auto') -> Path:
+        """Base DuckDB/SQLite con el modelo dimensional y fact_unificado_long (ver base_embebida.py)."""
+        tablas = {n: df for n, df in self.dimensional.items() if n.startswith(('dim_', 'fact_'))}
+        tablas.update({n: self.out[n] for n in TABLAS_OUT if n in self.out})
+        return construir_base(tablas, destino, motor)
+
+
+def ejecutar_pipeline(raw_dir: Optional[Path] = None, escribir_en: Optional[Path] = None,
+                      metodo_completado: Optional[str] = None) -> ResultadoPipeline:
+    """Ejecuta el pipeline completo en memoria.
+
+    raw_dir: carpeta con los .xlsx de ENACOM (por defecto data/raw).
+    escribir_en: si se indica, vuelca el resultado a esa carpeta processed.
+    metodo_completado: None (por defecto) deja fact_unificado_long como la
+        produce el pipeline en disco; 'lineal' / 'arrastre' imputa los trimestres
+        faltantes (ver build_series_completas.py).
+    """
+    raw_dir = Path(raw_dir) if raw_dir is not None else etl_principal.RAW_DIR
+    res = ResultadoPipeline()
+    res.clean = {Path(n).stem: df for n, df in etl_principal.leer_excels_clean(raw_dir).items()}
+    res.dimensional = etl_principal.tablas_dimensional_minimo(raw_dir)
+    res.bi, res.out = etl_principal.tablas_bi_y_out_minimos(res.dimensional)
+    res.procesadas = etl_principal.tablas_dimensiones_procesadas(res.dimensional)
+    # prepare_enacom consume data/processed/*.csv: procesadas + *_clean
+    entradas = {f'{n}.csv': df for n, df in {**res.clean, **res.procesadas}.items()}
+    res.out.update(prepare_enacom.preparar_en_memoria(entradas))
+    # Etapas analíticas sobre la tabla unificada
+    if metodo_completado is not None:
+        res.out['fact_unificado_long'] = completar_series(res.out['fact_unificado_long'], res.dimensional['dim_tiempo'], metodo_completado)
+    # Orden de la clave (dominio, subcategoria, variable, provincia, período): ver fact_indexado.py
+    res.out['fact_unificado_long'] = ordenar_fact(res.out['fact_unificado_long'])
+    # dim_provincias del resultado, con los nombres en el formato de ProvinciaNorm (ver series_temporales.py)
+    dim_provincias = res.dimensional['dim_provincias']
+    dim_provincias = dim_provincias.assign(provincia=clave_provincia(dim_provincias.assign(ProvinciaNorm=dim_provincias['provincia'])))
+    res.out['fact_metricas_derivadas'] = calcular_metricas_derivadas(res.out['fact_unificado_long'], dim_provincias)
+    res.out['fact_pronosticos'] = calcular_pronosticos(res.out['fact_unificado_long'], res.dimensional['dim_tiempo'], dim_provincias)
+    res.out['anomalias'] = detectar_anomalias(res.out['fact_unificado_long'], res.dimensional['dim_tiempo'])
+    # Correlaciones: se reutilizan las ya escritas si la entrada no cambió (ver build_correlaciones.py)
+    procedencia = procedencia_correlaciones(res.out['fact_unificado_long'], res.dimensional['dim_tiempo'], dim_provincias)
+    cache_dir = (Path(escribir_en) if escribir_en is not None else etl_principal.PROCESSED_DIR) / 'out'
+    correlaciones = leer_cache(cache_dir, procedencia)
+    if correlaciones is None:
+        correlaciones = calcular_correlaciones(res.out['fact_unificado_long'], res.dimensional['dim_tiempo'], dim_provincias)
+    res.out[CORRELACIONES] = correlaciones
+    res.procedencias[CORRELACIONES] = procedencia
+    res.out['agregados_rollup'] = calcular_rollups(res.out['fact_unificado_long'], dim_provincias)
+    res.out['fact_distribucion_velocidades'] = calcular_distribucion_velocidades(
+        res.out.get('fact_velocidad_rangos_long'), res.out.get('fact_velocidad_numerica_provincias'),
+        res.dimensional['dim_velocidades'], res.dimensional['dim_tiempo'], dim_provincias,
+    )
+    if escribir_en is not None:
+        res.escribir(escribir_en)
+    return res
+
+
+def main():
+    print('🚀 Ejecutando pipeline en memoria...')
+    res = ejecutar_pipeline()
+    escritos = res.escribir()
+    escribir_reporte(res.out['anomalias'])
+    base = res.base_embebida()
+    escribir_cubo(*construir_cubo(res.out['fact_unificado_long'], res.dimensional['dim_tiempo']),
+                  etl_principal.PROCESSED_DIR / 'out' / 'cubo')
+    for capa in CAPAS:
+        print(f'  - {capa}: {len(res.capa(capa))} tablas')
+    print(f'🗄️  Base embebida: {base}')
+    print(f'🎯 Finalizado. {len(escritos)} archivos escritos en {etl_principal.PROCESSED_DIR}')
+
+
+if __name__ == '__main__':
+    main()
@@ -16,11 +16,19 @@ Salidas en data/processed/out:
 - fact_tecnologias_long.csv (tecnologías pivotadas a largo)
 """
 import os
-import csv
 import unicodedata
 from pathlib import Path
+from typing import Dict
+
 import pandas as pd
 
+try:
+    from .io_csv import escribir_csv, leer_csv
+    from .salida_parquet import escribir_tabla
+except ImportError:  # ejecutado como script: python pipelines/prepare_enacom.py
+    from io_csv import escribir_csv, leer_csv
+    from salida_parquet import escribir_tabla
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 PROCESSED = BASE_DIR / "data" / "processed"
 OUT = PROCESSED / "out"
@@ -44,20 +52,29 @@ def to_int(x):
 
 
 def read_csv(path: Path, **kw):
-    return pd.read_csv(path, encoding="utf-8", dtype=str, keep_default_na=False, na_values=["", "NA", "NaN"], **kw)
+    """Todo como texto; solo '', 'NA' y 'NaN' son nulos (lector Arrow, ver io_csv.py)."""
+    return leer_csv(path, como_texto=True, **kw)
 
 
 def write_csv(df: pd.DataFrame, path: Path):
-    df.to_csv(path, index=False, encoding="utf-8", quoting=csv.QUOTE_MINIMAL)
+    """UTF-8, QUOTE_MINIMAL; mismo archivo que df.to_csv(index=False) (ver io_csv.py)."""
+    escribir_csv(df, path, encoding="utf-8")
+
+
+def write_table(df: pd.DataFrame, path: Path):
+    """write_csv y/o Parquet según FORMATO_SALIDA (ver salida_parquet.py)."""
+    escribir_tabla(df, path, write_csv)
+
+
+def as_text(df: pd.DataFrame) -> pd.DataFrame:
+    """Equivalente en memoria de read_csv(dtype=str): valores como texto y nulos como NaN."""
+    return df.astype(str).where(df.notna()).astype(object)
 
 
 # ---------- 1) DIMENSIONES ----------
 
-def build_dim_provincias():
-    p = PROCESSED / "dim_provincias.csv"
-    if not p.exists():
-        return
-    dim = read_csv(p)
+def dim_provincias_norm(dim: pd.DataFrame) -> pd.DataFrame:
+    dim = dim.copy()
     # Asegurar nombre columna provincia
     if "provincia" not in dim.columns:
         for c in dim.columns:
@@ -66,15 +83,19 @@ def build_dim_provincias():
                 break
     if "provincia" in dim.columns:
         dim["ProvinciaNorm"] = dim["provincia"].apply(normalize_text)
-    write_csv(dim, OUT / "dim_provincias_norm.csv")
-    print("✔ dim_provincias_norm.csv")
+    return dim
 
 
-def build_dim_tiempo():
-    p = PROCESSED / "dim_tiempo.csv"
+def build_dim_provincias():
+    p = PROCESSED / "dim_provincias.csv"
     if not p.exists():
         return
-    dim = read_csv(p)
+    write_table(dim_provincias_norm(read_csv(p)), OUT / "dim_provincias_norm.csv")
+    print("✔ dim_provincias_norm.csv")
+
+
+def dim_tiempo_norm(dim: pd.DataFrame) -> pd.DataFrame:
+    dim = dim.copy()
     for col in ("anio", "trimestre"):
         if col not in dim.columns:
             for c in dim.columns:
@@ -84,15 +105,19 @@ def build_dim_tiempo():
         dim["anio"] = dim["anio"].apply(to_int)
     if "trimestre" in dim.columns:
         dim["trimestre"] = dim["trimestre"].apply(to_int)
-    write_csv(dim, OUT / "dim_tiempo_norm.csv")
-    print("✔ dim_tiempo_norm.csv")
+    return dim
 
 
-def build_dim_velocidades():
-    p = PROCESSED / "dim_velocidades.csv"
+def build_dim_tiempo():
+    p = PROCESSED / "dim_tiempo.csv"
     if not p.exists():
         return
-    dim = read_csv(p)
+    write_table(dim_tiempo_norm(read_csv(p)), OUT / "dim_tiempo_norm.csv")
+    print("✔ dim_tiempo_norm.csv")
+
+
+def dim_velocidades_ready(dim: pd.DataFrame) -> pd.DataFrame:
+    dim = dim.copy()
     rename_map = {
         "velocidad_id": "velocidad_id",
         "rango_velocidad": "rango_velocidad",
@@ -112,18 +137,29 @@ def build_dim_velocidades():
             .str.replace(" ", "", regex=False)
             .str.replace("≥", "mayor_a_", regex=False)
         )
-    write_csv(dim, OUT / "dim_velocidades_ready.csv")
+    return dim
+
+
+def build_dim_velocidades():
+    p = PROCESSED / "dim_velocidades.csv"
+    if not p.exists():
+        return
+    write_table(dim_velocidades_ready(read_csv(p)), OUT / "dim_velocidades_ready.csv")
     print("✔ dim_velocidades_ready.csv")
 
 
+def dim_tecnologias_ready(dim: pd.DataFrame) -> pd.DataFrame:
+    dim = dim.copy()
+    if "tecnologia" in dim.columns:
+        dim["tec_key"] = dim["tecnologia"].str.lower().str.replace(" ", "", regex=False)
+    return dim
+
+
 def build_dim_tecnologias():
     p = PROCESSED / "dim_tecnologias.csv"
     if not p.exists():
         return
-    dim = read_csv(p)
-    if "tecnologia" in dim.columns:
-        dim["tec_key"] = dim["tecnologia"].str.lower().str.replace(" ", "", regex=False)
-    write_csv(dim, OUT / "dim_tecnologias_ready.csv")
+    write_table(dim_tecnologias_ready(read_csv(p)), OUT / "dim_tecnologias_ready.csv")
     print("✔ dim_tecnologias_ready.csv")
 
 
@@ -138,91 +174,89 @@ def add_common_keys(df: pd.DataFrame):
     return df
 
 
-def fact_penetracion_provincias():
-    p = PROCESSED / "internet_accesos_penetracion_provincias_clean.csv"
-    if not p.exists():
-        return
-    f = read_csv(p)
-    f = add_common_keys(f)
+def _read_out_dim(name: str):
+    """Lee una dimensión ya preparada en OUT (texto) o None si no existe."""
+    dim_path = OUT / name
+    return read_csv(dim_path) if dim_path.exists() else None
+
+
+def _asignar_velocidad_id(v_kbps: pd.Series, dim: pd.DataFrame) -> pd.Series:
+    dim = dim.copy()
+    dim["vel_min_kbps"] = pd.to_numeric(dim["vel_min_kbps"], errors="coerce")
+    dim["vel_max_kbps"] = pd.to_numeric(dim["vel_max_kbps"], errors="coerce")
+    import numpy as np
+    def asignar_id(v_kbps):
+        if np.isnan(v_kbps):
+            return pd.NA
+        fila = dim[( (dim["vel_min_kbps"].isna()) | (v_kbps >= dim["vel_min_kbps"]) ) &
+                   ( (dim["vel_max_kbps"].isna()) | (v_kbps < dim["vel_max_kbps"]) )]
+        if fila.empty:
+            return pd.NA
+        return int(fila.iloc[0]["velocidad_id"]) if not pd.isna(fila.iloc[0]["velocidad_id"]) else pd.NA
+    return v_kbps.apply(asignar_id).astype("Int64")
+
+
+def penetracion_provincias(f: pd.DataFrame) -> pd.DataFrame:
+    f = add_common_keys(f.copy())
     for c in ("accesos_cada_100_hogares", "accesos_cada_100_habitantes"):
         if c in f.columns:
             f[c] = pd.to_numeric(f[c], errors="coerce")
-    write_csv(f, OUT / "fact_penetracion_provincias.csv")
-    print("✔ fact_penetracion_provincias.csv")
+    return f
 
 
-def fact_velocidad_media_provincias():
-    p = PROCESSED / "internet_velocidad_media_descarga_provincias_clean.csv"
+def fact_penetracion_provincias():
+    p = PROCESSED / "internet_accesos_penetracion_provincias_clean.csv"
     if not p.exists():
         return
-    f = read_csv(p)
-    f = add_common_keys(f)
+    write_table(penetracion_provincias(read_csv(p)), OUT / "fact_penetracion_provincias.csv")
+    print("✔ fact_penetracion_provincias.csv")
+
+
+def velocidad_media_provincias(f: pd.DataFrame, dim_vel=None) -> pd.DataFrame:
+    f = add_common_keys(f.copy())
     if "mbps" in f.columns:
         f["mbps"] = pd.to_numeric(f["mbps"], errors="coerce")
         # Intentar mapear a un rango velocidad_id usando dim_velocidades_ready si existe
-        dim_path = OUT / "dim_velocidades_ready.csv"
-        if dim_path.exists():
-            dim = read_csv(dim_path)
-            # Asegurar columnas clave
-            if set(["velocidad_id","vel_min_kbps","vel_max_kbps"]).issubset(dim.columns):
-                # Convertir mbps a kbps para comparar con min/max
-                f_kbps = f["mbps"] * 1000
-                dim["vel_min_kbps"] = pd.to_numeric(dim["vel_min_kbps"], errors="coerce")
-                dim["vel_max_kbps"] = pd.to_numeric(dim["vel_max_kbps"], errors="coerce")
-                # Construimos una función para asignar id
-                import numpy as np
-                def asignar_id(v_kbps):
-                    if np.isnan(v_kbps):
-                        return pd.NA
-                    fila = dim[( (dim["vel_min_kbps"].isna()) | (v_kbps >= dim["vel_min_kbps"]) ) &
-                               ( (dim["vel_max_kbps"].isna()) | (v_kbps < dim["vel_max_kbps"]) )]
-                    if fila.empty:
-                        return pd.NA
-                    return int(fila.iloc[0]["velocidad_id"]) if not pd.isna(fila.iloc[0]["velocidad_id"]) else pd.NA
-                f["velocidad_id"] = f_kbps.apply(asignar_id).astype("Int64")
-    write_csv(f, OUT / "fact_velocidad_media_provincias.csv")
-    print("✔ fact_velocidad_media_provincias.csv")
+        if dim_vel is not None and set(["velocidad_id","vel_min_kbps","vel_max_kbps"]).issubset(dim_vel.columns):
+            # Convertir mbps a kbps para comparar con min/max
+            f["velocidad_id"] = _asignar_velocidad_id(f["mbps"] * 1000, dim_vel)
+    return f
 
 
-def fact_velocidad_numerica_provincias():
-    p = PROCESSED / "internet_accesos_velocidad_provincias_clean.csv"
+def fact_velocidad_media_provincias():
+    p = PROCESSED / "internet_velocidad_media_descarga_provincias_clean.csv"
     if not p.exists():
         return
-    f = read_csv(p)
-    f = add_common_keys(f)
+    f = velocidad_media_provincias(read_csv(p), _read_out_dim("dim_velocidades_ready.csv"))
+    write_table(f, OUT / "fact_velocidad_media_provincias.csv")
+    print("✔ fact_velocidad_media_provincias.csv")
+
+
+def velocidad_numerica_provincias(f: pd.DataFrame, dim_vel=None) -> pd.DataFrame:
+    f = add_common_keys(f.copy())
     if "velocidad" in f.columns:
         f["velocidad"] = pd.to_numeric(f["velocidad"], errors="coerce")
         # si es menor a 50 interpretamos Mbps y convertimos a kbps
         f["Velocidad_kbps"] = f["velocidad"].apply(lambda v: v * 1000 if pd.notna(v) and v < 50 else v)
         # Asignar velocidad_id (rango) usando dim_velocidades_ready
-        dim_path = OUT / "dim_velocidades_ready.csv"
-        if dim_path.exists():
-            dim = read_csv(dim_path)
-            if set(["velocidad_id","vel_min_kbps","vel_max_kbps"]).issubset(dim.columns):
-                dim["vel_min_kbps"] = pd.to_numeric(dim["vel_min_kbps"], errors="coerce")
-                dim["vel_max_kbps"] = pd.to_numeric(dim["vel_max_kbps"], errors="coerce")
-                import numpy as np
-                def asignar_id(v_kbps):
-                    if np.isnan(v_kbps):
-                        return pd.NA
-                    fila = dim[( (dim["vel_min_kbps"].isna()) | (v_kbps >= dim["vel_min_kbps"]) ) &
-                               ( (dim["vel_max_kbps"].isna()) | (v_kbps < dim["vel_max_kbps"]) )]
-                    if fila.empty:
-                        return pd.NA
-                    return int(fila.iloc[0]["velocidad_id"]) if not pd.isna(fila.iloc[0]["velocidad_id"]) else pd.NA
-                f["velocidad_id"] = f["Velocidad_kbps"].apply(asignar_id).astype("Int64")
+        if dim_vel is not None and set(["velocidad_id","vel_min_kbps","vel_max_kbps"]).issubset(dim_vel.columns):
+            f["velocidad_id"] = _asignar_velocidad_id(f["Velocidad_kbps"], dim_vel)
     if "accesos" in f.columns:
         f["accesos"] = pd.to_numeric(f["accesos"], errors="coerce").fillna(0).astype("Int64")
-    write_csv(f, OUT / "fact_velocidad_numerica_provincias.csv")
-    print("✔ fact_velocidad_numerica_provincias.csv")
+    return f
 
 
-def fact_velocidad_rangos_long():
-    p = PROCESSED / "internet_accesos_velocidad_rangos_provincias_clean.csv"
+def fact_velocidad_numerica_provincias():
+    p = PROCESSED / "internet_accesos_velocidad_provincias_clean.csv"
     if not p.exists():
         return
-    f = read_csv(p)
-    f = add_common_keys(f)
+    f = velocidad_numerica_provincias(read_csv(p), _read_out_dim("dim_velocidades_ready.csv"))
+    write_table(f, OUT / "fact_velocidad_numerica_provincias.csv")
+    print("✔ fact_velocidad_numerica_provincias.csv")
+
+
+def velocidad_rangos_long(f: pd.DataFrame) -> pd.DataFrame:
+    f = add_common_keys(f.copy())
     cols_base = {"anio", "trimestre", "provincia", "ProvinciaNorm", "total"}
     rango_cols = [c for c in f.columns if c not in cols_base]
     long_df = f.melt(
@@ -232,16 +266,19 @@ def fact_velocidad_rangos_long():
         value_name="accesos"
     )
     long_df["accesos"] = pd.to_numeric(long_df["accesos"], errors="coerce").fillna(0).astype("Int64")
-    write_csv(long_df, OUT / "fact_velocidad_rangos_long.csv")
-    print("✔ fact_velocidad_rangos_long.csv")
+    return long_df
 
 
-def fact_tecnologias_long():
-    p = PROCESSED / "internet_accesos_tecnologias_provincias_clean.csv"
+def fact_velocidad_rangos_long():
+    p = PROCESSED / "internet_accesos_velocidad_rangos_provincias_clean.csv"
     if not p.exists():
         return
-    f = read_csv(p)
-    f = add_common_keys(f)
+    write_table(velocidad_rangos_long(read_csv(p)), OUT / "fact_velocidad_rangos_long.csv")
+    print("✔ fact_velocidad_rangos_long.csv")
+
+
+def tecnologias_long(f: pd.DataFrame, dim_tec=None) -> pd.DataFrame:
+    f = add_common_keys(f.copy())
     cols_base = {"anio", "trimestre", "provincia", "ProvinciaNorm", "total"}
     tech_cols = [c for c in f.columns if c not in cols_base]
     long_df = f.melt(
@@ -252,7 +289,6 @@ def fact_tecnologias_long():
     )
     long_df["accesos"] = pd.to_numeric(long_df["accesos"], errors="coerce").fillna(0).astype("Int64")
     # Normalizamos similar al dim (el dim conserva acentos). Generamos una clave base sin espacios ni tildes para poder mapear.
-    import unicodedata
     def strip_accents(s):
         if pd.isna(s):
             return s
@@ -267,18 +303,63 @@ def fact_tecnologias_long():
     }
     long_df["tec_key"] = base_key.replace(remap)
     # Enriquecer con tecnologia_id desde dim_tecnologias_ready si existe
-    dim_path = OUT / "dim_tecnologias_ready.csv"
-    if dim_path.exists():
-        dim = read_csv(dim_path)
-        if "tec_key" in dim.columns and "tecnologia_id" in dim.columns:
-            dim_subset = dim[["tec_key", "tecnologia_id"]].drop_duplicates()
-            long_df = long_df.merge(dim_subset, on="tec_key", how="left")
-            if "tecnologia_id" in long_df.columns:
-                long_df["tecnologia_id"] = pd.to_numeric(long_df["tecnologia_id"], errors="coerce").astype("Int64")
-    write_csv(long_df, OUT / "fact_tecnologias_long.csv")
+    if dim_tec is not None and "tec_key" in dim_tec.columns and "tecnologia_id" in dim_tec.columns:
+        dim_subset = dim_tec[["tec_key", "tecnologia_id"]].drop_duplicates()
+        long_df = long_df.merge(dim_subset, on="tec_key", how="left")
+        if "tecnologia_id" in long_df.columns:
+            long_df["tecnologia_id"] = pd.to_numeric(long_df["tecnologia_id"], errors="coerce").astype("Int64")
+    return long_df
+
+
+def fact_tecnologias_long():
+    p = PROCESSED / "internet_accesos_tecnologias_provincias_clean.csv"
+    if not p.exists():
+        return
+    f = tecnologias_long(read_csv(p), _read_out_dim("dim_tecnologias_ready.csv"))
+    write_table(f, OUT / "fact_tecnologias_long.csv")
     print("✔ fact_tecnologias_long.csv")
 
 
+# ---------- 3) EN MEMORIA ----------
+
+def preparar_en_memoria(procesadas: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """Aplica las mismas transformaciones que main() sobre tablas ya cargadas.
+
+    `procesadas` usa como clave el nombre de archivo en data/processed
+    (p.ej. 'dim_provincias.csv', 'internet_accesos_tecnologias_provincias_clean.csv').
+    Devuelve {nombre de salida sin extensión: DataFrame} sin tocar disco.
+    """
+    def src(nombre):
+        return as_text(procesadas[nombre]) if nombre in procesadas else None
+
+    out: Dict[str, pd.DataFrame] = {}
+    dims = [
+        ("dim_provincias.csv", "dim_provincias_norm", dim_provincias_norm),
+        ("dim_tiempo.csv", "dim_tiempo_norm", dim_tiempo_norm),
+        ("dim_velocidades.csv", "dim_velocidades_ready", dim_velocidades_ready),
+        ("dim_tecnologias.csv", "dim_tecnologias_ready", dim_tecnologias_ready),
+    ]
+    for entrada, salida, fn in dims:
+        df = src(entrada)
+        if df is not None:
+            out[salida] = fn(df)
+    # Las dimensiones preparadas se consumen como texto, igual que al releer el CSV
+    dim_vel = as_text(out["dim_velocidades_ready"]) if "dim_velocidades_ready" in out else None
+    dim_tec = as_text(out["dim_tecnologias_ready"]) if "dim_tecnologias_ready" in out else None
+    hechos = [
+        ("internet_accesos_penetracion_provincias_clean.csv", "fact_penetracion_provincias", penetracion_provincias),
+        ("internet_velocidad_media_descarga_provincias_clean.csv", "fact_velocidad_media_provincias", lambda f: velocidad_media_provincias(f, dim_vel)),
+        ("internet_accesos_velocidad_provincias_clean.csv", "fact_velocidad_numerica_provincias", lambda f: velocidad_numerica_provincias(f, dim_vel)),
+        ("internet_accesos_velocidad_rangos_provincias_clean.csv", "fact_velocidad_rangos_long", velocidad_rangos_long),
+        ("internet_accesos_tecnologias_provincias_clean.csv", "fact_tecnologias_long", lambda f: tecnologias_long(f, dim_tec)),
+    ]
+    for entrada, salida, fn in hechos:
+        df = src(entrada)
+        if df is not None:
+            out[salida] = fn(df)
+    return out
+
+
 def main():
     print("🚀 Generando datasets normalizados para Tableau...")
     # Dimensiones
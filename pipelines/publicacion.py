@@ -0,0 +1,348 @@
+"""publicacion.py
+--------------
+Publicación versionada y atómica de carpetas de salida (p.ej.
+data/processed/dimensional). Antes se borraba la carpeta y se reconstruía
+en el lugar, así que durante toda la corrida Power BI / Tableau veían
+archivos faltantes o a medio escribir, y cada archivo se reescribía aunque
+no hubiera cambiado.
+
+- Cada corrida escribe en una versión nueva (staging) bajo
+  data/processed/.versiones/<carpeta>/<AAAAMMDDTHHMMSSffffff>.
+- escribir_tabla compara la huella del DataFrame con la entrada del
+  catálogo de la versión anterior: si es la misma, enlaza (hard link) los
+  archivos anteriores en vez de volver a escribirlos. Al publicar, los
+  archivos escritos por otras vías que resultan idénticos también se
+  reemplazan por enlaces, así cada versión ocupa solo lo que cambió.
+  Los escritores nunca truncan un archivo en el lugar (temporal +
+  os.replace, ver io_csv.reemplazar): reescribir un enlace no altera las
+  versiones que lo comparten.
+- La carpeta publicada es un symlink a la versión vigente; se cambia con
+  os.replace sobre un symlink temporal (atómico): un lector ve la versión
+  anterior o la nueva completa, nunca una mezcla.
+- Se conservan las últimas MANTENER_VERSIONES versiones (variable de
+  entorno VERSIONES_A_MANTENER) para volver atrás o comparar.
+- La primera vez, si la carpeta es un directorio real, se mueve como
+  versión inicial. Sin soporte de symlinks (algunos Windows) se copia
+  con enlaces duros y el cambio deja de ser atómico.
+- Una carpeta con archivos versionados en git (p.ej. data/processed/
+  dimensional) no se reemplaza por un symlink: git vería todos sus
+  archivos borrados. Sigue siendo un directorio real que se actualiza
+  archivo por archivo desde la versión (enlaces duros + os.replace, se
+  borran los que ya no están; los archivos ocultos como .gitkeep quedan).
+  Cada archivo cambia de forma atómica, la carpeta en conjunto no; las
+  versiones siguen guardándose en .versiones/ (ignorada por git).
+- conservar=True arranca la versión con los archivos de la anterior
+  (enlaces duros): para etapas que reescriben solo algunas tablas.
+
+Uso:
+  from pipelines.publicacion import Publicacion
+  with Publicacion(Path('data/processed/dimensional')) as version:
+      escribir_tabla(df, version.staging / 'dim_provincias.csv')
+  # al salir sin error: enlaces, catálogos, symlink y poda de versiones viejas
+"""
+from __future__ import annotations
+
+import filecmp
+import json
+import os
+import shutil
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    from .catalogo import (ARCHIVO_CATALOGO, archivos_de, carpetas_diferidas, copiar_entrada, diferir, firma,
+                           guardar_entrada, leer_catalogo, volcar)
+except ImportError:  # importado desde un script: python pipelines/etl_dimensional_completo.py
+    from catalogo import (ARCHIVO_CATALOGO, archivos_de, carpetas_diferidas, copiar_entrada, diferir, firma,
+                          guardar_entrada, leer_catalogo, volcar)
+
+CARPETA_VERSIONES = '.versiones'
+MANTENER_VERSIONES = int(os.getenv('VERSIONES_A_MANTENER', '3'))
+SUFIJO_STAGING = '.staging'
+ARCHIVO_VERSION = '_version.json'
+FORMATO_VERSION = '%Y%m%dT%H%M%S%f'
+FICLONE = 0x40049409  # ioctl de Linux para reflink
+
+# Publicaciones abiertas (escribir_tabla consulta si su destino está en un staging)
+_ACTIVAS: List['Publicacion'] = []
+
+
+def _clonar(origen: Path, destino: Path) -> None:
+    """Copia en el kernel: reflink (btrfs/XFS/APFS comparten bloques) o copy_file_range; si no, copia normal."""
+    with open(origen, 'rb') as f, open(destino, 'wb') as g:
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(g.fileno(), FICLONE, f.fileno())
+                return
+            except OSError:
+                pass
+        if hasattr(os, 'copy_file_range'):
+            try:
+                restante = os.fstat(f.fileno()).st_size
+                while restante > 0:
+                    copiados = os.copy_file_range(f.fileno(), g.fileno(), restante)
+                    if copiados == 0:
+                        break
+                    restante -= copiados
+                if restante == 0:
+                    return
+            except OSError:
+                pass
+            f.seek(0)
+            g.seek(0)
+            g.truncate()
+        shutil.copyfileobj(f, g)
+
+
+def materializar(origen: Path, destino: Path, enlace: bool = False) -> Path:
+    """Copia origen (archivo o carpeta) en destino sin pasar los datos por Python.
+
+    enlace=True usa hard links (las versiones publicadas no se modifican en el
+    lugar); si no, reflink / copy_file_range, así reescribir el original no
+    altera la copia. Cada archivo se reemplaza con os.replace (atómico).
+    """
+    origen, destino = Path(origen), Path(destino)
+    if origen.is_dir():
+        if destino.exists():
+            shutil.rmtree(destino)
+        for archivo in origen.rglob('*'):
+            if archivo.is_file():
+                materializar(archivo, destino / archivo.relative_to(origen), enlace)
+        return destino
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporal = destino.with_name(f'.{destino.name}.{os.getpid()}.tmp')
+    temporal.unlink(missing_ok=True)
+    try:
+        if not enlace:
+            raise OSError
+        os.link(origen, temporal)
+    except OSError:
+        _clonar(origen, temporal)
+    os.replace(temporal, destino)
+    return destino
+
+
+def reutilizar_tabla(origen_csv: Path, path_csv: Path, huella: str, enlace: bool = False) -> Optional[List[Path]]:
+    """Materializa los archivos de otra tabla con la misma huella (sin reescribirlos); None si no corresponde."""
+    origen_csv, path_csv = Path(origen_csv), Path(path_csv)
+    entrada = leer_catalogo(origen_csv.parent).get(origen_csv.stem)
+    if not entrada or entrada.get('huella') != huella:
+        return None
+    destinos = {}
+    for formato, info in entrada.get('archivos', {}).items():
+        ruta = origen_csv.parent / info['ruta']
+        if not ruta.exists() or (firma(ruta)['bytes'], firma(ruta)['mtime_ns']) != (info['bytes'], info['mtime_ns']):
+            return None
+        relativa = Path(info['ruta'])
+        destinos[formato] = (ruta, path_csv.parent / relativa.with_name(relativa.name.replace(origen_csv.stem, path_csv.stem, 1)))
+    if not destinos:
+        return None
+    for ruta, destino in destinos.values():
+        materializar(ruta, destino, enlace)
+    copiar_entrada(entrada, path_csv.parent, path_csv.stem, {f: d for f, (_, d) in destinos.items()})
+    return [d for _, d in destinos.values()]
+
+
+def version_vigente(destino: Path) -> Optional[Path]:
+    """Carpeta con el contenido publicado hoy (destino del symlink o el directorio real)."""
+    destino = Path(destino)
+    if destino.is_symlink():
+        return destino.resolve() if destino.exists() else None
+    return destino if destino.is_dir() else None
+
+
+def listar_versiones(destino: Path, versiones_dir: Optional[Path] = None) -> List[Path]:
+    """Versiones publicadas, de la más vieja a la más nueva."""
+    destino = Path(destino)
+    carpeta = Path(versiones_dir) if versiones_dir is not None else destino.parent / CARPETA_VERSIONES / destino.name
+    if not carpeta.is_dir():
+        return []
+    return sorted(d for d in carpeta.iterdir() if d.is_dir() and not d.name.endswith(SUFIJO_STAGING))
+
+
+def rastreada_por_git(carpeta: Path) -> bool:
+    """True si la carpeta (directorio real) tiene archivos versionados en git."""
+    carpeta = Path(carpeta)
+    if carpeta.is_symlink() or not carpeta.is_dir():
+        return False
+    try:
+        r = subprocess.run(['git', 'ls-files', '--', '.'], cwd=carpeta, capture_output=True, text=True, timeout=60)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return r.returncode == 0 and bool(r.stdout.strip())
+
+
+def publicacion_activa(path: Path) -> Optional['Publicacion']:
+    """Publicación abierta cuyo staging contiene path."""
+    path = Path(path).resolve()
+    for pub in _ACTIVAS:
+        if path.is_relative_to(pub.staging.resolve()):
+            return pub
+    return None
+
+
+class Publicacion:
+    """Versión en construcción de una carpeta de salida (context manager)."""
+
+    def __init__(self, destino: Path, mantener: int = MANTENER_VERSIONES, versiones_dir: Optional[Path] = None,
+                 conservar: bool = False):
+        self.destino = Path(destino)
+        self.conservar = conservar
+        self.mantener = max(1, mantener)
+        self.versiones = Path(versiones_dir) if versiones_dir is not None else \
+            self.destino.parent / CARPETA_VERSIONES / self.destino.name
+        self.version = datetime.now().strftime(FORMATO_VERSION)
+        self.staging = self.versiones / f'{self.version}{SUFIJO_STAGING}'
+        self.anterior = version_vigente(self.destino)
+        self.reutilizados: Dict[str, str] = {}
+
+    def __enter__(self) -> 'Publicacion':
+        self.staging.mkdir(parents=True, exist_ok=False)
+        if self.conservar and self.anterior is not None:
+            for archivo in self.anterior.rglob('*'):
+                if archivo.is_file() and archivo.name != ARCHIVO_VERSION:
+                    materializar(archivo, self.staging / archivo.relative_to(self.anterior), enlace=True)
+        _ACTIVAS.append(self)
+        # Catálogos en memoria: se escriben una vez al publicar
+        diferir(self.staging)
+        return self
+
+    def __exit__(self, tipo, valor, traza) -> bool:
+        _ACTIVAS.remove(self)
+        if tipo is not None:
+            volcar(self.staging, descartar=True)
+            shutil.rmtree(self.staging, ignore_errors=True)
+            return False
+        self.publicar()
+        return False
+
+    # ---------- Reutilización ----------
+
+    def _anterior_de(self, carpeta: Path) -> Optional[Path]:
+        if self.anterior is None:
+            return None
+        return self.anterior / Path(carpeta).resolve().relative_to(self.staging.resolve())
+
+    def reutilizar(self, path_csv: Path, huella: str) -> Optional[List[Path]]:
+        """Si la tabla no cambió desde la versión anterior, la enlaza y devuelve sus rutas."""
+        path_csv = Path(path_csv)
+        carpeta_anterior = self._anterior_de(path_csv.parent)
+        if carpeta_anterior is None:
+            return None
+        rutas = reutilizar_tabla(carpeta_anterior / path_csv.name, path_csv, huella, enlace=True)
+        for ruta in rutas or []:
+            for archivo in archivos_de(ruta):
+                self.reutilizados[str(archivo.resolve().relative_to(self.staging.resolve()))] = 'huella'
+        return rutas
+
+    def _deduplicar(self) -> None:
+        """Archivos escritos por otras vías e idénticos a la versión anterior -> hard link."""
+        if self.anterior is None:
+            return
+        for archivo in sorted(self.staging.rglob('*')):
+            relativo = archivo.relative_to(self.staging)
+            if not archivo.is_file() or archivo.name in (ARCHIVO_CATALOGO, ARCHIVO_VERSION) \
+                    or str(relativo) in self.reutilizados:
+                continue
+            previo = self.anterior / relativo
+            if previo.is_file() and previo.stat().st_size == archivo.stat().st_size \
+                    and filecmp.cmp(previo, archivo, shallow=False):
+                materializar(previo, archivo, enlace=True)
+                self.reutilizados[str(relativo)] = 'contenido'
+        # Los enlaces conservan el mtime anterior: se actualizan las firmas del catálogo
+        carpetas = {self.staging.resolve()} | {p.parent.resolve() for p in self.staging.rglob(ARCHIVO_CATALOGO)}
+        for carpeta in carpetas | set(carpetas_diferidas(self.staging)):
+            for nombre, entrada in leer_catalogo(carpeta).items():
+                cambios = False
+                for info in entrada.get('archivos', {}).values():
+                    ruta = carpeta / info['ruta']
+                    if ruta.exists():
+                        actual = firma(ruta)
+                        cambios |= (actual['bytes'], actual['mtime_ns']) != (info['bytes'], info['mtime_ns'])
+                        info.update(actual)
+                if cambios:
+                    guardar_entrada(carpeta, nombre, entrada)
+
+    # ---------- Publicación ----------
+
+    def _manifiesto(self) -> dict:
+        archivos = {}
+        for archivo in sorted(self.staging.rglob('*')):
+            if archivo.is_file() and archivo.name != ARCHIVO_VERSION:
+                relativo = str(archivo.relative_to(self.staging))
+                archivos[relativo] = {'bytes': archivo.stat().st_size, 'reutilizado': relativo in self.reutilizados}
+        return {
+            'version': self.version,
+            'anterior': self.anterior.name if self.anterior is not None else None,
+            'publicada': datetime.now().isoformat(timespec='seconds'),
+            'archivos': archivos,
+        }
+
+    def _migrar_directorio_real(self) -> None:
+        """Primera publicación: el directorio real pasa a ser la versión inicial."""
+        if self.destino.is_symlink() or not self.destino.is_dir():
+            return
+        inicial = self.versiones / datetime.fromtimestamp(self.destino.stat().st_mtime).strftime(FORMATO_VERSION)
+        os.rename(self.destino, inicial)
+        self.anterior = inicial
+
+    def _sincronizar(self, version: Path) -> None:
+        """Directorio real al contenido de la versión: enlaces duros archivo por archivo y se borra lo que ya no está."""
+        self.destino.mkdir(parents=True, exist_ok=True)
+        for archivo in version.rglob('*'):
+            destino = self.destino / archivo.relative_to(version)
+            if archivo.is_file() and archivo.name != ARCHIVO_VERSION \
+                    and not (destino.exists() and os.path.samefile(archivo, destino)):
+                materializar(archivo, destino, enlace=True)
+        for archivo in sorted(self.destino.rglob('*'), reverse=True):
+            if archivo.name.startswith('.'):
+                continue
+            if archivo.is_file() and not (version / archivo.relative_to(self.destino)).is_file():
+                archivo.unlink()
+            elif archivo.is_dir() and not any(archivo.iterdir()):
+                archivo.rmdir()
+
+    def _apuntar(self, version: Path) -> None:
+        temporal = self.destino.with_name(f'.{self.destino.name}.{os.getpid()}.tmp')
+        temporal.unlink(missing_ok=True)
+        try:
+            os.symlink(os.path.relpath(version, self.destino.parent), temporal, target_is_directory=True)
+        except (OSError, NotImplementedError):
+            # Sin symlinks: el directorio real se actualiza con enlaces duros (no atómico)
+            if self.destino.is_symlink():
+                self.destino.unlink()
+            self._sincronizar(version)
+            return
+        os.replace(temporal, self.destino)
+
+    def _podar(self, vigente: Path) -> List[Path]:
+        """Borra las versiones más viejas; quedan las últimas `mantener` (incluida la vigente)."""
+        versiones = listar_versiones(self.destino, self.versiones)
+        viejas = [v for v in versiones[:-self.mantener] if v != vigente]
+        for v in viejas:
+            shutil.rmtree(v, ignore_errors=True)
+        return viejas
+
+    def publicar(self) -> Path:
+        """Deduplica, cierra la versión, cambia el symlink y poda versiones viejas."""
+        self._deduplicar()
+        volcar(self.staging)
+        (self.staging / ARCHIVO_VERSION).write_text(
+            json.dumps(self._manifiesto(), ensure_ascii=False, indent=1), encoding='utf-8')
+        final = self.versiones / self.version
+        os.rename(self.staging, final)
+        if rastreada_por_git(self.destino):
+            # Archivos versionados en git: la carpeta sigue siendo un directorio real
+            self._sincronizar(final)
+        else:
+            self._migrar_directorio_real()
+            self._apuntar(final)
+        self._podar(final)
+        return final
@@ -0,0 +1,92 @@
+"""salida_arrow.py
+---------------
+Salida Arrow IPC (Feather v2 sin compresión) del modelo dimensional y de
+fact_unificado_long. La notebook, los tests y los servicios la abren con
+pyarrow.memory_map y comparten las páginas del archivo en la caché del
+sistema operativo en vez de cargar cada uno su copia del CSV.
+
+Sin compresión el archivo se mapea tal cual: abrir una tabla solo lee el
+esquema y el pie (milisegundos, sin importar el tamaño) y seleccionar o
+rebanar columnas no copia datos; las páginas se leen recién al usarlas.
+
+Se activa con FORMATO_SALIDA (ver salida_parquet.py):
+  FORMATO_SALIDA=csv+arrow python pipelines/etl_dimensional_completo.py
+
+Salidas (junto a cada carpeta de CSV):
+  dimensional/arrow/dim_provincias.arrow
+  dimensional/arrow/fact_internet_accesos_tecnologias.arrow
+  out/arrow/fact_unificado_long.arrow
+
+- Columnas tipadas como en Parquet (tipar) y fact_* ordenadas por
+  (anio, trimestre, provincia_id) para rebanar por período sin filtrar.
+- Escritura a un temporal + os.replace: quien tenga el archivo mapeado
+  sigue leyendo la versión anterior en vez de ver un archivo truncado.
+
+Uso:
+  from pipelines.salida_arrow import abrir_arrow
+  tabla = abrir_arrow(OUT_DIR / 'arrow', 'fact_unificado_long', columnas=['anio', 'valor'])
+
+Requiere pyarrow (opcional, ver requirements.txt).
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Optional, Sequence
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+try:
+    from .salida_parquet import ORDEN_HECHOS, es_hecho, tipar
+except ImportError:  # importado desde un script: python pipelines/prepare_enacom.py
+    from salida_parquet import ORDEN_HECHOS, es_hecho, tipar
+
+CARPETA_ARROW = 'arrow'
+EXTENSION = '.arrow'
+FILAS_POR_LOTE = 64 * 1024
+
+
+def _requiere_pyarrow():
+    if not HAS_PYARROW:
+        raise ImportError("La salida arrow requiere pyarrow. Instálelo con:\n  pip install pyarrow")
+
+
+def ruta_arrow(carpeta: Path, nombre: str) -> Path:
+    return Path(carpeta) / f'{nombre}{EXTENSION}'
+
+
+def escribir_arrow(df: pd.DataFrame, carpeta: Path, nombre: str, filas_por_lote: int = FILAS_POR_LOTE) -> Path:
+    """Escribe df como Feather v2 sin compresión en <carpeta>/<nombre>.arrow."""
+    _requiere_pyarrow()
+    carpeta = Path(carpeta)
+    carpeta.mkdir(parents=True, exist_ok=True)
+    df = tipar(df)
+    if es_hecho(nombre, df):
+        orden = [c for c in ORDEN_HECHOS if c in df.columns]
+        df = df.sort_values(orden, na_position='last', kind='stable').reset_index(drop=True)
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    destino = ruta_arrow(carpeta, nombre)
+    temporal = destino.with_name(f'.{destino.name}.tmp')
+    feather.write_feather(tabla, temporal, compression='uncompressed', chunksize=filas_por_lote, version=2)
+    os.replace(temporal, destino)
+    return destino
+
+
+def abrir_arrow(carpeta: Path, nombre: str, columnas: Optional[Sequence[str]] = None):
+    """pa.Table respaldada por el archivo mapeado en memoria (sin copiar datos)."""
+    _requiere_pyarrow()
+    fuente = pa.memory_map(str(ruta_arrow(carpeta, nombre)), 'r')
+    tabla = pa.ipc.open_file(fuente).read_all()
+    return tabla.select(list(columnas)) if columnas else tabla
+
+
+def leer_arrow(carpeta: Path, nombre: str, columnas: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Como abrir_arrow pero convertido a DataFrame (esto sí materializa las columnas pedidas)."""
+    return abrir_arrow(carpeta, nombre, columnas).to_pandas()
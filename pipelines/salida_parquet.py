@@ -0,0 +1,250 @@
+"""salida_parquet.py
+-----------------
+Sumidero Parquet común a todos los escritores del pipeline (modelo
+dimensional, tablas OUT de prepare_enacom, etapas analíticas y
+pipeline_api), para que Power BI, Tableau y los cargadores lean columnas
+tipadas y comprimidas con poda de particiones en vez de re-parsear texto.
+
+El formato se elige con la variable de entorno FORMATO_SALIDA:
+  csv (por defecto) | parquet | ambos (csv+parquet) | arrow
+y se combinan con '+', p.ej. FORMATO_SALIDA=csv+arrow (IPC mapeable en
+memoria, ver salida_arrow.py).
+
+Junto a cada carpeta de CSV se crea una subcarpeta parquet/:
+  dimensional/parquet/dim_provincias.parquet
+  dimensional/parquet/fact_internet_accesos_tecnologias/dominio=internet/anio=2014/part-0.parquet
+  out/parquet/fact_unificado_long/dominio=Internet/anio=2024/part-0.parquet
+
+- Columnas tipadas (texto numérico -> entero/decimal, anio/trimestre/mes
+  compactos, True/False -> booleano) y compresión zstd.
+- Las tablas fact_* se ordenan por (anio, trimestre, provincia_id) y se
+  particionan por dominio y anio (dominio se deduce del nombre si falta).
+- Row groups de hasta FILAS_POR_GRUPO filas, el tamaño que los motores BI
+  leen de a un bloque.
+
+Requiere pyarrow (opcional, ver requirements.txt).
+"""
+from __future__ import annotations
+
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .catalogo import entrada_vigente, hashes_columnas, huella_tabla, registrar
+    from .io_csv import escribir_csv as _escribir_csv_arrow, proyectar_csv, reemplazar
+    from .publicacion import publicacion_activa, reutilizar_tabla
+except ImportError:  # importado desde un script: python pipelines/prepare_enacom.py
+    from catalogo import entrada_vigente, hashes_columnas, huella_tabla, registrar
+    from io_csv import escribir_csv as _escribir_csv_arrow, proyectar_csv, reemplazar
+    from publicacion import publicacion_activa, reutilizar_tabla
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+FORMATOS = ('csv', 'parquet', 'ambos', 'arrow')
+CARPETA_PARQUET = 'parquet'
+COMPRESION = 'zstd'
+FILAS_POR_GRUPO = 1_000_000
+ORDEN_HECHOS = ['anio', 'trimestre', 'provincia_id']
+PARTICIONES = ['dominio', 'anio']
+# Prefijos de nombre de archivo ENACOM -> dominio
+DOMINIOS = ('internet', 'comunicaciones_moviles', 'telefonia_fija', 'tv', 'mercado_postal', 'portabilidad')
+_ENTEROS_CHICOS = {'anio': 'Int16', 'trimestre': 'Int8', 'mes': 'Int8'}
+
+
+def formato_salida(formato: Optional[str] = None) -> str:
+    """Formato pedido (argumento o FORMATO_SALIDA); 'csv' si no se indicó."""
+    formato = (formato or os.getenv('FORMATO_SALIDA') or 'csv').strip().lower()
+    for parte in formato.split('+'):
+        if parte.strip() not in FORMATOS:
+            raise ValueError(f"Formato de salida desconocido: {formato}. Opciones: {FORMATOS} (combinables con '+')")
+    return '+'.join(p.strip() for p in formato.split('+'))
+
+
+def componentes_formato(formato: Optional[str] = None) -> set:
+    """'ambos' -> {'csv', 'parquet'}; 'csv+arrow' -> {'csv', 'arrow'}."""
+    partes = set(formato_salida(formato).split('+'))
+    if 'ambos' in partes:
+        partes = (partes - {'ambos'}) | {'csv', 'parquet'}
+    return partes
+
+
+def dominio_desde_nombre(nombre: str) -> Optional[str]:
+    """'fact_internet_accesos_tecnologias' -> 'internet'; None si no se reconoce."""
+    base = nombre[5:] if nombre.startswith('fact_') else nombre
+    for dominio in DOMINIOS:
+        if base == dominio or base.startswith(dominio + '_'):
+            return dominio
+    return None
+
+
+def tipar(df: pd.DataFrame) -> pd.DataFrame:
+    """Convierte columnas de texto a su tipo real (los CSV de prepare_enacom se leen como str)."""
+    df = df.copy()
+    for col in df.columns:
+        s = df[col]
+        if col in _ENTEROS_CHICOS and s.isna().all():
+            df[col] = s.astype('float64').astype(_ENTEROS_CHICOS[col])
+            continue
+        if s.dtype == object or pd.api.types.is_string_dtype(s):
+            # Se convierten los valores distintos (pocos en claves y atributos) y se
+            # expanden con los códigos de factorize; -1 = nulo
+            codigos, distintos = pd.factorize(s)
+            texto = pd.Series(distintos, dtype=object).astype(str).str.strip()
+            nulos = codigos < 0
+            if len(texto) and texto.str.lower().isin(['true', 'false']).all():
+                valores = pd.array((texto.str.lower() == 'true').to_numpy()[codigos], dtype='boolean')
+                valores[nulos] = pd.NA
+                df[col] = pd.Series(valores, index=s.index)
+                continue
+            num = pd.to_numeric(texto, errors='coerce').to_numpy(dtype='float64')
+            # Códigos con ceros a la izquierda (p.ej. INDEC '06') siguen siendo texto
+            con_ceros = texto.str.match(r'^0\d').any()
+            if len(texto) and not np.isnan(num).any() and not con_ceros:
+                s = pd.Series(np.where(nulos, np.nan, num[codigos]), index=s.index)
+            else:
+                df[col] = s.astype('string')
+                continue
+        if pd.api.types.is_float_dtype(s) and s.notna().any() and (s.dropna() % 1 == 0).all():
+            s = s.astype('Int64')
+        if col in _ENTEROS_CHICOS and pd.api.types.is_integer_dtype(s):
+            s = s.astype(_ENTEROS_CHICOS[col])
+        df[col] = s
+    return df
+
+
+def es_hecho(nombre: str, df: pd.DataFrame) -> bool:
+    return nombre.startswith('fact_') and 'anio' in df.columns
+
+
+def escribir_parquet(df: pd.DataFrame, carpeta: Path, nombre: str,
+                     filas_por_grupo: int = FILAS_POR_GRUPO) -> Path:
+    """Escribe df como Parquet zstd; las fact_* como dataset particionado (hive).
+
+    Devuelve la ruta del archivo (dimensiones) o de la carpeta del dataset (hechos).
+    Re-escribir reemplaza por completo la salida anterior de esa tabla.
+    """
+    if not HAS_PYARROW:
+        raise ImportError("La salida parquet requiere pyarrow. Instálelo con:\n  pip install pyarrow")
+    carpeta = Path(carpeta)
+    carpeta.mkdir(parents=True, exist_ok=True)
+    df = tipar(df)
+    if not es_hecho(nombre, df):
+        destino = carpeta / f'{nombre}.parquet'
+        tabla = pa.Table.from_pandas(df, preserve_index=False)
+        reemplazar(destino, lambda temporal: pq.write_table(tabla, temporal, compression=COMPRESION,
+                                                             row_group_size=filas_por_grupo))
+        return destino
+
+    if 'dominio' not in df.columns:
+        df.insert(0, 'dominio', dominio_desde_nombre(nombre) or 'otros')
+    orden = [c for c in ORDEN_HECHOS if c in df.columns]
+    df = df.sort_values(orden, na_position='last', kind='stable').reset_index(drop=True)
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    particiones = [c for c in PARTICIONES if c in df.columns]
+    destino = carpeta / nombre
+    if destino.exists():
+        shutil.rmtree(destino)
+    ds.write_dataset(
+        tabla, destino, format='parquet',
+        partitioning=ds.partitioning(tabla.select(particiones).schema, flavor='hive'),
+        file_options=ds.ParquetFileFormat().make_write_options(compression=COMPRESION),
+        basename_template='part-{i}.parquet',
+        max_rows_per_group=filas_por_grupo,
+        min_rows_per_group=min(filas_por_grupo, max(len(df), 1)),
+        # Un solo hilo: conserva el orden (anio, trimestre, provincia_id) dentro de cada archivo
+        use_threads=False,
+    )
+    return destino
+
+
+def leer_parquet(carpeta: Path, nombre: str, columnas: Optional[Sequence[str]] = None, filtro=None) -> pd.DataFrame:
+    """Lee una tabla escrita por escribir_parquet (archivo o dataset particionado)."""
+    if not HAS_PYARROW:
+        raise ImportError("La lectura parquet requiere pyarrow. Instálelo con:\n  pip install pyarrow")
+    carpeta = Path(carpeta)
+    ruta = carpeta / nombre if (carpeta / nombre).is_dir() else carpeta / f'{nombre}.parquet'
+    dataset = ds.dataset(ruta, format='parquet', partitioning='hive')
+    return dataset.to_table(columns=list(columnas) if columnas else None, filter=filtro).to_pandas()
+
+
+# Escritores equivalentes a df.to_csv(index=False): sus CSV se pueden proyectar campo a campo
+_ESCRITORES_TO_CSV = {'io_csv.escribir_csv', 'prepare_enacom.write_csv'}
+
+
+def _nombre_escritor(escribir_csv: Callable) -> str:
+    # Sin el paquete: igual nombre importado como pipelines.io_csv o como io_csv (script)
+    return f"{escribir_csv.__module__.rsplit('.', 1)[-1]}.{escribir_csv.__qualname__}"
+
+
+def _es_proyeccion(df: pd.DataFrame, entrada: Optional[dict], escritor: str, hashes: List[str]) -> bool:
+    """df son columnas de la tabla registrada en entrada, sin cambios y escritas con el mismo escritor."""
+    if entrada is None or entrada.get('escritor') != escritor or escritor not in _ESCRITORES_TO_CSV \
+            or df.columns.duplicated().any():
+        return False
+    origen = {c['nombre']: c.get('hash') for c in entrada.get('columnas', [])}
+    return all(origen.get(c) == h for c, h in zip(df.columns, hashes))
+
+
+def escribir_tabla(df: pd.DataFrame, path_csv: Path, escribir_csv: Optional[Callable] = None,
+                   formato: Optional[str] = None, origen: Optional[Path] = None,
+                   procedencia: Optional[dict] = None) -> List[Path]:
+    """Punto único de escritura: CSV en path_csv, Parquet en <carpeta>/parquet/ y/o Arrow en <carpeta>/arrow/.
+
+    escribir_csv: función (df, path) que el módulo llamador ya usaba para el CSV
+    (por defecto io_csv.escribir_csv, igual byte a byte a df.to_csv(index=False)).
+    origen: CSV (registrado en el catálogo) del que df es copia o subconjunto de
+    columnas; si el contenido coincide, los archivos se materializan desde ahí
+    (reflink / copy_file_range) o el CSV se proyecta sin parsearlo.
+    procedencia: de qué entradas y parámetros sale df; queda en el catálogo
+    para cachear tablas derivadas (ver build_correlaciones.py).
+    """
+    partes = componentes_formato(formato)
+    path_csv = Path(path_csv)
+    escritor = _nombre_escritor(escribir_csv or _escribir_csv_arrow)
+    hashes = hashes_columnas(df)
+    huella = huella_tabla(df, partes, escritor, hashes, procedencia)
+    # Dentro de una publicación versionada: si la tabla no cambió, se enlazan los archivos anteriores
+    publicacion = publicacion_activa(path_csv)
+    if publicacion is not None:
+        reutilizados = publicacion.reutilizar(path_csv, huella)
+        if reutilizados is not None:
+            return reutilizados
+    entrada_origen = None
+    if origen is not None:
+        origen = Path(origen)
+        copiados = reutilizar_tabla(origen, path_csv, huella)
+        if copiados is not None:
+            return copiados
+        entrada_origen = entrada_vigente(origen.parent, origen.stem)
+    archivos = {}
+    if 'csv' in partes:
+        if _es_proyeccion(df, entrada_origen, escritor, hashes):
+            proyectar_csv(origen, path_csv, [str(c) for c in df.columns])
+        elif escribir_csv is None:
+            _escribir_csv_arrow(df, path_csv)
+        else:
+            # Temporal + os.replace: path_csv puede ser un hard link compartido con otra versión
+            reemplazar(path_csv, lambda temporal: escribir_csv(df, temporal))
+        archivos['csv'] = path_csv
+    if 'parquet' in partes:
+        archivos['parquet'] = escribir_parquet(df, path_csv.parent / CARPETA_PARQUET, path_csv.stem)
+    if 'arrow' in partes:
+        try:
+            from .salida_arrow import CARPETA_ARROW, escribir_arrow
+        except ImportError:  # importado desde un script: python pipelines/prepare_enacom.py
+            from salida_arrow import CARPETA_ARROW, escribir_arrow
+        archivos['arrow'] = escribir_arrow(df, path_csv.parent / CARPETA_ARROW, path_csv.stem)
+    # Estadísticas al escribir (filas, rangos, métricas): ver catalogo.py
+    registrar(path_csv.parent, path_csv.stem, df, archivos, huella, hashes, escritor, procedencia)
+    return list(archivos.values())
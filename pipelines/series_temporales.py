@@ -0,0 +1,111 @@
+"""series_temporales.py
+--------------------
+Utilidades compartidas por las etapas analíticas que trabajan sobre la
+tabla unificada `fact_unificado_long`: identificación de series y un índice
+de período trimestral entero para poder comparar y desplazar períodos de
+forma vectorizada.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .etl_dimensional_completo import normalizar_texto
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DIM_TIEMPO_PATH = BASE_DIR / 'data' / 'processed' / 'dimensional' / 'dim_tiempo.csv'
+
+# Columnas que identifican una serie dentro de fact_unificado_long
+# (partido/localidad solo existen en tablas a grano localidad)
+SERIE_COLS = ['dominio', 'subcategoria', 'variable', 'ProvinciaNorm', 'partido', 'localidad']
+PERIODO_COLS = ['anio', 'trimestre']
+# Nombres ENACOM que no coinciden con dim_provincias tras normalizar
+ALIAS_PROVINCIAS = {
+    'CAPITAL FEDERAL': 'CABA',
+    'CIUDAD AUTONOMA DE BUENOS AIRES': 'CABA',
+}
+
+
+def columnas_serie(df: pd.DataFrame) -> List[str]:
+    """Subconjunto de SERIE_COLS presente en df (el placeholder no trae provincia)."""
+    return [c for c in SERIE_COLS if c in df.columns]
+
+
+def clave_provincia(df: pd.DataFrame) -> pd.Series:
+    """ProvinciaNorm llevada al formato de dim_provincias (upper, sin tildes, alias CABA)."""
+    if 'ProvinciaNorm' not in df.columns:
+        return pd.Series(np.nan, index=df.index, dtype=object)
+    return df['ProvinciaNorm'].map(normalizar_texto).replace(ALIAS_PROVINCIAS)
+
+
+def cargar_dim_tiempo() -> pd.DataFrame:
+    """dim_tiempo del modelo dimensional; vacía si aún no fue generada."""
+    if DIM_TIEMPO_PATH.exists():
+        return pd.read_csv(DIM_TIEMPO_PATH)
+    return pd.DataFrame(columns=['tiempo_id', 'anio', 'trimestre'])
+
+
+def trimestre_efectivo(df: pd.DataFrame) -> pd.Series:
+    """Trimestre de cada fila; se deriva de `mes` si falta y se asume 4 (cierre anual) si no hay dato."""
+    if 'trimestre' in df.columns:
+        tri = pd.to_numeric(df['trimestre'], errors='coerce')
+    else:
+        tri = pd.Series(float('nan'), index=df.index)
+    if 'mes' in df.columns:
+        mes = pd.to_numeric(df['mes'], errors='coerce')
+        tri = tri.fillna((mes - 1) // 3 + 1)
+    return tri.fillna(4).astype('int64')
+
+
+def agregar_periodo_idx(df: pd.DataFrame) -> pd.DataFrame:
+    """Agrega `periodo_idx` = anio * 4 + (trimestre - 1); los lags trimestral y anual son -1 y -4."""
+    df = df.copy()
+    anio = pd.to_numeric(df['anio'], errors='coerce')
+    df['periodo_idx'] = (anio * 4 + trimestre_efectivo(df) - 1).astype('Int64')
+    return df
+
+
+def periodo_desde_idx(idx) -> pd.DataFrame:
+    """Inversa de agregar_periodo_idx: devuelve anio y trimestre."""
+    idx = pd.Series(idx, dtype='int64')
+    return pd.DataFrame({'anio': idx // 4, 'trimestre': idx % 4 + 1})
+
+
+def grilla_periodos(dim_tiempo: pd.DataFrame, observados=None) -> pd.DataFrame:
+    """Grilla trimestral completa (anio, trimestre, periodo_idx[, tiempo_id]).
+
+    Se toma de dim_tiempo y se extiende con los períodos observados que no
+    estén en la dimensión, para no descartar datos.
+    """
+    grilla = agregar_periodo_idx(dim_tiempo.dropna(subset=['anio']))
+    grilla = grilla.dropna(subset=['periodo_idx'])
+    idx = set(grilla['periodo_idx'].astype('int64'))
+    if observados is not None:
+        idx |= set(pd.Series(observados).dropna().astype('int64'))
+    todos = periodo_desde_idx(sorted(idx))
+    todos['periodo_idx'] = todos['anio'] * 4 + todos['trimestre'] - 1
+    if 'tiempo_id' in grilla.columns:
+        ids = grilla.drop_duplicates('periodo_idx')
+        todos['tiempo_id'] = todos['periodo_idx'].map(dict(zip(ids['periodo_idx'].astype('int64'), ids['tiempo_id'])))
+    return todos
+
+
+def matriz_series(df: pd.DataFrame, claves: List[str], periodos_idx, valor: str = 'valor') -> Tuple[np.ndarray, pd.DataFrame]:
+    """Pivota df a una matriz período × serie (NaN donde falta el dato).
+
+    `periodos_idx` define las filas (ordenadas); cada combinación de `claves`
+    es una columna. Devuelve (matriz, series) donde `series` tiene una fila
+    por columna de la matriz con los valores de las claves. Si hay más de un
+    valor por celda se conserva el último.
+    """
+    periodos_idx = np.asarray(periodos_idx, dtype='int64')
+    codigos = df.groupby(claves, dropna=False, sort=True).ngroup().to_numpy()
+    series = df[claves].assign(_serie=codigos).drop_duplicates('_serie').sort_values('_serie')
+    series = series.drop(columns='_serie').reset_index(drop=True)
+    filas = np.searchsorted(periodos_idx, df['periodo_idx'].to_numpy(dtype='int64'))
+    matriz = np.full((len(periodos_idx), len(series)), np.nan)
+    matriz[filas, codigos] = pd.to_numeric(df[valor], errors='coerce').to_numpy(dtype='float64')
+    return matriz, series
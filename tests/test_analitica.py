@@ -0,0 +1,439 @@
+"""
+Tests de las etapas analíticas vectorizadas sobre fact_unificado_long
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from pipelines.etl_dimensional_completo import crear_dim_provincias
+from pipelines.build_metricas_derivadas import calcular_metricas_derivadas
+from pipelines.build_series_completas import completar_series, interpolar_matriz
+from pipelines.build_pronosticos import ajustar_tendencias, calcular_pronosticos
+from pipelines.build_distribucion_velocidades import (
+    calcular_distribucion_velocidades, cuantiles_histograma, limites_desde_etiqueta,
+)
+from pipelines import build_correlaciones, build_distribucion_velocidades
+from pipelines.build_correlaciones import calcular_correlaciones, correlaciones_cacheadas
+from pipelines.catalogo import entrada_vigente
+from pipelines.build_anomalias import detectar_anomalias, escribir_reporte, z_robusto_movil
+from pipelines.build_rollups import calcular_rollups
+from pipelines.build_cubo_metricas import abrir_cubo, construir_cubo, escribir_cubo
+from pipelines.build_diccionario_metricas import generar_diccionario
+from pipelines.fact_indexado import FactIndexado, cargar_fact_indexado, escribir_indice
+from pipelines.io_csv import escribir_csv, leer_csv
+
+
+def _fact_sintetico():
+    """Dos provincias x dos tecnologías x 6 trimestres (2022T1-2023T2)"""
+    filas = []
+    periodos = [(2022, 1), (2022, 2), (2022, 3), (2022, 4), (2023, 1), (2023, 2)]
+    for prov, base in (('CORDOBA', 100.0), ('SANTA FE', 50.0)):
+        for tec, factor in (('fibra', 1.0), ('adsl', 3.0)):
+            for i, (anio, tri) in enumerate(periodos):
+                filas.append({
+                    'anio': anio, 'trimestre': tri, 'ProvinciaNorm': prov,
+                    'dominio': 'Internet', 'subcategoria': 'tecnologias', 'variable': tec,
+                    'valor': base * factor * (1 + 0.1 * i), 'unidad': 'accesos',
+                    'fuente_archivo': 'internet_accesos_tecnologias_provincias_clean.csv',
+                })
+    return pd.DataFrame(filas)
+
+
+@pytest.fixture(scope='module')
+def dim_provincias():
+    return crear_dim_provincias()
+
+
+class TestMetricasDerivadas:
+    def test_crecimiento(self, dim_provincias):
+        d = calcular_metricas_derivadas(_fact_sintetico(), dim_provincias)
+        fila = d[(d['ProvinciaNorm'] == 'CORDOBA') & (d['variable'] == 'fibra') & (d['anio'] == 2023) & (d['trimestre'] == 1)].iloc[0]
+        assert fila['crec_trimestral'] == pytest.approx(1.4 / 1.3 - 1)
+        assert fila['crec_interanual'] == pytest.approx(1.4 / 1.0 - 1)
+        primero = d[(d['anio'] == 2022) & (d['trimestre'] == 1)]
+        assert primero['crec_trimestral'].isna().all()
+
+    def test_crecimiento_respeta_huecos(self, dim_provincias):
+        fact = _fact_sintetico()
+        fact = fact[~((fact['anio'] == 2022) & (fact['trimestre'] == 4))]
+        d = calcular_metricas_derivadas(fact, dim_provincias)
+        # 2023T1 no tiene trimestre previo: no debe compararse contra 2022T3
+        assert d[(d['anio'] == 2023) & (d['trimestre'] == 1)]['crec_trimestral'].isna().all()
+
+    def test_per_capita_y_participacion(self, dim_provincias):
+        d = calcular_metricas_derivadas(_fact_sintetico(), dim_provincias)
+        pob = dim_provincias.set_index('provincia').loc['CORDOBA', 'poblacion_2023']
+        fila = d[(d['ProvinciaNorm'] == 'CORDOBA') & (d['variable'] == 'fibra')].iloc[0]
+        assert fila['provincia_id'] == dim_provincias.set_index('provincia').loc['CORDOBA', 'provincia_id']
+        assert fila['accesos_cada_100_hab'] == pytest.approx(100.0 / pob * 100)
+        assert fila['participacion'] == pytest.approx(0.25)
+        suma = d.groupby(['ProvinciaNorm', 'anio', 'trimestre'])['participacion'].sum()
+        assert np.allclose(suma, 1.0)
+        sup = dim_provincias.set_index('provincia').loc['CORDOBA', 'superficie_km2']
+        assert fila['accesos_por_km2'] == pytest.approx(100.0 / sup)
+
+    def test_crecimiento_series_mensuales(self, dim_provincias):
+        fact = pd.DataFrame({
+            'dominio': 'internet', 'subcategoria': 'accesos', 'variable': 'fibra', 'ProvinciaNorm': 'CORDOBA',
+            'anio': [2022] * 12 + [2023] * 3, 'mes': list(range(1, 13)) + [1, 2, 3],
+            'valor': [float(v) for v in range(100, 115)],
+        })
+        d = calcular_metricas_derivadas(fact, dim_provincias).set_index(['anio', 'mes'])
+        # Mismo mes del trimestre anterior (3 meses) y del año anterior (12 meses)
+        assert d.loc[(2022, 4), 'crec_trimestral'] == pytest.approx(103 / 100 - 1)
+        assert d.loc[(2023, 2), 'crec_interanual'] == pytest.approx(113 / 101 - 1)
+        assert d.loc[[(2022, 1), (2022, 2), (2022, 3)], 'crec_trimestral'].isna().all()
+
+    def test_ranking(self, dim_provincias):
+        d = calcular_metricas_derivadas(_fact_sintetico(), dim_provincias)
+        fibra = d[(d['variable'] == 'fibra') & (d['anio'] == 2022) & (d['trimestre'] == 1)].set_index('ProvinciaNorm')
+        assert fibra.loc['CORDOBA', 'ranking_provincia'] == 1
+        assert fibra.loc['SANTA FE', 'ranking_provincia'] == 2
+
+    def test_ranking_solo_grano_provincia(self, dim_provincias):
+        fact = _fact_sintetico()
+        base = fact[(fact['ProvinciaNorm'] == 'SANTA FE') & (fact['variable'] == 'fibra') & (fact['anio'] == 2022)
+                    & (fact['trimestre'] == 1)]
+        localidad = base.assign(localidad='ROSARIO', valor=1e6)
+        mensual = base.assign(mes=2, valor=1e6)
+        d = calcular_metricas_derivadas(pd.concat([fact, localidad, mensual], ignore_index=True), dim_provincias)
+        fibra = d[(d['variable'] == 'fibra') & (d['anio'] == 2022) & (d['trimestre'] == 1)]
+        provincial = fibra[fibra['localidad'].isna() & fibra['mes'].isna()].set_index('ProvinciaNorm')
+        assert provincial.loc['CORDOBA', 'ranking_provincia'] == 1
+        assert provincial.loc['SANTA FE', 'ranking_provincia'] == 2
+        assert fibra[fibra['localidad'].notna() | fibra['mes'].notna()]['ranking_provincia'].isna().all()
+
+
+class TestSeriesCompletas:
+    def _dim_tiempo(self):
+        return pd.DataFrame({
+            'tiempo_id': [f'TM{i:02d}' for i in range(1, 9)],
+            'anio': [2022] * 4 + [2023] * 4,
+            'trimestre': [1, 2, 3, 4] * 2,
+        })
+
+    def test_interpolacion_matricial(self):
+        m = np.array([[np.nan, 1.0], [1.0, np.nan], [np.nan, np.nan], [4.0, 4.0], [np.nan, np.nan]])
+        lineal = interpolar_matriz(m, 'lineal')
+        assert np.isnan(lineal[0, 0]) and np.isnan(lineal[4, 0])
+        assert lineal[2, 0] == pytest.approx(2.5)
+        assert lineal[1, 1] == pytest.approx(2.0)
+        arrastre = interpolar_matriz(m, 'arrastre')
+        assert arrastre[2, 0] == 1.0 and arrastre[4, 1] == 4.0
+        with pytest.raises(ValueError):
+            interpolar_matriz(m, 'spline')
+
+    def test_completa_huecos_y_marca(self):
+        fact = _fact_sintetico()
+        hueco = (fact['ProvinciaNorm'] == 'SANTA FE') & (fact['anio'] == 2022) & (fact['trimestre'] == 3)
+        completo = completar_series(fact[~hueco], self._dim_tiempo())
+        imputadas = completo[completo['imputado']]
+        # 2 tecnologías en el hueco de Santa Fe; 2023T3-T4 no se extrapolan en modo lineal
+        assert len(imputadas) == 2
+        esperado = fact[hueco].set_index('variable')['valor']
+        obtenido = imputadas.set_index('variable')['valor']
+        assert np.allclose(obtenido.loc[esperado.index], esperado)
+        assert (imputadas['fuente_archivo'] == fact['fuente_archivo'].iloc[0]).all()
+        # Re-ejecutar no acumula imputaciones
+        assert len(completar_series(completo, self._dim_tiempo())) == len(completo)
+
+    def test_observadas_sin_cambios_y_duplicados(self):
+        fact = _fact_sintetico()
+        fact['fuente_archivo'] = [f'f{i}' for i in range(len(fact))]
+        hueco = (fact['ProvinciaNorm'] == 'SANTA FE') & (fact['anio'] == 2022) & (fact['trimestre'] == 3)
+        completo = completar_series(fact[~hueco], self._dim_tiempo())
+        observadas = completo[~completo['imputado']].drop(columns='imputado')
+        pd.testing.assert_frame_equal(observadas.reset_index(drop=True), fact[~hueco].reset_index(drop=True))
+        # Imputadas con los atributos de la última observación de su serie
+        assert set(completo.loc[completo['imputado'], 'fuente_archivo']) == {'f17', 'f23'}
+        # Mismo (serie, período) con valores distintos: error explícito; duplicado idéntico se conserva
+        assert len(completar_series(pd.concat([fact, fact.head(1)]), self._dim_tiempo())) == len(fact) + 1
+        with pytest.raises(ValueError, match='serie, período'):
+            completar_series(pd.concat([fact, fact.head(1).assign(valor=-1.0)]), self._dim_tiempo())
+
+    def test_series_anuales_sin_cambios(self):
+        fact = pd.DataFrame({'anio': [2021, 2022], 'dominio': ['Internet'] * 2, 'subcategoria': ['Accesos'] * 2,
+                             'variable': ['accesos'] * 2, 'valor': [1, 2], 'fuente_archivo': ['f'] * 2})
+        completo = completar_series(fact, self._dim_tiempo())
+        assert len(completo) == 2 and not completo['imputado'].any()
+
+
+class TestPronosticos:
+    def test_tendencia_exacta_con_huecos(self):
+        # Dos series lineales exactas, la segunda con un dato faltante
+        m = np.arange(10, dtype=float)[:, None] * np.array([[1.0, 2.0]]) + np.array([[0.0, 5.0]])
+        m[3, 1] = np.nan
+        pred, inf, sup, n_obs, futuros = ajustar_tendencias(m, np.arange(10), horizonte=2)
+        assert np.allclose(pred[:, 0], [10, 11])
+        assert np.allclose(pred[:, 1], [25, 27])
+        assert list(n_obs) == [10, 9]
+        assert list(futuros) == [10, 11]
+        assert np.allclose(inf, pred) and np.allclose(sup, pred)
+
+    def test_series_insuficientes_sin_pronostico(self):
+        m = np.full((6, 1), np.nan)
+        m[-1, 0] = 3.0
+        pred = ajustar_tendencias(m, np.arange(6))[0]
+        assert np.isnan(pred).all()
+
+    def test_fact_pronosticos(self, dim_provincias):
+        dim_tiempo = pd.DataFrame({'tiempo_id': [f'TM{i:02d}' for i in range(1, 8)],
+                                   'anio': [2022] * 4 + [2023] * 3, 'trimestre': [1, 2, 3, 4, 1, 2, 3]})
+        pron = calcular_pronosticos(_fact_sintetico(), dim_tiempo, dim_provincias, estacional=False)
+        assert len(pron) == 4  # 2 provincias x 2 tecnologías
+        assert set(pron['tiempo_id']) == {'TM07'}
+        fila = pron[(pron['ProvinciaNorm'] == 'CORDOBA') & (pron['variable'] == 'fibra')].iloc[0]
+        assert fila['valor_pronostico'] == pytest.approx(100 * 1.6)
+        assert fila['limite_inferior'] <= fila['valor_pronostico'] <= fila['limite_superior']
+        assert pron['provincia_id'].notna().all()
+
+
+class TestAnomalias:
+    def _con_caida(self):
+        fact = _fact_sintetico()
+        caida = (fact['ProvinciaNorm'] == 'CORDOBA') & (fact['variable'] == 'fibra') & (fact['anio'] == 2022) & (fact['trimestre'] == 4)
+        fact.loc[caida, 'valor'] *= 0.1
+        return fact
+
+    def test_z_robusto_tolera_tendencia(self):
+        m = np.arange(12, dtype=float)[:, None] * np.array([[10.0, 10.0]]) + 1000
+        m[6, 1] = 100.0
+        z = z_robusto_movil(m)[2]
+        assert np.nanmax(np.abs(z[:, 0])) < 3.5
+        assert z[6, 1] < -3.5
+
+    def test_detecta_caida_de_un_trimestre(self):
+        anom = detectar_anomalias(self._con_caida(), pd.DataFrame(columns=['tiempo_id', 'anio', 'trimestre']))
+        assert set(zip(anom['ProvinciaNorm'], anom['variable'])) == {('CORDOBA', 'fibra')}
+        fila = anom[(anom['anio'] == 2022) & (anom['trimestre'] == 4)].iloc[0]
+        assert fila['tipo'] == 'nivel+salto'
+        assert fila['salto_pct'] == pytest.approx(0.13 / 1.2 - 1)
+        assert fila['fuente_archivo'] == 'internet_accesos_tecnologias_provincias_clean.csv'
+
+    def test_series_normales_sin_anomalias(self):
+        anom = detectar_anomalias(_fact_sintetico(), pd.DataFrame(columns=['tiempo_id', 'anio', 'trimestre']))
+        assert anom.empty
+
+    def test_reporte_por_archivo(self, tmp_path):
+        anom = detectar_anomalias(self._con_caida(), pd.DataFrame(columns=['tiempo_id', 'anio', 'trimestre']))
+        p = escribir_reporte(anom, tmp_path / 'anomalias.md')
+        texto = p.read_text(encoding='utf-8')
+        assert 'internet_accesos_tecnologias_provincias_clean.csv' in texto
+        assert 'series_evaluadas: 4' in texto
+
+
+class TestDistribucionVelocidades:
+    DIM_VEL = pd.DataFrame({'velocidad_id': ['VEL1', 'VEL2', 'VEL3'], 'rango_velocidad': ['0-3 Mbps', '3-10 Mbps', '10+ Mbps'],
+                            'velocidad_min_kbps': [0, 3000, 10000], 'velocidad_max_kbps': [3000, 10000, 999999]})
+
+    def test_limites_desde_etiqueta(self):
+        assert limites_desde_etiqueta('hasta512kbps') == (0.0, 512.0)
+        assert limites_desde_etiqueta('entre512_1mbps') == (512.0, 1000.0)
+        assert limites_desde_etiqueta('entre1mbps_6mbps') == (1000.0, 6000.0)
+        assert limites_desde_etiqueta('mayor30mbps') == (30000.0, np.inf)
+        assert np.isnan(limites_desde_etiqueta('otros')[0])
+
+    def test_cuantiles_histograma(self):
+        conteos = np.array([[50.0, 50.0, 0.0], [0.0, 10.0, 90.0], [0.0, 0.0, 0.0]])
+        q = cuantiles_histograma(conteos, np.array([0.0, 10.0, 20.0]), np.array([10.0, 20.0, np.inf]), [0.5, 0.9, 0.05])
+        assert q[0] == pytest.approx([10.0, 18.0, 1.0])
+        # p50 cae en el rango abierto: se toma su límite inferior
+        assert q[1, 0] == 20.0 and q[1, 2] == pytest.approx(15.0)
+        assert np.isnan(q[2]).all()
+
+    def _entradas(self):
+        rangos = pd.DataFrame({
+            'anio': [2024] * 8, 'trimestre': [1] * 8,
+            'ProvinciaNorm': ['CORDOBA'] * 4 + ['SANTA FE'] * 4,
+            'rango_velocidad': ['0-3 Mbps', '3-10 Mbps', '10+ Mbps', 'otros'] * 2,
+            'accesos': [100, 100, 0, 999, 0, 50, 50, 0],
+        })
+        numerica = pd.DataFrame({'anio': [2024, 2024, 2024], 'trimestre': [1, 1, 1], 'ProvinciaNorm': ['SANTA FE'] * 3,
+                                 'Velocidad_kbps': [5000, 20000, 100000], 'accesos': [10, 60, 30]})
+        return rangos, numerica, pd.DataFrame({'tiempo_id': ['TM01'], 'anio': [2024], 'trimestre': [1]})
+
+    def test_rangos_y_prioridad_numerica(self, dim_provincias):
+        rangos, numerica, dim_tiempo = self._entradas()
+        d = calcular_distribucion_velocidades(rangos, numerica, self.DIM_VEL, dim_tiempo, dim_provincias).set_index('ProvinciaNorm')
+        cba = d.loc['CORDOBA']
+        assert cba['fuente'] == 'rangos' and cba['accesos'] == 200  # 'otros' no tiene límites
+        assert cba['velocidad_mediana_mbps'] == pytest.approx(3.0)
+        assert cba['velocidad_media_mbps'] == pytest.approx((1.5 + 6.5) / 2)
+        sfe = d.loc['SANTA FE']
+        assert sfe['fuente'] == 'numerica'
+        assert sfe['velocidad_mediana_mbps'] == 20.0 and sfe['velocidad_p90_mbps'] == 100.0
+        assert sfe['velocidad_media_mbps'] == pytest.approx(0.5 + 12 + 30)
+        assert (d['tiempo_id'] == 'TM01').all() and d['provincia_id'].notna().all()
+
+    def test_desde_csv_igual_que_en_memoria(self, dim_provincias, tmp_path, monkeypatch):
+        rangos, numerica, dim_tiempo = self._entradas()
+        monkeypatch.setattr(build_distribucion_velocidades, 'OUT_DIR', tmp_path)
+        escribir_csv(rangos, tmp_path / 'fact_velocidad_rangos_long.csv')
+        escribir_csv(numerica, tmp_path / 'fact_velocidad_numerica_provincias.csv')
+        escribir_csv(self.DIM_VEL, tmp_path / 'dim_velocidades.csv')
+        leer = build_distribucion_velocidades._leer_out
+        disco = calcular_distribucion_velocidades(leer('fact_velocidad_rangos_long.csv'), leer('fact_velocidad_numerica_provincias.csv'),
+                                                  leer_csv(tmp_path / 'dim_velocidades.csv'), dim_tiempo, dim_provincias)
+        memoria = calcular_distribucion_velocidades(rangos, numerica, self.DIM_VEL, dim_tiempo, dim_provincias)
+        pd.testing.assert_frame_equal(disco, memoria)
+
+
+class TestCorrelaciones:
+    SIN_DIM = pd.DataFrame(columns=['tiempo_id', 'anio', 'trimestre'])
+
+    def _fact(self):
+        rng = np.random.default_rng(7)
+        filas = []
+        for prov, signo in (('CORDOBA', 1.0), ('SANTA FE', -1.0)):
+            base = rng.normal(0, 1, 16)
+            ruido = rng.normal(0, 1, 16)
+            for var, serie in (('fibra', 100 + base), ('Mbps', 50 + signo * base), ('adsl', 80 + ruido)):
+                for i, v in enumerate(serie):
+                    filas.append({'anio': 2020 + i // 4, 'trimestre': i % 4 + 1, 'ProvinciaNorm': prov,
+                                  'dominio': 'Internet', 'subcategoria': 'x', 'variable': var, 'valor': v})
+        return pd.DataFrame(filas)
+
+    def test_igual_a_pandas_corr(self):
+        fact = self._fact()
+        fact = fact.drop(index=[3, 40])  # huecos: correlación por pares
+        c = calcular_correlaciones(fact, self.SIN_DIM, transformacion='nivel', min_obs=2)
+        for prov, g in fact.groupby('ProvinciaNorm'):
+            ref = g.pivot_table(index=['anio', 'trimestre'], columns='variable', values='valor').corr()
+            sub = c[c['ProvinciaNorm'] == prov]
+            assert len(sub) == 3  # triángulo superior, sin diagonal
+            for fila in sub.itertuples():
+                assert fila.correlacion == pytest.approx(ref.loc[fila.variable_a, fila.variable_b])
+        par = c[(c['variable_a'] == 'Mbps') & (c['variable_b'] == 'fibra')].set_index('ProvinciaNorm')['correlacion']
+        assert par['CORDOBA'] == pytest.approx(1.0) and par['SANTA FE'] == pytest.approx(-1.0)
+
+    def test_rezago(self):
+        fact = self._fact()
+        c = calcular_correlaciones(fact, self.SIN_DIM, transformacion='nivel', lags=(1,), min_obs=2)
+        g = fact[fact['ProvinciaNorm'] == 'CORDOBA'].pivot_table(index=['anio', 'trimestre'], columns='variable', values='valor')
+        fila = c[(c['ProvinciaNorm'] == 'CORDOBA') & (c['variable_a'] == 'adsl') & (c['variable_b'] == 'fibra')].iloc[0]
+        assert fila['lag'] == 1
+        assert fila['correlacion'] == pytest.approx(g['adsl'].corr(g['fibra'].shift(1)))
+
+    def test_bloques_de_geografias(self, monkeypatch):
+        fact = self._fact()
+        entero = calcular_correlaciones(fact, self.SIN_DIM, transformacion='nivel', lags=(0, 1), min_obs=2)
+        monkeypatch.setattr(build_correlaciones, 'MAX_CELDAS', 9)  # 3 métricas: una geografía por bloque
+        por_bloques = calcular_correlaciones(fact, self.SIN_DIM, transformacion='nivel', lags=(0, 1), min_obs=2)
+        pd.testing.assert_frame_equal(por_bloques, entero)
+
+    def test_cache_por_hash(self, tmp_path):
+        fact = self._fact()
+        _, recalculada = correlaciones_cacheadas(fact, self.SIN_DIM, out_dir=tmp_path)
+        assert recalculada
+        _, recalculada = correlaciones_cacheadas(fact, self.SIN_DIM, out_dir=tmp_path)
+        assert not recalculada
+        fact.loc[0, 'valor'] += 1
+        _, recalculada = correlaciones_cacheadas(fact, self.SIN_DIM, out_dir=tmp_path)
+        assert recalculada
+
+    def test_cache_en_catalogo(self, tmp_path):
+        pytest.importorskip('pyarrow')
+        fact = self._fact()
+        corr, _ = correlaciones_cacheadas(fact, self.SIN_DIM, out_dir=tmp_path, formato='parquet')
+        entrada = entrada_vigente(tmp_path, 'correlaciones_metricas', 'parquet')
+        assert entrada['procedencia']['transformacion'] == 'crecimiento' and entrada['filas'] == len(corr)
+        assert not (tmp_path / 'correlaciones_metricas.meta.json').exists()
+        cacheada, recalculada = correlaciones_cacheadas(fact, self.SIN_DIM, out_dir=tmp_path, formato='parquet')
+        assert not recalculada and len(cacheada) == len(corr)
+        _, recalculada = correlaciones_cacheadas(fact, self.SIN_DIM, out_dir=tmp_path, lags=(0, 1), formato='parquet')
+        assert recalculada
+
+
+class TestRollups:
+    def _sel(self, r, geo, tiempo, tec):
+        return r[(r['nivel_geo'] == geo) & (r['nivel_tiempo'] == tiempo) & (r['nivel_tecnologia'] == tec)]
+
+    def test_totales_por_nivel(self, dim_provincias):
+        r = calcular_rollups(_fact_sintetico(), dim_provincias)
+        nacional = self._sel(r, 'nacional', 'trimestre', 'total')
+        fila = nacional[(nacional['anio'] == 2022) & (nacional['trimestre'] == 1)].iloc[0]
+        assert fila['suma'] == pytest.approx(100 + 300 + 50 + 150) and fila['n_filas'] == 4
+        assert fila['variable'] == 'accesos' and pd.isna(fila['tecnologia'])
+        assert fila['grouping_id'] == 0b110011
+        region = self._sel(r, 'region', 'anio', 'tecnologia')
+        adsl = region[(region['tecnologia'] == 'adsl') & (region['anio'] == 2023)].iloc[0]
+        assert adsl['region'] == 'PAMPEANA' and adsl['categoria'] == 'INTERNET_FIJO'
+        assert adsl['suma'] == pytest.approx((300 + 150) * (1.4 + 1.5))
+        assert adsl['maximo'] == pytest.approx(300 * 1.5)
+
+    def test_snapshot_ultimo_periodo(self, dim_provincias):
+        r = calcular_rollups(_fact_sintetico(), dim_provincias)
+        ultimo = self._sel(r, 'provincia', 'ultimo', 'total')
+        assert set(zip(ultimo['anio'], ultimo['trimestre'])) == {(2023, 2)}
+        trimestre = self._sel(r, 'provincia', 'trimestre', 'total')
+        trimestre = trimestre[(trimestre['anio'] == 2023) & (trimestre['trimestre'] == 2)]
+        assert sorted(ultimo['suma']) == sorted(trimestre['suma'])
+
+    def test_ratios_sin_suma(self, dim_provincias):
+        fact = _fact_sintetico().assign(subcategoria='penetracion', unidad='ratio',
+                                        fuente_archivo='internet_accesos_penetracion_provincias_clean.csv')
+        r = calcular_rollups(fact, dim_provincias)
+        assert set(r['nivel_tecnologia']) == {'total'}
+        assert r['suma'].isna().all() and r['promedio'].notna().all()
+
+
+class TestCuboMetricas:
+    def test_ida_y_vuelta_mapeado(self, tmp_path):
+        fact = _fact_sintetico()
+        fact = fact[~((fact['ProvinciaNorm'] == 'SANTA FE') & (fact['anio'] == 2022) & (fact['trimestre'] == 2))]
+        datos, ejes = construir_cubo(fact, pd.DataFrame(columns=['tiempo_id', 'anio', 'trimestre']))
+        assert datos.shape == (6, 2, 2)
+        escribir_cubo(datos, ejes, tmp_path)
+        cubo = abrir_cubo(tmp_path)
+        assert isinstance(cubo.datos, np.memmap)
+        assert cubo.tiempo[0] == '2022T1' and cubo.provincias == ['CORDOBA', 'SANTA FE']
+        serie = cubo.serie('Internet|tecnologias|fibra', 'CORDOBA')
+        assert np.shares_memory(serie, cubo.datos)
+        assert serie == pytest.approx([100.0 * (1 + 0.1 * i) for i in range(6)])
+        assert np.isnan(cubo.valor('2022T2', 'SANTA FE', ('Internet', 'tecnologias', 'adsl')))
+        assert cubo.corte('2023T2').shape == (2, 2)
+        with pytest.raises(KeyError):
+            cubo.serie('Internet|tecnologias|fibra', 'SALTA')
+
+
+class TestFactIndexado:
+    def _mezclado(self):
+        return _fact_sintetico().sample(frac=1, random_state=0).reset_index(drop=True)
+
+    def test_orden_e_indice(self):
+        fx = FactIndexado.desde_fact(self._mezclado())
+        assert len(fx.indice) == 4 and fx.indice['fin'].iloc[-1] == 24
+        assert list(fx.indice['variable']) == ['adsl', 'adsl', 'fibra', 'fibra']
+        assert list(fx.datos['anio'].iloc[:2]) == [2022, 2022] and list(fx.datos['trimestre'].iloc[:2]) == [1, 2]
+
+    def test_busqueda_igual_a_mascara(self):
+        fact = self._mezclado()
+        fx = FactIndexado.desde_fact(fact)
+        serie = fx.buscar(dominio='Internet', subcategoria='tecnologias', variable='fibra', provincia='SANTA FE')
+        assert serie['valor'].tolist() == pytest.approx([50.0 * (1 + 0.1 * i) for i in range(6)])
+        # Filtro que no es prefijo de la clave + rango de años
+        r = fx.buscar(provincia='CORDOBA', anio_desde=2023)
+        esperado = fact[(fact['ProvinciaNorm'] == 'CORDOBA') & (fact['anio'] >= 2023)]
+        assert len(r) == len(esperado) == 4 and set(r['ProvinciaNorm']) == {'CORDOBA'}
+        assert len(fx.buscar(dominio='Internet', anio_hasta=2022)) == 16
+        assert fx.buscar(dominio='Movil').empty
+        with pytest.raises(TypeError):
+            fx.buscar(operador='X')
+
+    def test_cargar_y_diccionario(self, tmp_path):
+        fx = FactIndexado.desde_fact(self._mezclado())
+        escribir_csv(fx.datos, tmp_path / 'fact_unificado_long.csv')
+        escribir_indice(fx.datos, tmp_path)
+        cargado = cargar_fact_indexado(tmp_path)
+        pd.testing.assert_frame_equal(cargado.indice, fx.indice, check_dtype=False)
+        dicc = generar_diccionario(cargado)
+        assert list(dicc['variable']) == ['adsl', 'fibra'] and list(dicc['observaciones']) == [12, 12]
+        assert list(dicc['anios_min_max']) == ['2022-2023'] * 2
+        # Tabla reescrita sin ordenar: el índice ya no vale y se reconstruye en memoria
+        escribir_csv(self._mezclado(), tmp_path / 'fact_unificado_long.csv')
+        assert cargar_fact_indexado(tmp_path).indice['fin'].tolist() == [6, 12, 18, 24]
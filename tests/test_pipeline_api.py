@@ -0,0 +1,96 @@
+"""
+Tests para la API en memoria del pipeline (pipelines/pipeline_api.py)
+"""
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from pipelines.pipeline_api import ejecutar_pipeline, ResultadoPipeline, CAPAS
+from pipelines import prepare_enacom
+from pipelines.catalogo import entrada_vigente
+
+
+@pytest.fixture(scope='module')
+def resultado(tmp_path_factory):
+    # raw vacío: se usan los valores por defecto de dim_tiempo y hechos base
+    raw = tmp_path_factory.mktemp('raw')
+    return ejecutar_pipeline(raw_dir=raw)
+
+
+class TestPipelineEnMemoria:
+    """Valida el resultado tipado sin pasar por disco"""
+
+    def test_resultado_tipado(self, resultado):
+        assert isinstance(resultado, ResultadoPipeline)
+        for capa in CAPAS:
+            for nombre, df in resultado.capa(capa).items():
+                assert isinstance(df, pd.DataFrame), f'{capa}/{nombre} no es DataFrame'
+
+    def test_dimensiones_en_memoria(self, resultado):
+        dim_prov = resultado.tabla('dimensional', 'dim_provincias')
+        assert len(dim_prov) == 24
+        assert dim_prov['provincia_id'].is_unique
+        tiempo = resultado.tabla('procesadas', 'dim_tiempo')
+        for col in ['anio', 'trimestre', 'mes_inicio', 'mes_fin', 'periodo_completo']:
+            assert col in tiempo.columns
+
+    def test_out_preparado(self, resultado):
+        assert 'ProvinciaNorm' in resultado.tabla('out', 'dim_provincias_norm').columns
+        assert 'tec_key' in resultado.tabla('out', 'dim_tecnologias_ready').columns
+
+    def test_sin_imputacion_por_defecto(self, resultado, tmp_path):
+        assert 'imputado' not in resultado.tabla('out', 'fact_unificado_long').columns
+        completado = ejecutar_pipeline(raw_dir=tmp_path, metodo_completado='lineal')
+        assert 'imputado' in completado.tabla('out', 'fact_unificado_long').columns
+
+    def test_capa_desconocida(self, resultado):
+        with pytest.raises(ValueError):
+            resultado.capa('inexistente')
+
+    def test_to_arrow(self, resultado):
+        pytest.importorskip('pyarrow')
+        tablas = resultado.to_arrow('dimensional')
+        assert tablas['dim_provincias'].num_rows == 24
+
+    def test_escritura_opcional(self, resultado, tmp_path):
+        escritos = resultado.escribir(tmp_path)
+        assert (tmp_path / 'dimensional' / 'dim_tiempo.csv').exists()
+        assert (tmp_path / 'out' / 'dim_provincias_norm.csv').exists()
+        assert len(escritos) == sum(len(resultado.capa(c)) for c in CAPAS)
+        # Procedencia de las correlaciones en el catálogo: la próxima corrida las reutiliza
+        entrada = entrada_vigente(tmp_path / 'out', 'correlaciones_metricas')
+        assert entrada['procedencia'] == resultado.procedencias['correlaciones_metricas']
+
+    def test_escritura_parquet(self, resultado, tmp_path):
+        pytest.importorskip('pyarrow')
+        resultado.escribir(tmp_path, formato='ambos')
+        assert (tmp_path / 'dimensional' / 'parquet' / 'dim_tiempo.parquet').exists()
+        assert (tmp_path / 'out' / 'parquet' / 'fact_unificado_long').is_dir()
+        assert (tmp_path / 'out' / 'fact_unificado_long.csv').exists()
+
+
+def test_preparar_en_memoria_igual_a_disco(tmp_path, monkeypatch):
+    """preparar_en_memoria produce el mismo CSV que el camino por disco"""
+    clean = pd.DataFrame({
+        'anio': [2022, 2022],
+        'trimestre': [1, 1],
+        'provincia': ['Córdoba', 'Santa Fe'],
+        'adsl': [10, 20],
+        'fibra optica': [5, None],
+        'total': [15, 20],
+    })
+    nombre = 'internet_accesos_tecnologias_provincias_clean.csv'
+    clean.to_csv(tmp_path / nombre, index=False)
+    out = tmp_path / 'out'
+    out.mkdir()
+    monkeypatch.setattr(prepare_enacom, 'PROCESSED', tmp_path)
+    monkeypatch.setattr(prepare_enacom, 'OUT', out)
+    prepare_enacom.fact_tecnologias_long()
+
+    en_memoria = prepare_enacom.preparar_en_memoria({nombre: clean})['fact_tecnologias_long']
+    prepare_enacom.write_csv(en_memoria, tmp_path / 'memoria.csv')
+    assert (tmp_path / 'memoria.csv').read_text(encoding='utf-8') == (out / 'fact_tecnologias_long.csv').read_text(encoding='utf-8')
@@ -0,0 +1,747 @@
+"""
+Tests de los formatos de salida del pipeline (Parquet, Arrow IPC, CSV Arrow, ...)
+"""
+import shutil
+import subprocess
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from pipelines import io_csv, salida_parquet
+from pipelines.base_embebida import conectar, construir_base
+from pipelines.build_diccionario_metricas import diccionario_desde_catalogo, generar_diccionario
+from pipelines.build_tiles import generar_teselas, leer_manifiesto, leer_tesela
+from pipelines.cdc import capturar, cambios, estado_en
+from pipelines.catalogo import contar_filas, entrada_vigente, leer_catalogo
+from pipelines.export_excel import escribir_libro, exportar_excel
+from pipelines.export_hyper import (actualizar_hyper, exportar_csv_a_hyper, exportar_estrella, perfilar_csv,
+                                    tablas_estrella, tipo_hyper)
+from pipelines.export_tabla_ancha import desnormalizar, desnormalizar_unificado, escribir_ancha
+from pipelines.io_csv import escribir_csv, leer_csv
+from pipelines.lector_salidas import leer_tabla, plan_lectura
+from pipelines.publicacion import Publicacion, listar_versiones
+from pipelines.salida_arrow import abrir_arrow, leer_arrow
+from pipelines.salida_parquet import componentes_formato, escribir_tabla, formato_salida, leer_parquet, tipar
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+def _fact():
+    return pd.DataFrame({
+        'anio': ['2015', '2014', '2014', '2014'],
+        'trimestre': ['1', '2', '1', '1'],
+        'provincia_id': ['PR02', 'PR01', 'PR02', 'PR01'],
+        'link_indec': ['06', '07', '08', '09'],
+        'accesos': ['10', '20', '30', '40'],
+        'imputado': ['False', 'True', 'False', 'False'],
+    })
+
+
+class TestSalidaParquet:
+    def test_formato_por_defecto_y_entorno(self, monkeypatch):
+        monkeypatch.delenv('FORMATO_SALIDA', raising=False)
+        assert formato_salida() == 'csv'
+        monkeypatch.setenv('FORMATO_SALIDA', 'Parquet')
+        assert formato_salida() == 'parquet'
+        with pytest.raises(ValueError):
+            formato_salida('xlsx')
+
+    def test_csv_sigue_siendo_el_default(self, tmp_path, monkeypatch):
+        monkeypatch.delenv('FORMATO_SALIDA', raising=False)
+        escritos = escribir_tabla(_fact(), tmp_path / 'fact_internet_accesos_baf.csv')
+        assert escritos == [tmp_path / 'fact_internet_accesos_baf.csv']
+        assert not (tmp_path / 'parquet').exists()
+
+    def test_tipado(self):
+        t = tipar(_fact())
+        assert str(t['anio'].dtype) == 'Int16' and str(t['trimestre'].dtype) == 'Int8'
+        assert pd.api.types.is_integer_dtype(t['accesos'])
+        assert str(t['imputado'].dtype) == 'boolean'
+        # Códigos con cero a la izquierda no se convierten a número
+        assert t['link_indec'].tolist() == ['06', '07', '08', '09']
+
+    def test_hechos_particionados_y_ordenados(self, tmp_path):
+        escribir_tabla(_fact(), tmp_path / 'fact_internet_accesos_baf.csv', formato='ambos')
+        base = tmp_path / 'parquet' / 'fact_internet_accesos_baf'
+        archivos = sorted(p.relative_to(base).as_posix() for p in base.rglob('*.parquet'))
+        assert archivos == ['dominio=internet/anio=2014/part-0.parquet', 'dominio=internet/anio=2015/part-0.parquet']
+        meta = pq.ParquetFile(base / archivos[0]).metadata
+        assert meta.row_group(0).column(0).compression == 'ZSTD'
+        leido = leer_parquet(tmp_path / 'parquet', 'fact_internet_accesos_baf')
+        anio_2014 = leido[leido['anio'] == 2014]
+        assert list(zip(anio_2014['trimestre'], anio_2014['provincia_id'])) == [(1, 'PR01'), (1, 'PR02'), (2, 'PR01')]
+        assert (tmp_path / 'fact_internet_accesos_baf.csv').exists()
+
+    def test_dimensiones_en_un_archivo(self, tmp_path):
+        dim = pd.DataFrame({'provincia_id': ['PR01', 'PR02'], 'provincia': ['BUENOS AIRES', 'CABA']})
+        escritos = escribir_tabla(dim, tmp_path / 'dim_provincias.csv', formato='parquet')
+        assert escritos == [tmp_path / 'parquet' / 'dim_provincias.parquet']
+        assert not (tmp_path / 'dim_provincias.csv').exists()
+        assert leer_parquet(tmp_path / 'parquet', 'dim_provincias').equals(tipar(dim))
+
+    def test_reescritura_reemplaza_particiones(self, tmp_path):
+        escribir_tabla(_fact(), tmp_path / 'fact_tv_accesos.csv', formato='parquet')
+        escribir_tabla(_fact()[_fact()['anio'] == '2014'], tmp_path / 'fact_tv_accesos.csv', formato='parquet')
+        leido = leer_parquet(tmp_path / 'parquet', 'fact_tv_accesos')
+        assert set(leido['anio']) == {2014} and len(leido) == 3
+
+    def test_dominio_desde_nombre(self):
+        assert salida_parquet.dominio_desde_nombre('fact_comunicaciones_moviles_sms') == 'comunicaciones_moviles'
+        assert salida_parquet.dominio_desde_nombre('fact_tv_accesos_provincias') == 'tv'
+        assert salida_parquet.dominio_desde_nombre('fact_desconocido') is None
+
+
+class TestIoCsv:
+    def _mixto(self):
+        return pd.DataFrame({
+            'anio': [2014, 2015, 2016],
+            'valor': [1.0, 1e-05, np.nan],
+            'accesos': pd.array([10, None, 30], dtype='Int64'),
+            'provincia': ['BUENOS AIRES', None, 'CÓRDOBA'],
+            'imputado': [True, False, True],
+        })
+
+    def test_escritura_identica_a_pandas(self, tmp_path):
+        df = self._mixto()
+        df.to_csv(tmp_path / 'pandas.csv', index=False)
+        escribir_csv(df, tmp_path / 'arrow.csv')
+        assert (tmp_path / 'arrow.csv').read_bytes() == (tmp_path / 'pandas.csv').read_bytes()
+        # Una sola columna con nulos: pandas escribe "" (una línea vacía se perdería al leer)
+        for col in ('valor', 'accesos', 'provincia'):
+            df[[col]].to_csv(tmp_path / 'pandas.csv', index=False)
+            escribir_csv(df[[col]], tmp_path / 'arrow.csv')
+            assert (tmp_path / 'arrow.csv').read_bytes() == (tmp_path / 'pandas.csv').read_bytes()
+            assert len(leer_csv(tmp_path / 'arrow.csv')) == len(df)
+
+    def test_valores_con_comillas_usan_quote_minimal(self, tmp_path):
+        df = pd.DataFrame({'localidad': ['La Plata', 'Capital, Norte', 'Dique "4"'], 'accesos': [1, 2, 3]})
+        df.to_csv(tmp_path / 'pandas.csv', index=False)
+        escribir_csv(df, tmp_path / 'arrow.csv')
+        assert (tmp_path / 'arrow.csv').read_bytes() == (tmp_path / 'pandas.csv').read_bytes()
+
+    def test_lectura_igual_a_pandas(self, tmp_path):
+        path = tmp_path / 'fact.csv'
+        # Fechas y horas: pandas no las infiere, quedan como texto
+        self._mixto().assign(fecha=['2024-01-02', None, '2024-03-04'], hora=['10:00:00', '11:30:00', None],
+                             momento=['2024-01-02 10:00:00', None, None]).to_csv(path, index=False)
+        pd.testing.assert_frame_equal(leer_csv(path), pd.read_csv(path))
+        texto = pd.read_csv(path, dtype=str, keep_default_na=False, na_values=['', 'NA', 'NaN'])
+        pd.testing.assert_frame_equal(leer_csv(path, como_texto=True), texto)
+
+
+class TestSalidaArrow:
+    def test_formatos_combinados(self):
+        assert componentes_formato('ambos') == {'csv', 'parquet'}
+        assert componentes_formato('CSV + arrow') == {'csv', 'arrow'}
+        with pytest.raises(ValueError):
+            formato_salida('csv+xlsx')
+
+    def test_hechos_mapeados_sin_copia(self, tmp_path):
+        pa = pytest.importorskip('pyarrow')
+        escritos = escribir_tabla(_fact(), tmp_path / 'fact_unificado_long.csv', formato='csv+arrow')
+        assert escritos == [tmp_path / 'fact_unificado_long.csv', tmp_path / 'arrow' / 'fact_unificado_long.arrow']
+        antes = pa.total_allocated_bytes()
+        tabla = abrir_arrow(tmp_path / 'arrow', 'fact_unificado_long', columnas=['anio', 'trimestre', 'accesos'])
+        assert pa.total_allocated_bytes() == antes  # los buffers apuntan al archivo mapeado
+        assert tabla.column_names == ['anio', 'trimestre', 'accesos']
+        assert str(tabla.schema.field('anio').type) == 'int16'
+        assert tabla.column('accesos').to_pylist() == [40, 30, 20, 10]  # ordenado por período y provincia
+
+    def test_reescritura_con_archivo_abierto(self, tmp_path):
+        escribir_tabla(_fact(), tmp_path / 'fact_tv_accesos.csv', formato='arrow')
+        abierta = abrir_arrow(tmp_path / 'arrow', 'fact_tv_accesos')
+        escribir_tabla(_fact().head(1), tmp_path / 'fact_tv_accesos.csv', formato='arrow')
+        assert abierta.num_rows == 4 and sum(abierta.column('accesos').to_pylist()) == 100
+        assert len(leer_arrow(tmp_path / 'arrow', 'fact_tv_accesos')) == 1
+        assert not (tmp_path / 'fact_tv_accesos.csv').exists()
+
+
+class TestBaseEmbebida:
+    def _tablas(self):
+        dim = pd.DataFrame({'provincia_id': ['PR01', 'PR02'], 'provincia': ['BUENOS AIRES', 'CABA']})
+        huerfana = _fact().assign(provincia_id=['PR01', 'PR01', 'PR01', 'PR99'])
+        return {'dim_provincias': dim, 'fact_internet_accesos_baf': _fact(), 'fact_tv_accesos': huerfana}
+
+    @pytest.mark.parametrize('motor', ['duckdb', 'sqlite'])
+    def test_join_tipado_en_un_archivo(self, tmp_path, motor):
+        if motor == 'duckdb':
+            pytest.importorskip('duckdb')
+        path = construir_base(self._tablas(), tmp_path / f'enacom.{motor}', motor)
+        assert [p.name for p in tmp_path.iterdir()] == [path.name]
+        con = conectar(path)
+        filas = con.execute(
+            'SELECT p.provincia, SUM(f.accesos) FROM fact_internet_accesos_baf f '
+            'JOIN dim_provincias p USING (provincia_id) GROUP BY 1 ORDER BY 1').fetchall()
+        assert filas == [('BUENOS AIRES', 60), ('CABA', 40)]
+        assert con.execute('SELECT MAX(anio) + 1 FROM fact_tv_accesos').fetchone()[0] == 2016
+        con.close()
+
+    def test_claves_e_indices_duckdb(self, tmp_path):
+        pytest.importorskip('duckdb')
+        con = conectar(construir_base(self._tablas(), tmp_path / 'enacom.duckdb', 'duckdb'))
+        claves = set(con.execute("SELECT table_name, constraint_type FROM duckdb_constraints() "
+                                 "WHERE constraint_type IN ('PRIMARY KEY', 'FOREIGN KEY')").fetchall())
+        # La FK solo se declara si todos los valores existen en la dimensión
+        assert claves == {('dim_provincias', 'PRIMARY KEY'), ('fact_internet_accesos_baf', 'FOREIGN KEY')}
+        indices = {r[0] for r in con.execute('SELECT index_name FROM duckdb_indexes()').fetchall()}
+        assert {'idx_fact_internet_accesos_baf_tiempo', 'idx_fact_tv_accesos_provincia_id'} <= indices
+        con.close()
+
+    def test_claves_e_indices_sqlite(self, tmp_path):
+        con = conectar(construir_base(self._tablas(), tmp_path / 'enacom.sqlite', 'sqlite'))
+        ddl = dict(con.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'").fetchall())
+        assert 'PRIMARY KEY ("provincia_id")' in ddl['dim_provincias']
+        assert 'REFERENCES "dim_provincias"' in ddl['fact_internet_accesos_baf']
+        assert 'REFERENCES' not in ddl['fact_tv_accesos']
+        indices = {r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()}
+        assert {'idx_fact_internet_accesos_baf_provincia_id', 'idx_fact_tv_accesos_tiempo'} <= indices
+        con.close()
+
+
+class TestTablaAncha:
+    def _dims(self):
+        return {
+            'dim_provincias': pd.DataFrame({'provincia_id': ['PR01', 'PR02'], 'provincia': ['BUENOS AIRES', 'CABA'],
+                                            'region': ['PAMPEANA', 'PAMPEANA'], 'poblacion_2023': [17569053, 3075646]}),
+            'dim_tecnologias': pd.DataFrame({'tecnologia_id': ['TEC1'], 'tecnologia': ['ADSL'], 'categoria': ['INTERNET_FIJO'],
+                                             'descripcion': ['Asymmetric Digital Subscriber Line']}),
+            'dim_servicios': pd.DataFrame({'servicio_id': ['SRV1'], 'servicio': ['INTERNET_FIJO'], 'categoria': ['CONECTIVIDAD']}),
+        }
+
+    def test_atributos_unidos_y_diccionario(self, tmp_path):
+        fact = _fact().assign(anio=[2015, 2014, 2014, 2014], trimestre=[1, 2, 1, 1], tecnologia_id='TEC1', servicio_id='SRV1')
+        ancha = desnormalizar(fact, self._dims())
+        assert len(ancha) == len(fact)
+        fila = ancha[ancha['provincia_id'] == 'PR02'].iloc[0]
+        assert (fila['provincia'], fila['region'], fila['poblacion_2023']) == ('CABA', 'PAMPEANA', 3075646)
+        assert fila['categoria'] == 'INTERNET_FIJO' and fila['categoria_servicio'] == 'CONECTIVIDAD'
+        assert 'descripcion' not in ancha.columns
+        assert ancha['periodo'].tolist() == ['2015T1', '2014T2', '2014T1', '2014T1']
+        esquema = pq.read_schema(escribir_ancha(ancha, tmp_path / 'fact.parquet'))
+        assert str(esquema.field('region').type).startswith('dictionary')
+        assert not str(esquema.field('accesos').type).startswith('dictionary')
+
+    def test_dim_tiempo_con_periodo(self):
+        # dim_tiempo de etl_principal: ya trae periodo
+        dim_tiempo = pd.DataFrame({'tiempo_id': ['TM01', 'TM02'], 'anio': [2014, 2014], 'trimestre': [1, 2],
+                                   'periodo': ['2014T1', '2014T2']})
+        por_id = desnormalizar(_fact().assign(tiempo_id=['TM01', 'TM02', 'TM01', 'TM01']), self._dims(), dim_tiempo)
+        por_periodo = desnormalizar(_fact().assign(anio=2014, trimestre=[1, 2, 1, 1]), self._dims(), dim_tiempo)
+        for ancha in (por_id, por_periodo):
+            assert ancha['periodo'].tolist() == ['2014T1', '2014T2', '2014T1', '2014T1']
+            assert not ancha.columns.duplicated().any() and 'periodo_tiempo' not in ancha.columns
+
+    def test_unificado(self):
+        fact = pd.DataFrame({'anio': [2024, 2024], 'trimestre': [1, 1], 'ProvinciaNorm': ['Capital Federal', 'BUENOS AIRES'],
+                             'dominio': 'Internet', 'subcategoria': 'tecnologias', 'variable': ['adsl', 'fibraOptica'],
+                             'valor': [1.0, 2.0]})
+        dims = self._dims()
+        dim_tec = pd.DataFrame({'tecnologia': ['ADSL', 'FIBRA_OPTICA'], 'categoria': ['INTERNET_FIJO', 'INTERNET_FIJO']})
+        ancha = desnormalizar_unificado(fact, dims['dim_provincias'], dim_tec)
+        assert ancha['provincia_id'].tolist() == ['PR02', 'PR01']
+        assert ancha['categoria_tecnologia'].tolist() == ['INTERNET_FIJO', 'INTERNET_FIJO']
+        assert ancha['periodo'].tolist() == ['2024T1', '2024T1']
+
+
+class TestLectorSalidas:
+    def _unificado(self):
+        filas = [{'anio': anio, 'trimestre': tri, 'ProvinciaNorm': prov, 'dominio': dom, 'variable': 'accesos',
+                  'valor': float(anio * 10 + tri)}
+                 for dom in ('Internet', 'TV') for anio in (2022, 2023, 2024) for tri in (1, 2)
+                 for prov in ('CORDOBA', 'SANTA FE')]
+        return pd.DataFrame(filas)
+
+    @pytest.mark.parametrize('formato', ['parquet', 'arrow', 'csv'])
+    def test_proyeccion_y_filtros(self, tmp_path, formato):
+        fact = self._unificado()
+        escribir_tabla(fact, tmp_path / 'fact_unificado_long.csv', formato=f'csv+{formato}' if formato != 'csv' else 'csv')
+        df = leer_tabla('fact_unificado_long', tmp_path, columnas=['anio', 'valor'], formato=formato,
+                        dominio='internet', anio_desde=2023, provincia='Córdoba', trimestre=2)
+        assert list(df.columns) == ['anio', 'valor']
+        assert sorted(df['valor'].tolist()) == [20232.0, 20242.0]
+        assert leer_tabla('fact_unificado_long', tmp_path, formato=formato, dominio='Movil').empty
+
+    @pytest.mark.parametrize('formato', ['parquet', 'arrow', 'csv'])
+    def test_provincia_con_tildes_en_la_columna(self, tmp_path, formato):
+        fact = self._unificado().replace({'ProvinciaNorm': {'CORDOBA': 'Córdoba', 'SANTA FE': 'Santa Fe'}})
+        escribir_tabla(fact, tmp_path / 'fact_unificado_long.csv', formato=f'csv+{formato}' if formato != 'csv' else 'csv')
+        df = leer_tabla('fact_unificado_long', tmp_path, formato=formato, provincia=['CORDOBA', 'santa fe'], anio=2024)
+        assert len(df) == 8 and set(df['ProvinciaNorm']) == {'Córdoba', 'Santa Fe'}
+        assert len(leer_tabla('fact_unificado_long', tmp_path, formato=formato, provincia='Córdoba')) == 12
+
+    def test_poda_particiones(self, tmp_path):
+        escribir_tabla(self._unificado(), tmp_path / 'fact_unificado_long.csv', formato='parquet')
+        plan = plan_lectura('fact_unificado_long', tmp_path, columnas=['valor'], dominio='TV', anio=2024)
+        assert (plan.formato, plan.archivos, plan.archivos_total) == ('parquet', 1, 6)
+        assert 0 < plan.fraccion_bytes < 1 / 6
+
+    def test_hecho_dimensional_sin_dominio(self, tmp_path):
+        escribir_csv(_fact(), tmp_path / 'fact_internet_accesos.csv')
+        plan = plan_lectura('fact_internet_accesos', tmp_path, dominio='tv')
+        assert plan.archivos == 0 and plan.bytes == 0
+        df = leer_tabla('fact_internet_accesos', tmp_path, columnas=['accesos'], dominio='Internet', provincia='PR01')
+        assert df['accesos'].tolist() == [20, 40]
+
+
+class TestCatalogo:
+    def _unificado(self):
+        return TestLectorSalidas()._unificado().assign(
+            subcategoria='accesos', unidad='accesos', fuente_archivo=lambda d: d['dominio'].str.lower() + '_clean.csv')
+
+    def test_entrada_al_escribir(self, tmp_path):
+        escribir_tabla(_fact(), tmp_path / 'fact_x.csv', formato='csv+parquet')
+        entrada = entrada_vigente(tmp_path, 'fact_x')
+        assert entrada['filas'] == 4 and set(entrada['archivos']) == {'csv', 'parquet'}
+        anio = next(c for c in entrada['columnas'] if c['nombre'] == 'anio')
+        assert (anio['min'], anio['max'], anio['distintos']) == ('2014', '2015', 2)
+        assert entrada['archivos']['csv']['hash'].startswith('blake2b:')
+        assert contar_filas(tmp_path / 'fact_x.csv') == 4
+
+    def test_entrada_invalida_si_cambia_el_archivo(self, tmp_path):
+        escribir_tabla(_fact(), tmp_path / 'fact_x.csv')
+        (tmp_path / 'fact_x.csv').write_text('anio\n2020\n2021\n2022\n', encoding='utf-8')
+        assert 'fact_x' in leer_catalogo(tmp_path) and entrada_vigente(tmp_path, 'fact_x') is None
+        assert contar_filas(tmp_path / 'fact_x.csv') == 3
+
+    def test_etl_principal_registra_y_cuenta_del_catalogo(self, tmp_path, monkeypatch):
+        from pipelines import bootstrap_test_data, catalogo, etl_principal
+        processed = tmp_path / 'processed'
+        monkeypatch.setattr(etl_principal, 'PROCESSED', processed)
+        for nombre, ruta in {'RAW_ENACOM': tmp_path / 'raw', 'PROCESSED': processed, 'DIMENSIONAL': processed / 'dimensional',
+                             'BI_DIR': processed / 'bi', 'OUT_DIR': processed / 'out'}.items():
+            monkeypatch.setattr(bootstrap_test_data, nombre, ruta)
+        etl_principal.main()
+        assert entrada_vigente(processed, 'internet_accesos_baf_clean')['filas'] == 2
+        assert entrada_vigente(processed / 'dimensional', 'dim_provincias')['filas'] == 24
+        # El resumen sale del catálogo, sin recorrer los CSV
+        monkeypatch.setattr(catalogo, 'open', lambda *a, **k: pytest.fail('contó líneas'), raising=False)
+        etl_principal.generar_resumen_datos()
+        resumen = leer_csv(processed / 'resumen_datos.csv').set_index('archivo')['filas']
+        assert resumen['telefonia_fija_accesos_provincias_clean.csv'] == 2
+
+    def test_catalogo_una_escritura_por_publicacion(self, tmp_path, monkeypatch):
+        from pipelines import catalogo
+        escrituras = []
+        guardar = catalogo._guardar
+        monkeypatch.setattr(catalogo, '_guardar', lambda carpeta, cat: (escrituras.append(carpeta), guardar(carpeta, cat)))
+        with Publicacion(tmp_path / 'dimensional') as version:
+            for nombre in ('dim_a', 'dim_b', 'fact_c'):
+                escribir_tabla(_fact(), version.staging / f'{nombre}.csv')
+            (version.staging / 'sub').mkdir()
+            escribir_tabla(_fact(), version.staging / 'sub' / 'dim_d.csv')
+            assert entrada_vigente(version.staging, 'dim_b')['filas'] == 4  # visible antes de escribirse
+            assert escrituras == []
+        assert len(escrituras) == 2
+        assert set(leer_catalogo(tmp_path / 'dimensional')) == {'dim_a', 'dim_b', 'fact_c'}
+        assert entrada_vigente(tmp_path / 'dimensional' / 'sub', 'dim_d') is not None
+
+    def test_diccionario_desde_catalogo(self, tmp_path):
+        fact = self._unificado()
+        escribir_tabla(fact, tmp_path / 'fact_unificado_long.csv')
+        dicc = diccionario_desde_catalogo(entrada_vigente(tmp_path, 'fact_unificado_long'))
+        pd.testing.assert_frame_equal(dicc.reset_index(drop=True), generar_diccionario(fact).reset_index(drop=True),
+                                      check_dtype=False)
+        assert dicc['anios_min_max'].tolist() == ['2022-2024', '2022-2024']
+
+    def test_lector_descarta_por_catalogo(self, tmp_path):
+        escribir_tabla(self._unificado(), tmp_path / 'fact_unificado_long.csv')
+        assert plan_lectura('fact_unificado_long', tmp_path, anio_desde=2030).bytes == 0
+        assert plan_lectura('fact_unificado_long', tmp_path, dominio='movil').bytes == 0
+        assert plan_lectura('fact_unificado_long', tmp_path, dominio='tv', anio=2023).bytes > 0
+
+
+class TestPublicacion:
+    def _publicar(self, destino, tablas, mantener=3):
+        with Publicacion(destino, mantener=mantener) as version:
+            for nombre, df in tablas.items():
+                escribir_tabla(df, version.staging / f'{nombre}.csv', formato='csv+parquet')
+        return version
+
+    def test_symlink_y_reutilizacion(self, tmp_path):
+        destino = tmp_path / 'dimensional'
+        self._publicar(destino, {'dim_a': _fact(), 'fact_b': _fact()})
+        assert destino.is_symlink() and (destino / 'dim_a.csv').exists()
+        anterior = destino.resolve()
+        cambiada = _fact().assign(accesos='99')
+        version = self._publicar(destino, {'dim_a': _fact(), 'fact_b': cambiada})
+        assert destino.resolve() != anterior and destino.resolve().name == version.version
+        # Tabla sin cambios: mismo inodo en las dos versiones; la cambiada se reescribió
+        assert (destino / 'dim_a.csv').stat().st_ino == (anterior / 'dim_a.csv').stat().st_ino
+        assert (destino / 'fact_b.csv').stat().st_ino != (anterior / 'fact_b.csv').stat().st_ino
+        assert entrada_vigente(destino, 'dim_a', 'parquet') is not None
+        assert leer_csv(destino / 'fact_b.csv')['accesos'].eq(99).all()
+
+    def test_reescribir_enlace_no_altera_versiones(self, tmp_path):
+        destino = tmp_path / 'dimensional'
+        self._publicar(destino, {'dim_a': _fact()})
+        anterior = destino.resolve()
+        self._publicar(destino, {'dim_a': _fact()})
+        assert (destino / 'dim_a.csv').stat().st_nlink > 1
+        original = (anterior / 'dim_a.csv').read_bytes()
+        # Escritura sobre la carpeta publicada (enlace compartido con la versión anterior)
+        escribir_tabla(_fact().assign(accesos='0'), destino / 'dim_a.csv', formato='csv+parquet')
+        escribir_tabla(_fact().assign(accesos='1'), destino / 'dim_a.csv', lambda df, p: df.to_csv(p, index=False))
+        assert (anterior / 'dim_a.csv').read_bytes() == original
+        assert leer_parquet(anterior / 'parquet', 'dim_a')['accesos'].tolist() == [10, 20, 30, 40]
+        assert leer_csv(destino / 'dim_a.csv')['accesos'].eq(1).all()
+
+    def test_directorio_real_y_poda(self, tmp_path):
+        destino = tmp_path / 'dimensional'
+        destino.mkdir()
+        (destino / 'viejo.csv').write_text('a\n1\n', encoding='utf-8')
+        for i in range(4):
+            self._publicar(destino, {'dim_a': _fact().assign(accesos=str(i))}, mantener=2)
+        assert [v.name for v in listar_versiones(destino)][-1] == destino.resolve().name
+        assert len(listar_versiones(destino)) == 2 and not (destino / 'viejo.csv').exists()
+
+    def test_carpeta_rastreada_por_git(self, tmp_path):
+        if shutil.which('git') is None:
+            pytest.skip('git no disponible')
+        destino = tmp_path / 'dimensional'
+        destino.mkdir()
+        (destino / '.gitkeep').touch()
+        escribir_csv(_fact(), destino / 'dim_a.csv')
+        escribir_csv(_fact(), destino / 'viejo.csv')
+        git = ['git', '-c', 'user.name=t', '-c', 'user.email=t@t', '-C', str(tmp_path)]
+        subprocess.run(git + ['init', '-q'], check=True)
+        subprocess.run(git + ['add', '.'], check=True)
+        subprocess.run(git + ['commit', '-qm', 'datos'], check=True)
+        self._publicar(destino, {'dim_a': _fact(), 'fact_b': _fact()})
+        # Sigue siendo un directorio real: git solo ve lo que cambió
+        assert not destino.is_symlink() and len(listar_versiones(destino)) == 1
+        estado = subprocess.run(git + ['status', '--porcelain', '--', 'dimensional/dim_a.csv', 'dimensional/.gitkeep'],
+                                capture_output=True, text=True, check=True).stdout
+        assert estado == ''
+        assert (destino / 'fact_b.csv').exists() and not (destino / 'viejo.csv').exists()
+
+    def test_conservar_tablas_no_reescritas(self, tmp_path):
+        destino = tmp_path / 'dimensional'
+        self._publicar(destino, {'dim_a': _fact(), 'fact_b': _fact()})
+        with Publicacion(destino, conservar=True) as version:
+            escribir_tabla(_fact().assign(accesos='0'), version.staging / 'dim_a.csv', formato='csv+parquet')
+        assert leer_csv(destino / 'dim_a.csv')['accesos'].eq(0).all()
+        assert leer_csv(destino / 'fact_b.csv')['accesos'].tolist() == [10, 20, 30, 40]
+        assert entrada_vigente(destino, 'fact_b') is not None
+
+    def test_error_no_publica(self, tmp_path):
+        destino = tmp_path / 'dimensional'
+        self._publicar(destino, {'dim_a': _fact()})
+        vigente = destino.resolve()
+        with pytest.raises(RuntimeError):
+            with Publicacion(destino) as version:
+                escribir_tabla(_fact().assign(accesos='0'), version.staging / 'dim_a.csv')
+                raise RuntimeError('falla a mitad de la corrida')
+        assert destino.resolve() == vigente and not version.staging.exists()
+        assert leer_csv(destino / 'dim_a.csv')['accesos'].tolist() == [10, 20, 30, 40]
+
+    def test_etl_dimensional_en_carpeta_vacia(self, tmp_path, monkeypatch):
+        from pipelines import etl_dimensional_completo as etl
+        raw = tmp_path / 'raw'
+        raw.mkdir()
+        base = {'anio': [2024, 2024], 'trimestre': [1, 1], 'provincia': ['Córdoba', 'Salta']}
+        pd.DataFrame({**base, 'velocidad': [0.5, 100.0], 'accesos': [10, 20]}).to_excel(
+            raw / 'internet_accesos_velocidad_provincias.xlsx', index=False)
+        pd.DataFrame({**base, 'adsl': [1, 2], 'fibraOptica': [3, 4]}).to_excel(
+            raw / 'internet_accesos_tecnologias_provincias.xlsx', index=False)
+        destino = tmp_path / 'dimensional'
+        monkeypatch.setattr(etl, 'RAW_DATA_PATH', raw)
+        monkeypatch.setattr(etl, 'OUTPUT_PATH', destino)
+        monkeypatch.setattr(etl, 'LOG_PATH', tmp_path / 'logs')
+        etl.main()
+        # Sin versión publicada previa: las dimensiones se leen del staging
+        velocidad = leer_csv(destino / 'fact_internet_accesos_velocidad_provincias.csv')
+        tecnologias = leer_csv(destino / 'fact_internet_accesos_tecnologias_provincias.csv')
+        assert velocidad['velocidad_id'].notna().all() and len(velocidad) == 2
+        assert tecnologias['tecnologia_id'].notna().all() and len(tecnologias) == 4
+
+
+class TestPassthrough:
+    def _dim(self):
+        return pd.DataFrame({'id': ['T1', 'T2', 'T3'], 'nombre': ['a,b', 'c"d', None], 'valor': [1.5, np.nan, 3e-05]})
+
+    def _sin_serializar(self, monkeypatch):
+        def falla(*args, **kwargs):
+            raise AssertionError('no debería serializar')
+        monkeypatch.setattr(io_csv, '_escribir_pandas', falla)
+        monkeypatch.setattr(io_csv.pacsv, 'write_csv', falla)
+        monkeypatch.setattr(salida_parquet, 'escribir_parquet', falla)
+
+    def test_copia_sin_cambios(self, tmp_path, monkeypatch):
+        origen, destino = tmp_path / 'dimensional' / 'dim_x.csv', tmp_path / 'bi' / 'dim_x.csv'
+        origen.parent.mkdir()
+        destino.parent.mkdir()
+        escribir_tabla(self._dim(), origen, formato='csv+parquet')
+        self._sin_serializar(monkeypatch)
+        escribir_tabla(self._dim(), destino, formato='csv+parquet', origen=origen)
+        assert destino.read_bytes() == origen.read_bytes()
+        assert destino.stat().st_ino != origen.stat().st_ino  # copia, no enlace: reescribir el origen no la altera
+        assert entrada_vigente(destino.parent, 'dim_x', 'parquet') is not None
+
+    def test_proyeccion_de_columnas(self, tmp_path, monkeypatch):
+        escribir_tabla(self._dim(), tmp_path / 'dim_x.csv')
+        self._sin_serializar(monkeypatch)
+        sub = self._dim()[['valor', 'nombre']]
+        escribir_tabla(sub, tmp_path / 'dim_y.csv', origen=tmp_path / 'dim_x.csv')
+        assert (tmp_path / 'dim_y.csv').read_bytes() == sub.to_csv(index=False).encode('utf-8')
+        assert entrada_vigente(tmp_path, 'dim_y')['filas'] == 3
+
+    def test_valores_distintos_se_escriben(self, tmp_path):
+        escribir_tabla(self._dim(), tmp_path / 'dim_x.csv')
+        cambiada = self._dim().assign(valor=[1.0, 2.0, 3.0])[['id', 'valor']]
+        escribir_tabla(cambiada, tmp_path / 'dim_y.csv', origen=tmp_path / 'dim_x.csv')
+        assert (tmp_path / 'dim_y.csv').read_bytes() == cambiada.to_csv(index=False).encode('utf-8')
+
+
+class TestCDC:
+    def _release(self, tmp_path, df, release):
+        path = tmp_path / 'fact_tv_accesos_provincias.csv'
+        escribir_csv(df, path)
+        return capturar(path, release, tmp_path / 'cdc')
+
+    def test_insertadas_actualizadas_eliminadas(self, tmp_path):
+        assert self._release(tmp_path, _fact(), '2024T4')['insertadas'] == 4
+        revisada = _fact().drop(index=[3])
+        revisada.loc[0, 'accesos'] = '11'
+        revisada = pd.concat([revisada, _fact().head(1).assign(anio='2016')], ignore_index=True)
+        resumen = self._release(tmp_path, revisada, '2025T1')
+        assert (resumen['insertadas'], resumen['actualizadas'], resumen['eliminadas']) == (1, 1, 1)
+        delta = cambios('fact_tv_accesos_provincias', '2025T1', tmp_path / 'cdc').set_index('_operacion')
+        assert delta.loc['U', 'accesos'] == '11' and delta.loc['I', 'anio'] == '2016'
+        assert delta.loc['D', 'accesos'] == '40'  # con los últimos valores publicados
+        assert self._release(tmp_path, revisada, '2025T1') is None  # release ya registrada
+
+    def test_estado_en_release_anterior(self, tmp_path):
+        self._release(tmp_path, _fact(), 'r1')
+        self._release(tmp_path, _fact().head(2).assign(accesos='0'), 'r2')
+        self._release(tmp_path, _fact().head(2).assign(accesos='0'), 'r3')
+        anterior = estado_en('fact_tv_accesos_provincias', 'r1', tmp_path / 'cdc')
+        esperado = _fact().sort_values(list(_fact().columns)).reset_index(drop=True)
+        pd.testing.assert_frame_equal(anterior.sort_values(list(_fact().columns)).reset_index(drop=True), esperado)
+        assert estado_en('fact_tv_accesos_provincias', carpeta=tmp_path / 'cdc')['accesos'].tolist() == ['0', '0']
+        assert len(cambios('fact_tv_accesos_provincias', 'r3', tmp_path / 'cdc')) == 0
+
+    def test_claves_repetidas_y_orden(self, tmp_path):
+        self._release(tmp_path, _fact(), 'r1')
+        # Un duplicado de una clave no cambia la clave de las filas únicas ni de la primera ocurrencia
+        con_duplicado = pd.concat([_fact(), _fact().head(1)], ignore_index=True)
+        resumen = self._release(tmp_path, con_duplicado, 'r2')
+        assert (resumen['insertadas'], resumen['actualizadas'], resumen['eliminadas']) == (1, 0, 0)
+        # Mismo contenido en otro orden: sin cambios
+        repetidas = con_duplicado.assign(anio='2014', trimestre='1', provincia_id='PR01', link_indec='06')
+        self._release(tmp_path, repetidas, 'r3')
+        resumen = self._release(tmp_path, repetidas.iloc[::-1], 'r4')
+        assert (resumen['insertadas'], resumen['actualizadas'], resumen['eliminadas']) == (0, 0, 0)
+
+    def test_clave_unificada_incluye_localidad(self, tmp_path):
+        fact = pd.DataFrame({
+            'dominio': 'Internet', 'subcategoria': 'accesos', 'variable': 'fibra', 'ProvinciaNorm': 'CORDOBA',
+            'anio': '2024', 'trimestre': '1', 'mes': '', 'partido': ['Capital', 'Capital', 'Colon'],
+            'localidad': ['Cordoba', 'Malagueño', 'Jesus Maria'], 'valor': ['10', '20', '30'],
+            'fuente_archivo': 'internet_clean.csv',
+        })
+        path = tmp_path / 'fact_unificado_long.csv'
+        escribir_csv(fact, path)
+        capturar(path, 'r1', tmp_path / 'cdc')
+        escribir_csv(fact.assign(valor=['10', '21', '30']).iloc[::-1], path)
+        resumen = capturar(path, 'r2', tmp_path / 'cdc')
+        assert (resumen['insertadas'], resumen['actualizadas'], resumen['eliminadas']) == (0, 1, 0)
+        assert cambios('fact_unificado_long', 'r2', tmp_path / 'cdc')['localidad'].tolist() == ['Malagueño']
+
+
+class TestExportExcel:
+    def _tablas(self, tmp_path):
+        carpeta = tmp_path / 'dimensional'
+        carpeta.mkdir()
+        escribir_tabla(_fact(), carpeta / 'fact_tv_accesos_provincias.csv', formato='csv')
+        escribir_csv(pd.DataFrame({'anio': [2014, 2015], 'valor': [1.5, None]}), carpeta / 'fact_tv_ingresos.csv')
+        return carpeta
+
+    def test_hojas_partidas_e_indice(self, tmp_path):
+        pytest.importorskip('xlsxwriter')
+        openpyxl = pytest.importorskip('openpyxl')
+        carpeta = self._tablas(tmp_path)
+        r = escribir_libro('tv', sorted(carpeta.glob('*.csv')), tmp_path / 'tv.xlsx', filas_por_hoja=3)
+        assert [(h['hoja'], h['filas']) for h in r['hojas']] == [('accesos_provincias', 3), ('accesos_provincias_2', 1),
+                                                                  ('ingresos', 2)]
+        wb = openpyxl.load_workbook(tmp_path / 'tv.xlsx', read_only=True)
+        assert wb.sheetnames == ['indice', 'accesos_provincias', 'accesos_provincias_2', 'ingresos']
+        filas = list(wb['accesos_provincias'].values)
+        assert filas[0] == tuple(_fact().columns) and filas[1][3] == '06'  # texto según el catálogo
+        assert list(wb['accesos_provincias_2'].values)[1][4] == '40'
+        assert list(wb['ingresos'].values)[1:] == [(2014, 1.5), (2015, None)]
+        assert list(wb['indice'].values)[2] == ('accesos_provincias_2', 'fact_tv_accesos_provincias', 2, 1)
+
+    def test_infinitos_como_celda_vacia(self, tmp_path):
+        pytest.importorskip('xlsxwriter')
+        openpyxl = pytest.importorskip('openpyxl')
+        path = tmp_path / 'fact_tv_crecimiento.csv'
+        pd.DataFrame({'anio': [2014, 2015, 2016], 'crec': [0.5, float('inf'), float('-inf')]}).to_csv(path, index=False)
+        hoja = escribir_libro('tv', [path], tmp_path / 'tv.xlsx')['hojas'][0]['hoja']
+        wb = openpyxl.load_workbook(tmp_path / 'tv.xlsx', read_only=True)
+        assert list(wb[hoja].values)[1:] == [(2014, 0.5), (2015, None), (2016, None)]
+
+    def test_libros_en_paralelo(self, tmp_path):
+        pytest.importorskip('xlsxwriter')
+        openpyxl = pytest.importorskip('openpyxl')
+        carpeta = self._tablas(tmp_path)
+        libros = {'a': [carpeta / 'fact_tv_ingresos.csv'], 'b': [carpeta / 'fact_tv_accesos_provincias.csv']}
+        resultados = exportar_excel(libros, tmp_path / 'excel', procesos=2)
+        assert [r['filas'] for r in resultados] == [2, 4]
+        assert openpyxl.load_workbook(tmp_path / 'excel' / 'b.xlsx', read_only=True).sheetnames == ['indice', 'fact_tv_accesos_provincias']
+
+
+class TestTeselas:
+    def _unificada(self):
+        return pd.DataFrame({
+            'anio': [2014, 2014, 2015, 2015], 'trimestre': [1, 1, 1, 1],
+            'ProvinciaNorm': ['CABA', 'CÓRDOBA', 'CABA', 'CÓRDOBA'],
+            'dominio': ['Internet', 'Internet', 'Internet', 'TV'],
+            'variable': ['adsl', 'adsl', 'adsl', 'suscriptores'], 'valor': [1.5, None, 2.0, 7.0],
+        })
+
+    def test_teselas_y_manifiesto(self, tmp_path):
+        resumen = generar_teselas(self._unificada(), destino=tmp_path)
+        assert (resumen['teselas'], resumen['escritas']) == (4, 4)
+        rutas = [t['ruta'] for t in leer_manifiesto(tmp_path)['teselas']]
+        assert rutas == ['provincia/caba.json.gz', 'provincia/cordoba.json.gz',
+                         'variable/internet/adsl.json.gz', 'variable/tv/suscriptores.json.gz']
+        tesela = leer_tesela('variable/internet/adsl.json.gz', tmp_path)
+        assert tesela['clave'] == {'dominio': 'Internet', 'variable': 'adsl'} and tesela['filas'] == 3
+        assert tesela['tabla']['columns'] == ['anio', 'trimestre', 'ProvinciaNorm', 'valor']
+        assert [f[3] for f in tesela['tabla']['data']] == [1.5, None, 2.0]
+
+    def test_solo_se_regeneran_las_porciones_que_cambian(self, tmp_path):
+        df = self._unificada()
+        generar_teselas(df, destino=tmp_path)
+        antes = {t['ruta']: t['etag'] for t in leer_manifiesto(tmp_path)['teselas']}
+        mtime = (tmp_path / 'provincia/caba.json.gz').stat().st_mtime_ns
+        assert generar_teselas(df, destino=tmp_path)['escritas'] == 0
+
+        df.loc[3, 'valor'] = 8.0  # solo CÓRDOBA y TV/suscriptores
+        resumen = generar_teselas(df, destino=tmp_path)
+        assert (resumen['escritas'], resumen['sin_cambios']) == (2, 2)
+        despues = {t['ruta']: t['etag'] for t in leer_manifiesto(tmp_path)['teselas']}
+        assert despues['provincia/caba.json.gz'] == antes['provincia/caba.json.gz']
+        assert despues['provincia/cordoba.json.gz'] != antes['provincia/cordoba.json.gz']
+        assert (tmp_path / 'provincia/caba.json.gz').stat().st_mtime_ns == mtime
+
+        assert generar_teselas(df[df['dominio'] == 'Internet'], destino=tmp_path)['borradas'] == 1
+        assert not (tmp_path / 'variable/tv/suscriptores.json.gz').exists()
+
+
+class TestExportHyper:
+    def _csv(self, tmp_path):
+        df = pd.DataFrame({
+            'anio': [2014, 2015, 2016], 'mes': [1.0, None, 12.0], 'accesos': [3_000_000_000, 1, 2],
+            'valor': [1.25, 2.5, None], 'ratio': [1 / 3, 0.5, 1.0], 'fecha': ['2024-01-05', '2024-02-01', None],
+            'imputado': [True, False, True], 'link_indec': ['06', '07', 'NA'], 'nota': ['a', 'NA', 'c'],
+        })
+        path = tmp_path / 'fact_prueba.csv'
+        escribir_tabla(df, path, formato='csv')  # registra link_indec como texto en el catálogo
+        return path
+
+    def test_tipos_segun_datos(self, tmp_path):
+        hyper = pytest.importorskip('tableauhyperapi')
+        SqlType = hyper.SqlType
+        perfil = {c['nombre']: c for c in perfilar_csv(self._csv(tmp_path), filas_por_lote=2)}
+        tipos = {n: tipo_hyper(c) for n, c in perfil.items()}
+        assert tipos['anio'] == SqlType.small_int() and tipos['mes'] == SqlType.small_int()
+        assert tipos['accesos'] == SqlType.big_int()
+        assert tipos['valor'] == SqlType.numeric(18, 2) and tipos['ratio'] == SqlType.double()
+        assert tipos['fecha'] == SqlType.date() and tipos['imputado'] == SqlType.bool()
+        assert tipos['link_indec'] == SqlType.text() and tipos['nota'] == SqlType.text()
+        assert (perfil['anio']['nulos'], perfil['mes']['nulos'], perfil['nota']['nulos']) == (0, 1, 0)
+
+    def test_copy_completo_y_filtrado(self, tmp_path):
+        hyper = pytest.importorskip('tableauhyperapi')
+        path = self._csv(tmp_path)
+        assert exportar_csv_a_hyper(path, tmp_path / 'prueba.hyper', 'prueba') == 3
+        assert exportar_csv_a_hyper(path, tmp_path / 'filtrada.hyper', 'prueba', columnas=['anio', 'valor'], anio=2015) == 1
+        with hyper.HyperProcess(telemetry=hyper.Telemetry.DO_NOT_SEND_USAGE_DATA_TO_TABLEAU) as hp:
+            with hyper.Connection(hp.endpoint, tmp_path / 'prueba.hyper') as con:
+                columnas = con.catalog.get_table_definition(hyper.TableName('prueba')).columns
+                assert [c.nullability for c in columnas[:2]] == [hyper.NOT_NULLABLE, hyper.NULLABLE]
+                filas = con.execute_list_query('SELECT mes, link_indec, nota, fecha FROM prueba ORDER BY anio')
+                assert [f[:3] for f in filas] == [[1, '06', 'a'], [None, '07', 'NA'], [12, 'NA', 'c']]
+                assert str(filas[0][3]) == '2024-01-05'
+            with hyper.Connection(hp.endpoint, tmp_path / 'filtrada.hyper') as con:
+                assert con.execute_list_query('SELECT anio, valor FROM prueba') == [[2015, Decimal('2.50')]]
+
+    def test_estrella_con_claves_verificadas(self, tmp_path):
+        hyper = pytest.importorskip('tableauhyperapi')
+        carpeta = tmp_path / 'dimensional'
+        carpeta.mkdir()
+        escribir_csv(pd.DataFrame({'provincia_id': ['PR01', 'PR02'], 'provincia': ['CABA', 'CHACO']}),
+                     carpeta / 'dim_provincias.csv')
+        escribir_csv(pd.DataFrame({'tecnologia_id': [1, 2], 'tecnologia': ['ADSL', 'FIBRA']}), carpeta / 'dim_tecnologias.csv')
+        escribir_csv(pd.DataFrame({'anio': [2014, 2014], 'provincia_id': ['PR01', 'PR02'], 'tecnologia_id': [1, 3],
+                                   'accesos': [10, 20]}), carpeta / 'fact_internet_accesos_tecnologias_provincias.csv')
+        escribir_csv(pd.DataFrame({'anio': [2014], 'provincia_id': ['PR02'], 'tv': [5]}), carpeta / 'fact_tv_accesos_provincias.csv')
+        tablas = tablas_estrella(carpeta)
+        assert list(tablas)[:2] == ['dim_provincias', 'dim_tecnologias']
+
+        r = exportar_estrella(tablas, tmp_path / 'modelo.hyper', conexiones=3)
+        assert r['filas']['fact_internet_accesos_tecnologias_provincias'] == 2
+        assert 'fact_tv_accesos_provincias.provincia_id -> dim_provincias' in r['declaradas']
+        assert 'dim_tecnologias.tecnologia_id PK' in r['declaradas']
+        assert r['omitidas'] == ['fact_internet_accesos_tecnologias_provincias.tecnologia_id -> dim_tecnologias '
+                                 '(1 filas no la cumplen)']
+        with hyper.HyperProcess(telemetry=hyper.Telemetry.DO_NOT_SEND_USAGE_DATA_TO_TABLEAU) as hp:
+            with hyper.Connection(hp.endpoint, tmp_path / 'modelo.hyper') as con:
+                assert len(con.catalog.get_table_names('public')) == 4
+        assert [p.name for p in tmp_path.iterdir() if p.suffix == '.hyper'] == ['modelo.hyper']
+
+    def _consultar(self, hyper, path, sql):
+        with hyper.HyperProcess(telemetry=hyper.Telemetry.DO_NOT_SEND_USAGE_DATA_TO_TABLEAU) as hp:
+            with hyper.Connection(hp.endpoint, path) as con:
+                return con.execute_list_query(sql)
+
+    def test_incremental_reemplaza_solo_los_periodos_cambiados(self, tmp_path):
+        hyper = pytest.importorskip('tableauhyperapi')
+        csv, destino = tmp_path / 'fact_unificado_long.csv', tmp_path / 'fact.hyper'
+        df = pd.DataFrame({'anio': [2014, 2014, 2014, 2015, 2015], 'trimestre': [1, 1, 2, 1, 2],
+                           'provincia': ['CABA', 'CHACO', 'CABA', 'CABA', 'CABA'], 'valor': [1.5, 2.0, 3.0, 4.0, 5.0]})
+        escribir_csv(df, csv)
+        assert actualizar_hyper({'fact': csv}, destino)['modo'] == 'completa'
+        assert actualizar_hyper({'fact': csv}, destino)['modo'] == 'sin_cambios'
+
+        df.loc[1, 'valor'] = 2.5                          # 2014T1 revisado
+        df = df[df['trimestre'].ne(2) | df['anio'].ne(2014)]  # 2014T2 eliminado
+        df = pd.concat([df, pd.DataFrame({'anio': [2015], 'trimestre': [3], 'provincia': ['CABA'], 'valor': [6.0]})])
+        escribir_csv(df, csv)
+        r = actualizar_hyper({'fact': csv}, destino)
+        assert r['modo'] == 'incremental' and r['marca_agua'] == {'fact': [2015, 3]}
+        assert r['tablas']['fact'] == {'periodos': 3, 'borradas': 3, 'insertadas': 3}
+        filas = self._consultar(hyper, destino, 'SELECT anio, trimestre, provincia, valor FROM fact ORDER BY 1, 2, 3')
+        assert [[a, t, p, float(v)] for a, t, p, v in filas] == df.sort_values(['anio', 'trimestre', 'provincia']).values.tolist()
+
+    def test_incremental_regenera_si_el_cambio_no_entra(self, tmp_path):
+        hyper = pytest.importorskip('tableauhyperapi')
+        carpeta = tmp_path / 'dimensional'
+        carpeta.mkdir()
+        escribir_csv(pd.DataFrame({'provincia_id': ['PR01', 'PR02']}), carpeta / 'dim_provincias.csv')
+        fact = pd.DataFrame({'anio': [2014, 2015], 'trimestre': [1, 1], 'provincia_id': ['PR01', 'PR02'], 'accesos': [1, 2]})
+        escribir_csv(fact, carpeta / 'fact_tv_accesos_provincias.csv')
+        destino = tmp_path / 'modelo.hyper'
+        assert actualizar_hyper(tablas_estrella(carpeta), destino, claves=True)['modo'] == 'completa'
+
+        nuevo = pd.DataFrame({'anio': [2015], 'trimestre': [2], 'provincia_id': ['PR01'], 'accesos': [3]})
+        escribir_csv(pd.concat([fact, nuevo]), carpeta / 'fact_tv_accesos_provincias.csv')
+        r = actualizar_hyper(tablas_estrella(carpeta), destino, claves=True)
+        assert r['modo'] == 'incremental' and list(r['tablas']) == ['fact_tv_accesos_provincias']
+
+        huerfana = nuevo.assign(trimestre=3, provincia_id='PR99')  # rompería la clave foránea declarada
+        escribir_csv(pd.concat([fact, nuevo, huerfana]), carpeta / 'fact_tv_accesos_provincias.csv')
+        assert actualizar_hyper(tablas_estrella(carpeta), destino, claves=True)['modo'] == 'completa'
+        assert self._consultar(hyper, destino, 'SELECT COUNT(*) FROM fact_tv_accesos_provincias') == [[4]]
+
+        grande = nuevo.assign(trimestre=4, accesos=3_000_000_000)  # ya no entra en SMALLINT
+        escribir_csv(pd.concat([fact, nuevo, huerfana, grande]), carpeta / 'fact_tv_accesos_provincias.csv')
+        assert actualizar_hyper(tablas_estrella(carpeta), destino, claves=True)['modo'] == 'completa'
+        assert self._consultar(hyper, destino, 'SELECT MAX(accesos) FROM fact_tv_accesos_provincias') == [[3_000_000_000]]